@@ -7,6 +7,9 @@ All test outputs are saved to Creations/MMedia/ with descriptive names:
   - Format: eval_XX_description.mp4 (e.g., eval_01_bottom_default.mp4)
   - All files use descriptive test names that indicate their configuration
   - Location: Creations/MMedia/ (ensured by hardcoded path and config)
+
+Visualization-only sweep (one audio analysis, all variants rendered in one pass):
+  python scripts/run_evaluation_tests.py --viz-only path/to/audio.mp3
 """
 
 import subprocess
@@ -1049,6 +1052,38 @@ def run_all_evaluation_tests():
         print(f"[CONFIG] Config files saved to: Creations/Configs/evaluation_tests/")
 
 
+
+def evaluation_variants() -> Dict[str, Dict]:
+    """EVALUATION_TESTS as visualization overrides for AudioVisualizer.generate_variants"""
+    return {
+        test["name"]: {"style": "waveform", **test.get("visualization", {}), "waveform": test["waveform"]}
+        for test in EVALUATION_TESTS
+    }
+
+
+def run_visualization_sweep(audio_path: Path):
+    """
+    Render every evaluation waveform over one audio file in a single pass.
+
+    Skips TTS, avatar and composition: the audio is analysed once and all
+    variants are encoded concurrently (see `podcast-creator visualize-batch`).
+    """
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+    from src.core.audio_visualizer import AudioVisualizer
+    from src.utils.config import load_config
+
+    output_dir = Path("Creations/MMedia")
+    output_dir.mkdir(parents=True, exist_ok=True)
+    start = time.time()
+    outputs = AudioVisualizer(load_config()).generate_variants(audio_path, evaluation_variants(), output_dir)
+    print(f"[EVAL] {len(outputs)}/{len(EVALUATION_TESTS)} visualization variants in {time.time() - start:.1f}s")
+    print(f"[OUTPUT] {output_dir}")
+
+
 if __name__ == "__main__":
-    run_all_evaluation_tests()
+    # --viz-only AUDIO: one-pass visualization sweep instead of full podcast runs
+    if len(sys.argv) == 3 and sys.argv[1] == "--viz-only":
+        run_visualization_sweep(Path(sys.argv[2]))
+    else:
+        run_all_evaluation_tests()
 
@@ -487,6 +487,65 @@ def create(
         raise typer.Exit(1)
 
 
+@app.command("visualize-batch")
+def visualize_batch(
+    audio_path: Path = typer.Argument(..., help="Audio file to visualize"),
+    variants_file: Path = typer.Argument(..., help="YAML mapping of variant name -> visualization overrides"),
+    output_dir: Path = typer.Option(Path("Creations/MMedia"), "--output-dir", "-o", help="Directory for <name>.mp4 outputs"),
+    config_file: Optional[Path] = typer.Option(None, "--config", "-c", help="Custom config file"),
+):
+    """
+    Render many visualization variants of one audio file in a single pass.
+
+    Audio is analysed once and every frame is rendered for all variants together,
+    each streaming into its own FFmpeg encoder.
+
+    Example variants file:
+        bottom_green:
+          waveform: {position: bottom}
+          primary_color: [0, 255, 0]
+        circular:
+          style: circular
+
+    Examples:
+        podcast-creator visualize-batch episode.mp3 variants.yaml
+        podcast-creator visualize-batch episode.mp3 variants.yaml -o out/sweep
+    """
+    import yaml
+
+    from src.core.audio_visualizer import AudioVisualizer
+
+    if not audio_path.exists():
+        console.print(f"[red]Error:[/red] Audio file not found: {audio_path}")
+        raise typer.Exit(1)
+    if not variants_file.exists():
+        console.print(f"[red]Error:[/red] Variants file not found: {variants_file}")
+        raise typer.Exit(1)
+
+    with open(variants_file, "r", encoding="utf-8") as f:
+        variants = yaml.safe_load(f) or {}
+    if not isinstance(variants, dict) or not variants:
+        console.print("[red]Error:[/red] Variants file must map variant names to visualization overrides")
+        raise typer.Exit(1)
+
+    config = load_config(config_file)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        outputs = AudioVisualizer(config).generate_variants(audio_path, variants, output_dir)
+    except Exception as e:
+        console.print(f"[red]Error:[/red] {e}")
+        raise typer.Exit(1) from e
+
+    table = Table(show_header=True, header_style="bold cyan")
+    table.add_column("Variant")
+    table.add_column("Output")
+    for name in variants:
+        table.add_row(name, str(outputs[name]) if name in outputs else "[red]failed[/red]")
+    console.print(table)
+    if len(outputs) < len(variants):
+        raise typer.Exit(1)
+
+
 @app.command()
 def list():
     """List all generated podcasts."""
@@ -2,12 +2,20 @@
 Audio Visualizer - Generate vibrant backgrounds that react to voice
 """
 
+from contextlib import ExitStack, contextmanager
 from pathlib import Path
 import subprocess
+from typing import Dict, Optional
 
 import librosa
 import numpy as np
-from PIL import Image, ImageDraw, ImageFilter
+from PIL import Image, ImageDraw
+
+from src.utils.audio_features import FrameFeatureTable, extract_frame_features, spectrum_normalizers
+from src.utils.glow import apply_glow, glow_reach
+from src.utils.metrics import get_peak_rss_mb, record_component_stats
+from src.utils.particles import DEFAULT_PARTICLE_COUNT, ParticleField
+from src.utils.segmented_encode import MIN_SEGMENT_SECONDS, concat_segments, segment_bounds
 
 # OpenCV for smooth, anti-aliased line drawing (fixes graininess)
 try:
@@ -23,6 +31,52 @@ try:
 except ImportError:
     pass  # librosa.display is optional, only needed for spectrogram visualization
 
+# Parallel rendering (visualization.workers > 1): frames per task, and tasks kept in
+# flight per worker (the in-order window that bounds the reorder buffer)
+PARALLEL_SHARD_FRAMES = 16
+PARALLEL_SHARDS_PER_WORKER = 2
+
+# Frame streaming watchdogs (_stream_frames_to_video): seconds to the first frame,
+# longest gap between frames reaching FFmpeg, pipeline thread start-up, supervisor
+# check period, and the overall cap as a multiple of the media duration
+FIRST_FRAME_TIMEOUT = 60.0
+FRAME_STALL_TIMEOUT = 30.0
+THREAD_START_TIMEOUT = 5.0
+WATCHDOG_INTERVAL = 1.0
+MAX_RENDER_SLOWDOWN = 20.0
+
+# Pooled frame buffers beyond what the queue holds: one being rendered, one being written
+FRAME_POOL_SPARE = 2
+
+# Raw frame formats the visualizer can pipe to FFmpeg, with bytes per pixel:
+# gray = intensity mask of a single-color style (colorized by FFmpeg), yuv420p =
+# converted before piping, rgba = alpha keyed from the black background
+PIPE_FORMATS = {"gray": 1.0, "yuv420p": 1.5, "rgb24": 3.0, "rgba": 4.0}
+
+# How frames rendered below the video rate (visualization.render_fps) reach it, per style:
+# "blend" mixes neighbouring frames in Python, "duplicate" repeats them (FFmpeg for full
+# renders); particles jump too far between frames for a blend to look like motion
+RENDER_FPS_METHODS = {"waveform": "blend", "spectrum": "blend", "circular": "blend", "particles": "duplicate"}
+
+# Per-process renderer, set up once by _init_render_worker
+_worker_render = None
+_worker_render_block = None
+
+
+def _init_render_worker(visualizer, shared_dir):
+    """Process-pool initializer: memory-map the shared feature table and build the style renderer."""
+    global _worker_render, _worker_render_block
+    features = FrameFeatureTable.load(shared_dir)
+    _worker_render = visualizer._frame_renderer(features)
+    _worker_render_block = visualizer._block_renderer(features) if visualizer.render_batch_frames > 1 else None
+
+
+def _render_frame_range(start: int, stop: int) -> np.ndarray:
+    """Render frames [start, stop) in a worker process as one (N, H, W, 3) array."""
+    if _worker_render_block is not None:
+        return _worker_render_block(start, stop)
+    return np.stack([_worker_render(i) for i in range(start, stop)])
+
 
 class AudioVisualizer:
     """Generate audio-reactive visualizations"""
@@ -40,6 +94,25 @@ class AudioVisualizer:
         self.background_color = self.viz_config.get("background_color", [10, 10, 20])  # Dark
         self.blur = self.viz_config.get("blur", 3)
         self.sensitivity = self.viz_config.get("sensitivity", 1.0)
+        self.spectrum_scale = self.viz_config.get("spectrum_scale", "log")  # Spectrum band spacing: log or linear
+        # Spectrum bar level reference: global (two-pass), lookahead, or running (legacy)
+        self.spectrum_normalization = self.viz_config.get("spectrum_normalization", "global")
+        self.spectrum_lookahead = self.viz_config.get("spectrum_lookahead", 2.0)  # Seconds, lookahead mode only
+        self.elide_silence = self.viz_config.get("elide_silence", False)  # Draw each quiet run once, then repeat it
+        self.silence_threshold_db = self.viz_config.get("silence_threshold_db", -50.0)  # Frame peak (dBFS) counted as quiet
+        self.particle_config = self.viz_config.get("particles", {}) or {}
+        self.particle_count = self.particle_config.get("count", DEFAULT_PARTICLE_COUNT)
+        self.particle_seed = self.particle_config.get("seed", None)  # None = different field every render
+        self.workers = max(1, int(self.viz_config.get("workers", 1) or 1))  # Frame render processes
+        self.render_batch_frames = max(1, int(self.viz_config.get("render_batch_frames", 8) or 1))  # Frames per render_batch block (1 = frame by frame)
+        self.encode_segments = max(1, int(config.get("video", {}).get("encode_segments", 1) or 1))  # Parallel keyframe-aligned encodes
+        self.render_fps = min(self.fps, self.viz_config.get("render_fps") or self.fps)  # Internal frame rate (<= video fps)
+        self.render_fps_method = self.viz_config.get("render_fps_method", "auto")  # auto (per style), blend, duplicate
+        self.frame_queue_mb = self.viz_config.get("frame_queue_mb", 256)  # Encoder queue budget (MB of frames)
+        self.pipe_format = self.viz_config.get("pipe_format", "auto")  # auto, rgb24, gray, yuv420p, rgba
+        # Sidecar audio feature index in storage.cache_dir (re-renders skip audio decoding)
+        cache_dir = config.get("storage", {}).get("cache_dir")
+        self.feature_cache_dir = Path(cache_dir) if cache_dir and self.viz_config.get("feature_cache", True) else None
         
         # Waveform configuration (NEW - comprehensive controls)
         self.waveform_config = self.viz_config.get("waveform", {})
@@ -70,6 +143,22 @@ class AudioVisualizer:
         self.blend_mode = self.waveform_config.get("blend_mode", "normal")  # normal, screen, add, overlay
         self.waveform_style = self.waveform_config.get("waveform_style", "continuous")  # continuous, bars, dots, filled
         self.randomize = self.waveform_config.get("randomize", False)  # Randomize per video
+        # Sampling grids per waveform region, built once per render
+        self._waveform_templates = {}
+        # Reusable render-scale canvases for region-of-interest waveform rendering
+        self._roi_canvases = {}
+        # Output crop (x, y, width, height) when rendering only the waveform band
+        self._output_band = None
+        # Recycled output frame buffers, set while frames are streamed to the encoder
+        self._frame_pool = None
+        # Frames per item the streamed generator yields (> 1 = (N, H, W, 3) blocks)
+        self._stream_block_frames = 1
+        # Frames of the current render that repeat a quiet frame instead of being drawn
+        self._elided_frames = 0
+        # (video-rate table, render_fps table) of the current render, see _render_features
+        self._render_tables = None
+        # Throughput/buffer/queue/RSS figures from the last streamed render (see _record_stream_stats)
+        self.stream_stats = None
         
         # Initialize randomization if enabled
         if self.randomize:
@@ -136,162 +225,690 @@ class AudioVisualizer:
 
     def _get_audio_duration_ffmpeg(self, audio_path: Path) -> float:
         """Get audio duration using FFmpeg (safer than librosa which can crash with C extensions)."""
-        try:
-            # Use ffprobe to get duration without loading audio into memory
-            cmd = [
-                "ffprobe",
-                "-v", "error",
-                "-show_entries", "format=duration",
-                "-of", "default=noprint_wrappers=1:nokey=1",
-                str(audio_path)
-            ]
-            result = subprocess.run(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                timeout=10
-            )
-            if result.returncode == 0 and result.stdout.strip():
-                return float(result.stdout.strip())
-        except (subprocess.TimeoutExpired, ValueError, FileNotFoundError):
-            pass
-        # Fallback: return None to use default duration
-        return None
+        from src.utils.media_probe import MediaProbe
+
+        # Shares the composer's probe of the same file (src/utils/media_probe.py); None if unknown
+        return MediaProbe(self.config.get("storage", {}).get("cache_dir")).duration(audio_path)
 
-    def generate_visualization(self, audio_path: Path, output_path: Path) -> Path:
+    def generate_visualization(self, audio_path: Path, output_path: Path, band_only: bool = False,
+                               start: Optional[float] = None, end: Optional[float] = None, compose=None) -> Path:
         """
         Generate video with audio-reactive visualization (STREAMING - memory efficient)
         
-        Uses chunked audio loading to minimize RAM usage - only loads small chunks
-        of audio at a time instead of the entire file.
+        Decodes the audio once, in order, into a per-frame feature table that every
+        style renders from - no per-frame audio loading.
+
+        With start/end only that time range is rendered. The feature table still covers
+        the whole file and every style renders frame i from it alone, so the segment's
+        frames equal the same frames of a full render (normalization, silence elision
+        and particle motion included; particles need a fixed ``particles.seed``) and
+        segments can be spliced into a full render with stream copy.
 
         Args:
             audio_path: Path to audio file
             output_path: Path for output video
+            band_only: Encode only the waveform band (see waveform_band) instead of the
+                full frame; ignored when the current settings have no single band
+            start: Segment start in seconds (rounded to a frame); None = beginning
+            end: Segment end in seconds (exclusive, rounded to a frame); None = end of audio
+            compose: compose(pipe_input, pipe_chain) -> FFmpeg command writing output_path,
+                with the frames as one of its inputs (single-pass composition, see
+                _stream_frames_to_video); None = encode the visualization on its own
 
         Returns:
             Path to generated video
         """
         print(f"[VIZ] Generating {self.style} visualization (streaming mode)...")
 
+        self._output_band = self.waveform_band() if band_only else None
+        if self._output_band is not None:
+            x, y, w, h = self._output_band
+            print(f"  [INFO] Rendering waveform band only: {w}x{h} at ({x}, {y})")
+
         # Get duration using FFmpeg (safer than librosa which can crash with C extensions)
         duration = self._get_audio_duration_ffmpeg(audio_path)
         if duration is None:
             # Fallback: use default duration if FFmpeg fails
             duration = 10.0
         
-        # Get sample rate from a small sample (only need it for frame generation)
-        y_sample, sr = librosa.load(str(audio_path), sr=None, duration=0.1, offset=0.0)
-        sr_int = int(sr)
-        del y_sample  # Free sample immediately
+        # Single decode pass - sample rate comes from the decoder, no separate probe
+        features = self._extract_frame_features(audio_path, duration)
+        sr_int = features.sample_rate
+
+        first, last = self._segment_frames(len(features), start, end)
+        segment = (first, last) != (0, len(features))
+        if segment:
+            print(f"  [INFO] Rendering segment {first / self.fps:.3f}s-{last / self.fps:.3f}s "
+                  f"(frames {first}-{last} of {len(features)})")
+            if self.style == "particles" and self.particle_seed is None:
+                print("  [WARN] particles.seed is not set - the segment will not match other renders")
+
+        # Below the video rate, frames are drawn from a resampled table and brought up to it afterwards
+        render_features = self._render_features(features)
+        subsampled = render_features is not features
+        render_first, render_last = self._rendered_range(first, last, len(render_features))
+        if subsampled:
+            print(f"  [INFO] Rendering at {self.render_fps} fps ({render_last - render_first} frames), "
+                  f"{self._retime_method()} to {self.fps} fps")
+
+        self._count_elided_frames(render_features, render_first, render_last)
+
+        # Long renders are encoded as parallel keyframe-aligned segments joined by stream copy
+        bounds = segment_bounds(first, last, self.encode_segments, min_frames=int(MIN_SEGMENT_SECONDS * self.fps))
+        if len(bounds) > 1 and compose is None:
+            video_path = self._encode_segments(features, bounds, audio_path, output_path)
+            print(f"[OK] Visualization generated: {output_path}")
+            return video_path
 
         # Generate frames as generator based on style (streaming - no memory accumulation)
-        # Pass audio_path instead of loaded array for chunked processing
-        if self.style == "waveform":
-            frame_generator = self._generate_waveform_frames_streaming_chunked(audio_path, sr_int, duration)
+        workers = min(self.workers, max(1, (render_last - render_first) // PARALLEL_SHARD_FRAMES))
+        # Spectrum and waveform stream render_batch blocks of frames (one pipe write each)
+        block_frames = self.render_batch_frames if workers == 1 and self._renders_blocks() else 1
+        # Full renders hand duplication to FFmpeg; everything else is retimed here, frame by frame
+        input_fps = self.render_fps if subsampled and not segment and self._retime_method() == "duplicate" else None
+        retime = subsampled and input_fps is None
+        self._stream_block_frames = 1 if retime else block_frames
+        if workers > 1:
+            frame_generator = self._generate_frames_parallel(render_features, workers, render_first, render_last)
+        elif segment:
+            frame_generator = self._generate_frame_range(render_features, render_first, render_last, block_frames)
+        elif self.style == "waveform":
+            frame_generator = self._generate_waveform_frames_streaming_chunked(
+                audio_path, sr_int, duration, render_features, block_frames=block_frames
+            )
         elif self.style == "spectrum":
-            # Spectrum needs full audio for STFT, but we'll use a streaming approach
-            frame_generator = self._generate_spectrum_frames_streaming_chunked(audio_path, sr_int, duration)
+            frame_generator = self._generate_spectrum_frames_streaming_chunked(
+                audio_path, sr_int, duration, render_features, block_frames=block_frames
+            )
         elif self.style == "circular":
-            frame_generator = self._generate_circular_frames_streaming_chunked(audio_path, sr_int, duration)
+            frame_generator = self._generate_circular_frames_streaming_chunked(
+                audio_path, sr_int, duration, render_features
+            )
         elif self.style == "particles":
-            frame_generator = self._generate_particle_frames_streaming_chunked(audio_path, sr_int, duration)
+            frame_generator = self._generate_particle_frames_streaming_chunked(
+                audio_path, sr_int, duration, render_features
+            )
         else:
             # Default to waveform
-            frame_generator = self._generate_waveform_frames_streaming_chunked(audio_path, sr_int, duration)
+            frame_generator = self._generate_waveform_frames_streaming_chunked(
+                audio_path, sr_int, duration, render_features, block_frames=block_frames
+            )
+        if retime:
+            frame_generator = self._retime_frames(frame_generator, first, last, render_first)
 
         # Stream frames directly to FFmpeg (no memory accumulation)
-        video_path = self._stream_frames_to_video(frame_generator, audio_path, output_path, duration)
+        if segment:
+            duration = (last - first) / self.fps
+        video_path = self._stream_frames_to_video(
+            frame_generator, audio_path, output_path, duration, audio_offset=first / self.fps, input_fps=input_fps,
+            compose=compose,
+        )
 
         print(f"[OK] Visualization generated: {output_path}")
         return video_path
 
+    def _encode_segments(self, features: FrameFeatureTable, bounds: list, audio_path: Path, output_path: Path) -> Path:
+        """
+        Render and encode each (start, stop) frame range in parallel, then join them.
+
+        All ranges (at most ``encode_segments``) are encoded at once, each streaming into
+        its own video-only FFmpeg process from a deep copy of this visualizer (render
+        caches and buffers are per copy; only the read-only feature tables are shared).
+        Frame rendering holds the GIL, so with workers > 1 the ranges draw their frames
+        in one shared pool of ``workers`` render processes (see _render_pool), over a
+        single saved copy of the table, and each range's thread only feeds its encoder.
+        Frame i depends only on the feature table, so the ranges join seamlessly; they
+        are concatenated with stream copy and the audio, from the first range's start,
+        is muxed once. The ranges encode with libx264 (never NVENC) and split
+        frame_queue_mb between them, so the queued frames stay within one budget.
+        """
+        import copy
+        import tempfile
+        import time
+        from concurrent.futures import ThreadPoolExecutor
+
+        width, height = self._frame_size()
+        suffix = ".mov" if self._resolve_pipe_format(width, height) == "rgba" else ".mp4"
+        block_frames = self.render_batch_frames if self._renders_blocks() else 1
+        render_features = self._render_features(features)
+        encoders = min(len(bounds), self.encode_segments)
+        particle_seed = self.particle_seed
+        if particle_seed is None:
+            # Every segment must simulate the same particle field
+            particle_seed = int(np.random.default_rng().integers(2**32))
+
+        def encode(segment_path, start, stop, render_pool):
+            segment_viz = copy.deepcopy(self, {id(features): features, id(render_features): render_features})
+            segment_viz._waveform_templates, segment_viz._roi_canvases = {}, {}
+            segment_viz._frame_pool = None
+            segment_viz.particle_seed = particle_seed
+            segment_viz.frame_queue_mb = self.frame_queue_mb / encoders
+            if render_pool is not None:
+                render_first, render_last = segment_viz._rendered_range(start, stop, len(render_features))
+                frames = segment_viz._generate_frames_parallel(render_features, 1, render_first, render_last,
+                                                               pool=render_pool)
+                if render_features is not features:
+                    frames = segment_viz._retime_frames(frames, start, stop, render_first)
+                segment_viz._stream_block_frames = 1
+            else:
+                frames = segment_viz._generate_output_range(features, start, stop, block_frames)
+                segment_viz._stream_block_frames = 1 if render_features is not features else block_frames
+            segment_viz._stream_frames_to_video(frames, audio_path, segment_path, (stop - start) / self.fps,
+                                                mux_audio=False)
+
+        print(f"  [INFO] Encoding {len(bounds)} keyframe-aligned segments, {encoders} at a time...")
+        start_time = time.time()
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.TemporaryDirectory(prefix="viz_segments_", dir=output_path.parent) as segment_dir:
+            segment_paths = [Path(segment_dir) / f"segment_{index:03d}{suffix}" for index in range(len(bounds))]
+            with ExitStack() as stack:
+                render_pool = None
+                if self.workers > 1:
+                    # One render pool (and one table write) for every segment
+                    render_pool = stack.enter_context(self._render_pool(render_features, self.workers, particle_seed))
+                pool = stack.enter_context(ThreadPoolExecutor(max_workers=encoders))
+                futures = [
+                    pool.submit(encode, path, start, stop, render_pool)
+                    for path, (start, stop) in zip(segment_paths, bounds, strict=True)
+                ]
+                for future in futures:
+                    future.result()
+            concat_segments(
+                segment_paths, output_path, audio_path, audio_offset=bounds[0][0] / self.fps,
+                output_args=["-f", "mov"] if suffix == ".mov" else None,
+                timeout=max(300.0, (bounds[-1][1] - bounds[0][0]) / self.fps * 0.1),
+            )
+
+        frame_count = bounds[-1][1] - bounds[0][0]
+        elapsed = time.time() - start_time
+        self.stream_stats = {
+            "frames": frame_count,
+            "segments": len(bounds),
+            "block_frames": block_frames,
+            "fps": round(frame_count / elapsed, 1) if elapsed > 0 else None,
+            "elided_frames": self._elided_frames,
+        }
+        record_component_stats("segmented_encode", self.stream_stats)
+        print(f"  [INFO] Throughput: {self.stream_stats['fps']} fps ({frame_count} frames in {elapsed:.1f}s, "
+              f"{len(bounds)} segments)")
+        return output_path
+
+    def _segment_frames(self, num_frames: int, start: Optional[float], end: Optional[float]) -> tuple:
+        """Frame range [first, last) of the start/end times in seconds (None = open end)"""
+        first = 0 if start is None else int(round(start * self.fps))
+        last = num_frames if end is None else min(num_frames, int(round(end * self.fps)))
+        if (start is not None or end is not None) and not 0 <= first < last:
+            raise ValueError(f"Invalid visualization segment: start={start}, end={end} "
+                             f"({num_frames / self.fps:.3f}s of audio)")
+        return first, last
+
+    def _render_features(self, features: FrameFeatureTable) -> FrameFeatureTable:
+        """The feature table frames are drawn from: features resampled to render_fps (features itself at the video rate)"""
+        if self.render_fps >= self.fps:
+            return features
+        if self._render_tables is None or self._render_tables[0] is not features:
+            self._render_tables = (features, features.resample(self.render_fps))
+        return self._render_tables[1]
+
+    def _retime_method(self) -> str:
+        """How render_fps frames are brought up to the video rate: blend or duplicate"""
+        if self.render_fps_method in ("blend", "duplicate"):
+            return self.render_fps_method
+        return RENDER_FPS_METHODS.get(self.style, "blend")
+
+    def _rendered_range(self, first: int, last: int, num_rendered: int) -> tuple:
+        """Rendered frames [start, stop) that video frames [first, last) are made from (see _retime_frames)"""
+        if self.render_fps >= self.fps:
+            return first, last
+        scale = self.render_fps / self.fps
+        lookahead = 2 if self._retime_method() == "blend" else 1
+        start = int(np.floor(first * scale + 1e-6))
+        return start, min(num_rendered, int(np.floor((last - 1) * scale + 1e-6)) + lookahead)
+
+    def _retime_frames(self, rendered, first: int, last: int, rendered_first: int):
+        """
+        Yield video-rate frames [first, last) from frames rendered at render_fps.
+
+        ``rendered`` yields frames (or blocks) from rendered frame ``rendered_first`` on.
+        Video frame i sits at p = i * render_fps / fps in rendered frames: "blend" mixes
+        frames floor(p) and floor(p) + 1 by the fraction of p, "duplicate" repeats frame
+        floor(p). Output frames are fresh buffers, so rendered ones are recycled as soon
+        as no later video frame needs them.
+        """
+        scale = self.render_fps / self.fps
+        blend = self._retime_method() == "blend"
+
+        def rendered_frames():
+            for item in rendered:
+                if item.ndim == 4:
+                    yield from item
+                else:
+                    yield item
+
+        source = rendered_frames()
+        held = {}  # rendered index -> frame
+        next_index = rendered_first
+        for i in range(first, last):
+            position = i * scale
+            low = int(np.floor(position + 1e-6))
+            weight = position - low if blend and position - low > 1e-6 else 0.0
+            while next_index <= (low + 1 if weight else low):
+                frame = next(source, None)
+                if frame is None:
+                    break  # The last rendered frame holds to the end
+                held[next_index] = frame
+                next_index += 1
+            low = min(low, next_index - 1)  # Past the last rendered frame, it holds
+            for index in [index for index in held if index < low]:
+                frame = held.pop(index)
+                if self._frame_pool is not None:
+                    self._frame_pool.release(frame)
+            base = held[low]
+            out = self._output_frame(base.shape)
+            if weight and low + 1 in held:
+                if OPENCV_AVAILABLE:
+                    cv2.addWeighted(base, 1.0 - weight, held[low + 1], weight, 0.0, dst=out)
+                else:
+                    np.copyto(out, (base * (1.0 - weight) + held[low + 1] * weight + 0.5).astype(np.uint8))
+            else:
+                np.copyto(out, base)
+            yield out
+
+    def _generate_output_range(self, features: FrameFeatureTable, first: int, last: int, block_frames: int = 1):
+        """Yield video-rate frames [first, last), drawn at render_fps and retimed when that is lower"""
+        render_features = self._render_features(features)
+        if render_features is features:
+            yield from self._generate_frame_range(features, first, last, block_frames)
+            return
+        render_first, render_last = self._rendered_range(first, last, len(render_features))
+        yield from self._retime_frames(
+            self._generate_frame_range(render_features, render_first, render_last, block_frames),
+            first, last, render_first,
+        )
+
+    def generate_variants(self, audio_path: Path, variants: Dict[str, dict], output_dir: Path) -> Dict[str, Path]:
+        """
+        Render several visualization configs of one audio file in a single pass.
+
+        Audio features are extracted once (shared by every variant); each variant then
+        renders through the same pipeline as generate_visualization (render_fps retiming,
+        render_batch blocks) and the variants take turns, one frame or block each, while
+        every variant streams into its own FFmpeg encoder running concurrently. A variant
+        whose encoder fails is dropped without stopping the others.
+
+        Args:
+            audio_path: Path to audio file
+            variants: Variant name -> visualization overrides, merged over this
+                visualizer's config (nested dicts such as ``waveform`` are merged too)
+            output_dir: Directory for the ``<name>.mp4`` outputs (``<name>.mov`` for
+                variants piped as rgba)
+
+        Returns:
+            Variant name -> generated video, for the variants that succeeded
+        """
+        import threading
+        from src.utils.frame_queue import FrameQueue, FrameQueueAborted
+
+        output_dir = Path(output_dir)
+        visualizers = {name: AudioVisualizer(self._variant_config(overrides)) for name, overrides in variants.items()}
+        print(f"[VIZ] Rendering {len(visualizers)} visualization variants in one pass...")
+
+        duration = self._get_audio_duration_ffmpeg(audio_path)
+        if duration is None:
+            duration = 10.0
+        spectrum = any(viz.style == "spectrum" for viz in visualizers.values())
+        features = self._extract_frame_features(audio_path, duration, spectrum=spectrum)
+
+        feeds, sources, threads = {}, {}, {}
+        results, errors = {}, {}
+
+        def _encode(name, viz, feed, output_path, input_fps):
+            """Encoder thread: stream one variant's frames from its feed into FFmpeg."""
+            def frames():
+                while (frame := feed.get()) is not None:
+                    yield frame
+            try:
+                results[name] = viz._stream_frames_to_video(frames(), audio_path, output_path, duration,
+                                                            input_fps=input_fps)
+            except Exception as e:
+                errors[name] = e
+                feed.abort(e)  # Unblock the render loop
+
+        for name, viz in visualizers.items():
+            width, height = viz._frame_size()
+            suffix = ".mov" if viz._resolve_pipe_format(width, height) == "rgba" else ".mp4"
+            block_frames = viz.render_batch_frames if viz._renders_blocks() else 1
+            render_features = viz._render_features(features)
+            subsampled = render_features is not features
+            viz._count_elided_frames(render_features)
+            # Below the video rate, duplication is left to FFmpeg and blending is done here
+            input_fps = viz.render_fps if subsampled and viz._retime_method() == "duplicate" else None
+            if input_fps is not None:
+                sources[name] = viz._generate_frame_range(render_features, 0, len(render_features), block_frames)
+            else:
+                sources[name] = viz._generate_output_range(features, 0, len(features), block_frames)
+            viz._stream_block_frames = 1 if subsampled and input_fps is None else block_frames
+            feeds[name] = FrameQueue(viz.frame_queue_mb * 1024 * 1024)
+            threads[name] = threading.Thread(
+                target=_encode, args=(name, viz, feeds[name], output_dir / f"{name}{suffix}", input_fps), daemon=True
+            )
+            threads[name].start()
+
+        # One pass over the frames: the next frame (or block) of every live variant in turn
+        active = dict(sources)
+        while active:
+            for name, source in list(active.items()):
+                try:
+                    item = next(source, None)
+                    if item is None:
+                        del active[name]
+                    else:
+                        feeds[name].put(item)
+                except FrameQueueAborted:
+                    del active[name]
+                except Exception as e:
+                    errors[name] = e
+                    feeds[name].abort(e)
+                    del active[name]
+        for feed in feeds.values():
+            feed.close()
+        for thread in threads.values():
+            thread.join()
+
+        for name, error in errors.items():
+            print(f"[ERROR] Variant {name} failed: {error}")
+        if not results:
+            raise Exception(f"All {len(visualizers)} visualization variants failed")
+        print(f"[OK] {len(results)}/{len(visualizers)} visualization variants generated in {output_dir}")
+        return {name: results[name] for name in variants if name in results}
+
+    def _variant_config(self, overrides: dict) -> dict:
+        """This visualizer's config with visualization overrides applied (nested dicts merged)"""
+        import copy
+
+        config = copy.deepcopy(self.config)
+        viz_config = config.setdefault("visualization", {})
+        for key, value in overrides.items():
+            if isinstance(value, dict) and isinstance(viz_config.get(key), dict):
+                viz_config[key] = {**viz_config[key], **value}
+            else:
+                viz_config[key] = copy.deepcopy(value)
+        return config
+
+    def _extract_frame_features(self, audio_path: Path, duration: float, spectrum: bool = None) -> FrameFeatureTable:
+        """Build the per-frame feature table for this render (cached index, or one decode pass)."""
+        if spectrum is None:
+            spectrum = self.style == "spectrum"
+        print(f"  [INFO] Analyzing audio ({int(duration * self.fps)} frames, single pass)...")
+        return extract_frame_features(
+            audio_path, self.fps, duration, spectrum=spectrum, cache_dir=self.feature_cache_dir,
+            spectrum_scale=self.spectrum_scale,
+        )
+
+    def _standalone_features(self, audio_path: Path, duration: float, spectrum: bool = None) -> FrameFeatureTable:
+        """Features for a generator called without a table: undecodable audio renders silence, as chunk loads did"""
+        try:
+            return self._extract_frame_features(audio_path, duration, spectrum=spectrum)
+        except Exception as e:
+            print(f"  [WARN] Could not decode audio ({e}) - rendering silence")
+            if spectrum is None:
+                spectrum = self.style == "spectrum"
+            return FrameFeatureTable.empty(int(duration * self.fps), self.fps, spectrum=spectrum)
+
     def _generate_waveform_frames_streaming(self, y: np.ndarray, sr: int, duration: float):
         """Generate waveform visualization frames as a generator (DEPRECATED - use chunked version)"""
         # This method kept for backward compatibility but should use chunked version
         return self._generate_waveform_frames_streaming_chunked_from_array(y, sr, duration)
     
-    def _generate_waveform_frames_streaming_chunked(self, audio_path: Path, sr: int, duration: float):
-        """Generate waveform frames using chunked audio loading (RAM efficient - only loads small chunks)"""
-        num_frames = int(duration * self.fps)
-        width, height = self.resolution
-        frame_duration = 1.0 / self.fps  # Duration of each frame in seconds
-        
-        # Load audio in small chunks (1 frame at a time + small overlap for smooth transitions)
-        chunk_overlap = 0.05  # 50ms overlap for smooth transitions
-        chunk_duration = frame_duration + chunk_overlap
+    def _generate_waveform_frames_streaming_chunked(self, audio_path: Path, sr: int, duration: float,
+                                                    features: FrameFeatureTable = None, block_frames: int = 1):
+        """Generate waveform frames from the per-frame feature table (audio decoded once, not per frame)
+
+        With block_frames > 1 (and OpenCV) it yields (N, H, W, 3) blocks from render_batch instead.
+        """
+        if features is None:
+            features = self._standalone_features(audio_path, duration)
+        num_frames = len(features)
+        render_block = self._block_renderer(features) if block_frames > 1 else None
+        if render_block is not None:
+            yield from self._generate_frame_blocks(render_block, num_frames, block_frames)
+            return
+        render = self._elide_quiet_frames(self._waveform_renderer(features), features)
         
-        print(f"  [INFO] Generating {num_frames} waveform frames (chunked loading)...")
+        print(f"  [INFO] Generating {num_frames} waveform frames (from feature table)...")
 
         for i in range(num_frames):
             # Progress reporting every 100 frames
             if i > 0 and i % 100 == 0:
                 print(f"  [INFO] Generated {i}/{num_frames} frames...", end='\r')
             
-            # Calculate time offset for this frame
-            frame_time = i * frame_duration
-            offset = max(0.0, frame_time - chunk_overlap / 2)
-            
-            # Load only the chunk needed for this frame (memory efficient!)
-            try:
-                chunk, _ = librosa.load(
-                    str(audio_path),
-                    sr=sr,
-                    offset=offset,
-                    duration=chunk_duration
-                )
-            except Exception as e:
-                # If loading fails (e.g., end of file), use silence
-                chunk = np.zeros(int(chunk_duration * sr), dtype=np.float32)
-            
-            # Calculate amplitude - use peak amplitude for maximum visibility
-            chunk_abs = np.abs(chunk)
-            if len(chunk_abs) > 0:
-                # Use peak amplitude with high boost for very visible waveforms
-                peak_amp = chunk_abs.max()
-                rms = np.sqrt(np.mean(chunk**2))
-                # Calculate amplitude - use sensitivity and multiplier directly without excessive boost
-                # This allows amplitude_multiplier to have fine-grained control without clipping
-                amplitude = (peak_amp * 0.8 + rms * 0.2) * self.sensitivity * self.amplitude_multiplier
+            yield render(i)
+    
+    def _waveform_renderer(self, features: FrameFeatureTable):
+        """render(i) -> waveform frame i (see _frame_renderer)"""
+        render_thickness = int(self._base_line_thickness() * self.render_scale)
+
+        def render(i):
+            return self._render_waveform_frame(features.window[i], self._waveform_amplitude(features, i), render_thickness)
+
+        return render
+
+    def _waveform_block_renderer(self, features: FrameFeatureTable):
+        """render_block(start, stop) -> (N, H, W, 3) waveform frames (see _block_renderer)
+
+        Amplitudes and waveform profiles of the whole block are computed with array
+        operations; only the anti-aliased strokes are rasterized frame by frame,
+        straight into the block buffer.
+        """
+        width, height = self.resolution
+        render_width = int(width * self.render_scale)
+        render_height = int(height * self.render_scale)
+        render_thickness = int(self._base_line_thickness() * self.render_scale)
+
+        # One profile per (orientation, resolution), shared by every position (see _waveform_profile)
+        profile_keys = set()
+        for position in [p.strip() for p in str(self.position).split(",")]:
+            orientation = self._get_orientation(position)
+            region_start, region_size = self._waveform_region(orientation, position, render_width, render_height)
+            template = self._waveform_template(orientation, region_start, region_size, render_width, render_height)
+            profile_keys.add((orientation, template["num_points"]))
+
+        def render_block(start, stop):
+            windows = np.asarray(features.window[start:stop], dtype=np.float32)
+            amplitudes = self._waveform_amplitude(features, slice(start, stop))
+            block_profiles = {
+                key: self._waveform_block_profiles(windows, key[0], key[1], amplitudes) for key in profile_keys
+            }
+            out_width, out_height = self._frame_size()
+            block = self._output_frame((stop - start, out_height, out_width, 3))
+            for k in range(stop - start):
+                profiles = {key: block_profiles[key][k] for key in profile_keys}
+                self._render_waveform_frame(windows[k], amplitudes[k], render_thickness, out=block[k], profiles=profiles)
+            return block
+
+        return render_block
+
+    def _waveform_amplitude(self, features: FrameFeatureTable, index):
+        """Drawing amplitude of frame index (an int, or a slice for a block of frames)"""
+        # Peak-weighted amplitude - sensitivity and multiplier applied directly without excessive boost
+        return (features.peak[index] * 0.8 + features.rms[index] * 0.2) * self.sensitivity * self.amplitude_multiplier
+    
+    def _waveform_bands(self, render_width: int, render_height: int, render_thickness: int):
+        """Return [(positions, (x0, y0, x1, y1))] disjoint output-pixel bands containing every stroke
+
+        Bands cover the waveform region plus the stroke half-width and the Lanczos
+        support, aligned to even pixels; overlapping bands are merged so their
+        positions draw onto one canvas in order. Returns None when strokes can leave
+        their region (rotation, centered baseline) or the PIL fallback is in use.
+        """
+        if not (OPENCV_AVAILABLE and self.anti_alias) or self.rotation != 0:
+            return None
+        if self.orientation_offset is not None and abs(max(0.0, min(100.0, float(self.orientation_offset))) - 50.0) < 1.0:
+            return None
+
+        width, height = self.resolution
+        scale_x = render_width / width
+        scale_y = render_height / height
+        pad = max(thickness for _, thickness in self._line_styles(render_thickness)) // 2 + 2
+        support = 4  # Lanczos4 reaches 4 output pixels each side
+
+        def span(start, stop, scale, limit):
+            lo = max(0, int(np.floor((start - pad) / scale)) - support)
+            hi = min(limit, int(np.ceil((stop + pad) / scale)) + support)
+            return lo - lo % 2, min(limit, hi + hi % 2)
+
+        bands = []
+        for position in [p.strip() for p in str(self.position).split(",")]:
+            orientation = self._get_orientation(position)
+            region_start, region_size = self._waveform_region(orientation, position, render_width, render_height)
+            if orientation == "horizontal":
+                y0, y1 = span(region_start, region_start + region_size, scale_y, height)
+                box = (0, y0, width, y1)
             else:
-                amplitude = 0.0
+                x0, x1 = span(region_start, region_start + region_size, scale_x, width)
+                box = (x0, 0, x1, height)
+
+            # Merge with every band this one overlaps (positions keep their draw order)
+            group = [position]
+            for other in list(bands):
+                other_positions, other_box = other
+                if box[0] < other_box[2] and other_box[0] < box[2] and box[1] < other_box[3] and other_box[1] < box[3]:
+                    bands.remove(other)
+                    group = other_positions + group
+                    box = (min(box[0], other_box[0]), min(box[1], other_box[1]),
+                           max(box[2], other_box[2]), max(box[3], other_box[3]))
+            bands.append((group, box))
+        return bands
+
+    def waveform_band(self):
+        """Return the (x, y, width, height) output region the waveform is drawn in
+
+        Only defined for a single-position waveform whose strokes stay inside their
+        region; returns None otherwise (the full frame is needed).
+        """
+        if self.style != "waveform":
+            return None
+        width, height = self.resolution
+        render_thickness = int(self._base_line_thickness() * self.render_scale)
+        bands = self._waveform_bands(int(width * self.render_scale), int(height * self.render_scale), render_thickness)
+        if not bands or len(bands) != 1:
+            return None
+        x0, y0, x1, y1 = bands[0][1]
+        return (x0, y0, x1 - x0, y1 - y0)
+
+    def use_alpha_layer(self) -> bool:
+        """Stream a straight-alpha RGBA layer (keyed from the black background) from now on
+
+        Encoded renders become QuickTime RLE with alpha (write them to a .mov) and
+        single-pass composition receives rgba frames, so an overlay needs no chromakey.
+        Returns False and changes nothing without OpenCV, which does the conversion.
+        """
+        if not OPENCV_AVAILABLE:
+            return False
+        self.pipe_format = "rgba"
+        return True
+
+    def _base_line_thickness(self):
+        """First configured line thickness (before render_scale)"""
+        if isinstance(self.line_thickness, (int, float)):
+            return self.line_thickness
+        if isinstance(self.line_thickness, (list, tuple)) and len(self.line_thickness) > 0:
+            return self.line_thickness[0]
+        return 12
+
+    def _frame_size(self) -> tuple:
+        """Size of the frames handed to the encoder (the band when rendering band-only)"""
+        if self._output_band is not None:
+            return self._output_band[2], self._output_band[3]
+        width, height = self.resolution
+        return width, height
+
+    def _output_frame(self, shape: tuple) -> np.ndarray:
+        """Buffer for the next output frame: a recycled one while streaming, else a new array"""
+        pool = self._frame_pool
+        if pool is not None and pool.shape == tuple(shape):
+            return pool.acquire()
+        return np.empty(shape, dtype=np.uint8)
+
+    def _roi_canvas(self, rows: int, cols: int) -> np.ndarray:
+        """Return a cleared, reusable render-scale canvas of the given size"""
+        canvas = self._roi_canvases.get((rows, cols))
+        if canvas is None:
+            canvas = np.zeros((rows, cols, 3), dtype=np.uint8)
+            self._roi_canvases[(rows, cols)] = canvas
+        else:
+            canvas.fill(0)
+        return canvas
 
-            # Determine positions to render (support multiple positions)
-            positions = [p.strip() for p in str(self.position).split(",")]
-            
-            # Render at 2x scale for smoothness (then scale down)
-            render_width = int(width * self.render_scale)
-            render_height = int(height * self.render_scale)
-            base_thickness = self.line_thickness if isinstance(self.line_thickness, (int, float)) else self.line_thickness[0] if isinstance(self.line_thickness, (list, tuple)) and len(self.line_thickness) > 0 else 12
-            render_thickness = int(base_thickness * self.render_scale)
+    def _render_waveform_frame(self, chunk: np.ndarray, amplitude: float, render_thickness: int,
+                               out: Optional[np.ndarray] = None, profiles: Optional[dict] = None) -> np.ndarray:
+        """Render one waveform frame at render_scale and scale it down to the output resolution
+
+        When every stroke stays inside its position's band, only those bands are drawn and
+        downsampled; they are pasted into a black frame (or returned alone in band-only mode).
+        ``out`` receives the frame (e.g. a slot of a block buffer); ``profiles`` may carry
+        this frame's precomputed waveform profiles.
+        """
+        width, height = self.resolution
+        render_width = int(width * self.render_scale)
+        render_height = int(height * self.render_scale)
+        
+        # Determine positions to render (support multiple positions)
+        positions = [p.strip() for p in str(self.position).split(",")]
+
+        bands = self._waveform_bands(render_width, render_height, render_thickness)
+        if bands is not None:
+            out_x, out_y = self._output_band[:2] if self._output_band is not None else (0, 0)
+            out_width, out_height = self._frame_size()
+            frame = out if out is not None else self._output_frame((out_height, out_width, 3))
+            frame.fill(0)
+            scale_x = render_width / width
+            scale_y = render_height / height
+            profiles = {} if profiles is None else profiles
+            for band_positions, (x0, y0, x1, y1) in bands:
+                rx0, ry0 = int(round(x0 * scale_x)), int(round(y0 * scale_y))
+                rx1 = min(render_width, int(round(x1 * scale_x)))
+                ry1 = min(render_height, int(round(y1 * scale_y)))
+                canvas = self._roi_canvas(ry1 - ry0, rx1 - rx0)
+                for pos in band_positions:
+                    self._draw_waveform_opencv(canvas, chunk, amplitude, render_width, render_height, pos, render_thickness,
+                                               profiles=profiles, origin=(rx0, ry0))
+                cv2.resize(canvas, (x1 - x0, y1 - y0), dst=frame[y0 - out_y:y1 - out_y, x0 - out_x:x1 - out_x],
+                           interpolation=cv2.INTER_LANCZOS4)
+            return frame
+        
+        # Create frame at 2x resolution with BLACK background (will be chromakeyed transparent)
+        if OPENCV_AVAILABLE and self.anti_alias:
+            # Use OpenCV for smooth, anti-aliased rendering
+            frame = self._roi_canvas(render_height, render_width)  # Black background
             
-            # Create frame at 2x resolution with BLACK background (will be chromakeyed transparent)
-            if OPENCV_AVAILABLE and self.anti_alias:
-                # Use OpenCV for smooth, anti-aliased rendering
-                frame = np.zeros((render_height, render_width, 3), dtype=np.uint8)  # Black background
-                
-                # Render waveforms at each position
-                for pos in positions:
-                    self._draw_waveform_opencv(frame, chunk, amplitude, render_width, render_height, pos, render_thickness)
-                
-                # Scale down from 2x resolution to target resolution (smooths pixelation)
-                frame_scaled = cv2.resize(frame, (width, height), interpolation=cv2.INTER_LANCZOS4)
-                yield frame_scaled
-            else:
-                # Fallback to PIL (original method)
-                img = Image.new("RGB", (render_width, render_height), (0, 0, 0))
-                draw = ImageDraw.Draw(img)
-                
-                for pos in positions:
-                    self._draw_waveform_pil(draw, chunk, amplitude, render_width, render_height, pos, render_thickness)
-                
-                # Scale down from 2x resolution to target resolution
-                img_scaled = img.resize((width, height), Image.Resampling.LANCZOS)
-                yield np.array(img_scaled)
+            # Render waveforms at each position (positions share one waveform profile)
+            profiles = {} if profiles is None else profiles
+            for pos in positions:
+                self._draw_waveform_opencv(frame, chunk, amplitude, render_width, render_height, pos, render_thickness,
+                                           profiles=profiles)
             
-            # Free chunk memory immediately
-            del chunk
+            # Scale down from 2x resolution to target resolution (smooths pixelation)
+            if out is not None:
+                return cv2.resize(frame, (width, height), dst=out, interpolation=cv2.INTER_LANCZOS4)
+            if self._frame_pool is None:
+                return cv2.resize(frame, (width, height), interpolation=cv2.INTER_LANCZOS4)
+            return cv2.resize(frame, (width, height), dst=self._output_frame((height, width, 3)),
+                              interpolation=cv2.INTER_LANCZOS4)
+        
+        # Fallback to PIL (original method)
+        img = Image.new("RGB", (render_width, render_height), (0, 0, 0))
+        draw = ImageDraw.Draw(img)
+        
+        for pos in positions:
+            self._draw_waveform_pil(draw, chunk, amplitude, render_width, render_height, pos, render_thickness)
+        
+        # Scale down from 2x resolution to target resolution
+        img_scaled = img.resize((width, height), Image.Resampling.LANCZOS)
+        if out is not None:
+            np.copyto(out, np.asarray(img_scaled))
+            return out
+        return np.array(img_scaled)
     
     def _generate_waveform_frames_streaming_chunked_from_array(self, y: np.ndarray, sr: int, duration: float):
         """Generate waveform frames from array with OpenCV for smooth, anti-aliased rendering (FIXES GRAININESS)"""
@@ -331,426 +948,331 @@ class AudioVisualizer:
             else:
                 amplitude = 0.0
 
-            # Determine positions to render (support multiple positions)
-            positions = [p.strip() for p in str(self.position).split(",")]
-            
-            # Create frame at 2x resolution with BLACK background (will be chromakeyed transparent)
-            if OPENCV_AVAILABLE and self.anti_alias:
-                # Use OpenCV for smooth, anti-aliased rendering
-                frame = np.zeros((render_height, render_width, 3), dtype=np.uint8)  # Black background
-                
-                # Render waveforms at each position
-                for pos in positions:
-                    self._draw_waveform_opencv(frame, chunk, amplitude, render_width, render_height, pos, render_thickness)
-                
-                # Scale down from 2x resolution to target resolution (smooths pixelation)
-                frame_scaled = cv2.resize(frame, (width, height), interpolation=cv2.INTER_LANCZOS4)
-                yield frame_scaled
-            else:
-                # Fallback to PIL (original method)
-                img = Image.new("RGB", (render_width, render_height), (0, 0, 0))
-                draw = ImageDraw.Draw(img)
-                
-                for pos in positions:
-                    self._draw_waveform_pil(draw, chunk, amplitude, render_width, render_height, pos, render_thickness)
-                
-                # Scale down from 2x resolution to target resolution
-                img_scaled = img.resize((width, height), Image.Resampling.LANCZOS)
-                yield np.array(img_scaled)
+            yield self._render_waveform_frame(chunk, amplitude, render_thickness)
     
-    def _rotate_points(self, points: list, center: tuple, angle_degrees: float) -> list:
-        """Rotate points around a center point by angle in degrees"""
+    def _rotate_points(self, points, center: tuple, angle_degrees: float):
+        """Rotate points around a center point by angle in degrees
+
+        Accepts a list of (x, y) tuples or an (N, 2) array. Lists come back as lists of
+        integer tuples, arrays as integer arrays; coordinates are truncated like int().
+        """
         if angle_degrees == 0:
             return points
-        
-        import math
-        angle_rad = math.radians(angle_degrees)
-        cos_a = math.cos(angle_rad)
-        sin_a = math.sin(angle_rad)
-        cx, cy = center
-        
-        rotated = []
-        for x, y in points:
-            # Translate to origin
-            dx = x - cx
-            dy = y - cy
-            # Rotate
-            rx = dx * cos_a - dy * sin_a
-            ry = dx * sin_a + dy * cos_a
-            # Translate back
-            rotated.append((int(rx + cx), int(ry + cy)))
-        return rotated
-    
-    def _draw_waveform_opencv(self, frame: np.ndarray, chunk: np.ndarray, amplitude: float, 
-                               width: int, height: int, position: str, base_thickness: int):
-        """Draw waveform using OpenCV with support for multiple lines, instances, rotation, and orientation offset"""
-        # Parse position and determine orientation
-        orientation = self._get_orientation(position)
-        
-        # Calculate waveform region based on position
+
+        angle_rad = np.radians(angle_degrees)
+        cos_a = np.cos(angle_rad)
+        sin_a = np.sin(angle_rad)
+        rotation = np.array([[cos_a, -sin_a], [sin_a, cos_a]])
+        origin = np.asarray(center, dtype=np.float64)
+
+        coords = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        rotated = np.trunc((coords - origin) @ rotation.T + origin).astype(np.int64)
+        if isinstance(points, np.ndarray):
+            return rotated
+        return [tuple(point) for point in rotated.tolist()]
+
+    @staticmethod
+    def _windowed_rms(chunk: np.ndarray, num_points: int) -> np.ndarray:
+        """RMS of a window around each of num_points evenly spaced positions in chunk
+
+        Uses a prefix sum of squares so every window costs O(1) regardless of its size.
+        A (frames, samples) chunk is handled row by row in one pass (same values).
+        """
+        length = chunk.shape[-1]
+        if length == 0:
+            return np.zeros(chunk.shape[:-1] + (num_points,))
+        half_window = max(10, length // (num_points * 2))
+        centers = (np.arange(num_points) * length) // num_points
+        starts = np.maximum(0, centers - half_window)
+        ends = np.minimum(length, centers + half_window)
+
+        squares = np.cumsum(np.square(chunk, dtype=np.float64), axis=-1)
+        energy = np.concatenate((np.zeros(chunk.shape[:-1] + (1,)), squares), axis=-1)
+        counts = ends - starts
+        sums = energy[..., ends] - energy[..., starts]
+        rms = np.zeros(chunk.shape[:-1] + (num_points,))
+        valid = counts > 0
+        rms[..., valid] = np.sqrt(np.maximum(sums[..., valid], 0.0) / counts[valid])
+        return rms
+
+    @staticmethod
+    def _windowed_abs_mean(chunk: np.ndarray, num_points: int, half_window: int = 2) -> np.ndarray:
+        """Mean absolute value of a small window around num_points evenly spaced positions (per row of a block)"""
+        length = chunk.shape[-1]
+        if length == 0:
+            return np.zeros(chunk.shape[:-1] + (num_points,))
+        centers = (np.arange(num_points) * length) // num_points
+        starts = np.maximum(0, centers - half_window)
+        ends = np.minimum(length, centers + half_window)
+
+        sums = np.cumsum(np.abs(chunk, dtype=np.float64), axis=-1)
+        magnitude = np.concatenate((np.zeros(chunk.shape[:-1] + (1,)), sums), axis=-1)
+        counts = ends - starts
+        means = np.zeros(chunk.shape[:-1] + (num_points,))
+        valid = counts > 0
+        means[..., valid] = (magnitude[..., ends[valid]] - magnitude[..., starts[valid]]) / counts[valid]
+        return means
+
+    @staticmethod
+    def _box_smooth(samples: np.ndarray, window_size: int) -> np.ndarray:
+        """Edge-padded moving average (keeps the historical length quirk for even windows)
+
+        Works along the last axis, so a (frames, samples) block is smoothed in one
+        prefix-sum pass over the whole block.
+        """
+        if window_size <= 1:
+            return samples
+        half = window_size // 2
+        pad_width = [(0, 0)] * (samples.ndim - 1) + [(half, half)]
+        padded = np.pad(np.asarray(samples, dtype=np.float64), pad_width, mode='edge')
+        sums = np.cumsum(padded, axis=-1)
+        sums = np.concatenate((np.zeros(sums.shape[:-1] + (1,)), sums), axis=-1)
+        return (sums[..., window_size:] - sums[..., :-window_size]) / window_size
+
+    def _compress_amplitude(self, samples: np.ndarray) -> np.ndarray:
+        """Normalize RMS samples to 0-1 against a fixed reference with soft-knee compression
+
+        Values up to 1.0 scale linearly; louder input is log-compressed
+        (2.0 -> ~1.3, 3.0 -> ~1.45, 6.0 -> ~1.65) so high multipliers don't all hit the ceiling.
+        """
+        # Fixed reference level instead of the chunk peak preserves natural dynamics
+        fixed_reference = 0.5
+        scaled = np.clip(samples / fixed_reference, 0.0, 2.0) * self.amplitude_multiplier
+        overflow = np.maximum(scaled - 1.0, 0.0)
+        compressed = np.where(scaled <= 1.0, scaled, 1.0 + (np.log1p(overflow) / np.log(7.0)) * 0.65)
+        compressed = np.where(scaled > 0, compressed, 0.0)
+        return np.clip(compressed, 0.0, 1.0)
+
+    def _waveform_region(self, orientation: str, position: str, width: int, height: int) -> tuple:
+        """Return (region_start, region_size) along the axis the waveform grows on
+
+        Horizontal waveforms get (region_y, region_height); vertical ones (region_x, region_width).
+        """
         if orientation == "horizontal":
-            # Horizontal waveform
             region_height = int(height * (self.height_percent / 100))
-            
+
             # Calculate region_y based on orientation_offset if provided, otherwise use position
             if self.orientation_offset is not None:
                 # 0 = bottom, 100 = top
                 offset_normalized = max(0.0, min(100.0, float(self.orientation_offset))) / 100.0
                 region_y = int((height - region_height) * (1.0 - offset_normalized))
+            elif position == "top":
+                region_y = 0
+            elif position == "middle":
+                region_y = (height - region_height) // 2
             else:
-                # Use position-based calculation
-                if position == "top":
-                    region_y = 0
-                elif position == "bottom":
-                    region_y = height - region_height
-                elif position == "middle":
-                    region_y = (height - region_height) // 2
-                else:
-                    region_y = height - region_height  # Default to bottom
+                region_y = height - region_height  # Bottom (default)
+            return region_y, region_height
+
+        # Vertical waveform (for left/right positions)
+        region_width = int(width * (self.width_percent / 100))
+        if position == "left":
+            region_x = int(self.left_spacing * self.render_scale)
+        elif position == "right":
+            region_x = width - region_width - int(self.right_spacing * self.render_scale)
         else:
-            # Vertical waveform (for left/right positions)
-            region_width = int(width * (self.width_percent / 100))
-            if position == "left":
-                region_x = int(self.left_spacing * self.render_scale)
-            elif position == "right":
-                region_x = width - region_width - int(self.right_spacing * self.render_scale)
+            region_x = 0  # Default to left
+        return region_x, region_width
+
+    def _waveform_template(self, orientation: str, region_start: int, region_size: int,
+                           width: int, height: int) -> dict:
+        """Return the frame-independent sampling grids for one waveform region (cached per render)"""
+        key = (orientation, region_start, region_size, width, height)
+        template = self._waveform_templates.get(key)
+        if template is None:
+            if orientation == "horizontal":
+                # Sample at reduced resolution and upsample; too many points create jagged segments
+                wave_samples = min(width, 500)
+                template = {
+                    "num_points": wave_samples,
+                    "base_x": (np.arange(wave_samples) / max(1, wave_samples - 1) * (width - 1)).astype(np.int64),
+                    "xs": np.arange(width),
+                }
             else:
-                region_x = 0  # Default to left
-        
+                template = {
+                    "num_points": height,
+                    "ys": np.arange(height),
+                    "x_scale": region_size * 0.95,
+                }
+            self._waveform_templates[key] = template
+        return template
+
+    def _waveform_profile(self, chunk: np.ndarray, orientation: str, num_points: int,
+                          amplitude: float, profiles: dict):
+        """Return the normalized waveform profile for this frame, computing it at most once
+
+        Horizontal profiles are (compressed 0-1 samples, raw amplitude midpoint); vertical
+        profiles are per-row widths in 0.1-1. All regions of a frame share one profile per
+        (orientation, resolution), so extra lines, instances and positions only add strokes.
+        """
+        key = (orientation, num_points)
+        profile = profiles.get(key)
+        if profile is not None:
+            return profile
+
+        profile = self._waveform_block_profiles(chunk[np.newaxis], orientation, num_points, np.array([amplitude]))[0]
+        profiles[key] = profile
+        return profile
+
+    def _waveform_block_profiles(self, windows: np.ndarray, orientation: str, num_points: int,
+                                 amplitudes: np.ndarray) -> list:
+        """Waveform profiles (see _waveform_profile) of a (frames, samples) block, one per frame"""
+        if orientation == "horizontal":
+            raw_samples = self._windowed_rms(windows, num_points)
+            amplitude_middles = (raw_samples.max(axis=-1) + raw_samples.min(axis=-1)) / 2.0
+            # Two smoothing passes prevent vertical bars
+            if raw_samples.shape[-1] > 3:
+                raw_samples = self._box_smooth(raw_samples, min(25, raw_samples.shape[-1] // 5))
+                raw_samples = self._box_smooth(raw_samples, min(15, raw_samples.shape[-1] // 10))
+            compressed = self._compress_amplitude(raw_samples[:, :num_points])
+            return list(zip(compressed, amplitude_middles, strict=True))
+
+        sample_avg = self._windowed_abs_mean(windows, num_points)
+        # Minimum 10% width keeps silent sections visible
+        return list(np.clip(sample_avg * np.asarray(amplitudes)[:, np.newaxis], 0.1, 1.0))
+
+    def _horizontal_stroke(self, profile: tuple, template: dict, width: int, height: int,
+                           region_y: int, region_height: int) -> tuple:
+        """Map a horizontal profile into a region as a full-width (width, 2) stroke
+
+        Direction follows orientation_offset: exactly 50 centers the line on a dynamic
+        baseline, above 50 peaks grow downward from the region top, below 50 upward
+        from the region bottom. Returns (points, rotation_center).
+        """
+        samples, amplitude_middle = profile
+        offset_normalized = max(0.0, min(100.0, float(self.orientation_offset if self.orientation_offset is not None else 0))) / 100.0
+        is_centered = abs(offset_normalized - 0.5) < 0.01
+
+        max_offset = region_height - 1
+        y_offset = np.minimum((samples * max_offset).astype(np.int64), max_offset)
+
+        if is_centered:
+            # Baseline flips to the bottom edge when the amplitude midpoint sits below video center
+            y_base = height - 1 if amplitude_middle * height > height // 2 else 0
+            base_y = np.clip(y_base + y_offset if y_base == 0 else y_base - y_offset, 0, height - 1)
+        elif offset_normalized > 0.5:
+            y_base = region_y  # Top of region - peaks extend downward
+            base_y = np.clip(y_base + y_offset, y_base, region_y + region_height - 1)
+        else:
+            y_base = region_y + region_height - 1  # Bottom of region - peaks extend upward
+            base_y = np.clip(y_base - y_offset, region_y, y_base)
+
+        # Interpolate to full width for a smooth horizontal line
+        if template["num_points"] > 1:
+            points = np.column_stack((template["xs"], np.interp(template["xs"], template["base_x"], base_y).astype(np.int64)))
+        else:
+            points = np.column_stack((template["base_x"], base_y))
+
+        # Centered waveforms rotate about the video center, others about the region center
+        center_y = height // 2 if is_centered else region_y + (region_height // 2)
+        return points, (width // 2, center_y)
+
+    def _place_horizontal_stroke(self, stroke: np.ndarray, rotation_center: tuple,
+                                 instance_offset_x: int, width: int, height: int) -> np.ndarray:
+        """Shift a horizontal stroke for one instance, rotate it and clamp it to the frame"""
+        if instance_offset_x:
+            # Shifted instances are cut off at the frame edge
+            points = stroke + np.array([instance_offset_x, 0])
+            points = points[(points[:, 0] >= 0) & (points[:, 0] < width)]
+        else:
+            points = stroke.copy()
+
+        if self.rotation != 0 and len(points):
+            points = self._rotate_points(points, rotation_center, self.rotation)
+            points = points[np.argsort(points[:, 0], kind='stable')]
+
+        points[:, 0] = np.clip(points[:, 0], 0, width - 1)
+        points[:, 1] = np.clip(points[:, 1], 0, height - 1)
+        return points
+
+    def _place_vertical_stroke(self, x_offset: np.ndarray, template: dict, height: int, position: str,
+                               region_x: int, region_width: int, x_center: int,
+                               instance_offset_y: int) -> np.ndarray:
+        """Build the (height, 2) polyline for one vertical line/instance from shared row widths"""
+        xs = x_center + x_offset if position == "left" else x_center - x_offset
+        xs = np.clip(xs, region_x + 1, region_x + region_width - 2)
+        points = np.column_stack((xs, template["ys"] + instance_offset_y))
+
+        if self.rotation != 0:
+            points = self._rotate_points(points, (region_x + (region_width // 2), height // 2), self.rotation)
+
+        points[:, 0] = np.clip(points[:, 0], region_x + 1, region_x + region_width - 2)
+        points[:, 1] = np.clip(points[:, 1], 0, height - 1)
+        return points
+
+    def _line_styles(self, base_thickness: int) -> list:
+        """Return (color, thickness) for every configured waveform line"""
+        styles = []
+        for line_idx in range(self.num_lines):
+            # Get line-specific color
+            if self.line_colors and line_idx < len(self.line_colors):
+                line_color = self.line_colors[line_idx]
+            else:
+                line_color = self.primary_color
+            color = tuple([int(c * self.opacity) for c in line_color])
+
+            # Get line-specific thickness
+            if isinstance(self.line_thickness, (list, tuple)) and line_idx < len(self.line_thickness):
+                line_thickness_val = self.line_thickness[line_idx]
+            else:
+                line_thickness_val = self.line_thickness if isinstance(self.line_thickness, (int, float)) else base_thickness
+            styles.append((color, max(1, int(line_thickness_val * self.render_scale))))
+        return styles
+
+    def _draw_waveform_opencv(self, frame: np.ndarray, chunk: np.ndarray, amplitude: float, 
+                               width: int, height: int, position: str, base_thickness: int,
+                               profiles: Optional[dict] = None, origin: tuple = (0, 0)):
+        """Draw waveform using OpenCV with support for multiple lines, instances, rotation, and orientation offset
+
+        The waveform profile is computed once per frame (pass the same ``profiles`` dict
+        for every position of a frame to share it); lines and instances are derived from
+        it with offset transforms and drawn with one cv2.polylines call per stroke.
+        width/height describe the full render canvas; when ``frame`` is only a region of
+        it, ``origin`` is that region's top-left corner in canvas coordinates.
+        """
+        origin = np.asarray(origin, dtype=np.int64)
+        orientation = self._get_orientation(position)
+        region_start, region_size = self._waveform_region(orientation, position, width, height)
+        template = self._waveform_template(orientation, region_start, region_size, width, height)
+        profile = self._waveform_profile(
+            np.asarray(chunk, dtype=np.float32), orientation, template["num_points"], amplitude,
+            profiles if profiles is not None else {}
+        )
+        styles = self._line_styles(base_thickness)
+
+        if orientation == "horizontal":
+            stroke, rotation_center = self._horizontal_stroke(
+                profile, template, width, height, region_start, region_size
+            )
+        else:
+            x_offset = (profile * template["x_scale"]).astype(np.int64)
+            # Spread multiple lines across the region
+            line_spacing = (region_size * 0.9) / max(1, self.num_lines) if self.num_lines > 1 else 0
+
         # Draw multiple instances
         for instance_idx in range(self.num_instances):
-            # Calculate instance offset
-            instance_offset_x = instance_idx * self.instances_offset if orientation == "horizontal" else 0
-            instance_offset_y = instance_idx * self.instances_offset if orientation == "vertical" else 0
-            
-            # Draw multiple lines
-            for line_idx in range(self.num_lines):
-                # Get line-specific color
-                if self.line_colors and line_idx < len(self.line_colors):
-                    line_color = self.line_colors[line_idx]
-                else:
-                    line_color = self.primary_color
-                color = tuple([int(c * self.opacity) for c in line_color])
-                
-                # Get line-specific thickness
-                if isinstance(self.line_thickness, (list, tuple)) and line_idx < len(self.line_thickness):
-                    line_thickness_val = self.line_thickness[line_idx]
-                else:
-                    line_thickness_val = self.line_thickness if isinstance(self.line_thickness, (int, float)) else base_thickness
-                line_thickness_val = max(1, int(line_thickness_val * self.render_scale))
-                
-                # Calculate line spacing for multiple lines
-                if orientation == "horizontal":
-                    line_spacing = (region_height * 0.9) / max(1, self.num_lines) if self.num_lines > 1 else 0
-                    line_y_offset = line_idx * line_spacing - (self.num_lines - 1) * line_spacing / 2
-                else:
-                    line_spacing = (region_width * 0.9) / max(1, self.num_lines) if self.num_lines > 1 else 0
-                    line_x_offset = line_idx * line_spacing - (self.num_lines - 1) * line_spacing / 2
-                
-                # Generate waveform points
-                if orientation == "horizontal":
-                    # Sample at reduced resolution and upsample for smoother curves
-                    # Too many points can create jagged vertical segments
-                    wave_samples = min(width, 500)  # Max 500 points for smoothness
-                    raw_samples = []
-                    # Determine if waveform should emanate from top (downward), center (both ways), or bottom (upward)
-                    # If orientation_offset is exactly 50 (middle), center the waveform
-                    # If > 50, emanate from top downward; if < 50, emanate from bottom upward
-                    offset_normalized = max(0.0, min(100.0, float(self.orientation_offset if self.orientation_offset is not None else 0))) / 100.0
-                    
-                    if abs(offset_normalized - 0.5) < 0.01:  # Exactly middle (within 1%)
-                        # Center the waveform - use dynamic baseline based on amplitude range
-                        is_centered = True
-                        # Will calculate y_base after we have raw_samples
-                    elif offset_normalized > 0.5:
-                        # Top: emanate downward
-                        y_base = region_y  # Top of region - peaks extend downward
-                        is_centered = False
-                    else:
-                        # Bottom: emanate upward
-                        y_base = region_y + region_height - 1  # Bottom of region - peaks extend upward
-                        is_centered = False
-                    
-                    # First pass: sample audio at reduced resolution
-                    for idx in range(wave_samples):
-                        # Map index to audio sample
-                        audio_idx = int((idx / wave_samples) * len(chunk))
-                        
-                        # Use wider window for smoother averaging
-                        window_size = max(10, len(chunk) // (wave_samples * 2))
-                        sample_start = max(0, audio_idx - window_size)
-                        sample_end = min(len(chunk), audio_idx + window_size)
-                        
-                        if sample_end > sample_start:
-                            # Use RMS for smoother representation
-                            sample_rms = np.sqrt(np.mean(chunk[sample_start:sample_end]**2))
-                            sample_value = sample_rms
-                        else:
-                            sample_value = 0.0
-                        
-                        raw_samples.append(sample_value)
-                    
-                    # For centered waveforms, calculate dynamic baseline based on amplitude range
-                    if is_centered and len(raw_samples) > 0:
-                        # Calculate amplitude middle point: (max + min) / 2
-                        max_amp = max(raw_samples)
-                        min_amp = min(raw_samples)
-                        amplitude_middle = (max_amp + min_amp) / 2.0
-                        video_center = height // 2
-                        
-                        # Convert amplitude middle to pixel position (assuming max amplitude = full height)
-                        # This is a normalized position where 1.0 = full height
-                        amplitude_middle_normalized = amplitude_middle
-                        # Scale to pixel space: if amplitude_middle is 0.5, that's middle of video height
-                        amplitude_middle_pixel = amplitude_middle_normalized * height
-                        
-                        # If amplitude middle is greater than video center, use bottom as baseline
-                        # Otherwise, use top as baseline (inverted)
-                        if amplitude_middle_pixel > video_center:
-                            # Use bottom as baseline, waveform extends upward
-                            y_base = height - 1  # Bottom of video
-                        else:
-                            # Use top as baseline, waveform extends downward (inverted)
-                            y_base = 0  # Top of video
-                    elif is_centered:
-                        # Fallback if no samples
-                        y_base = height // 2
-                    
-                    # Apply multiple passes of smoothing to prevent vertical bars
-                    if len(raw_samples) > 3:
-                        # First pass: wider smoothing
-                        window_size = min(25, len(raw_samples) // 5)
-                        if window_size > 1:
-                            kernel = np.ones(window_size) / window_size
-                            padded = np.pad(raw_samples, (window_size//2, window_size//2), mode='edge')
-                            smoothed = np.convolve(padded, kernel, mode='valid')
-                            raw_samples = smoothed.tolist()
-                        
-                        # Second pass: tighter smoothing for extra smoothness
-                        window_size = min(15, len(raw_samples) // 10)
-                        if window_size > 1:
-                            kernel = np.ones(window_size) / window_size
-                            padded = np.pad(raw_samples, (window_size//2, window_size//2), mode='edge')
-                            smoothed = np.convolve(padded, kernel, mode='valid')
-                            raw_samples = smoothed.tolist()
-                    
-                    # Use fixed reference level instead of normalizing to chunk peak
-                    # This prevents everything from hitting the ceiling
-                    # RMS values are typically 0-1 range, so use a fixed reference that allows natural dynamics
-                    fixed_reference = 0.5  # Fixed reference level (typical RMS is much lower than peak)
-                    
-                    # Generate points at reduced resolution, then interpolate to full width
-                    base_points = []
-                    for idx in range(wave_samples):
-                        sample_value = raw_samples[idx]
-                        
-                        # Normalize against fixed reference, not chunk peak
-                        # This preserves natural dynamics - only truly loud sounds hit the top
-                        if fixed_reference > 0:
-                            # Divide by fixed reference to get relative amplitude
-                            sample_normalized = sample_value / fixed_reference
-                            # Clamp to reasonable range (0-2) before applying curve
-                            sample_normalized = min(2.0, max(0.0, sample_normalized))
-                        else:
-                            sample_normalized = 0.0
-                        
-                        # Apply amplitude_multiplier FIRST to scale the input signal
-                        # This allows fine control: 0.05 = 5% of max, 1.0 = 100%, 3.0 = 300% (will be compressed)
-                        scaled_normalized = sample_normalized * self.amplitude_multiplier
-                        
-                        # Apply power curve to compress high values while preserving low values
-                        # This ensures only the loudest peaks reach maximum height
-                        # The power curve acts as a soft limiter for high multipliers
-                        if scaled_normalized > 0:
-                            # Use a more aggressive power curve to prevent ceiling clipping
-                            # For values <= 1.0: linear scaling (preserves fine detail)
-                            # For values > 1.0: aggressive compression (prevents clipping)
-                            if scaled_normalized <= 1.0:
-                                # Linear scaling for low values (preserves fine detail)
-                                base_scale = scaled_normalized
-                            else:
-                                # Compressive curve for high values: 1.0 + log(overflow) scaled
-                                # At 2.0 -> ~1.3, at 3.0 -> ~1.45, at 4.0 -> ~1.55, at 6.0 -> ~1.65
-                                # This ensures even high multipliers don't all hit the ceiling
-                                overflow = scaled_normalized - 1.0
-                                # Use logarithmic compression: log(1 + overflow) / log(max_expected)
-                                # max_expected is about 6.0 (3.0 multiplier * 2.0 max normalized)
-                                base_scale = 1.0 + (np.log(1.0 + overflow) / np.log(7.0)) * 0.65
-                            scaled_sample = base_scale
-                        else:
-                            scaled_sample = 0.0
-                        
-                        # Cap at full height - this ensures only extreme peaks reach maximum
-                        scaled_sample = min(1.0, max(0.0, scaled_sample))
-                        
-                        # Calculate y position
-                        # For centered waveforms, use full region height (single line, not symmetric)
-                        # For non-centered, use full region height
-                        max_offset = region_height - 1
-                        
-                        y_offset = int(scaled_sample * max_offset)
-                        y_offset = min(y_offset, max_offset)
-                        
-                        # For top position: peaks extend downward (y_base + y_offset)
-                        # For bottom position: peaks extend upward (y_base - y_offset)
-                        # For middle position: single line, direction based on dynamic baseline
-                        if is_centered:
-                            # Center waveform: single line, direction based on baseline position
-                            # If y_base is at top (0), extend downward; if at bottom (height-1), extend upward
-                            if y_base == 0:
-                                # Top baseline: extend downward
-                                y = y_base + y_offset + instance_offset_y
-                            else:
-                                # Bottom baseline: extend upward
-                                y = y_base - y_offset + instance_offset_y
-                            y = max(0, min(height - 1, int(y)))
-                            y_bottom_mirrored = None
-                        elif offset_normalized > 0.5:
-                            # Top: peaks extend downward
-                            y = y_base + y_offset + instance_offset_y
-                            y = max(y_base, min(region_y + region_height - 1, int(y)))
-                            y_bottom_mirrored = None
-                        else:
-                            # Bottom: peaks extend upward
-                            y = y_base - y_offset + instance_offset_y
-                            y = max(region_y, min(y_base, int(y)))
-                            y_bottom_mirrored = None
-                        
-                        # X position at reduced resolution
-                        x = int((idx / (wave_samples - 1)) * (width - 1)) + instance_offset_x
-                        x = max(0, min(width - 1, x))
-                        
-                        # Store point (single line, no mirroring)
-                        base_points.append((x, y))
-                    
-                    # Interpolate to full width for smooth horizontal line
-                    if len(base_points) > 1:
-                        points = []
-                        for x_idx in range(width):
-                            x_target = x_idx + instance_offset_x
-                            x_target = max(0, min(width - 1, x_target))
-                            
-                            # Find surrounding base points
-                            if x_target <= base_points[0][0]:
-                                y = base_points[0][1]
-                            elif x_target >= base_points[-1][0]:
-                                y = base_points[-1][1]
-                            else:
-                                # Linear interpolation between base points
-                                for i in range(len(base_points) - 1):
-                                    x1 = base_points[i][0]
-                                    y1 = base_points[i][1]
-                                    x2 = base_points[i + 1][0]
-                                    y2 = base_points[i + 1][1]
-                                    
-                                    if x1 <= x_target <= x2:
-                                        # Interpolate
-                                        if x2 != x1:
-                                            t = (x_target - x1) / (x2 - x1)
-                                            y = int(y1 + (y2 - y1) * t)
-                                        else:
-                                            y = y1
-                                        break
-                                else:
-                                    y = base_points[-1][1]
-                            
-                            points.append((x_target, y))
-                    else:
-                        points = [(base_points[0][0], base_points[0][1])]
-                    
-                    # Apply rotation if needed
-                    if self.rotation != 0:
-                        center_x = width // 2
-                        # For centered waveforms, use center of full video height
-                        # For others, use center of region
-                        if is_centered:
-                            center_y = height // 2
-                        else:
-                            center_y = region_y + (region_height // 2)
-                        points = self._rotate_points(points, (center_x, center_y), self.rotation)
-                    
-                    # Draw waveform as connected horizontal line (single line for all waveforms)
-                    if len(points) > 1:
-                        # Ensure points are sorted by X coordinate
-                        points = sorted(points, key=lambda p: p[0])
-                        
-                        # Draw line connecting consecutive points horizontally
-                        thickness = max(1, line_thickness_val)
-                        for i in range(len(points) - 1):
-                            x1, y1 = points[i]
-                            x2, y2 = points[i + 1]
-                            
-                            # Clamp coordinates
-                            x1 = max(0, min(width - 1, int(x1)))
-                            y1 = max(0, min(height - 1, int(y1)))
-                            x2 = max(0, min(width - 1, int(x2)))
-                            y2 = max(0, min(height - 1, int(y2)))
-                            
-                            # Only draw if points are close in X (horizontal connection)
-                            if abs(x2 - x1) <= 2:  # Adjacent or very close pixels
-                                cv2.line(frame, (x1, y1), (x2, y2), color, thickness, lineType=cv2.LINE_AA)
-                            else:
-                                # For larger gaps, interpolate intermediate points
-                                steps = abs(x2 - x1)
-                                for step in range(steps):
-                                    t = step / max(1, steps)
-                                    x = int(x1 + (x2 - x1) * t)
-                                    y = int(y1 + (y2 - y1) * t)
-                                    if step < steps - 1:
-                                        x_next = int(x1 + (x2 - x1) * ((step + 1) / steps))
-                                        y_next = int(y1 + (y2 - y1) * ((step + 1) / steps))
-                                        cv2.line(frame, (x, y), (x_next, y_next), color, thickness, lineType=cv2.LINE_AA)
-                
-                else:
-                    # Vertical waveform
-                    wave_samples = height
-                    points = []
-                    x_center = region_x + (region_width // 2) + int(line_x_offset) + instance_offset_x
-                    
-                    for y_idx in range(wave_samples):
-                        y = y_idx + instance_offset_y
-                        # Sample audio
-                        sample_start = max(0, int((y_idx / wave_samples) * len(chunk)) - 2)
-                        sample_end = min(len(chunk), int((y_idx / wave_samples) * len(chunk)) + 2)
-                        
-                        if sample_end > sample_start:
-                            sample_avg = np.abs(chunk[sample_start:sample_end]).mean()
-                        else:
-                            sample_avg = 0.0
-                        
-                        # Calculate x position
-                        sample_normalized = min(1.0, sample_avg * amplitude)
-                        sample_normalized = max(0.1, sample_normalized)  # Minimum 10% width
-                        x_offset = int(sample_normalized * (region_width * 0.95))
-                        
-                        if position == "left":
-                            x = x_center + x_offset
-                        else:  # right
-                            x = x_center - x_offset
-                        
-                        x = max(region_x + 1, min(region_x + region_width - 2, x))
-                        points.append((x, y))
-                    
-                    # Apply rotation if needed
-                    if self.rotation != 0:
-                        center_x = region_x + (region_width // 2)
-                        center_y = height // 2
-                        points = self._rotate_points(points, (center_x, center_y), self.rotation)
-                    
-                    # Draw waveform
-                    if len(points) > 1:
-                        valid_points = []
-                        for pt in points:
-                            x, y = pt
-                            x = max(region_x + 1, min(region_x + region_width - 2, x))
-                            y = max(0, min(height - 1, y))
-                            valid_points.append((x, y))
-                        
-                        if len(valid_points) > 1:
-                            # Draw thin line only (no fill)
-                            pts = np.array(valid_points, dtype=np.int32)
-                            thickness = max(1, line_thickness_val)
-                            cv2.polylines(frame, [pts], isClosed=False, color=color, thickness=thickness, lineType=cv2.LINE_AA)
+            if orientation == "horizontal":
+                # Every line of an instance follows the same stroke
+                points = self._place_horizontal_stroke(
+                    stroke, rotation_center, instance_idx * self.instances_offset, width, height
+                )
+                if len(points) < 2:
+                    continue
+                pts = np.ascontiguousarray(points - origin, dtype=np.int32)
+                for color, thickness in styles:
+                    cv2.polylines(frame, [pts], isClosed=False, color=color, thickness=thickness, lineType=cv2.LINE_AA)
+                continue
+
+            for line_idx, (color, thickness) in enumerate(styles):
+                line_x_offset = line_idx * line_spacing - (self.num_lines - 1) * line_spacing / 2
+                x_center = region_start + (region_size // 2) + int(line_x_offset)
+                points = self._place_vertical_stroke(
+                    x_offset, template, height, position, region_start, region_size,
+                    x_center, instance_idx * self.instances_offset
+                )
+                if len(points) > 1:
+                    pts = np.ascontiguousarray(points - origin, dtype=np.int32)
+                    cv2.polylines(frame, [pts], isClosed=False, color=color, thickness=thickness, lineType=cv2.LINE_AA)
     
     def _get_orientation(self, position: str) -> str:
         """Determine orientation based on position and config"""
@@ -848,10 +1370,7 @@ class AudioVisualizer:
                     draw.rectangle([x + 2, y_pos, x + bar_width - 2, y_pos + 1], fill=bar_color)
 
             # Add glow
-            img = img.filter(ImageFilter.GaussianBlur(self.blur))
-
-            # Yield frame immediately
-            yield np.array(img)
+            yield apply_glow(np.array(img), self.blur, out=None)
 
     def _generate_spectrum_frames_streaming(self, y: np.ndarray, sr: int, duration: float):
         """Generate spectrum analyzer frames as a generator (streaming - memory efficient)"""
@@ -899,10 +1418,7 @@ class AudioVisualizer:
                     draw.rectangle([x + 2, y_pos_draw, x + bar_width - 2, y_pos_draw + 1], fill=bar_color)
 
             # Add glow
-            img = img.filter(ImageFilter.GaussianBlur(self.blur))
-
-            # Yield frame immediately
-            yield np.array(img)
+            yield apply_glow(np.array(img), self.blur, out=None)
 
     def _generate_circular_frames_streaming(self, y: np.ndarray, sr: int, duration: float):
         """Generate circular/radial visualization frames as a generator (streaming - memory efficient)"""
@@ -910,412 +1426,616 @@ class AudioVisualizer:
 
         samples_per_frame = len(y) // num_frames
         width, height = self.resolution
-        center_x, center_y = width // 2, height // 2
+        layout = self._circular_layout(width, height)
 
         for i in range(num_frames):
-            # Create frame
-            img = Image.new("RGB", (width, height), tuple(self.background_color))
-            draw = ImageDraw.Draw(img)
-
             # Get audio chunk
             start_idx = i * samples_per_frame
             end_idx = start_idx + samples_per_frame
             chunk = y[start_idx:end_idx]
 
             # Calculate amplitude
-            amplitude = np.abs(chunk).mean() * self.sensitivity
+            amplitude = np.abs(chunk).mean() * self.sensitivity if len(chunk) else 0.0
 
-            # Draw concentric circles
-            num_circles = 8
-            base_radius = 100
+            yield self._render_circular_frame(amplitude, chunk, layout, blur=self.blur)
 
-            for circle_idx in range(num_circles):
-                radius = int(base_radius + circle_idx * 50 + amplitude * 300)
-
-                # Color gradient
-                t = circle_idx / num_circles
-                color = self._interpolate_color(self.primary_color, self.secondary_color, t)
-                _alpha = int(255 * (1 - t))  # Reserved for future transparency support
+    def _generate_particle_frames_streaming(self, y: np.ndarray, sr: int, duration: float):
+        """Generate particle-based visualization frames as a generator (DEPRECATED - use chunked version)"""
+        return self._generate_particle_frames_streaming_chunked_from_array(y, sr, duration)
+    
+    def _generate_spectrum_frames_streaming_chunked(self, audio_path: Path, sr: int, duration: float,
+                                                    features: FrameFeatureTable = None, block_frames: int = 1):
+        """Generate spectrum frames from the per-frame spectrum bands in the feature table.
+        
+        Note: The bands come from one Hann-windowed FFT centred on each frame, computed
+        during the single decode pass and grouped into (log or linear) bands there.
+        With block_frames > 1 (and OpenCV) it yields (N, H, W, 3) blocks from render_batch instead.
+        """
+        if features is None or features.spectrum is None:
+            features = self._standalone_features(audio_path, duration, spectrum=True)
+        num_frames = len(features)
+        render_block = self._block_renderer(features) if block_frames > 1 else None
+        if render_block is not None:
+            yield from self._generate_frame_blocks(render_block, num_frames, block_frames)
+            return
+        render = self._elide_quiet_frames(self._spectrum_renderer(features), features)
+        
+        print(f"  [INFO] Generating {num_frames} spectrum frames (from feature table)...")
+        
+        for i in range(num_frames):
+            yield render(i)
 
-                # Draw circle
-                bbox = [center_x - radius, center_y - radius, center_x + radius, center_y + radius]
-                draw.ellipse(bbox, outline=tuple(color), width=3)
+    def _spectrum_renderer(self, features: FrameFeatureTable):
+        """render(i) -> spectrum frame i (see _frame_renderer)"""
+        layout, normalizers = self._spectrum_tables(features)
 
-            # Draw radial lines based on frequency
-            num_lines = 32
-            for line_idx in range(num_lines):
-                angle = (line_idx / num_lines) * 2 * np.pi
+        def render(i):
+            bar_heights = features.spectrum[i] / normalizers[i]
+            
+            if OPENCV_AVAILABLE:
+                # Glow is applied inside the renderer (separable, vertical pass on the bar columns)
+                return self._render_spectrum_frame(bar_heights, layout, blur=self.blur)
+            
+            # Add glow
+            frame = self._render_spectrum_frame(bar_heights, layout)
+            return apply_glow(frame, self.blur, out=frame)
 
-                # Sample amplitude for this angle
-                sample_idx = int((line_idx / num_lines) * len(chunk))
-                if sample_idx < len(chunk):
-                    line_amplitude = abs(chunk[sample_idx]) * self.sensitivity
-                else:
-                    line_amplitude = 0
+        return render
 
-                # Calculate line endpoints
-                inner_radius = 50
-                outer_radius = int(150 + line_amplitude * 400)
+    def _spectrum_block_renderer(self, features: FrameFeatureTable):
+        """render_block(start, stop) -> (N, H, W, 3) spectrum frames (see _block_renderer)"""
+        layout, normalizers = self._spectrum_tables(features)
+        height, width = layout["height"], layout["width"]
 
-                x1 = int(center_x + inner_radius * np.cos(angle))
-                y1 = int(center_y + inner_radius * np.sin(angle))
-                x2 = int(center_x + outer_radius * np.cos(angle))
-                y2 = int(center_y + outer_radius * np.sin(angle))
+        def render_block(start, stop):
+            bar_heights = features.spectrum[start:stop] / np.asarray(normalizers[start:stop])[:, np.newaxis]
+            block = self._output_frame((stop - start, height, width, 3))
+            return self._render_spectrum_block(bar_heights, layout, block, blur=self.blur)
 
-                # Color based on position
-                t = line_idx / num_lines
-                color = self._interpolate_color(self.primary_color, self.secondary_color, t)
+        return render_block
 
-                draw.line([x1, y1, x2, y2], fill=tuple(color), width=2)
+    def _spectrum_tables(self, features: FrameFeatureTable) -> tuple:
+        """(layout, per-frame normalizers) shared by every spectrum frame of a render"""
+        width, height = self.resolution
+        layout = self._spectrum_layout(width, height, features.spectrum.shape[1])
 
-            # Add glow
-            img = img.filter(ImageFilter.GaussianBlur(self.blur))
+        # Level reference per frame (the whole table is known, so early frames can be
+        # scaled like later ones)
+        normalizers = spectrum_normalizers(
+            features.spectrum_peak, self.spectrum_normalization, int(self.spectrum_lookahead * features.fps)
+        )
+        return layout, normalizers
 
-            # Yield frame immediately
-            yield np.array(img)
+    def _spectrum_layout(self, width: int, height: int, num_bars: int) -> dict:
+        """Precompute the pixel layout and gradient ramps for spectrum bars (once per render)
 
-    def _generate_particle_frames_streaming(self, y: np.ndarray, sr: int, duration: float):
-        """Generate particle-based visualization frames as a generator (DEPRECATED - use chunked version)"""
-        return self._generate_particle_frames_streaming_chunked_from_array(y, sr, duration)
-    
-    def _generate_spectrum_frames_streaming_chunked(self, audio_path: Path, sr: int, duration: float):
-        """Generate spectrum frames using chunked audio loading (RAM efficient).
-        
-        Note: Spectrum analysis requires computing STFT on audio chunks.
-        We compute STFT on overlapping windows to maintain frequency resolution.
+        ``ramps[h]`` is the bottom-up brightness column of a bar h pixels tall (the
+        gradient stretches with the bar), ``column_map`` sends every output column to
+        its bar, or to the extra background column for gaps and the right margin.
         """
-        num_frames = int(duration * self.fps)
-        width, height = self.resolution
-        frame_duration = 1.0 / self.fps
-        num_bars = 64
-        bar_width = width // num_bars
-        
-        # For spectrum, we need a larger chunk for STFT (frequency analysis)
-        # Use 0.5 second chunks with 0.1 second overlap for smooth transitions
-        chunk_duration = 0.5
-        chunk_overlap = 0.1
-        
-        print(f"  [INFO] Generating {num_frames} spectrum frames (chunked loading)...")
+        bar_width = max(1, width // num_bars)
+        columns = np.arange(width)
+        bar_of_column = columns // bar_width
+        offset = columns % bar_width
+        inside = (offset >= 2) & (offset <= bar_width - 2) & (bar_of_column < num_bars)
+
+        # Tallest bar possible: bands never exceed the running peak
+        max_bar = int(height * 0.8 * max(1.0, self.sensitivity)) + 1
+        bar_px = np.arange(max_bar + 1)[:, np.newaxis]
+        rows = np.arange(height)[np.newaxis, :]
+        # A bar of h pixels covers h - 1 rows; row d above the bottom is lit (d + 2) / h
+        ramps = np.where(rows < bar_px - 1, np.minimum(rows + 2, bar_px - 1) / np.maximum(bar_px, 1), 0.0)
+
+        colors = np.array([
+            self._interpolate_color(self.primary_color, self.secondary_color, bar_idx / num_bars)
+            for bar_idx in range(num_bars)
+        ], dtype=np.float64)
+
+        return {
+            "width": width,
+            "height": height,
+            "column_map": np.where(inside, bar_of_column, num_bars),
+            "ramps": ramps,
+            "colors": colors,
+            "background": np.array(self.background_color, dtype=np.uint8),
+            "bars": {},  # Scratch images per block size (see _render_spectrum_block)
+        }
+
+    def _render_spectrum_frame(self, bar_heights: np.ndarray, layout: dict, blur: float = 0) -> np.ndarray:
+        """Render one spectrum frame (a block of one, see _render_spectrum_block)"""
+        frame = self._output_frame((layout["height"], layout["width"], 3))
+        self._render_spectrum_block(np.asarray(bar_heights)[np.newaxis], layout, frame[np.newaxis], blur=blur)
+        return frame
+
+    def _render_spectrum_block(self, bar_heights: np.ndarray, layout: dict, out: np.ndarray,
+                               blur: float = 0) -> np.ndarray:
+        """Render (N, num_bars) bar heights into out (N, H, W, 3) by slicing gradient ramps
+
+        Every pixel column of a bar is identical, so the block is drawn as one image of
+        one RGBx column per bar per frame and expanded to pixels with a single gather.
+        With blur > 0 (OpenCV only) a Gaussian glow is added: the vertical pass runs on
+        that column image (columns blur independently, so the whole block goes through
+        one call) and the horizontal pass only covers the rows from each frame's tallest
+        bar's glow down.
+        """
+        height, width = layout["height"], layout["width"]
+        ramps = layout["ramps"]
+        bar_px = np.clip((np.asarray(bar_heights, dtype=np.float64) * height * 0.8 * self.sensitivity).astype(np.int64),
+                         0, len(ramps) - 1)
+        count, num_bars = bar_px.shape
+
+        # Top-down rows: flip the bottom-up ramps
+        alpha = ramps[bar_px].transpose(2, 0, 1)[::-1]  # (height, count, num_bars)
+        shaded = (alpha[..., np.newaxis] * layout["colors"]).astype(np.uint8)
+
+        # (height, count, num_bars + 1, 4) scratch with an extra background column per frame;
+        # the 4th byte pads pixels to 32 bits so columns expand with a single integer gather
+        bars = layout["bars"].get(count)
+        if bars is None:
+            bars = np.zeros((height, count, num_bars + 1, 4), dtype=np.uint8)
+            bars[..., :3] = layout["background"]
+            layout["bars"][count] = bars
+        # Keep the background wherever a bar does not reach
+        bars[:, :, :-1, :3] = np.where(alpha[..., np.newaxis] > 0, shaded, layout["background"])
+        columns = bars.reshape(height, count * (num_bars + 1), 4)
+        if blur:
+            columns = cv2.GaussianBlur(columns, (1, 0), sigmaX=0, sigmaY=blur, borderType=cv2.BORDER_REPLICATE)
+
+        pixels = columns.view(np.uint32)[:, :, 0].reshape(height, count, num_bars + 1)
+        packed = np.take(pixels.transpose(1, 0, 2), layout["column_map"], axis=2)  # (count, height, width)
+        frames = packed.view(np.uint8).reshape(count, height, width, 4)
+        if not OPENCV_AVAILABLE:
+            np.copyto(out, frames[..., :3])
+            return out
+        cv2.cvtColor(frames.reshape(count * height, width, 4), cv2.COLOR_RGBA2RGB,
+                     dst=out.reshape(count * height, width, 3))
+        # Rows above the tallest bar's glow are flat background, which a horizontal blur keeps as is
+        tops = np.maximum(0, height - 1 - bar_px.max(axis=1) - glow_reach(blur))
+        for frame, top in zip(out, tops, strict=True):
+            apply_glow(frame, blur, (0, int(top), width, height), out=frame, sigma_y=0)
+        return out
+    
+    def _generate_circular_frames_streaming_chunked(self, audio_path: Path, sr: int, duration: float,
+                                                    features: FrameFeatureTable = None):
+        """Generate circular frames from the per-frame feature table (audio decoded once)"""
+        if features is None:
+            features = self._standalone_features(audio_path, duration)
+        num_frames = len(features)
+        render = self._elide_quiet_frames(self._circular_renderer(features), features)
         
-        # Track global max for normalization across chunks
-        global_max_amplitude = 0.0
+        print(f"  [INFO] Generating {num_frames} circular frames (from feature table)...")
         
         for i in range(num_frames):
-            frame_time = i * frame_duration
-            offset = max(0.0, frame_time - chunk_overlap / 2)
-            
-            # Load chunk for this frame
-            try:
-                chunk, _ = librosa.load(
-                    str(audio_path),
-                    sr=sr,
-                    offset=offset,
-                    duration=chunk_duration
-                )
-            except Exception:
-                chunk = np.zeros(int(chunk_duration * sr), dtype=np.float32)
-            
-            # Compute STFT for this chunk
-            hop_length = len(chunk) // 32  # Use smaller hop for chunk
-            if len(chunk) > hop_length:
-                D = np.abs(librosa.stft(chunk, hop_length=max(hop_length, 1)))
-                # Use the middle column (most representative of current frame)
-                # Handle edge case where STFT returns empty result
-                if D.shape[1] == 0:
-                    # No time frames in STFT, use magnitude of chunk directly
-                    spectrum = np.abs(chunk)
-                else:
-                    mid_col = D.shape[1] // 2
-                    spectrum = D[:, mid_col]
-            else:
-                spectrum = np.abs(chunk)
-            
-            # Update global max for normalization
-            if len(spectrum) > 0:
-                global_max_amplitude = max(global_max_amplitude, np.max(spectrum))
-            
-            # Create frame
-            img = Image.new("RGB", (width, height), tuple(self.background_color))
-            draw = ImageDraw.Draw(img)
-            
-            # Bin spectrum into bars
-            if len(spectrum) == 0:
-                # Empty spectrum - use zero bars
-                bar_heights = [0.0] * num_bars
-            elif len(spectrum) >= num_bars:
-                bins = np.array_split(spectrum[:num_bars*10], num_bars)  # Use first part for efficiency
-                bar_heights = [np.mean(b) for b in bins]
-            else:
-                # Spectrum too short - use mean of available data
-                mean_val = np.mean(spectrum) if len(spectrum) > 0 else 0.0
-                bar_heights = [mean_val] * num_bars
-            
-            # Normalize using global max
-            max_height = global_max_amplitude if global_max_amplitude > 0 else 1
-            bar_heights = [h / max_height for h in bar_heights]
-            
-            # Draw bars
-            for bar_idx, bar_height in enumerate(bar_heights):
-                x = bar_idx * bar_width
-                bar_h = int(bar_height * height * 0.8 * self.sensitivity)
-                y_pos = height - bar_h
-                
-                # Color gradient
-                t = bar_idx / num_bars
-                color = self._interpolate_color(self.primary_color, self.secondary_color, t)
-                
-                # Draw bar
-                for h in range(bar_h):
-                    y_pos_draw = height - h
-                    alpha = h / bar_h if bar_h > 0 else 1
-                    bar_color = tuple([int(c * alpha) for c in color])
-                    draw.rectangle([x + 2, y_pos_draw, x + bar_width - 2, y_pos_draw + 1], fill=bar_color)
-            
-            # Free chunk memory
-            del chunk
-            
-            # Add glow
-            img = img.filter(ImageFilter.GaussianBlur(self.blur))
-            
-            # Yield frame immediately
-            yield np.array(img)
+            yield render(i)
+
+    def _circular_renderer(self, features: FrameFeatureTable):
+        """render(i) -> circular frame i (see _frame_renderer)"""
+        layout = self._circular_layout(*self.resolution)
+
+        def render(i):
+            amplitude = features.mean_abs[i] * self.sensitivity
+            return self._render_circular_frame(amplitude, features.window[i], layout, blur=self.blur)
+
+        return render
     
-    def _generate_circular_frames_streaming_chunked(self, audio_path: Path, sr: int, duration: float):
-        """Generate circular frames using chunked audio loading (RAM efficient)"""
-        num_frames = int(duration * self.fps)
-        width, height = self.resolution
-        frame_duration = 1.0 / self.fps
+    def _circular_layout(self, width: int, height: int, num_circles: int = 8, num_lines: int = 32) -> dict:
+        """
+        Precompute per-render tables for the circular style.
+
+        Holds the radial angle table (cos/sin), the ring and line gradient palettes,
+        the fixed inner line endpoints, and a background-filled canvas that frames
+        are drawn into (only the previous figure's bounding box is reset per frame).
+        """
         center_x, center_y = width // 2, height // 2
-        
-        chunk_overlap = 0.05
-        chunk_duration = frame_duration + chunk_overlap
-        
-        print(f"  [INFO] Generating {num_frames} circular frames (chunked loading)...")
-        
-        for i in range(num_frames):
-            frame_time = i * frame_duration
-            offset = max(0.0, frame_time - chunk_overlap / 2)
-            
-            # Load chunk for this frame
-            try:
-                chunk, _ = librosa.load(
-                    str(audio_path),
-                    sr=sr,
-                    offset=offset,
-                    duration=chunk_duration
-                )
-            except Exception:
-                chunk = np.zeros(int(chunk_duration * sr), dtype=np.float32)
-            
-            # Create frame
-            img = Image.new("RGB", (width, height), tuple(self.background_color))
+        primary = np.asarray(self.primary_color[:3], dtype=np.float64)
+        secondary = np.asarray(self.secondary_color[:3], dtype=np.float64)
+
+        def palette(count):
+            # Same truncation as _interpolate_color, one row per item
+            t = (np.arange(count) / count)[:, np.newaxis]
+            return [tuple(int(c) for c in row) for row in (primary + (secondary - primary) * t).astype(int)]
+
+        fractions = np.arange(num_lines) / num_lines
+        angles = fractions * 2 * np.pi
+        cos, sin = np.cos(angles), np.sin(angles)
+        inner_radius = 50
+        background = tuple(int(c) for c in self.background_color[:3])
+        return {
+            "width": width,
+            "height": height,
+            "center": (center_x, center_y),
+            "ring_radii": 100.0 + np.arange(num_circles) * 50,
+            "ring_colors": palette(num_circles),
+            "line_fractions": fractions,
+            "line_colors": palette(num_lines),
+            "cos": cos,
+            "sin": sin,
+            "inner_x": (center_x + inner_radius * cos).astype(int),
+            "inner_y": (center_y + inner_radius * sin).astype(int),
+            "background": background,
+            "canvas": np.full((height, width, 3), background, dtype=np.uint8) if OPENCV_AVAILABLE else None,
+            "dirty": None,
+        }
+
+    def _render_circular_frame(self, amplitude: float, chunk: np.ndarray, layout: dict, blur: float = 0) -> np.ndarray:
+        """
+        Render one circular frame: 8 amplitude-scaled rings plus 32 radial lines.
+
+        All radii and endpoints are computed as array ops from the layout tables.
+        Glow (apply_glow) covers only the figure's bounding box.
+        """
+        width, height = layout["width"], layout["height"]
+        center_x, center_y = layout["center"]
+        ring_radii = (layout["ring_radii"] + amplitude * 300).astype(int)
+
+        # Sample one amplitude per radial line
+        if len(chunk):
+            samples = np.abs(chunk[(layout["line_fractions"] * len(chunk)).astype(int)]) * self.sensitivity
+        else:
+            samples = np.zeros(len(layout["line_fractions"]))
+        outer_radii = (150 + samples * 400).astype(int)
+        outer_x = (center_x + outer_radii * layout["cos"]).astype(int)
+        outer_y = (center_y + outer_radii * layout["sin"]).astype(int)
+
+        # Everything drawn lies within this box around the center
+        reach = max(int(ring_radii.max()), int(outer_radii.max())) + 2
+        x0, y0 = max(0, center_x - reach), max(0, center_y - reach)
+        x1, y1 = min(width, center_x + reach + 1), min(height, center_y + reach + 1)
+
+        lines = zip(layout["inner_x"], layout["inner_y"], outer_x, outer_y, layout["line_colors"], strict=True)
+        if not OPENCV_AVAILABLE:
+            img = Image.new("RGB", (width, height), layout["background"])
             draw = ImageDraw.Draw(img)
-            
-            # Calculate amplitude
-            amplitude = np.abs(chunk).mean() * self.sensitivity if len(chunk) > 0 else 0.0
-            
-            # Draw concentric circles
-            num_circles = 8
-            base_radius = 100
-            
-            for circle_idx in range(num_circles):
-                radius = int(base_radius + circle_idx * 50 + amplitude * 300)
-                
-                # Color gradient
-                t = circle_idx / num_circles
-                color = self._interpolate_color(self.primary_color, self.secondary_color, t)
-                
-                # Draw circle
-                bbox = [center_x - radius, center_y - radius, center_x + radius, center_y + radius]
-                draw.ellipse(bbox, outline=tuple(color), width=3)
-            
-            # Draw radial lines
-            num_lines = 32
-            for line_idx in range(num_lines):
-                angle = (line_idx / num_lines) * 2 * np.pi
-                
-                # Sample amplitude for this angle
-                sample_idx = int((line_idx / num_lines) * len(chunk))
-                if sample_idx < len(chunk):
-                    line_amplitude = abs(chunk[sample_idx]) * self.sensitivity
-                else:
-                    line_amplitude = 0
-                
-                # Calculate line endpoints
-                inner_radius = 50
-                outer_radius = int(150 + line_amplitude * 400)
-                
-                x1 = int(center_x + inner_radius * np.cos(angle))
-                y1 = int(center_y + inner_radius * np.sin(angle))
-                x2 = int(center_x + outer_radius * np.cos(angle))
-                y2 = int(center_y + outer_radius * np.sin(angle))
-                
-                # Color based on position
-                t = line_idx / num_lines
-                color = self._interpolate_color(self.primary_color, self.secondary_color, t)
-                
-                draw.line([x1, y1, x2, y2], fill=tuple(color), width=2)
-            
-            # Free chunk memory
-            del chunk
-            
-            # Add glow
-            img = img.filter(ImageFilter.GaussianBlur(self.blur))
-            
-            # Yield frame immediately
-            yield np.array(img)
+            for radius, color in zip(ring_radii, layout["ring_colors"], strict=True):
+                draw.ellipse([center_x - radius, center_y - radius, center_x + radius, center_y + radius],
+                             outline=color, width=3)
+            for lx1, ly1, lx2, ly2, color in lines:
+                draw.line([int(lx1), int(ly1), int(lx2), int(ly2)], fill=color, width=2)
+            frame = np.array(img)
+            return apply_glow(frame, blur, (x0, y0, x1, y1), out=frame)
+
+        canvas = layout["canvas"]
+        if layout["dirty"] is not None:
+            dx0, dy0, dx1, dy1 = layout["dirty"]
+            canvas[dy0:dy1, dx0:dx1] = layout["background"]
+        layout["dirty"] = (x0, y0, x1, y1)
+
+        # Stroke widths matched to PIL: a width-3 ellipse outline grows inward from the
+        # radius (~ a 2px cv2 ring one pixel in), a width-2 line is two 1px lines side by side
+        for radius, color in zip(ring_radii, layout["ring_colors"], strict=True):
+            cv2.circle(canvas, (center_x, center_y), max(0, int(radius) - 1), color, thickness=2, lineType=cv2.LINE_8)
+        shallow = np.abs(outer_x - layout["inner_x"]) >= np.abs(outer_y - layout["inner_y"])
+        for (lx1, ly1, lx2, ly2, color), flat in zip(lines, shallow, strict=True):
+            ox, oy = (0, -1) if flat else (-1, 0)
+            cv2.line(canvas, (int(lx1), int(ly1)), (int(lx2), int(ly2)), color, thickness=1, lineType=cv2.LINE_8)
+            cv2.line(canvas, (int(lx1) + ox, int(ly1) + oy), (int(lx2) + ox, int(ly2) + oy), color,
+                     thickness=1, lineType=cv2.LINE_8)
+
+        return apply_glow(canvas, blur, (x0, y0, x1, y1), out=self._output_frame(canvas.shape))
     
-    def _generate_particle_frames_streaming_chunked(self, audio_path: Path, sr: int, duration: float):
-        """Generate particle frames using chunked audio loading (RAM efficient)"""
-        num_frames = int(duration * self.fps)
+    def _generate_particle_frames_streaming_chunked(self, audio_path: Path, sr: int, duration: float,
+                                                    features: FrameFeatureTable = None):
+        """Generate particle frames from the per-frame feature table (audio decoded once)"""
+        if features is None:
+            features = self._standalone_features(audio_path, duration)
+        print(f"  [INFO] Generating {len(features)} particle frames (from feature table)...")
+        yield from self._render_particle_frames(features.mean_abs * self.sensitivity, frame_step=self.fps / features.fps)
+
+    def _particle_renderer(self, amplitudes: np.ndarray, frame_step: float = 1.0):
+        """
+        render(i) -> particle frame i for per-frame amplitudes (see _frame_renderer).
+
+        Louder frames move particles further (speed x (1 + 5a)) and draw them larger
+        (radius x (1 + 3a)). Positions come from the cumulative travel, so frame i
+        depends only on the seed and amplitudes[:i + 1] and can be rendered on its own.
+        ``frame_step`` is how many video frames each amplitude stands for (render_fps
+        tables), so particles keep their on-screen speed.
+        """
         width, height = self.resolution
-        frame_duration = 1.0 / self.fps
-        
-        chunk_overlap = 0.05
-        chunk_duration = frame_duration + chunk_overlap
-        
-        # Initialize particles (state maintained across frames)
-        num_particles = 200
-        particles = []
-        for _ in range(num_particles):
-            particles.append(
-                {
-                    "x": np.random.rand() * width,
-                    "y": np.random.rand() * height,
-                    "vx": (np.random.rand() - 0.5) * 5,
-                    "vy": (np.random.rand() - 0.5) * 5,
-                    "size": np.random.rand() * 5 + 2,
-                }
-            )
-        
-        print(f"  [INFO] Generating {num_frames} particle frames (chunked loading)...")
-        
-        for i in range(num_frames):
-            frame_time = i * frame_duration
-            offset = max(0.0, frame_time - chunk_overlap / 2)
-            
-            # Load chunk for this frame
-            try:
-                chunk, _ = librosa.load(
-                    str(audio_path),
-                    sr=sr,
-                    offset=offset,
-                    duration=chunk_duration
-                )
-            except Exception:
-                chunk = np.zeros(int(chunk_duration * sr), dtype=np.float32)
-            
-            amplitude = np.abs(chunk).mean() * self.sensitivity if len(chunk) > 0 else 0.0
-            
-            # Create frame
-            img = Image.new("RGB", (width, height), tuple(self.background_color))
-            draw = ImageDraw.Draw(img)
-            
-            # Update and draw particles
-            for idx, particle in enumerate(particles):
-                # Update position
-                particle["x"] += particle["vx"] * (1 + amplitude * 5)
-                particle["y"] += particle["vy"] * (1 + amplitude * 5)
-                
-                # Wrap around edges
-                if particle["x"] < 0:
-                    particle["x"] = width
-                elif particle["x"] > width:
-                    particle["x"] = 0
-                if particle["y"] < 0:
-                    particle["y"] = height
-                elif particle["y"] > height:
-                    particle["y"] = 0
-                
-                # Color based on position
-                t = idx / num_particles
-                color = self._interpolate_color(self.primary_color, self.secondary_color, t)
-                
-                # Draw particle
-                size = int(particle["size"] * (1 + amplitude * 3))
-                bbox = [
-                    int(particle["x"] - size),
-                    int(particle["y"] - size),
-                    int(particle["x"] + size),
-                    int(particle["y"] + size),
-                ]
-                draw.ellipse(bbox, fill=tuple(color))
-            
-            # Free chunk memory
-            del chunk
-            
-            # Add glow
-            img = img.filter(ImageFilter.GaussianBlur(self.blur))
+        field = ParticleField(
+            width,
+            height,
+            count=self.particle_count,
+            colors=(self.primary_color, self.secondary_color),
+            seed=self.particle_seed,
+        )
+        amplitudes = np.asarray(amplitudes, dtype=np.float64)
+        travel = np.cumsum(1 + amplitudes * 5) * frame_step
+
+        def render(i):
+            frame = field.render(travel[i], size_scale=1 + amplitudes[i] * 3, background=self.background_color,
+                                 out=self._output_frame((height, width, 3)))
             
-            # Yield frame immediately
-            yield np.array(img)
+            # Add glow around the particles
+            return apply_glow(frame, self.blur, field.drawn_box, out=frame)
+
+        return render
     
     def _generate_particle_frames_streaming_chunked_from_array(self, y: np.ndarray, sr: int, duration: float):
         """Generate particle frames from array (backward compatibility)"""
         num_frames = int(duration * self.fps)
         samples_per_frame = len(y) // num_frames
-        width, height = self.resolution
+        amplitudes = np.zeros(num_frames, dtype=np.float32)
+        if samples_per_frame > 0:
+            usable = np.abs(y[:num_frames * samples_per_frame]).reshape(num_frames, samples_per_frame)
+            amplitudes = usable.mean(axis=1) * self.sensitivity
+        yield from self._render_particle_frames(amplitudes)
+
+    def _render_particle_frames(self, amplitudes: np.ndarray, frame_step: float = 1.0):
+        """Yield one particle frame per amplitude value."""
+        render = self._particle_renderer(amplitudes, frame_step)
+        for i in range(len(amplitudes)):
+            yield render(i)
+
+    def _frame_renderer(self, features: FrameFeatureTable):
+        """
+        Random-access renderer for the configured style: render(i) -> frame i.
 
-        # Initialize particles
-        num_particles = 200
-        particles = []
-        for _ in range(num_particles):
-            particles.append(
-                {
-                    "x": np.random.rand() * width,
-                    "y": np.random.rand() * height,
-                    "vx": (np.random.rand() - 0.5) * 5,
-                    "vy": (np.random.rand() - 0.5) * 5,
-                    "size": np.random.rand() * 5 + 2,
-                }
-            )
+        Every style draws frame i from row i of the feature table plus tables built
+        here once, so frames can be produced in any order - which is what lets
+        _generate_frames_parallel hand disjoint frame ranges to worker processes.
+        """
+        if self.style == "spectrum":
+            return self._elide_quiet_frames(self._spectrum_renderer(features), features)
+        elif self.style == "circular":
+            return self._elide_quiet_frames(self._circular_renderer(features), features)
+        elif self.style == "particles":
+            return self._particle_renderer(features.mean_abs * self.sensitivity, frame_step=self.fps / features.fps)
+        # Default to waveform
+        return self._elide_quiet_frames(self._waveform_renderer(features), features)
 
-        for i in range(num_frames):
-            # Create frame
-            img = Image.new("RGB", (width, height), tuple(self.background_color))
-            draw = ImageDraw.Draw(img)
+    def _block_renderer(self, features: FrameFeatureTable):
+        """
+        Block renderer for the configured style: render_block(start, stop) -> frames [start, stop).
 
-            # Get audio chunk
-            start_idx = i * samples_per_frame
-            end_idx = start_idx + samples_per_frame
-            chunk = y[start_idx:end_idx]
-            amplitude = np.abs(chunk).mean() * self.sensitivity
-
-            # Update and draw particles
-            for idx, particle in enumerate(particles):
-                # Update position
-                particle["x"] += particle["vx"] * (1 + amplitude * 5)
-                particle["y"] += particle["vy"] * (1 + amplitude * 5)
-
-                # Wrap around edges
-                if particle["x"] < 0:
-                    particle["x"] = width
-                elif particle["x"] > width:
-                    particle["x"] = 0
-                if particle["y"] < 0:
-                    particle["y"] = height
-                elif particle["y"] > height:
-                    particle["y"] = 0
-
-                # Color based on position
-                t = idx / num_particles
-                color = self._interpolate_color(self.primary_color, self.secondary_color, t)
+        Returns one contiguous (N, H, W, 3) array per call, so a block reaches the encoder
+        pipe in a single write. Spectrum and waveform compute the geometry of the whole
+        block with array operations (output identical to render(i) frame by frame).
+        Returns None for styles that only render frame by frame (circular, particles)
+        and for the PIL fallback.
+        """
+        if not self._renders_blocks():
+            return None
+        if self.style == "spectrum":
+            return self._elide_quiet_blocks(self._spectrum_block_renderer(features), features)
+        # Default to waveform
+        return self._elide_quiet_blocks(self._waveform_block_renderer(features), features)
+
+    def _renders_blocks(self) -> bool:
+        """True if the configured style has a block renderer (see _block_renderer)"""
+        if not OPENCV_AVAILABLE or self.style in ("circular", "particles"):
+            return False
+        return self.style == "spectrum" or self.anti_alias
+
+    def render_batch(self, features: FrameFeatureTable, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        """
+        Render frames [start, stop) of a feature table as one (N, H, W, 3) uint8 array.
 
-                # Draw particle
-                size = int(particle["size"] * (1 + amplitude * 3))
-                bbox = [
-                    int(particle["x"] - size),
-                    int(particle["y"] - size),
-                    int(particle["x"] + size),
-                    int(particle["y"] + size),
-                ]
-                draw.ellipse(bbox, fill=tuple(color))
+        Args:
+            features: Feature table of the whole render (normalization looks across frames)
+            start: First frame
+            stop: End frame (exclusive); None = the end of the table
 
-            # Add glow
-            img = img.filter(ImageFilter.GaussianBlur(self.blur))
+        Returns:
+            The frames, identical to rendering them one at a time
+        """
+        stop = len(features) if stop is None else min(stop, len(features))
+        render_block = self._block_renderer(features)
+        if render_block is not None:
+            return render_block(start, stop)
+        render = self._frame_renderer(features)
+        return np.stack([render(i) for i in range(start, stop)])
+
+    def _generate_frame_blocks(self, render_block, stop: int, block_frames: int, first: int = 0):
+        """Yield frames [first, stop) as (N, H, W, 3) blocks of block_frames frames, in order"""
+        print(f"  [INFO] Generating {stop - first} {self.style} frames in blocks of {block_frames}...")
+        for start in range(first, stop, block_frames):
+            yield render_block(start, min(stop, start + block_frames))
+
+    def _generate_frame_range(self, features: FrameFeatureTable, first: int, last: int, block_frames: int = 1):
+        """Yield frames [first, last) of the render (in blocks when block_frames > 1 and the style has them)"""
+        render_block = self._block_renderer(features) if block_frames > 1 else None
+        if render_block is not None:
+            yield from self._generate_frame_blocks(render_block, last, block_frames, first)
+            return
+        render = self._frame_renderer(features)
+        print(f"  [INFO] Generating {last - first} {self.style} frames (from feature table)...")
+        for i in range(first, last):
+            yield render(i)
+
+    def _count_elided_frames(self, features: FrameFeatureTable, first: int = 0, last: Optional[int] = None) -> int:
+        """Record (and report) how many frames of this render (frames [first, last)) silence elision will skip"""
+        run_starts = self._quiet_run_starts(features)
+        self._elided_frames = 0
+        if run_starts is not None:
+            last = len(features) if last is None else last
+            run_starts = run_starts[first:last]
+            repeats = (run_starts >= 0) & (run_starts != np.arange(first, last))
+            self._elided_frames = int(np.count_nonzero(repeats))
+            print(f"  [INFO] Silence elision: {self._elided_frames}/{last - first} frames repeat a quiet frame "
+                  f"({self._elided_frames / max(1, last - first):.0%})")
+        return self._elided_frames
+
+    def _quiet_run_starts(self, features: FrameFeatureTable) -> Optional[np.ndarray]:
+        """
+        For every frame, the first frame of the quiet run it belongs to (-1 if not quiet).
+
+        A frame is quiet when its peak is below silence_threshold_db. Returns None when
+        elision is off or the style keeps moving through silence (particles).
+        """
+        if not self.elide_silence or self.style == "particles":
+            return None
+        quiet = np.asarray(features.peak) < 10 ** (self.silence_threshold_db / 20)
+        index = np.arange(len(quiet))
+        starts = np.where(quiet & ~np.concatenate(([False], quiet[:-1])), index, 0)
+        run_starts = np.maximum.accumulate(starts) if len(starts) else starts
+        run_starts[~quiet] = -1
+        return run_starts
+
+    def _elide_quiet_frames(self, render, features: FrameFeatureTable):
+        """
+        Wrap render(i) so each run of quiet frames is drawn once and then repeated.
+
+        Every frame of a run shows the run's first frame, whichever frame of the run is
+        asked for first, so sequential and parallel (sharded) renders stay identical.
+        The repeated frame is a private copy: pooled buffers are recycled by the writer.
+        """
+        run_starts = self._quiet_run_starts(features)
+        if run_starts is None:
+            return render
+        held = {"start": None, "frame": None}
+
+        def render_elided(i):
+            start = run_starts[i]
+            if start < 0:
+                return render(i)
+            if held["start"] != start:
+                frame = render(int(start))
+                held["start"], held["frame"] = start, frame.copy()
+                if self._frame_pool is not None:
+                    self._frame_pool.release(frame)
+            return held["frame"]
+
+        return render_elided
+
+    def _elide_quiet_blocks(self, render_block, features: FrameFeatureTable):
+        """
+        Block counterpart of _elide_quiet_frames: quiet frames show their run's first frame.
+
+        Only the loud stretches of [start, stop), plus the first frame of a quiet run not
+        held yet, are rendered (adjacent ones in a single call); the remaining quiet rows
+        are filled from the held frame.
+        """
+        run_starts = self._quiet_run_starts(features)
+        if run_starts is None:
+            return render_block
+        held = {"start": None, "frame": None}
+
+        def render_elided(start, stop):
+            runs = run_starts[start:stop]
+            if not np.any(runs >= 0):
+                return render_block(start, stop)
+            if 0 <= runs[0] < start and held["start"] != runs[0]:
+                # A run that began before this block (e.g. at a shard boundary) is drawn alone
+                rendered = render_block(int(runs[0]), int(runs[0]) + 1)
+                held["start"], held["frame"] = runs[0], rendered[0].copy()
+                if self._frame_pool is not None:
+                    self._frame_pool.release(rendered)
+
+            draw = (runs < 0) | ((runs == np.arange(start, stop)) & (runs != held["start"]))
+            edges = np.flatnonzero(np.diff(np.concatenate(([0], draw.view(np.int8), [0]))))
+            block = None
+            for a, b in zip(edges[::2], edges[1::2], strict=True):
+                rendered = render_block(start + int(a), start + int(b))
+                if a == 0 and b == stop - start:
+                    block = rendered  # Every row drawn: the rendered block is the output
+                    break
+                if block is None:
+                    block = self._output_frame((stop - start,) + rendered.shape[1:])
+                block[a:b] = rendered
+                if self._frame_pool is not None:
+                    self._frame_pool.release(rendered)
+            if block is None:
+                block = self._output_frame((stop - start,) + held["frame"].shape)
+
+            for k in np.flatnonzero(runs >= 0):
+                if held["start"] != runs[k]:
+                    # Only reached for a run starting at frame k, drawn above
+                    held["start"], held["frame"] = runs[k], block[k].copy()
+                block[k] = held["frame"]
+            return block
+
+        return render_elided
+
+    def _generate_frames_parallel(self, features: FrameFeatureTable, workers: int, first: int = 0,
+                                  last: Optional[int] = None, pool=None):
+        """
+        Render frames [first, last) in a pool of worker processes and yield them in order.
+
+        Contiguous shards of up to PARALLEL_SHARD_FRAMES frames are submitted in order,
+        and at most ``workers * PARALLEL_SHARDS_PER_WORKER`` shards are in flight; the
+        oldest shard is always awaited first, so that window doubles as the reorder
+        buffer. Shards shrink and the window narrows so the frames in flight stay within
+        frame_queue_mb however many workers there are. ``pool`` is a pool from
+        _render_pool over the same table (shared by segment encodes); by default one is
+        started for this call.
+        """
+        from collections import deque
 
-            # Yield frame immediately
-            yield np.array(img)
+        if pool is None:
+            with self._render_pool(features, workers) as pool:
+                yield from self._generate_frames_parallel(features, workers, first, last, pool)
+            return
+
+        num_frames = len(features) if last is None else last
+        width, height = self.resolution
+        budget_frames = max(1, int(self.frame_queue_mb * 1024 * 1024) // (width * height * 3))
+        window = workers * PARALLEL_SHARDS_PER_WORKER
+        shard_frames = max(1, min(PARALLEL_SHARD_FRAMES, budget_frames // window))
+        window = max(1, min(window, budget_frames // shard_frames))
+        print(f"  [INFO] Rendering {num_frames - first} {self.style} frames with {workers} worker processes...")
+        shards = iter(range(first, num_frames, shard_frames))
+        pending = deque()
+        try:
+            while True:
+                while len(pending) < window:
+                    start = next(shards, None)
+                    if start is None:
+                        break
+                    pending.append(pool.submit(_render_frame_range, start, min(num_frames, start + shard_frames)))
+                if not pending:
+                    break
+                # Frames are views into the shard array, which is freed once the last view is dropped
+                yield from pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    @contextmanager
+    def _render_pool(self, features: FrameFeatureTable, workers: int, particle_seed: Optional[int] = None):
+        """
+        Start a pool of render worker processes over a feature table (see _render_frame_range).
+
+        The table is written once to a temporary directory and memory-mapped by every
+        worker (shared page cache, no per-worker copies). ``particle_seed`` overrides
+        the seed the workers simulate particles with.
+        """
+        import multiprocessing
+        import tempfile
+        from concurrent.futures import ProcessPoolExecutor
+
+        worker_viz = self._worker_visualizer()
+        if particle_seed is not None:
+            worker_viz.particle_seed = particle_seed
+        with tempfile.TemporaryDirectory(prefix="viz_features_") as shared_dir:
+            features.save(shared_dir)
+            # spawn: the encoder side of this process runs threads, which fork would copy mid-flight
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_render_worker,
+                initargs=(worker_viz, shared_dir),
+            ) as pool:
+                yield pool
+
+    def _worker_visualizer(self) -> "AudioVisualizer":
+        """
+        Copy of this visualizer to pickle into render worker processes.
+
+        Render caches, pooled buffers and the render_fps tables are dropped: workers
+        build their own caches and read the feature table from the shared memmap, so
+        no feature array travels with the copy.
+        """
+        import copy
+
+        worker_viz = copy.copy(self)
+        worker_viz._waveform_templates, worker_viz._roi_canvases = {}, {}
+        worker_viz._frame_pool = None  # Buffers are recycled here, not in the workers
+        worker_viz._render_tables = None  # Would pickle whole tables into every worker
+        if worker_viz.particle_seed is None:
+            # Every worker must simulate the same particle field
+            worker_viz.particle_seed = int(np.random.default_rng().integers(2**32))
+        return worker_viz
 
     def _interpolate_color(self, color1: list, color2: list, t: float) -> list:
         """Interpolate between two colors"""
@@ -1371,43 +2091,263 @@ class AudioVisualizer:
                 except Exception:
                     pass
     
-    def _stream_frames_to_video(self, frame_generator, audio_path: Path, output_path: Path, duration: float) -> Path:
-        """Stream frames directly to FFmpeg via pipe (memory efficient - no frame accumulation)."""
+    def _mask_color(self) -> Optional[tuple]:
+        """
+        The one RGB color this style draws, when every frame is that color scaled by
+        coverage on a black background (so a gray mask plus the color reproduces it).
+
+        Returns:
+            (r, g, b), or None for multi-color styles and non-black backgrounds
+        """
+        if self.style in ("spectrum", "circular", "particles"):
+            if list(self.background_color[:3]) != [0, 0, 0]:
+                return None
+            colors = {tuple(self.primary_color[:3]), tuple(self.secondary_color[:3])}
+        elif OPENCV_AVAILABLE and self.anti_alias:
+            # Waveforms are drawn on black (chromakeyed later) in their per-line colors
+            colors = {tuple(color) for color, _ in self._line_styles(1)}
+        else:
+            colors = {tuple(self.primary_color[:3])}
+        if len(colors) != 1:
+            return None
+        color = tuple(int(c) for c in colors.pop())
+        return color if max(color) > 0 else None
+
+    def _resolve_pipe_format(self, width: int, height: int) -> str:
+        """Pick the cheapest pipe format that carries this style's colors (see PIPE_FORMATS)"""
+        requested = self.pipe_format if self.pipe_format in PIPE_FORMATS else "auto"
+        if requested != self.pipe_format:
+            print(f"  [WARN] Unknown visualization pipe_format '{self.pipe_format}' - choosing automatically")
+        if requested == "gray" and self._mask_color() is None:
+            print("  [WARN] pipe_format 'gray' needs a single-color style on black - choosing automatically")
+            requested = "auto"
+        if requested in ("yuv420p", "rgba", "auto") and not OPENCV_AVAILABLE:
+            return "rgb24"  # Conversions run through OpenCV
+        if requested == "yuv420p" and (width % 2 or height % 2):
+            return "rgb24"  # 4:2:0 needs even dimensions
+        if requested != "auto":
+            return requested
+        if self._mask_color() is not None:
+            return "gray"
+        return "yuv420p" if width % 2 == 0 and height % 2 == 0 else "rgb24"
+
+    def _pipe_mask(self) -> Optional[tuple]:
+        """
+        (color, channel, lut) that turn frames of a single-color style into coverage masks.
+
+        ``color`` is _mask_color(), ``channel`` its strongest channel and ``lut`` stretches
+        that channel to 0-255 (see _coverage_mask). None for multi-color styles.
+        """
+        color = self._mask_color()
+        if color is None:
+            return None
+        channel = int(np.argmax(color))
+        lut = np.minimum(np.round(np.arange(256) * 255.0 / color[channel]), 255).astype(np.uint8)
+        return color, channel, lut
+
+    def _pipe_converter(self, pipe_format: str, width: int, height: int, mask: Optional[tuple] = None):
+        """
+        convert(frame) -> array holding the frame's bytes in pipe_format.
+
+        An (N, H, W, 3) block converts to one contiguous block of N converted frames.
+        Conversions write into scratch buffers that are reused for every frame (or
+        block), so the result is only valid until the next call (the writer sends it
+        first). ``mask`` is the stream's _pipe_mask(), built here when not given.
+        """
+        if mask is None and pipe_format in ("gray", "rgba"):
+            mask = self._pipe_mask()
+        if pipe_format in ("gray", "yuv420p"):
+            rows = height if pipe_format == "gray" else height * 3 // 2
+            scratch = {}
+
+            def convert(frame):
+                out = None
+                if frame.shape[-3:-1] == (height, width):
+                    shape = frame.shape[:-3] + (rows, width)
+                    out = scratch.get(shape)
+                    if out is None:
+                        out = scratch[shape] = np.empty(shape, dtype=np.uint8)
+                if pipe_format == "gray":
+                    return self._coverage_mask(frame, mask, out)
+                if frame.ndim == 4:
+                    if out is None:
+                        out = np.empty((len(frame), frame.shape[1] * 3 // 2, frame.shape[2]), dtype=np.uint8)
+                    for source, target in zip(frame, out, strict=True):
+                        cv2.cvtColor(source, cv2.COLOR_RGB2YUV_I420, dst=target)
+                    return out
+                return cv2.cvtColor(frame, cv2.COLOR_RGB2YUV_I420, dst=out)
+
+            return convert
+        if pipe_format == "rgba":
+            scratch = {}
+
+            def convert(frame):
+                shape = frame.shape[:-1] + (4,)
+                out = scratch.get(shape)
+                if out is None:
+                    out = scratch[shape] = np.empty(shape, dtype=np.uint8)
+                if frame.ndim == 4:
+                    for source, target in zip(frame, out, strict=True):
+                        self._to_straight_rgba(source, mask, target)
+                    return out
+                return self._to_straight_rgba(frame, mask, out)
+
+            return convert
+        return lambda frame: frame
+
+    @staticmethod
+    def _coverage_mask(frame: np.ndarray, mask: tuple, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """0-255 coverage of a single-color frame: its strongest channel stretched to full range (see _pipe_mask)"""
+        _, channel, lut = mask
+        return np.take(lut, frame[..., channel], out=out)
+
+    def _to_straight_rgba(self, frame: np.ndarray, mask: Optional[tuple],
+                          out: Optional[np.ndarray] = None) -> np.ndarray:
+        """RGBA keyed from the black background, with colors un-scaled by their coverage (into ``out`` if given)"""
+        rgba = cv2.cvtColor(frame, cv2.COLOR_RGB2RGBA, dst=out)
+        if self.style in ("spectrum", "circular", "particles") and list(self.background_color[:3]) != [0, 0, 0]:
+            return rgba  # The style paints its own opaque background
+        if mask is not None:
+            # Single color: exact coverage, constant color
+            rgba[:, :, :3] = mask[0]
+            self._coverage_mask(frame, mask, out=rgba[:, :, 3])
+            return rgba
+        # Multi-color: brightness key, like chromakeying black
+        alpha = frame.max(axis=2)
+        drawn = alpha > 0
+        scale = 255.0 / alpha[drawn]
+        rgba[drawn, :3] = np.minimum(np.round(frame[drawn] * scale[:, np.newaxis]), 255).astype(np.uint8)
+        rgba[:, :, 3] = alpha
+        return rgba
+
+    @staticmethod
+    def _pipe_filter_args(pipe_format: str, color: Optional[tuple]) -> list:
+        """FFmpeg output options that turn the piped frames back into the rendered colors"""
+        chain = AudioVisualizer._pipe_filter_chain(pipe_format, color)
+        return ["-vf", chain] if chain else []
+
+    @staticmethod
+    def _pipe_filter_chain(pipe_format: str, color: Optional[tuple]) -> str:
+        """Filter chain (empty if none is needed) that turns the piped frames back into the rendered colors"""
+        if pipe_format != "gray":
+            return ""
+        # Gray mask -> RGB, then scale each channel by the style color (rounded)
+        channels = ":".join(
+            f"{name}=val" if c == 255 else f"{name}=0" if c == 0 else f"{name}=(val*{c}+127.5)/255"
+            for name, c in zip("rgb", color, strict=True)
+        )
+        return f"format=rgb24,lutrgb={channels}"
+
+    def _stream_frames_to_video(self, frame_generator, audio_path: Path, output_path: Path, duration: float,
+                                audio_offset: float = 0.0, mux_audio: bool = True,
+                                input_fps: Optional[float] = None, compose=None) -> Path:
+        """Stream frames directly to FFmpeg via pipe (memory efficient - no frame accumulation).
+
+        ``audio_offset`` is where in audio_path the streamed frames start (segment renders);
+        with mux_audio=False only the video stream is encoded (segmented encodes). Frames
+        piped at ``input_fps`` (render_fps) are repeated by FFmpeg up to the video fps.
+
+        ``compose(pipe_input, pipe_chain) -> cmd`` replaces the visualization encode with
+        the caller's command (single-pass composition, writing output_path): pipe_input
+        are the FFmpeg input options of the frame pipe and pipe_chain the filters (possibly
+        none) that must run on that input first. audio_path is not used then.
+        """
         import subprocess
         
         # Ensure output directory exists before writing
         output_path.parent.mkdir(parents=True, exist_ok=True)
         
-        width, height = self.resolution
-        num_frames = int(duration * self.fps)
+        width, height = self._frame_size()
+        input_fps = input_fps or self.fps
+        num_frames = int(duration * input_fps)
         
-        # Try GPU acceleration first
-        try:
-            from src.utils.gpu_utils import get_gpu_manager
-            gpu_manager = get_gpu_manager()
-            
-            nvenc_check = subprocess.run(
-                ["ffmpeg", "-hide_banner", "-encoders"],
-                capture_output=True,
-                text=True
-            )
-            use_nvenc = gpu_manager.gpu_available and "h264_nvenc" in nvenc_check.stdout
-            
-        except Exception:
-            use_nvenc = False
+        # Narrowest raw format that still carries the style's colors
+        pipe_format = self._resolve_pipe_format(width, height)
+        # Mask color, channel and LUT are built once per stream, not per frame
+        mask = self._pipe_mask() if pipe_format in ("gray", "rgba") else None
+        mask_color = mask[0] if mask is not None and pipe_format == "gray" else None
+        convert_frame = self._pipe_converter(pipe_format, width, height, mask)
+        pipe_filter = self._pipe_filter_args(pipe_format, mask_color)
+        print(f"  [INFO] Piping {pipe_format} frames "
+              f"({width * height * PIPE_FORMATS[pipe_format] / (1024 * 1024):.1f} MB each)")
+        
+        # Try GPU acceleration first (single-pass composition brings its own encoder; segmented
+        # encodes run several FFmpeg processes at once, so like VideoComposer._encode_segmented
+        # they stay on libx264 rather than open one NVENC session each)
+        use_nvenc = False
+        if compose is None and mux_audio:
+            try:
+                from src.utils.gpu_utils import get_gpu_manager
+                gpu_manager = get_gpu_manager()
+                
+                nvenc_check = subprocess.run(
+                    ["ffmpeg", "-hide_banner", "-encoders"],
+                    capture_output=True,
+                    text=True
+                )
+                use_nvenc = gpu_manager.gpu_available and "h264_nvenc" in nvenc_check.stdout
+                
+            except Exception:
+                use_nvenc = False
+        
+        # Segment renders read the audio from the segment start, in sync with their first frame;
+        # segmented encodes leave the audio out and mux it once after joining the segments
+        audio_input = ["-i", str(audio_path)]
+        if audio_offset > 0:
+            audio_input = ["-ss", f"{audio_offset:.6f}"] + audio_input
+        audio_output = ["-c:a", "aac", "-b:a", "192k", "-ar", "44100", "-ac", "2"]
+        if not mux_audio:
+            audio_input, audio_output = [], ["-an"]
+        # Frames piped below the video rate are duplicated up to it by the output -r
+        rate_output = ["-r", str(self.fps)] if input_fps != self.fps else []
         
         # Build FFmpeg command to read raw video from stdin
-        if use_nvenc:
+        if compose is not None:
+            # Single pass: the frames feed one input of the caller's filter graph
+            print("[COMPOSE] Piping visualization frames straight into the composition encode")
+            cmd = compose(
+                [
+                    "-f", "rawvideo",
+                    "-vcodec", "rawvideo",
+                    "-s", f"{width}x{height}",
+                    "-pix_fmt", pipe_format,
+                    "-r", str(input_fps),
+                    "-i", "-",  # Read from stdin
+                ],
+                self._pipe_filter_chain(pipe_format, mask_color),
+            )
+        elif pipe_format == "rgba":
+            # H.264 has no alpha; QuickTime RLE keeps it losslessly and packs the flat background tightly
+            print("[CPU] Using QuickTime RLE for alpha visualization encoding (streaming)")
+            cmd = [
+                "ffmpeg", "-y",
+                "-f", "rawvideo",
+                "-vcodec", "rawvideo",
+                "-s", f"{width}x{height}",
+                "-pix_fmt", "rgba",
+                "-r", str(input_fps),
+                "-i", "-",  # Read from stdin
+                *audio_input,
+                "-c:v", "qtrle",
+                "-pix_fmt", "argb",
+                *rate_output,
+                *audio_output,
+                "-shortest",
+                "-f", "mov",
+                str(output_path)
+            ]
+        elif use_nvenc:
             print("[GPU] Using NVENC for visualization encoding (streaming)")
             cmd = [
                 "ffmpeg", "-y",
                 "-f", "rawvideo",
                 "-vcodec", "rawvideo",
                 "-s", f"{width}x{height}",
-                "-pix_fmt", "rgb24",  # RGB format (black background will be chromakeyed)
-                "-r", str(self.fps),
+                "-pix_fmt", pipe_format,  # Black background will be chromakeyed
+                "-r", str(input_fps),
                 "-i", "-",  # Read from stdin
-                "-i", str(audio_path),
+                *audio_input,
+                *pipe_filter,
                 "-c:v", "h264_nvenc",
                 "-preset", "p7",
                 "-tune", "1",
@@ -1419,10 +2359,8 @@ class AudioVisualizer:
                 "-g", "30",
                 "-keyint_min", "30",
                 "-sc_threshold", "0",
-                "-c:a", "aac",
-                "-b:a", "192k",
-                "-ar", "44100",
-                "-ac", "2",
+                *rate_output,
+                *audio_output,
                 "-pix_fmt", "yuv420p",  # H.264 output (no alpha support, but we'll use chromakey in overlay)
                 "-shortest",
                 "-f", "mp4",
@@ -1436,10 +2374,11 @@ class AudioVisualizer:
                 "-f", "rawvideo",
                 "-vcodec", "rawvideo",
                 "-s", f"{width}x{height}",
-                "-pix_fmt", "rgb24",  # RGB format (black background will be chromakeyed)
-                "-r", str(self.fps),
+                "-pix_fmt", pipe_format,  # Black background will be chromakeyed
+                "-r", str(input_fps),
                 "-i", "-",  # Read from stdin
-                "-i", str(audio_path),
+                *audio_input,
+                *pipe_filter,
                 "-c:v", "libx264",
                 "-profile:v", "baseline",
                 "-level", "3.1",
@@ -1450,10 +2389,8 @@ class AudioVisualizer:
                 "-keyint_min", "30",
                 "-sc_threshold", "0",
                 "-pix_fmt", "yuv420p",  # H.264 output (no alpha support, but we'll use chromakey in overlay)
-                "-c:a", "aac",
-                "-b:a", "192k",
-                "-ar", "44100",
-                "-ac", "2",
+                *rate_output,
+                *audio_output,
                 "-shortest",
                 "-f", "mp4",
                 "-movflags", "+faststart",
@@ -1504,269 +2441,177 @@ class AudioVisualizer:
         stderr_thread.start()
         
         import time
+        from src.utils.frame_pool import FramePool
+        from src.utils.frame_queue import FrameQueue, FrameQueueAborted
+        from src.utils.ram_monitor import RAMMonitor
+        
+        # Initialize RAM monitor (45GB max, warn at 35GB - accounts for baseline system usage)
+        ram_monitor = RAMMonitor(max_ram_gb=45.0, warning_threshold_gb=35.0)
+        
+        # Frames in flight are bounded in bytes, not frames, so the budget holds at any resolution
+        frame_queue = FrameQueue(self.frame_queue_mb * 1024 * 1024)
+        # Enough recycled buffers to fill the queue plus the frames being rendered and written
+        # (whole blocks when the renderer yields render_batch blocks)
+        buffer_shape = (height, width, 3)
+        if self._stream_block_frames > 1:
+            buffer_shape = (self._stream_block_frames,) + buffer_shape
+        frame_pool = FramePool(buffer_shape, frame_queue.max_bytes // int(np.prod(buffer_shape)) + FRAME_POOL_SPARE)
+        self._frame_pool = frame_pool
+        producer_error = []
+        writer_error = []
+        frames_written = 0
+        writer_started = writer_done = False
+        writer_state = threading.Condition()
         start_time = time.time()
-        last_file_check = start_time
-        last_frame_time = start_time
-        last_file_size = 0.0
-        max_stall_time = 30.0  # Abort if no progress for 30 seconds
-        max_frame_stall_time = 15.0  # Abort if no frame for 15 seconds
-        max_total_time = 600.0  # Abort if total time exceeds 10 minutes
+        last_progress = start_time
+        
+        # Liveness comes from progress: the first frame must arrive within FIRST_FRAME_TIMEOUT,
+        # then a frame must reach FFmpeg at least every FRAME_STALL_TIMEOUT. The only overall
+        # cap scales with the media duration, so long episodes are never cut off.
+        deadline = start_time + FIRST_FRAME_TIMEOUT + duration * MAX_RENDER_SLOWDOWN
+        
+        def _ffmpeg_died():
+            """Build the error for an FFmpeg process that exited mid-stream."""
+            ffmpeg_stderr_done.wait(timeout=2.0)
+            error_msg = '\n'.join(ffmpeg_stderr_data[-10:]) if ffmpeg_stderr_data else "Process died unexpectedly"
+            return Exception(f"FFmpeg process died: {error_msg[:500]}")
+        
+        def _produce_frames():
+            """Producer thread: render frames into the queue (blocks while the queue is full)."""
+            try:
+                for frame in frame_generator:
+                    frame_queue.put(frame)
+            except FrameQueueAborted:
+                pass  # Pipeline already failed elsewhere
+            except Exception as e:
+                producer_error.append(e)
+            finally:
+                frame_queue.close()
+        
+        def _write_frames():
+            """Writer thread: move frames (or blocks of frames) from the queue into FFmpeg's stdin, in order."""
+            nonlocal frames_written, last_progress, writer_started, writer_done
+            writer_started = True
+            last_frame = piped = None
+            try:
+                while True:
+                    frame = frame_queue.get()
+                    if frame is None:
+                        break
+                    
+                    # Check if process is still alive
+                    if process.poll() is not None:
+                        raise _ffmpeg_died()
+                    
+                    # A repeated (elided) frame reuses its converted pixels; pooled buffers are
+                    # recycled, so the same object there does not mean the same content
+                    if frame is not last_frame or frame_pool.owns(frame):
+                        piped = convert_frame(frame)
+                    last_frame = frame
+                    
+                    # Pixels go straight from the frame or block (or conversion) buffer into the pipe
+                    try:
+                        self._write_frame(process.stdin, piped)
+                        process.stdin.flush()  # Ensure data is sent
+                    except BrokenPipeError:
+                        # FFmpeg closed stdin
+                        stdout, stderr = process.communicate()
+                        error_msg = stderr.decode('utf-8', errors='replace') if stderr else "FFmpeg closed input"
+                        raise Exception(f"FFmpeg closed input: {error_msg[:500]}")
+                    frame_pool.release(frame)
+                    
+                    written = len(frame) if frame.ndim == 4 else 1
+                    frames_written += written
+                    last_progress = time.time()
+                    
+                    # Progress update every 100 frames
+                    if frames_written // 100 > (frames_written - written) // 100:
+                        current_size = monitor.get_current_size_mb()
+                        elapsed = last_progress - start_time
+                        elapsed_str = f"{elapsed:.1f}s" if elapsed < 60 else f"{elapsed/60:.1f}min"
+                        print(f"  [PROGRESS] Frame {frames_written}/{num_frames} ({current_size:.1f} MB, {elapsed_str}, "
+                              f"{frames_written / max(elapsed, 1e-6):.1f} fps)", end='\r')
+            except FrameQueueAborted:
+                pass  # Pipeline already failed elsewhere
+            except Exception as e:
+                writer_error.append(e)
+                frame_queue.abort(e)
+            finally:
+                with writer_state:
+                    writer_done = True
+                    writer_state.notify_all()
         
         try:
-            # Stream frames directly to FFmpeg
-            frame_count = 0
-            print(f"  [INFO] Starting frame streaming (expecting ~{num_frames} frames)...")
+            print(f"  [INFO] Starting frame streaming (expecting ~{num_frames} frames, "
+                  f"queue {self.frame_queue_mb:g} MB)...")
             
-            # Use timeout wrapper to detect if generator hangs before yielding
-            import threading
-            from collections import deque
-            from src.utils.ram_monitor import RAMMonitor
+            producer_thread = threading.Thread(target=_produce_frames, daemon=True)
+            writer_thread = threading.Thread(target=_write_frames, daemon=True)
+            producer_thread.start()
+            writer_thread.start()
             
-            # Initialize RAM monitor (45GB max, warn at 35GB - accounts for baseline system usage)
-            ram_monitor = RAMMonitor(max_ram_gb=45.0, warning_threshold_gb=35.0)
-            
-            # Bounded queue - max 100 frames in memory (~600MB at 1920x1080)
-            # This prevents unbounded memory growth if FFmpeg can't keep up
-            MAX_QUEUE_SIZE = 100
-            frame_queue = deque(maxlen=MAX_QUEUE_SIZE)  # Use deque with maxlen for automatic bounds
-            generator_exception = []
-            generator_done = threading.Event()
-            queue_full_warnings = 0
-            
-            def _generator_wrapper():
-                """Wrapper to run generator in thread and catch exceptions."""
-                nonlocal queue_full_warnings
-                generator_start = time.time()
-                max_generator_time = 300.0  # 5 minute max for generator
-                try:
-                    for frame in frame_generator:
-                        # Check total generator time
-                        if time.time() - generator_start > max_generator_time:
-                            raise Exception(f"Frame generator exceeded maximum time ({max_generator_time}s)")
-                        
-                        # Check if queue is full (backpressure)
-                        if len(frame_queue) >= MAX_QUEUE_SIZE:
-                            queue_full_warnings += 1
-                            if queue_full_warnings <= 3:  # Only warn first 3 times
-                                print(f"  [WARN] Frame queue full ({len(frame_queue)} frames). "
-                                      f"FFmpeg may be slow. Waiting for space...")
-                            # Wait a bit for queue to drain, but don't wait forever
-                            wait_count = 0
-                            max_wait = 50  # Max 5 seconds waiting for queue space
-                            while len(frame_queue) >= MAX_QUEUE_SIZE and wait_count < max_wait:
-                                time.sleep(0.1)
-                                wait_count += 1
-                                # Check RAM before continuing
-                                is_over, msg = ram_monitor.check_ram_limit()
-                                if is_over:
-                                    raise Exception(f"RAM limit exceeded: {msg}")
-                            
-                            if wait_count >= max_wait:
-                                raise Exception(f"Frame queue full for {max_wait * 0.1}s - FFmpeg may be hung")
-                            continue
-                        
-                        frame_queue.append(frame)
-                        if generator_done.is_set():
-                            break
-                except Exception as e:
-                    generator_exception.append(e)
-                finally:
-                    generator_done.set()
-            
-            # Start generator in separate thread
-            gen_thread = threading.Thread(target=_generator_wrapper, daemon=True)
-            gen_thread.start()
-            
-            # Wait for first frame with aggressive timeout (check every 0.5s)
-            first_frame_timeout = 5.0
-            start_wait = time.time()
-            last_ram_check = start_wait
-            while len(frame_queue) == 0 and not generator_done.is_set():
-                elapsed_wait = time.time() - start_wait
-                
-                # Check RAM every 2 seconds
-                if time.time() - last_ram_check > 2.0:
+            try:
+                # Supervise: the frame path itself never sleeps, this loop only runs the watchdogs
+                while True:
+                    with writer_state:
+                        writer_state.wait_for(lambda: writer_done, timeout=WATCHDOG_INTERVAL)
+                    if writer_done:
+                        break
+                    now = time.time()
+                    
+                    if not writer_started and now - start_time > THREAD_START_TIMEOUT:
+                        raise Exception(f"Frame writer thread did not start within {THREAD_START_TIMEOUT}s")
+                    if writer_started and not writer_thread.is_alive():
+                        raise Exception("Frame writer thread exited unexpectedly")
+                    
+                    if producer_error:
+                        raise Exception(f"Frame generator error: {producer_error[0]}")
+                    
+                    # Check RAM
                     is_over, msg = ram_monitor.check_ram_limit()
                     if is_over:
                         print(f"\n[ERROR] {msg}")
-                        try:
-                            process.kill()
-                        except:
-                            pass
-                        try:
-                            monitor.stop()
-                        except:
-                            pass
                         raise Exception(msg)
                     elif msg:
                         print(f"  [WARN] {msg}")
-                    last_ram_check = time.time()
-                
-                if elapsed_wait > first_frame_timeout:
-                    # No frames after timeout - kill everything
-                    print(f"\n[ERROR] Frame generator hung - no frames after {elapsed_wait:.1f}s. Aborting...")
-                    self._cleanup_ffmpeg_process(process)
-                    try:
-                        monitor.stop()
-                    except:
-                        pass
-                    # Check if generator thread is stuck
-                    if gen_thread.is_alive():
-                        print(f"[ERROR] Generator thread still alive but not producing frames - likely hung in blocking operation")
-                    raise Exception(f"Frame generator hung - no frames produced after {first_frame_timeout}s. Thread alive: {gen_thread.is_alive()}")
-                
-                # Also check file size - if FFmpeg started but file isn't growing, abort faster
-                if output_path.exists():
-                    file_size = output_path.stat().st_size
-                    if file_size == 0 and elapsed_wait > 3.0:
-                        # File exists but zero size after 3s - FFmpeg likely hung
-                        print(f"\n[ERROR] Output file exists but zero size after {elapsed_wait:.1f}s. FFmpeg may be hung.")
-                        self._cleanup_ffmpeg_process(process)
-                        try:
-                            monitor.stop()
-                        except:
-                            pass
-                        raise Exception(f"FFmpeg output file zero size after {elapsed_wait:.1f}s - process may be hung")
-                
-                time.sleep(0.5)  # Check every 0.5 seconds
+                    
+                    # Check for FFmpeg errors in stderr
+                    if ffmpeg_stderr_data:
+                        last_error = ffmpeg_stderr_data[-1]
+                        if any(keyword in last_error.lower() for keyword in ['error', 'failed', 'cannot open', 'no such file']):
+                            print(f"\n[ERROR] FFmpeg error detected: {last_error}")
+                            raise Exception(f"FFmpeg error: {last_error[:200]}")
+                    
+                    if process.poll() is not None:
+                        raise _ffmpeg_died()
+                    
+                    # Progress watchdogs
+                    stall = now - last_progress
+                    if frames_written == 0 and stall > FIRST_FRAME_TIMEOUT:
+                        print(f"\n[ERROR] Frame generator hung - no frames after {stall:.1f}s. Aborting...")
+                        raise Exception(f"Frame generator hung - no frames produced after {FIRST_FRAME_TIMEOUT}s. "
+                                        f"Thread alive: {producer_thread.is_alive()}")
+                    if frames_written > 0 and stall > FRAME_STALL_TIMEOUT:
+                        print(f"\n[ERROR] Frame streaming stalled - no frame for {stall:.1f}s")
+                        raise Exception(f"Frame streaming stalled - no frame for {stall:.1f}s "
+                                        f"(frame {frames_written}/{num_frames}, {len(frame_queue)} queued)")
+                    if now > deadline:
+                        raise Exception(f"FFmpeg streaming exceeded maximum time ({deadline - start_time:.0f}s "
+                                        f"for {duration:.0f}s of media)")
+            except Exception as e:
+                frame_queue.abort(e)
+                raise
             
             # Check for exceptions
-            if generator_exception:
-                self._cleanup_ffmpeg_process(process)
-                monitor.stop()
-                raise Exception(f"Frame generator error: {generator_exception[0]}")
-            
-            # Process frames from queue with timeout detection
-            while not generator_done.is_set() or len(frame_queue) > 0:
-                # Wait for next frame with timeout
-                if len(frame_queue) == 0:
-                    # Wait for frame with aggressive timeout check
-                    wait_start = time.time()
-                    while len(frame_queue) == 0 and not generator_done.is_set():
-                        time.sleep(0.5)  # Check every 0.5 seconds
-                        current_time = time.time()
-                        time_since_last_frame = current_time - last_frame_time
-                        elapsed = current_time - start_time
-                        wait_elapsed = current_time - wait_start
-                        
-                        # Check for total timeout
-                        if elapsed > max_total_time:
-                            print(f"\n[ERROR] Total timeout exceeded ({elapsed:.1f}s)")
-                            self._cleanup_ffmpeg_process(process)
-                            try:
-                                monitor.stop()
-                            except:
-                                pass
-                            raise Exception(f"FFmpeg streaming exceeded maximum time ({max_total_time}s)")
-                        
-                        # Check for stall timeout (more aggressive - 10s instead of 15s)
-                        if frame_count > 0 and time_since_last_frame > 10.0:
-                            print(f"\n[ERROR] Frame generation stalled - no frame for {time_since_last_frame:.1f}s")
-                            self._cleanup_ffmpeg_process(process)
-                            try:
-                                monitor.stop()
-                            except:
-                                pass
-                            raise Exception(f"Frame generation stalled - no frame for {time_since_last_frame:.1f}s (frame {frame_count}/{num_frames})")
-                        
-                        # Check if file is zero size and we've been waiting
-                        if output_path.exists() and wait_elapsed > 5.0:
-                            file_size = output_path.stat().st_size
-                            if file_size == 0:
-                                print(f"\n[ERROR] File zero size after {wait_elapsed:.1f}s wait - aborting")
-                                self._cleanup_ffmpeg_process(process)
-                                try:
-                                    monitor.stop()
-                                except:
-                                    pass
-                                raise Exception(f"Output file zero size after {wait_elapsed:.1f}s - process likely hung")
-                    
-                    # Generator done, check if any frames left
-                    if generator_done.is_set() and len(frame_queue) == 0:
-                        break
-                
-                # Check RAM before processing frame
-                if frame_count % 30 == 0:  # Check every 30 frames (~1 second at 30fps)
-                    is_over, msg = ram_monitor.check_ram_limit()
-                    if is_over:
-                        print(f"\n[ERROR] {msg}")
-                        self._cleanup_ffmpeg_process(process)
-                        try:
-                            monitor.stop()
-                        except:
-                            pass
-                        raise Exception(msg)
-                    elif msg:
-                        print(f"  [WARN] {msg}")
-                
-                # Get frame from queue (deque uses popleft for FIFO)
-                if len(frame_queue) == 0:
-                    continue  # Shouldn't happen due to loop logic, but safety check
-                frame = frame_queue.popleft()
-                current_time = time.time()
-                elapsed = current_time - start_time
-                
-                # Update last frame time
-                last_frame_time = current_time
-                
-                # Check if process is still alive
-                if process.poll() is not None:
-                    # Process died - wait for stderr to finish reading
-                    ffmpeg_stderr_done.wait(timeout=2.0)
-                    error_msg = '\n'.join(ffmpeg_stderr_data[-10:]) if ffmpeg_stderr_data else "Process died unexpectedly"
-                    monitor.stop()
-                    raise Exception(f"FFmpeg process died: {error_msg[:500]}")
-                
-                # Check for FFmpeg errors in stderr (every 10 frames)
-                if frame_count % 10 == 0 and ffmpeg_stderr_data:
-                    last_error = ffmpeg_stderr_data[-1]
-                    if any(keyword in last_error.lower() for keyword in ['error', 'failed', 'cannot open', 'no such file']):
-                        print(f"\n[ERROR] FFmpeg error detected: {last_error}")
-                        self._cleanup_ffmpeg_process(process)
-                        try:
-                            monitor.stop()
-                        except:
-                            pass
-                        raise Exception(f"FFmpeg error: {last_error[:200]}")
-                
-                # Check for total timeout
-                if elapsed > max_total_time:
-                    self._cleanup_ffmpeg_process(process)
-                    monitor.stop()
-                    raise Exception(f"FFmpeg streaming exceeded maximum time ({max_total_time}s)")
-                
-                # Check for stalls (every 5 seconds)
-                if current_time - last_file_check > 5.0:
-                    if output_path.exists():
-                        current_size = output_path.stat().st_size / (1024 * 1024)  # MB
-                        if current_size <= last_file_size + 0.01:  # Less than 0.01 MB growth
-                            stall_time = current_time - last_file_check
-                            if stall_time > max_stall_time:
-                                self._cleanup_ffmpeg_process(process)
-                                monitor.stop()
-                                raise Exception(f"FFmpeg streaming stalled - no file growth for {stall_time:.1f}s. File size: {current_size:.2f} MB")
-                        last_file_size = current_size
-                    last_file_check = current_time
-                
-                # Convert frame to bytes (RGB24 format: width * height * 3 bytes)
-                frame_bytes = frame.tobytes()
-                try:
-                    process.stdin.write(frame_bytes)
-                    process.stdin.flush()  # Ensure data is sent
-                except BrokenPipeError:
-                    # FFmpeg closed stdin
-                    monitor.stop()
-                    stdout, stderr = process.communicate()
-                    error_msg = stderr.decode('utf-8', errors='replace') if stderr else "FFmpeg closed input"
-                    raise Exception(f"FFmpeg closed input: {error_msg[:500]}")
-                
-                frame_count += 1
-                
-                # Progress update every 100 frames
-                if frame_count % 100 == 0:
-                    current_size = monitor.get_current_size_mb()
-                    elapsed_str = f"{elapsed:.1f}s" if elapsed < 60 else f"{elapsed/60:.1f}min"
-                    print(f"  [PROGRESS] Frame {frame_count}/{num_frames} ({current_size:.1f} MB, {elapsed_str})", end='\r')
+            if writer_error:
+                raise writer_error[0]
+            if producer_error:
+                raise Exception(f"Frame generator error: {producer_error[0]}")
+            if not frame_queue.closed:
+                # Writer stopped but the generator never finished
+                raise Exception(f"Frame pipeline stopped early ({frames_written}/{num_frames} frames). "
+                                f"Generator alive: {producer_thread.is_alive()}")
+            frame_count = frames_written
             
             # Close stdin to signal end of input
             try:
@@ -1776,7 +2621,8 @@ class AudioVisualizer:
             
             # Wait for FFmpeg to finish with timeout
             try:
-                stdout, stderr = process.communicate(timeout=300)  # 5 minute timeout for final encoding
+                # Final encoding flush: 5 minutes, more for very long media
+                stdout, stderr = process.communicate(timeout=max(300.0, duration * 0.1))
             except subprocess.TimeoutExpired:
                 # Use helper function for proper cleanup
                 self._cleanup_ffmpeg_process(process)
@@ -1792,7 +2638,12 @@ class AudioVisualizer:
                 raise Exception(f"FFmpeg streaming failed with code {process.returncode}")
             
             final_size = monitor.get_current_size_mb()
-            print(f"\n[OK] Visualization video encoded with {'NVENC' if use_nvenc else 'libx264'} (streamed {frame_count} frames, {final_size:.1f} MB)")
+            if compose is not None:
+                encoder = "the composition encode"
+            else:
+                encoder = "QuickTime RLE" if pipe_format == "rgba" else "NVENC" if use_nvenc else "libx264"
+            print(f"\n[OK] Visualization video encoded with {encoder} (streamed {frame_count} {pipe_format} frames, {final_size:.1f} MB)")
+            self._record_stream_stats(frame_pool, frame_queue, frame_count, time.time() - start_time)
             
         except subprocess.TimeoutExpired:
             self._cleanup_ffmpeg_process(process)
@@ -1813,6 +2664,8 @@ class AudioVisualizer:
                 print(f"  Output file size: {output_path.stat().st_size / (1024*1024):.2f} MB")
             raise
         finally:
+            # Renderers still running after a failure fall back to fresh arrays
+            self._frame_pool = None
             # GUARANTEED cleanup - ensure all handles are closed even if exception occurs
             try:
                 if 'process' in locals():
@@ -1822,6 +2675,37 @@ class AudioVisualizer:
         
         return output_path
 
+    @staticmethod
+    def _write_frame(pipe, frame: np.ndarray) -> None:
+        """Write one frame's pixels to pipe straight from its buffer (no intermediate bytes object)"""
+        view = memoryview(np.ascontiguousarray(frame)).cast("B")
+        while len(view):
+            written = pipe.write(view)
+            # Unbuffered pipes may accept only part of a frame
+            if not isinstance(written, int) or written >= len(view):
+                break
+            view = view[written:]
+
+    def _record_stream_stats(self, frame_pool, frame_queue, frame_count: int, elapsed: float = 0.0) -> None:
+        """Report throughput, frame buffer reuse, queue high-water mark and peak RSS for the streamed render"""
+        stats = frame_pool.stats()
+        stats["frames"] = frame_count
+        stats["block_frames"] = self._stream_block_frames
+        stats["fps"] = round(frame_count / elapsed, 1) if elapsed > 0 else None
+        stats["peak_queue_mb"] = round(frame_queue.peak_bytes / (1024 * 1024), 1)
+        stats["peak_rss_mb"] = get_peak_rss_mb()
+        stats["elided_frames"] = self._elided_frames
+        stats["elision_rate"] = round(self._elided_frames / max(1, frame_count), 3)
+        self.stream_stats = stats
+        record_component_stats("frame_buffers", stats)
+        peak_rss = f"{stats['peak_rss_mb']:.0f} MB" if stats["peak_rss_mb"] is not None else "n/a"
+        if stats["fps"] is not None:
+            print(f"  [INFO] Throughput: {stats['fps']} fps ({frame_count} frames in {elapsed:.1f}s, "
+                  f"{stats['block_frames']} per block)")
+        print(f"  [INFO] Frame buffers: {stats['pool_buffers']} pooled, {stats['reuses']} reuses, "
+              f"{stats['transient_allocations']} transient; peak queue {stats['peak_queue_mb']} MB, peak RSS {peak_rss}; "
+              f"{stats['elided_frames']} elided frames")
+
     def _frames_to_video(self, frames: list, audio_path: Path, output_path: Path) -> Path:
         """Legacy method - kept for compatibility. Use _stream_frames_to_video for new code."""
         """Convert frames to video with audio using FFmpeg with GPU acceleration."""
@@ -4,7 +4,6 @@ Generates animated talking head videos synced to audio
 Supports multiple engines: Wav2Lip, SadTalker, D-ID
 """
 
-import subprocess
 import sys
 from pathlib import Path
 from typing import Any, Dict
@@ -67,28 +66,10 @@ class AvatarGenerator:
     
     def _get_audio_duration_ffmpeg(self, audio_path: Path) -> float:
         """Get audio duration using FFmpeg (safer than librosa which can crash with C extensions)."""
-        try:
-            # Use ffprobe to get duration without loading audio into memory
-            cmd = [
-                "ffprobe",
-                "-v", "error",
-                "-show_entries", "format=duration",
-                "-of", "default=noprint_wrappers=1:nokey=1",
-                str(audio_path)
-            ]
-            result = subprocess.run(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                timeout=10
-            )
-            if result.returncode == 0 and result.stdout.strip():
-                return float(result.stdout.strip())
-        except (subprocess.TimeoutExpired, ValueError, FileNotFoundError):
-            pass
-        # Fallback: return None to use default timeout
-        return None
+        from src.utils.media_probe import MediaProbe
+
+        # One cached ffprobe per file (see src/utils/media_probe.py); None = use the default
+        return MediaProbe(self.config.get("storage", {}).get("cache_dir")).duration(audio_path)
 
     def _init_sadtalker(self):
         """Initialize SadTalker model with GPU acceleration."""
@@ -6,7 +6,7 @@ Composes final video with background and effects
 import subprocess
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
 
 class VideoComposer:
@@ -43,75 +43,51 @@ class VideoComposer:
         if audio_path.stat().st_size < 100:  # Less than 100 bytes is suspicious
             return False, f"Audio file is too small ({audio_path.stat().st_size} bytes), likely corrupted: {audio_path}"
         
-        # Use ffprobe to validate the audio file format
+        # One ffprobe (cached with the file's other metadata) validates the format
+        from src.utils.media_probe import ProbeError
+
         try:
-            cmd = [
-                "ffprobe",
-                "-v", "error",
-                "-show_entries", "format=duration",
-                "-of", "default=noprint_wrappers=1:nokey=1",
-                str(audio_path)
-            ]
-            result = subprocess.run(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                timeout=10
-            )
-            
-            # Check for common corruption indicators in stderr
-            stderr_lower = result.stderr.lower()
+            info = self._media_probe().probe(audio_path)
+        except ProbeError as e:
+            stderr_lower = e.stderr.lower()
             if "illegal" in stderr_lower or "invalid" in stderr_lower or "corrupt" in stderr_lower:
-                return False, f"Audio file appears corrupted (FFprobe error): {audio_path}\n  FFprobe stderr: {result.stderr[:200]}"
-            
-            if result.returncode != 0:
-                return False, f"Audio file validation failed (FFprobe returned {result.returncode}): {audio_path}\n  FFprobe stderr: {result.stderr[:200]}"
-            
-            # Check if we got a valid duration
-            if not result.stdout.strip():
-                return False, f"Audio file has no duration information (may be corrupted): {audio_path}\n  FFprobe stderr: {result.stderr[:200]}"
-            
-            try:
-                duration = float(result.stdout.strip())
-                if duration <= 0:
-                    return False, f"Audio file has invalid duration ({duration}s): {audio_path}"
-            except ValueError:
-                return False, f"Audio file duration could not be parsed: {audio_path}\n  FFprobe output: {result.stdout[:200]}"
-            
-            return True, ""
-            
+                return False, f"Audio file appears corrupted (FFprobe error): {audio_path}\n  FFprobe stderr: {e.stderr[:200]}"
+            return False, f"Audio file validation failed (FFprobe returned {e.returncode}): {audio_path}\n  FFprobe stderr: {e.stderr[:200]}"
         except subprocess.TimeoutExpired:
             return False, f"Audio file validation timed out (file may be corrupted or unreadable): {audio_path}"
         except FileNotFoundError:
             return False, f"FFprobe not found - cannot validate audio file: {audio_path}"
         except Exception as e:
             return False, f"Error validating audio file: {audio_path}\n  Error: {str(e)}"
-    
+
+        # Check for common corruption indicators ffprobe reported while reading past them
+        warnings = info.get("warnings", "")
+        if any(word in warnings.lower() for word in ("illegal", "invalid", "corrupt")):
+            return False, f"Audio file appears corrupted (FFprobe error): {audio_path}\n  FFprobe stderr: {warnings[:200]}"
+
+        # Check if we got a valid duration
+        raw_duration = str(info.get("format", {}).get("duration") or "").strip()
+        if not raw_duration:
+            return False, f"Audio file has no duration information (may be corrupted): {audio_path}\n  FFprobe stderr: {warnings[:200]}"
+        try:
+            duration = float(raw_duration)
+        except ValueError:
+            return False, f"Audio file duration could not be parsed: {audio_path}\n  FFprobe output: {raw_duration[:200]}"
+        if duration <= 0:
+            return False, f"Audio file has invalid duration ({duration}s): {audio_path}"
+
+        return True, ""
+
+    def _media_probe(self):
+        """Shared ffprobe results, cached in-process and in storage.cache_dir (see src/utils/media_probe.py)."""
+        from src.utils.media_probe import MediaProbe
+
+        return MediaProbe(self.config.get("storage", {}).get("cache_dir"))
+
     def _get_audio_duration_ffmpeg(self, audio_path: Path) -> float:
         """Get audio duration using FFmpeg (safer than librosa which can crash with C extensions)."""
-        try:
-            # Use ffprobe to get duration without loading audio into memory
-            cmd = [
-                "ffprobe",
-                "-v", "error",
-                "-show_entries", "format=duration",
-                "-of", "default=noprint_wrappers=1:nokey=1",
-                str(audio_path)
-            ]
-            result = subprocess.run(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                timeout=10
-            )
-            if result.returncode == 0 and result.stdout.strip():
-                return float(result.stdout.strip())
-        except (subprocess.TimeoutExpired, ValueError, FileNotFoundError):
-            pass
-        # Fallback: return None to use default timeout
-        return None
+        # None tells callers to use their default timeout
+        return self._media_probe().duration(audio_path)
     
     def _cleanup_ffmpeg_process(self, process, timeout=2.0):
         """Properly cleanup FFmpeg process, closing all pipes and terminating/killing if needed."""
@@ -316,6 +292,9 @@ class VideoComposer:
             
             preset = self.QUALITY_PRESETS[quality_key]
             print(f"[Quality] Using preset: {quality_key} ({preset['resolution'][0]}x{preset['resolution'][1]})")
+            source_path = image_path
+            image_path, fitted = self._sized_background(image_path, preset)
+            bg_fit = self._background_filter(preset, fitted)
 
             # Base FFmpeg command
             cmd = ["ffmpeg", "-y"]
@@ -361,7 +340,7 @@ class VideoComposer:
                                 "-sc_threshold",
                                 "0",  # Disable scene change detection for consistent keyframes
                                 "-vf",
-                                f"scale={preset['resolution'][0]}:{preset['resolution'][1]}:force_original_aspect_ratio=decrease:eval=frame,pad={preset['resolution'][0]}:{preset['resolution'][1]}:(ow-iw)/2:(oh-ih)/2:color=0x141E30",  # Scale image and pad with dark blue background
+                                bg_fit,  # Scale image and pad with dark blue background (pre-rendered: passthrough)
                                 "-r",
                                 "30",  # Set output frame rate to match video settings
                                 "-c:a",
@@ -393,7 +372,7 @@ class VideoComposer:
                             "-loop",
                             "1",
                             "-i",
-                            str(image_path),
+                            str(source_path),  # Stretched, not letterboxed like the pre-rendered asset
                             "-i",
                             str(audio_path),
                             "-c:v",
@@ -415,7 +394,11 @@ class VideoComposer:
                             "-sc_threshold",
                             "0",  # Disable scene change detection for consistent keyframes
                             "-vf",
-                            f"scale={preset['resolution'][0]}:{preset['resolution'][1]}",  # Apply resolution
+                            self._background_filter(
+                                preset,
+                                fitted and image_path == source_path,
+                                f"scale={preset['resolution'][0]}:{preset['resolution'][1]}",
+                            ),  # Apply resolution (already frame-sized: passthrough)
                             "-c:a",
                             "aac",
                             "-b:a",
@@ -464,7 +447,7 @@ class VideoComposer:
                         "-sc_threshold",
                         "0",  # Disable scene change detection for consistent keyframes
                         "-vf",
-                        f"scale={preset['resolution'][0]}:{preset['resolution'][1]}:force_original_aspect_ratio=decrease:eval=frame,pad={preset['resolution'][0]}:{preset['resolution'][1]}:(ow-iw)/2:(oh-ih)/2:color=0x141E30",  # Scale image and pad with dark blue background
+                        bg_fit,  # Scale image and pad with dark blue background (pre-rendered: passthrough)
                         "-r",
                         "30",  # Set output frame rate
                         "-c:a",
@@ -496,22 +479,27 @@ class VideoComposer:
                 timeout_seconds = 600  # 10 minutes default
             
             try:
-                # Use Popen for better process control
-                process = subprocess.Popen(
-                    cmd,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    text=True,
-                    errors='replace'
-                )
-                
-                try:
-                    stdout, stderr = process.communicate(timeout=timeout_seconds)
-                    result = subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
-                except subprocess.TimeoutExpired:
-                    print(f"[ERROR] FFmpeg encoding timed out after {timeout_seconds}s")
-                    self._cleanup_ffmpeg_process(process)
-                    raise RuntimeError(f"FFmpeg encoding timed out after {timeout_seconds}s. File may be incomplete: {output_path}")
+                if self._compose_still_loop(cmd, ["-loop", "1", "-i", str(image_path)], audio_path, output_path):
+                    result = subprocess.CompletedProcess(cmd, 0, "", "")
+                elif self._encode_segmented(cmd, audio_path, output_path):
+                    result = subprocess.CompletedProcess(cmd, 0, "", "")
+                else:
+                    # Use Popen for better process control
+                    process = subprocess.Popen(
+                        cmd,
+                        stdout=subprocess.PIPE,
+                        stderr=subprocess.PIPE,
+                        text=True,
+                        errors='replace'
+                    )
+                    
+                    try:
+                        stdout, stderr = process.communicate(timeout=timeout_seconds)
+                        result = subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
+                    except subprocess.TimeoutExpired as e:
+                        print(f"[ERROR] FFmpeg encoding timed out after {timeout_seconds}s")
+                        self._cleanup_ffmpeg_process(process)
+                        raise RuntimeError(f"FFmpeg encoding timed out after {timeout_seconds}s. File may be incomplete: {output_path}") from e
             except subprocess.TimeoutExpired:
                 raise RuntimeError(f"FFmpeg encoding timed out after {timeout_seconds}s. File may be incomplete: {output_path}")
             
@@ -532,12 +520,11 @@ class VideoComposer:
             if output_path.stat().st_size == 0:
                 raise RuntimeError(f"Output file is empty: {output_path}")
             
-            # Verify the file is a valid MP4 by checking for moov atom
+            # Verify the file is a valid MP4 from its container headers (moov atom, video stream, duration)
             try:
-                verify_cmd = ["ffprobe", "-v", "error", "-select_streams", "v:0", "-count_packets", "-show_entries", "stream=nb_read_packets", "-of", "csv=p=0", str(output_path)]
-                verify_result = subprocess.run(verify_cmd, capture_output=True, text=True, timeout=10)
-                if verify_result.returncode != 0:
-                    print(f"[WARN] File verification warning: {verify_result.stderr[:200]}")
+                problem = self._media_probe().verify_output(output_path)
+                if problem:
+                    print(f"[WARN] File verification warning: {problem}")
             except Exception as e:
                 print(f"[WARN] Could not verify file: {e}")
             
@@ -554,6 +541,11 @@ class VideoComposer:
         """Create a default background image."""
         from PIL import Image, ImageDraw
 
+        # The gradient never changes, so an earlier render is reused
+        bg_path = Path(self.config["storage"]["cache_dir"]) / "default_background.jpg"
+        if bg_path.exists() and bg_path.stat().st_size > 0:
+            return bg_path
+
         # Create a gradient background
         width, height = 1920, 1080
         img = Image.new("RGB", (width, height))
@@ -568,12 +560,48 @@ class VideoComposer:
             draw.line([(0, y), (width, y)], fill=(r, g, b))
 
         # Save to cache
-        bg_path = Path(self.config["storage"]["cache_dir"]) / "default_background.jpg"
         bg_path.parent.mkdir(parents=True, exist_ok=True)
         img.save(str(bg_path), quality=95)
 
         return bg_path
 
+    def _sized_background(self, image_path: Path, preset: Dict[str, Any]) -> Tuple[Path, bool]:
+        """
+        The background pre-rendered at the preset resolution (see src/utils/background_assets.py).
+
+        Returns:
+            (path, fitted): fitted is True when path is exactly the preset resolution.
+            Without storage.cache_dir, or when the image can't be read, this is
+            (image_path, False) and the filter graph fits it instead.
+        """
+        from src.utils.background_assets import fitted_background
+
+        cache_dir = self.config.get("storage", {}).get("cache_dir")
+        if not cache_dir:
+            return image_path, False
+        try:
+            return fitted_background(image_path, preset["resolution"], Path(cache_dir)), True
+        except (OSError, ValueError) as e:
+            print(f"[WARN] Could not pre-render background, scaling it in FFmpeg instead: {e}")
+            return image_path, False
+
+    @staticmethod
+    def _background_filter(preset: Dict[str, Any], fitted: bool, fit: Optional[str] = None) -> str:
+        """
+        FFmpeg filter fitting a background still into the preset frame.
+
+        "null" (passthrough) for a fitted background (see _sized_background), so the graph
+        does not rescale the same image for every frame. Otherwise fit, by default scale
+        to fit and pad with the dark-blue background.
+        """
+        if fitted:
+            return "null"
+        if fit is not None:
+            return fit
+        width, height = preset["resolution"][0], preset["resolution"][1]
+        return (f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+                f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2:color=0x141E30")
+
     def _create_text_image(self, text: str, size: tuple) -> str:
         """Create an image with text overlay."""
         import tempfile
@@ -697,6 +725,11 @@ class VideoComposer:
                     str(output_path)
                 ])
             
+            # Loop a cached black clip (the color source is endless here; the clip sets the length)
+            black = ["-f", "lavfi", "-i", f"color=c=black:s={preset['resolution'][0]}x{preset['resolution'][1]}:r=30"]
+            if self._compose_still_loop(cmd, black, audio_path, output_path):
+                return output_path
+
             # Use Popen with timeout for better cleanup
             # Get audio duration using FFmpeg (safer than librosa which can crash)
             audio_duration = self._get_audio_duration_ffmpeg(audio_path)
@@ -801,11 +834,10 @@ class VideoComposer:
         temp_viz_path = Path(tempfile.mktemp(suffix=".mp4"))
         
         try:
-            # Generate visualization frames and create temp video
-            visualizer.generate_visualization(audio_path, temp_viz_path)
-            
-            # Now overlay visualization on background using FFmpeg
+            # Overlay visualization on background using FFmpeg
             preset = self.QUALITY_PRESETS.get(quality or "fastest", self.QUALITY_PRESETS["fastest"])
+            bg_path, fitted = self._sized_background(bg_path, preset)
+            bg_fit = self._background_filter(preset, fitted)
             
             # Check GPU availability and NVENC support
             gpu_manager = get_gpu_manager()
@@ -816,7 +848,7 @@ class VideoComposer:
                 "-loop", "1", "-i", str(bg_path),  # Background image
                 "-i", str(temp_viz_path),  # Visualization video
                 "-filter_complex",
-                f"[0:v]scale={preset['resolution'][0]}:{preset['resolution'][1]}:force_original_aspect_ratio=decrease:eval=frame,pad={preset['resolution'][0]}:{preset['resolution'][1]}:(ow-iw)/2:(oh-ih)/2:color=0x141E30[bg];"
+                f"[0:v]{bg_fit}[bg];"
                 f"[1:v]scale={preset['resolution'][0]}:{preset['resolution'][1]}[viz];"
                 f"[bg][viz]blend=all_mode=screen:all_opacity=0.7[out]",  # Blend visualization over background
                 "-map", "[out]",
@@ -867,6 +899,17 @@ class VideoComposer:
                 str(output_path)
             ])
             
+            # Single pass: visualization frames go straight into this encode
+            if self._compose_single_pass(visualizer, cmd, temp_viz_path, audio_path, output_path):
+                return output_path
+            
+            # Generate visualization frames and create temp video
+            visualizer.generate_visualization(audio_path, temp_viz_path)
+            
+            # Long CPU encodes run as parallel segments joined by stream copy
+            if self._encode_segmented(cmd, audio_path, output_path):
+                return output_path
+            
             # Use Popen with timeout for better cleanup
             # Get audio duration using FFmpeg (safer than librosa which can crash)
             audio_duration = self._get_audio_duration_ffmpeg(audio_path)
@@ -898,6 +941,143 @@ class VideoComposer:
             if temp_viz_path.exists():
                 temp_viz_path.unlink(missing_ok=True)
     
+    def _compose_single_pass(self, visualizer, cmd: list, viz_path: Path, audio_path: Path, output_path: Path,
+                             band_only: bool = False) -> bool:
+        """
+        Run a compose command with the visualization frames piped in instead of read from viz_path.
+
+        With video.single_pass the visualizer streams its frames straight into cmd, so the
+        composite is the only encode: no temporary visualization video, no second decode.
+
+        Args:
+            visualizer: AudioVisualizer configured for this composition
+            cmd: Compose command that reads the visualization video from viz_path
+            viz_path: The temporary visualization video the two-pass path would write
+            audio_path: Episode audio (replaces audio taken from the visualization video)
+            output_path: Final video
+            band_only: Render only the waveform band (see AudioVisualizer.waveform_band)
+
+        Returns:
+            True once output_path is written; False if single pass is off or failed (the
+            caller then encodes the visualization video first)
+        """
+        if not self.config.get("video", {}).get("single_pass", False):
+            return False
+        try:
+            kwargs = {"band_only": True} if band_only else {}
+            visualizer.generate_visualization(
+                audio_path, output_path,
+                compose=lambda pipe_input, pipe_chain: self._pipe_visualization_command(
+                    cmd, viz_path, pipe_input, pipe_chain, audio_path
+                ),
+                **kwargs,
+            )
+            return True
+        except Exception as e:
+            print(f"[WARN] Single-pass composition failed: {e}")
+            print("  Encoding the visualization video first")
+            return False
+
+    @staticmethod
+    def _pipe_visualization_command(cmd: list, viz_path: Path, pipe_input: list, pipe_chain: str,
+                                    audio_path: Path) -> list:
+        """
+        Rewrite cmd to read the visualization from a raw frame pipe instead of viz_path.
+
+        ``-i viz_path`` becomes pipe_input, pipe_chain (if any) runs on the piped stream
+        before the rest of the filter graph, and audio mapped from the visualization video
+        is read from audio_path, added as the last input.
+        """
+        index = cmd.index(str(viz_path))
+        viz_input = cmd[:index].count("-i") - 1
+        input_count = cmd.count("-i")
+        cmd = cmd[:index - 1] + pipe_input + cmd[index + 1:]
+
+        if pipe_chain and "-filter_complex" in cmd:
+            graph = cmd.index("-filter_complex") + 1
+            label = f"[{viz_input}:v]"
+            cmd[graph] = f"{label}{pipe_chain}[viz_piped];" + cmd[graph].replace(label, "[viz_piped]")
+
+        viz_audio = f"{viz_input}:a"
+        if viz_audio in cmd:
+            last_input = len(cmd) - cmd[::-1].index("-i") + 1
+            cmd = cmd[:last_input] + ["-i", str(audio_path)] + cmd[last_input:]
+            cmd[cmd.index(viz_audio)] = f"{input_count}:a"
+        return cmd
+
+    def _encode_segmented(self, cmd: list, audio_path: Path, output_path: Path,
+                          audio_source: Optional[Path] = None) -> bool:
+        """
+        Run a CPU encode as parallel keyframe-aligned segments joined by stream copy.
+
+        Applies when video.encode_segments > 1 and the encode is long enough to split;
+        NVENC encodes stay single-process (the GPU limits concurrent sessions).
+
+        Args:
+            cmd: The single-process FFmpeg command writing output_path
+            audio_path: Episode audio (sets the duration)
+            output_path: Final video
+            audio_source: File whose audio is muxed (default: audio_path)
+
+        Returns:
+            True if the segmented encode produced output_path, False if it did not apply
+        """
+        from src.utils.segmented_encode import encode_segmented
+
+        segments = int(self.config.get("video", {}).get("encode_segments", 1) or 1)
+        if segments <= 1 or "h264_nvenc" in cmd:
+            return False
+        duration = self._get_audio_duration_ffmpeg(audio_path)
+        if not duration:
+            return False
+        return encode_segmented(
+            cmd, output_path, audio_source or audio_path, duration, segments,
+            fps=self.config.get("video", {}).get("fps", 30), timeout=int(duration * 2) + 300,
+        )
+
+    def _compose_still_loop(self, cmd: list, input_args: list, audio_path: Path, output_path: Path) -> bool:
+        """
+        Build a still-image video by looping a cached clip instead of a full-length encode.
+
+        Applies when video.still_loop_cache is on and storage.cache_dir is set. The clip
+        is encoded once per (still, fps, video options) with cmd's own video options,
+        so the output matches the QUALITY_PRESETS profile cmd was built from. The looped
+        output is probed and discarded (full encode) unless it ends with the audio.
+
+        Args:
+            cmd: The single-process FFmpeg command writing output_path
+            input_args: Options reading the still, ending in "-i <source>"
+            audio_path: Episode audio (sets the duration and is muxed)
+            output_path: Final video
+
+        Returns:
+            True if the looped clip produced output_path, False if it did not apply
+        """
+        from src.utils.segmented_encode import audio_output_args
+        from src.utils.still_loop import DURATION_TOLERANCE, loop_still, video_output_args
+
+        cache_dir = self.config.get("storage", {}).get("cache_dir")
+        if not cache_dir or not self.config.get("video", {}).get("still_loop_cache", False):
+            return False
+        duration = self._get_audio_duration_ffmpeg(audio_path)
+        if not duration:
+            return False
+        try:
+            loop_still(
+                input_args, video_output_args(cmd, output_path), audio_path, output_path, duration, Path(cache_dir),
+                fps=self.config.get("video", {}).get("fps", 30), audio_args=audio_output_args(cmd),
+                timeout=int(duration * 2) + 300,
+            )
+        except (RuntimeError, OSError, ValueError, subprocess.TimeoutExpired) as e:
+            print(f"[WARN] Still loop cache unavailable, encoding the full video: {e}")
+            return False
+        looped = self._media_probe().duration(output_path)
+        if looped is None or abs(looped - duration) > DURATION_TOLERANCE:
+            print(f"[WARN] Looped still video runs {looped}s for {duration:.2f}s of audio, encoding the full video")
+            Path(output_path).unlink(missing_ok=True)
+            return False
+        return True
+
     def _check_nvenc(self) -> bool:
         """Check if NVENC is available."""
         try:
@@ -915,10 +1095,8 @@ class VideoComposer:
 
             print("[COMPOSE] Overlaying visualization on avatar video...")
 
-            # Generate visualization video first
             temp_viz_path = output_path.parent / f"temp_viz_{output_path.stem}.mp4"
             visualizer = AudioVisualizer(self.config)
-            visualizer.generate_visualization(audio_path, temp_viz_path)
 
             # Use FFmpeg to overlay avatar on top of visualization
             # Avatar in center-top, visualization stays at bottom
@@ -934,7 +1112,9 @@ class VideoComposer:
                 str(avatar_video),  # Overlay (avatar)
                 "-filter_complex",
                 "[1:v]scale=960:720[avatar];"  # Scale avatar to 960x720
-                + "[0:v][avatar]overlay=(W-w)/2:50",  # Center avatar, 50px from top
+                + "[0:v][avatar]overlay=(W-w)/2:50[vout]",  # Center avatar, 50px from top
+                "-map", "[vout]",
+                "-map", "0:a",  # Episode audio, muxed into the visualization video
             ]
             
             # Use GPU encoding if available
@@ -983,10 +1163,25 @@ class VideoComposer:
             
             ffmpeg_cmd.extend([
                 "-c:a", "copy",
+                "-shortest",
                 str(output_path),
                 "-y",
             ])
 
+            # Single pass: visualization frames go straight into this encode (episode audio read from audio_path)
+            if self._compose_single_pass(visualizer, ffmpeg_cmd, temp_viz_path, audio_path, output_path):
+                print(f"[OK] Combined video created: {output_path}")
+                return output_path
+
+            # Generate visualization video first
+            visualizer.generate_visualization(audio_path, temp_viz_path)
+
+            # Long CPU encodes run as parallel segments joined by stream copy (audio from the visualization)
+            if self._encode_segmented(ffmpeg_cmd, audio_path, output_path, audio_source=temp_viz_path):
+                temp_viz_path.unlink(missing_ok=True)
+                print(f"[OK] Combined video created: {output_path}")
+                return output_path
+
             # Use Popen with timeout for better cleanup
             # Get audio duration using FFmpeg (safer than librosa which can crash)
             audio_duration = self._get_audio_duration_ffmpeg(audio_path)
@@ -1051,14 +1246,30 @@ class VideoComposer:
             
             print("[VIDEO] Composing avatar + background + visualization...")
             
-            # Generate visualization video first
             from .audio_visualizer import AudioVisualizer
-            temp_viz_path = output_path.parent / f"temp_viz_{output_path.stem}.mp4"
             visualizer = AudioVisualizer(self.config)
-            visualizer.generate_visualization(audio_path, temp_viz_path)
+            # A straight-alpha layer is overlaid as it is: no chromakey or saturation fix-up per output frame
+            alpha_layer = self.config.get("visualization", {}).get("alpha_layer", False) and visualizer.use_alpha_layer()
+            temp_viz_path = output_path.parent / f"temp_viz_{output_path.stem}{'.mov' if alpha_layer else '.mp4'}"
+            # The filter graph only keeps the waveform band, so render just that strip when possible
+            viz_band = visualizer.waveform_band()
+
+            def render_visualization():
+                """Render the visualization for ffmpeg_cmd: True if single pass already wrote the output"""
+                if self._compose_single_pass(visualizer, ffmpeg_cmd, temp_viz_path, audio_path, output_path,
+                                             band_only=viz_band is not None):
+                    return True
+                # Two passes: encode the visualization video first
+                if viz_band is not None:
+                    visualizer.generate_visualization(audio_path, temp_viz_path, band_only=True)
+                else:
+                    visualizer.generate_visualization(audio_path, temp_viz_path)
+                return False
             
             gpu_manager = get_gpu_manager()
             preset = self.QUALITY_PRESETS.get(quality or "fastest", self.QUALITY_PRESETS["fastest"])
+            background_path, fitted = self._sized_background(background_path, preset)
+            bg_fit = self._background_filter(preset, fitted)
             
             # Verify avatar video exists and is valid before using it
             if not avatar_video.exists():
@@ -1073,27 +1284,12 @@ class VideoComposer:
             
             # Get avatar video dimensions to calculate proper scaling
             # Avatar video is typically 1024x640 (wider than tall), so we need to ensure it fits without cropping
-            try:
-                import subprocess
-                probe_result = subprocess.run(
-                    ['ffprobe', '-v', 'error', '-select_streams', 'v:0', 
-                     '-show_entries', 'stream=width,height', '-of', 'csv=s=x:p=0', str(avatar_video)],
-                    capture_output=True, text=True, timeout=5
-                )
-                if probe_result.returncode == 0:
-                    avatar_dims = probe_result.stdout.strip().split('x')
-                    if len(avatar_dims) == 2:
-                        avatar_width = int(avatar_dims[0])
-                        avatar_height = int(avatar_dims[1])
-                        avatar_aspect = avatar_width / avatar_height
-                        print(f"[DEBUG] Avatar video dimensions: {avatar_width}x{avatar_height} (aspect: {avatar_aspect:.2f})")
-                    else:
-                        avatar_width, avatar_height = 1024, 640  # Default fallback
-                        avatar_aspect = avatar_width / avatar_height
-                else:
-                    avatar_width, avatar_height = 1024, 640  # Default fallback
-                    avatar_aspect = avatar_width / avatar_height
-            except Exception:
+            avatar_dims = self._media_probe().dimensions(avatar_video)
+            if avatar_dims:
+                avatar_width, avatar_height = avatar_dims
+                avatar_aspect = avatar_width / avatar_height
+                print(f"[DEBUG] Avatar video dimensions: {avatar_width}x{avatar_height} (aspect: {avatar_aspect:.2f})")
+            else:
                 avatar_width, avatar_height = 1024, 640  # Default fallback
                 avatar_aspect = avatar_width / avatar_height
             
@@ -1170,21 +1366,47 @@ class VideoComposer:
                 crop_x = 0
                 overlay_x = 0
             
+            if viz_band is not None:
+                # Visualization video is already the band strip - scale it to output pixels and place it
+                band_x, band_y, band_width, band_height = viz_band
+                scale_x = output_width / visualizer.resolution[0]
+                scale_y = output_height / visualizer.resolution[1]
+                overlay_x = int(round(band_x * scale_x))
+                overlay_y = int(round(band_y * scale_y))
+                crop_width = max(2, int(round(band_width * scale_x)) // 2 * 2)
+                crop_height = max(2, int(round(band_height * scale_y)) // 2 * 2)
+                crop_x, crop_y = overlay_x, overlay_y
+                viz_filter = f"[1:v]scale={crop_width}:{crop_height}[viz_cropped];"  # Scale band strip to output pixels
+            else:
+                viz_filter = (
+                    f"[1:v]scale={preset['resolution'][0]}:{preset['resolution'][1]}[viz_full];"  # Scale visualization to full resolution
+                    + f"[viz_full]crop={crop_width}:{crop_height}:{crop_x}:{crop_y}[viz_cropped];"  # Crop visualization to position-specific region
+                )
+            
+            if alpha_layer:
+                # The layer's alpha already masks the black background
+                viz_key = ""
+                viz_overlay = f"[bg_avatar][viz_cropped]overlay={overlay_x}:{overlay_y}[vout]"
+            else:
+                viz_key = f"[viz_cropped]chromakey=color=0x000000:similarity=0.05:blend=0.0[viz_transparent];"  # Make black transparent via chromakey (similarity=0.05 to preserve bright green, blend=0.0 for no fade)
+                viz_overlay = (
+                    f"[bg_avatar][viz_transparent]overlay={overlay_x}:{overlay_y}[vout_raw];"  # Overlay transparent visualization
+                    + f"[vout_raw]eq=saturation=1.3[vout]"  # Boost saturation to preserve waveform vibrancy after overlay (1.3 = 30% boost)
+                )
+            
             ffmpeg_cmd = [
                 "ffmpeg", "-y",
                 "-loop", "1", "-i", str(background_path),  # Background image (input 0)
                 "-i", str(temp_viz_path),  # Visualization video (input 1) - no audio
                 "-i", str(avatar_video),  # Avatar video (input 2) - THIS IS THE LIP-SYNC VIDEO WITH AUDIO
                 "-filter_complex",
-                f"[0:v]scale={preset['resolution'][0]}:{preset['resolution'][1]}:force_original_aspect_ratio=decrease,pad={preset['resolution'][0]}:{preset['resolution'][1]}:(ow-iw)/2:(oh-ih)/2:color=0x141E30[bg];"  # Scale and pad background
-                + f"[1:v]scale={preset['resolution'][0]}:{preset['resolution'][1]}[viz_full];"  # Scale visualization to full resolution
-                + f"[viz_full]crop={crop_width}:{crop_height}:{crop_x}:{crop_y}[viz_cropped];"  # Crop visualization to position-specific region
-                + f"[viz_cropped]chromakey=color=0x000000:similarity=0.05:blend=0.0[viz_transparent];"  # Make black transparent via chromakey (similarity=0.05 to preserve bright green, blend=0.0 for no fade)
+                f"[0:v]{bg_fit}[bg];"  # Scale and pad background (pre-rendered: passthrough)
+                + viz_filter
+                + viz_key
                 + f"[2:v]scale={avatar_scale_width}:{avatar_scale_height}:force_original_aspect_ratio=decrease[avatar_scaled];"  # Scale avatar preserving aspect ratio (no cropping)
                 + f"[avatar_scaled]pad={avatar_scale_width}:{avatar_scale_height}:(ow-iw)/2:(oh-ih)/2:color=black[avatar];"  # Pad to exact size if needed, centered
                 + f"[bg][avatar]overlay=(W-w)/2:(H-h)/2[bg_avatar];"  # Overlay avatar on background first
-                + f"[bg_avatar][viz_transparent]overlay={overlay_x}:{overlay_y}[vout_raw];"  # Overlay transparent visualization
-                + f"[vout_raw]eq=saturation=1.3[vout]",  # Boost saturation to preserve waveform vibrancy after overlay (1.3 = 30% boost)
+                + viz_overlay,
                 "-map", "[vout]",  # Use the overlay output directly (already at target resolution)
                 "-map", "2:a",  # Use audio from avatar video (input 2) - THIS PRESERVES LIP-SYNC!
             ]
@@ -1240,6 +1462,10 @@ class VideoComposer:
                     str(output_path),
                 ])
                 
+                if render_visualization():
+                    print(f"[OK] Full composition created: {output_path}")
+                    return output_path
+                
                 # Start file monitoring for progress indication
                 from src.utils.file_monitor import FileMonitor
                 monitor = FileMonitor(
@@ -1360,6 +1586,16 @@ class VideoComposer:
                     str(output_path),
                 ])
                 
+                if render_visualization():
+                    print(f"[OK] Full composition created: {output_path}")
+                    return output_path
+                
+                # Long encodes run as parallel segments joined by stream copy (audio from the avatar, as mapped above)
+                if self._encode_segmented(ffmpeg_cmd, audio_path, output_path, audio_source=avatar_video):
+                    temp_viz_path.unlink(missing_ok=True)
+                    print(f"[OK] Full composition created: {output_path}")
+                    return output_path
+                
                 # Start file monitoring for progress indication
                 from src.utils.file_monitor import FileMonitor
                 monitor = FileMonitor(
@@ -1477,36 +1713,25 @@ class VideoComposer:
             
             gpu_manager = get_gpu_manager()
             preset = self.QUALITY_PRESETS.get(quality or "fastest", self.QUALITY_PRESETS["fastest"])
+            background_path, fitted = self._sized_background(background_path, preset)
+            bg_fit = self._background_filter(preset, fitted)
             
             # Get avatar dimensions for proper scaling
-            try:
-                import subprocess as sp
-                probe_result = sp.run(
-                    ['ffprobe', '-v', 'error', '-select_streams', 'v:0', 
-                     '-show_entries', 'stream=width,height', '-of', 'csv=s=x:p=0', str(avatar_video)],
-                    capture_output=True, text=True, timeout=5
-                )
-                if probe_result.returncode == 0:
-                    avatar_dims = probe_result.stdout.strip().split('x')
-                    if len(avatar_dims) == 2:
-                        avatar_width = int(avatar_dims[0])
-                        avatar_height = int(avatar_dims[1])
-                        avatar_aspect = avatar_width / avatar_height
-                        # Scale to fit within canvas while preserving aspect ratio
-                        if avatar_aspect > (preset['resolution'][0] / preset['resolution'][1]):
-                            avatar_scale_width = preset['resolution'][0]
-                            avatar_scale_height = int(preset['resolution'][0] / avatar_aspect)
-                        else:
-                            avatar_scale_height = preset['resolution'][1]
-                            avatar_scale_width = int(preset['resolution'][1] * avatar_aspect)
-                        # Ensure even dimensions
-                        avatar_scale_width = (avatar_scale_width // 2) * 2
-                        avatar_scale_height = (avatar_scale_height // 2) * 2
-                    else:
-                        avatar_scale_width, avatar_scale_height = 768, 480
+            avatar_dims = self._media_probe().dimensions(avatar_video)
+            if avatar_dims:
+                avatar_width, avatar_height = avatar_dims
+                avatar_aspect = avatar_width / avatar_height
+                # Scale to fit within canvas while preserving aspect ratio
+                if avatar_aspect > (preset['resolution'][0] / preset['resolution'][1]):
+                    avatar_scale_width = preset['resolution'][0]
+                    avatar_scale_height = int(preset['resolution'][0] / avatar_aspect)
                 else:
-                    avatar_scale_width, avatar_scale_height = 768, 480
-            except Exception:
+                    avatar_scale_height = preset['resolution'][1]
+                    avatar_scale_width = int(preset['resolution'][1] * avatar_aspect)
+                # Ensure even dimensions
+                avatar_scale_width = (avatar_scale_width // 2) * 2
+                avatar_scale_height = (avatar_scale_height // 2) * 2
+            else:
                 avatar_scale_width, avatar_scale_height = 768, 480
             
             print(f"[DEBUG] Avatar scaling for background overlay: {avatar_scale_width}x{avatar_scale_height}")
@@ -1518,7 +1743,7 @@ class VideoComposer:
                 "-i", str(avatar_video),  # Avatar video (input 1) - LIP-SYNC VIDEO WITH AUDIO
                 "-i", str(audio_path),  # Audio (input 2) - but we'll use avatar's audio instead
                 "-filter_complex",
-                f"[0:v]scale={preset['resolution'][0]}:{preset['resolution'][1]}:force_original_aspect_ratio=decrease,pad={preset['resolution'][0]}:{preset['resolution'][1]}:(ow-iw)/2:(oh-ih)/2:color=0x141E30[bg];"  # Scale and pad background
+                f"[0:v]{bg_fit}[bg];"  # Scale and pad background (pre-rendered: passthrough)
                 + f"[1:v]scale={avatar_scale_width}:{avatar_scale_height}:force_original_aspect_ratio=decrease[avatar_scaled];"  # Scale avatar preserving aspect ratio
                 + f"[avatar_scaled]pad={avatar_scale_width}:{avatar_scale_height}:(ow-iw)/2:(oh-ih)/2:color=black[avatar];"  # Pad avatar to exact size
                 + f"[bg][avatar]overlay=(W-w)/2:(H-h)/2[vout]",  # Overlay avatar centered on background
@@ -1584,6 +1809,11 @@ class VideoComposer:
                 str(output_path),
             ])
             
+            # Long CPU encodes run as parallel segments joined by stream copy (audio from the avatar, as above)
+            if self._encode_segmented(ffmpeg_cmd, audio_path, output_path, audio_source=avatar_video):
+                print(f"[OK] Avatar+background composition created: {output_path}")
+                return output_path
+            
             # Monitor file growth for progress indication
             from src.utils.file_monitor import FileMonitor
             monitor = FileMonitor(
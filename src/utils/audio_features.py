@@ -0,0 +1,894 @@
+"""
+Audio Features - Single-pass per-frame feature extraction for visualizations
+
+Decodes an audio file once, front to back, into a multi-resolution envelope
+(min/max/RMS/mean-abs pyramid) plus a decimated sample track, and reduces those to
+a compact table with one row per video frame. Visualizer styles read from the table instead of calling
+librosa.load() for every frame.
+
+When a cache directory is given, the envelope, frame tables and spectra are kept
+in a content-hashed sidecar index and memory-mapped on later renders, so
+re-rendering the same audio needs no decoding at all.
+"""
+
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+from src.utils.file_hash import content_hash
+
+# Number of (signed) samples kept per frame for drawing the waveform shape
+DEFAULT_WINDOW_POINTS = 256
+# Samples decoded per block while walking the file
+DEFAULT_BLOCK_SIZE = 65536
+# Each frame reads 1/fps seconds plus this overlap (same as the old per-frame loads)
+FRAME_OVERLAP_SECONDS = 0.05
+# Spectrum analysis: FFT size and number of output bands
+SPECTRUM_N_FFT = 2048
+SPECTRUM_BANDS = 64
+# Band layouts: "log" spaces bands geometrically from SPECTRUM_MIN_FREQ to SPECTRUM_MAX_FREQ,
+# "linear" averages the first SPECTRUM_BINS_PER_BAND FFT bins into each band
+SPECTRUM_SCALES = ("log", "linear")
+SPECTRUM_BINS_PER_BAND = 10
+SPECTRUM_MIN_FREQ = 40.0
+SPECTRUM_MAX_FREQ = 16000.0
+# Frames per vectorized FFT batch in the streaming STFT
+SPECTRUM_BATCH_FRAMES = 256
+# Per-frame level references for spectrum bars: "global" (two-pass, whole-file peak),
+# "lookahead" (running peak that sees a few seconds ahead), "running" (causal peak)
+SPECTRUM_NORMALIZATIONS = ("global", "lookahead", "running")
+# Sample rate assumed when audio cannot be decoded at all
+FALLBACK_SAMPLE_RATE = 22050
+
+# Envelope pyramid hop sizes in samples (finest first) and column layout
+ENVELOPE_HOPS = (32, 256, 2048)
+ENV_MIN, ENV_MAX, ENV_RMS, ENV_MEAN_ABS = range(4)
+# Every SAMPLE_TRACK_HOP-th sample is kept so frame windows are drawn from real samples
+SAMPLE_TRACK_HOP = 2
+# Frames processed per vectorized block when deriving frame features
+_FRAME_BLOCK = 2048
+
+
+@dataclass
+class FrameFeatureTable:
+    """Per-frame audio features (row i describes video frame i)."""
+
+    sample_rate: int
+    fps: float
+    peak: np.ndarray  # (N,) max |sample|
+    rms: np.ndarray  # (N,) root mean square
+    mean_abs: np.ndarray  # (N,) mean |sample|
+    window: np.ndarray  # (N, window_points) downsampled signed samples
+    spectrum: Optional[np.ndarray] = None  # (N, SPECTRUM_BANDS) band magnitudes
+    spectrum_peak: Optional[np.ndarray] = None  # (N,) max bin magnitude per frame
+
+    def __len__(self) -> int:
+        return len(self.peak)
+
+    @property
+    def num_frames(self) -> int:
+        return len(self.peak)
+
+    @property
+    def window_points(self) -> int:
+        return self.window.shape[1]
+
+    @classmethod
+    def from_arrays(
+        cls, sample_rate: int, fps: float, frames: np.ndarray, spectra: Optional[np.ndarray] = None
+    ) -> "FrameFeatureTable":
+        """
+        Wrap packed arrays (possibly memory-mapped) without copying.
+
+        Args:
+            frames: (N, 3 + window_points) rows of [peak, rms, mean_abs, window...]
+            spectra: (N, SPECTRUM_BANDS + 1) rows of [bands..., peak] or None
+        """
+        return cls(
+            sample_rate=int(sample_rate),
+            fps=fps,
+            peak=frames[:, 0],
+            rms=frames[:, 1],
+            mean_abs=frames[:, 2],
+            window=frames[:, 3:],
+            spectrum=spectra[:, :SPECTRUM_BANDS] if spectra is not None else None,
+            spectrum_peak=spectra[:, SPECTRUM_BANDS] if spectra is not None else None,
+        )
+
+    def save(self, directory: Path) -> None:
+        """
+        Write the table as packed .npy files (see from_arrays) that other processes
+        can memory-map with load(); rows are streamed to disk, not staged in RAM.
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        frames = np.lib.format.open_memmap(
+            directory / "frames.npy", mode="w+", dtype=np.float32, shape=(len(self), 3 + self.window_points)
+        )
+        frames[:, 0], frames[:, 1], frames[:, 2] = self.peak, self.rms, self.mean_abs
+        frames[:, 3:] = self.window
+        frames.flush()
+        if self.spectrum is not None:
+            spectra = np.lib.format.open_memmap(
+                directory / "spectra.npy", mode="w+", dtype=np.float32, shape=(len(self), self.spectrum.shape[1] + 1)
+            )
+            spectra[:, :-1], spectra[:, -1] = self.spectrum, self.spectrum_peak
+            spectra.flush()
+        (directory / "table.json").write_text(json.dumps({"sample_rate": self.sample_rate, "fps": self.fps}))
+
+    @classmethod
+    def load(cls, directory: Path) -> "FrameFeatureTable":
+        """Memory-map a table written by save() (read-only, shared page cache)."""
+        directory = Path(directory)
+        meta = json.loads((directory / "table.json").read_text())
+        spectra_path = directory / "spectra.npy"
+        return cls.from_arrays(
+            meta["sample_rate"],
+            meta["fps"],
+            np.load(directory / "frames.npy", mmap_mode="r"),
+            np.load(spectra_path, mmap_mode="r") if spectra_path.exists() else None,
+        )
+
+    @classmethod
+    def empty(
+        cls,
+        num_frames: int,
+        fps: float,
+        sample_rate: int = FALLBACK_SAMPLE_RATE,
+        window_points: int = DEFAULT_WINDOW_POINTS,
+        spectrum: bool = False,
+    ) -> "FrameFeatureTable":
+        """Create an all-zero (silent) table."""
+        return cls.from_arrays(
+            sample_rate,
+            fps,
+            np.zeros((num_frames, 3 + window_points), dtype=np.float32),
+            np.zeros((num_frames, SPECTRUM_BANDS + 1), dtype=np.float32) if spectrum else None,
+        )
+
+    def resample(self, fps: float) -> "FrameFeatureTable":
+        """
+        Table at a lower frame rate: row j is row round(j * self.fps / fps) of this one.
+
+        Whole-number rate ratios are strided views (no copy); others gather rows.
+        Returns self when fps is not below the table's rate.
+        """
+        if fps >= self.fps or len(self) == 0:
+            return self
+        ratio = self.fps / fps
+        count = int(np.floor((len(self) - 1) / ratio + 1e-6)) + 1
+        if abs(ratio - round(ratio)) < 1e-9:
+            rows = slice(0, None, int(round(ratio)))
+        else:
+            rows = np.minimum(len(self) - 1, np.round(np.arange(count) * ratio).astype(np.int64))
+
+        def take(column):
+            return None if column is None else column[rows][:count]
+
+        return FrameFeatureTable(
+            sample_rate=self.sample_rate,
+            fps=fps,
+            peak=take(self.peak),
+            rms=take(self.rms),
+            mean_abs=take(self.mean_abs),
+            window=take(self.window),
+            spectrum=take(self.spectrum),
+            spectrum_peak=take(self.spectrum_peak),
+        )
+
+
+def open_audio_blocks(audio_path: Path, block_size: int = DEFAULT_BLOCK_SIZE) -> Tuple[int, Iterator[np.ndarray]]:
+    """
+    Open an audio file for sequential mono decoding.
+
+    Uses soundfile to stream blocks straight from disk. Formats libsndfile cannot
+    read fall back to a single librosa.load() of the whole file.
+
+    Args:
+        audio_path: Path to audio file
+        block_size: Samples per yielded block
+
+    Returns:
+        (sample_rate, iterator of float32 mono blocks)
+    """
+    try:
+        import soundfile as sf
+
+        sound_file = sf.SoundFile(str(audio_path))
+    except Exception:
+        sound_file = None
+
+    if sound_file is not None:
+        def _soundfile_blocks():
+            try:
+                while True:
+                    block = sound_file.read(block_size, dtype="float32", always_2d=True)
+                    if len(block) == 0:
+                        break
+                    yield block.mean(axis=1) if block.shape[1] > 1 else block[:, 0]
+            finally:
+                sound_file.close()
+
+        return int(sound_file.samplerate), _soundfile_blocks()
+
+    import librosa
+
+    y, sr = librosa.load(str(audio_path), sr=None, mono=True)
+    y = np.asarray(y, dtype=np.float32)
+
+    def _array_blocks():
+        for start in range(0, len(y), block_size):
+            yield y[start:start + block_size]
+
+    return int(sr), _array_blocks()
+
+
+class _SampleReader:
+    """Sliding buffer over decoded blocks; reads must move forward in time."""
+
+    def __init__(self, blocks: Iterator[np.ndarray]):
+        self._blocks = iter(blocks)
+        self._buffer = np.zeros(0, dtype=np.float32)
+        self._buffer_start = 0
+        self._exhausted = False
+
+    def read(self, start: int, length: int) -> np.ndarray:
+        """Return samples [start, start + length), clipped to what the file contains."""
+        end = start + length
+        while not self._exhausted and self._buffer_start + len(self._buffer) < end:
+            try:
+                block = next(self._blocks)
+            except StopIteration:
+                self._exhausted = True
+                break
+            self._buffer = np.concatenate((self._buffer, block))
+        lo = max(0, start - self._buffer_start)
+        hi = max(lo, end - self._buffer_start)
+        return self._buffer[lo:hi]
+
+    def discard_before(self, position: int):
+        """Drop buffered samples that no later read will need."""
+        drop = min(position - self._buffer_start, len(self._buffer))
+        if drop > 0:
+            self._buffer = self._buffer[drop:]
+            self._buffer_start += drop
+
+
+def _bucket_stats(buckets: np.ndarray) -> np.ndarray:
+    """Reduce (n, hop) sample buckets to (n, 4) [min, max, rms, mean_abs] rows."""
+    stats = np.empty((len(buckets), 4), dtype=np.float32)
+    stats[:, ENV_MIN] = buckets.min(axis=1)
+    stats[:, ENV_MAX] = buckets.max(axis=1)
+    stats[:, ENV_RMS] = np.sqrt(np.mean(buckets * buckets, axis=1))
+    stats[:, ENV_MEAN_ABS] = np.abs(buckets).mean(axis=1)
+    return stats
+
+
+class _EnvelopeBuilder:
+    """Accumulates the finest envelope level from sequential blocks."""
+
+    def __init__(self, hop: int):
+        self.hop = hop
+        self.num_samples = 0
+        self._rows = []
+        self._carry = np.zeros(0, dtype=np.float32)
+
+    def add(self, block: np.ndarray):
+        self.num_samples += len(block)
+        data = np.concatenate((self._carry, block)) if len(self._carry) else block
+        usable = len(data) - len(data) % self.hop
+        if usable:
+            self._rows.append(_bucket_stats(data[:usable].reshape(-1, self.hop)))
+        self._carry = np.array(data[usable:], dtype=np.float32)
+
+    def finish(self) -> np.ndarray:
+        if len(self._carry):
+            self._rows.append(_bucket_stats(self._carry.reshape(1, -1)))
+            self._carry = np.zeros(0, dtype=np.float32)
+        if not self._rows:
+            return np.zeros((0, 4), dtype=np.float32)
+        return np.concatenate(self._rows)
+
+
+class _SampleTrackBuilder:
+    """
+    Keeps every hop-th sample (absolute positions 0, hop, 2*hop, ...) of sequential blocks.
+
+    With ``out`` (e.g. AudioFeatureIndex.samples_draft()), samples are written into it
+    as they arrive instead of being collected in RAM. finish() returns ``out`` itself
+    when the audio filled it exactly, else an in-memory track (the decoded length
+    differed from the one the file header announced).
+    """
+
+    def __init__(self, hop: int = SAMPLE_TRACK_HOP, out: Optional[np.ndarray] = None):
+        self.hop = hop
+        self._position = 0
+        self._parts = []
+        self._out = out
+        self._filled = 0
+
+    def add(self, block: np.ndarray):
+        first = (-self._position) % self.hop
+        kept = block[first::self.hop]
+        self._position += len(block)
+        if self._out is not None and not self._parts:
+            take = min(len(kept), len(self._out) - self._filled)
+            self._out[self._filled:self._filled + take] = kept[:take]
+            self._filled += take
+            kept = kept[take:]
+        if len(kept):
+            self._parts.append(np.array(kept, dtype=np.float32))
+
+    def finish(self) -> np.ndarray:
+        if self._out is not None:
+            if self._filled == len(self._out) and not self._parts:
+                return self._out
+            self._parts.insert(0, np.array(self._out[:self._filled], dtype=np.float32))
+        if not self._parts:
+            return np.zeros(0, dtype=np.float32)
+        return np.concatenate(self._parts)
+
+
+def _coarsen_envelope(envelope: np.ndarray, factor: int) -> np.ndarray:
+    """Merge groups of `factor` envelope rows into one (next pyramid level)."""
+    if len(envelope) == 0:
+        return envelope
+    pad = (-len(envelope)) % factor
+    if pad:
+        # Edge-pad min/max, zero-pad energy columns (tail bucket is slightly under-weighted)
+        tail = np.zeros((pad, 4), dtype=np.float32)
+        tail[:, ENV_MIN] = envelope[-1, ENV_MIN]
+        tail[:, ENV_MAX] = envelope[-1, ENV_MAX]
+        envelope = np.concatenate((envelope, tail))
+    groups = envelope.reshape(-1, factor, 4)
+    coarse = np.empty((len(groups), 4), dtype=np.float32)
+    coarse[:, ENV_MIN] = groups[:, :, ENV_MIN].min(axis=1)
+    coarse[:, ENV_MAX] = groups[:, :, ENV_MAX].max(axis=1)
+    coarse[:, ENV_RMS] = np.sqrt(np.mean(groups[:, :, ENV_RMS] ** 2, axis=1))
+    coarse[:, ENV_MEAN_ABS] = groups[:, :, ENV_MEAN_ABS].mean(axis=1)
+    return coarse
+
+
+def _build_pyramid(finest: np.ndarray) -> Dict[int, np.ndarray]:
+    """Build all ENVELOPE_HOPS levels from the finest one."""
+    levels = {ENVELOPE_HOPS[0]: finest}
+    for previous, hop in zip(ENVELOPE_HOPS[:-1], ENVELOPE_HOPS[1:], strict=True):
+        levels[hop] = _coarsen_envelope(levels[previous], hop // previous)
+    return levels
+
+
+def _track_values(track: np.ndarray, hop: int, positions: np.ndarray) -> np.ndarray:
+    """Samples at absolute positions, linearly interpolated between track points (0 past the end)."""
+    scaled = positions / hop
+    lower = np.floor(scaled).astype(np.int64)
+    frac = (scaled - lower).astype(np.float32)
+    # One zero point past the end stands in for silence
+    padded = np.concatenate((np.asarray(track, dtype=np.float32), np.zeros(1, dtype=np.float32)))
+    left = padded[np.minimum(lower, len(track))]
+    right = padded[np.minimum(lower + 1, len(track))]
+    return left + (right - left) * frac
+
+
+def _frame_rows_from_envelope(
+    envelope: np.ndarray, hop: int, track: np.ndarray, sample_rate: int, fps: float, num_frames: int,
+    window_points: int, track_hop: int = SAMPLE_TRACK_HOP,
+) -> np.ndarray:
+    """
+    Derive packed per-frame rows [peak, rms, mean_abs, window...] from an envelope level
+    and the decimated sample track.
+
+    Frame i covers [i/fps - overlap/2, (i+1)/fps + overlap/2) like the old chunked
+    loads. Its window holds the samples at window_points evenly spaced positions of
+    that span (decimated like the old per-frame loads), read from the sample track.
+    Frames past the end of the audio are silent.
+    """
+    rows = np.zeros((num_frames, 3 + window_points), dtype=np.float32)
+    if num_frames == 0 or len(envelope) == 0:
+        return rows
+
+    window_length = int((1.0 / fps + FRAME_OVERLAP_SECONDS) * sample_rate)
+    span = max(1, -(-window_length // hop))
+    # One zero row past the end stands in for silence
+    padded = np.concatenate((np.asarray(envelope, dtype=np.float32), np.zeros((1, 4), dtype=np.float32)))
+    offsets = np.arange(span)
+    point_offsets = (np.arange(window_points) * window_length) // window_points
+
+    for block_start in range(0, num_frames, _FRAME_BLOCK):
+        block_end = min(num_frames, block_start + _FRAME_BLOCK)
+        frame_idx = np.arange(block_start, block_end)
+        starts = (np.maximum(0.0, frame_idx / fps - FRAME_OVERLAP_SECONDS / 2) * sample_rate).astype(np.int64)
+        bucket_idx = np.minimum(starts[:, None] // hop + offsets, len(envelope))
+        buckets = padded[bucket_idx]  # (frames, span, 4)
+
+        out = rows[block_start:block_end]
+        out[:, 0] = np.maximum(-buckets[:, :, ENV_MIN].min(axis=1), buckets[:, :, ENV_MAX].max(axis=1))
+        out[:, 1] = np.sqrt(np.mean(buckets[:, :, ENV_RMS] ** 2, axis=1))
+        out[:, 2] = buckets[:, :, ENV_MEAN_ABS].mean(axis=1)
+        out[:, 3:] = _track_values(track, track_hop, starts[:, None] + point_offsets)
+
+    return rows
+
+
+def _read_padded(reader: _SampleReader, start: int, length: int) -> np.ndarray:
+    """Read samples [start, start + length), zero-padded past either end of the file."""
+    segment = reader.read(start, length)
+    if len(segment) == length:
+        return segment
+    left_pad = max(0, -start)
+    right_pad = length - left_pad - len(segment)
+    return np.pad(segment, (left_pad, max(0, right_pad)))
+
+
+def spectrum_band_edges(sample_rate: int, scale: str = "log", bands: int = SPECTRUM_BANDS,
+                        n_fft: int = SPECTRUM_N_FFT) -> np.ndarray:
+    """
+    FFT bin index table for grouping a magnitude spectrum into bands.
+
+    Band i covers bins [edges[i], edges[i + 1]), so band sums are
+    np.add.reduceat(magnitudes[:edges[-1]], edges[:-1]). Log bands that would be
+    narrower than one FFT bin are widened to exactly one bin.
+
+    Args:
+        sample_rate: Audio sample rate
+        scale: "log" or "linear" (see SPECTRUM_SCALES)
+        bands: Number of bands
+        n_fft: FFT size
+
+    Returns:
+        (bands + 1,) strictly increasing int64 bin indices
+    """
+    num_bins = n_fft // 2 + 1
+    if scale == "linear":
+        return np.minimum(np.arange(bands + 1) * SPECTRUM_BINS_PER_BAND, num_bins).astype(np.int64)
+    if scale != "log":
+        raise ValueError(f"Unknown spectrum scale: {scale} (expected one of {SPECTRUM_SCALES})")
+
+    low = max(1, int(SPECTRUM_MIN_FREQ * n_fft / sample_rate))
+    high = min(num_bins, int(np.ceil(SPECTRUM_MAX_FREQ * n_fft / sample_rate)))
+    high = max(high, low + bands)
+    edges = np.floor(np.geomspace(low, high, bands + 1)).astype(np.int64)
+    steps = np.arange(bands + 1)
+    edges = np.maximum.accumulate(edges - steps) + steps
+    return np.minimum(edges, num_bins)
+
+
+def _band_spectrum(magnitudes: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """Rows [band means..., peak] for a (frames, bins) block of magnitude spectra."""
+    used = magnitudes[:, :edges[-1]]
+    out = np.empty((len(magnitudes), len(edges)), dtype=np.float32)
+    out[:, :-1] = np.add.reduceat(used, edges[:-1], axis=1) / np.diff(edges)
+    out[:, -1] = used[:, edges[0]:].max(axis=1)
+    return out
+
+
+class StreamingSTFT:
+    """
+    Frame-synchronous short-time Fourier transform with hop = sample_rate / fps.
+
+    Emits exactly one Hann-windowed magnitude column per video frame (column i is
+    centred on (i + 0.5) / fps seconds) while walking the audio once, front to
+    back. Frames are transformed in batches with one vectorized rfft; only the
+    current batch's samples plus one FFT window are held in memory, so memory
+    stays bounded regardless of input length.
+    """
+
+    def __init__(self, sample_rate: int, fps: float, scale: str = "log",
+                 n_fft: int = SPECTRUM_N_FFT, batch_frames: int = SPECTRUM_BATCH_FRAMES):
+        self.sample_rate = sample_rate
+        self.fps = fps
+        self.n_fft = n_fft
+        self.batch_frames = max(1, batch_frames)
+        self.edges = spectrum_band_edges(sample_rate, scale, n_fft=n_fft)
+        self.window = np.hanning(n_fft + 1)[:-1].astype(np.float32)  # periodic, as librosa.stft
+        self._offsets = np.arange(n_fft)
+
+    def centers(self, start: int, stop: int) -> np.ndarray:
+        """Centre sample of each frame in [start, stop)."""
+        return ((np.arange(start, stop) + 0.5) / self.fps * self.sample_rate).astype(np.int64)
+
+    def magnitudes(self, reader: _SampleReader, num_frames: int) -> Iterator[Tuple[int, np.ndarray]]:
+        """Yield (first_frame, (batch, n_fft // 2 + 1) magnitude columns) in frame order."""
+        half = self.n_fft // 2
+        for start in range(0, num_frames, self.batch_frames):
+            centers = self.centers(start, min(num_frames, start + self.batch_frames))
+            first = centers[0] - half
+            segment = _read_padded(reader, first, int(centers[-1] - centers[0]) + self.n_fft)
+            frames = segment[(centers - centers[0])[:, np.newaxis] + self._offsets] * self.window
+            yield start, np.abs(np.fft.rfft(frames, axis=1))
+            reader.discard_before(max(0, int(centers[-1]) - half))
+
+    def band_rows(self, reader: _SampleReader, num_frames: int) -> Iterator[Tuple[int, np.ndarray]]:
+        """Yield (first_frame, (batch, bands + 1) rows of [band means..., peak]) in frame order."""
+        for start, magnitudes in self.magnitudes(reader, num_frames):
+            yield start, _band_spectrum(magnitudes, self.edges)
+
+
+def _frame_spectra(reader: _SampleReader, sample_rate: int, fps: float, num_frames: int,
+                   scale: str = "log", out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Fill per-frame spectrum rows [bands..., peak] (into ``out`` if given, e.g. a memmap)."""
+    spectra = out if out is not None else np.zeros((num_frames, SPECTRUM_BANDS + 1), dtype=np.float32)
+    for start, rows in StreamingSTFT(sample_rate, fps, scale).band_rows(reader, num_frames):
+        spectra[start:start + len(rows)] = rows
+    return spectra
+
+
+def spectrum_normalizers(peaks: np.ndarray, mode: str = "global", lookahead_frames: int = 0) -> np.ndarray:
+    """
+    Per-frame reference level that spectrum bands are divided by.
+
+    Args:
+        peaks: (N,) per-frame spectrum peak (FrameFeatureTable.spectrum_peak)
+        mode: "global" scales every frame by the whole-file peak (needs the full
+            table, i.e. a second pass); "lookahead" uses the running peak up to
+            lookahead_frames ahead; "running" the causal running peak
+        lookahead_frames: Frames the "lookahead" mode may look ahead
+
+    Returns:
+        (N,) float32 references, never zero
+    """
+    if mode not in SPECTRUM_NORMALIZATIONS:
+        raise ValueError(f"Unknown spectrum normalization: {mode} (expected one of {SPECTRUM_NORMALIZATIONS})")
+    peaks = np.asarray(peaks, dtype=np.float32)
+    if len(peaks) == 0:
+        return peaks.copy()
+
+    if mode == "global":
+        reference = np.full(len(peaks), peaks.max(), dtype=np.float32)
+    else:
+        reference = np.maximum.accumulate(peaks)
+        if mode == "lookahead" and lookahead_frames > 0:
+            reference = reference[np.minimum(np.arange(len(peaks)) + lookahead_frames, len(peaks) - 1)]
+    return np.where(reference > 0, reference, np.float32(1.0))
+
+
+def _expected_samples(audio_path: Path) -> Optional[int]:
+    """Sample count from the file header (None if soundfile cannot tell)."""
+    try:
+        import soundfile as sf
+
+        return int(sf.info(str(audio_path)).frames)
+    except Exception:
+        return None
+
+
+class _UntilDecodeError:
+    """Pass decoded blocks through; a decode error after the first block ends the stream (the rest is silence)."""
+
+    def __init__(self, blocks: Iterator[np.ndarray]):
+        self._blocks = blocks
+        self.stopped_early = False
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        decoded = False
+        try:
+            for block in self._blocks:
+                decoded = True
+                yield block
+        except Exception as e:
+            if not decoded:
+                raise
+            self.stopped_early = True
+            print(f"  [WARN] Audio decode stopped early ({e}) - the rest renders as silence")
+
+
+def _analyze_audio(
+    audio_path: Path, fps: float, num_frames: int, spectrum: bool, spectrum_scale: str = "log",
+    spectra_out: Optional[np.ndarray] = None, track_out: Optional[np.ndarray] = None,
+) -> Tuple[int, int, Dict[int, np.ndarray], np.ndarray, Optional[np.ndarray], bool]:
+    """
+    Walk the decoded audio once, building the envelope pyramid and sample track
+    (and spectra if asked).
+
+    Spectrum rows and track samples are written into ``spectra_out`` and ``track_out``
+    when given (e.g. memory-mapped index files), so long inputs never hold the whole
+    spectrum table or sample track in RAM.
+
+    Returns:
+        (sample_rate, num_samples, envelope levels by hop, sample track, spectra or None,
+        whether the whole file decoded)
+    """
+    sr, blocks = open_audio_blocks(audio_path)
+    blocks = _UntilDecodeError(blocks)
+    builder = _EnvelopeBuilder(ENVELOPE_HOPS[0])
+    track = _SampleTrackBuilder(out=track_out)
+
+    def _tap():
+        for block in blocks:
+            builder.add(block)
+            track.add(block)
+            yield block
+
+    tapped = _tap()
+    spectra = None
+    if spectrum:
+        spectra = _frame_spectra(_SampleReader(tapped), sr, fps, num_frames, spectrum_scale, out=spectra_out)
+    for _ in tapped:
+        pass  # Drain whatever the spectrum pass did not need into the envelope
+
+    return (sr, builder.num_samples, _build_pyramid(builder.finish()), track.finish(), spectra,
+            not blocks.stopped_early)
+
+
+def _load_mapped(path: Path) -> np.ndarray:
+    """np.load with mmap_mode="r" (empty arrays cannot be mapped and are read normally)."""
+    try:
+        return np.load(path, mmap_mode="r")
+    except ValueError:
+        return np.load(path)
+
+
+def _fps_tag(fps: float) -> str:
+    return f"{fps:g}".replace(".", "_")
+
+
+class AudioFeatureIndex:
+    """
+    Content-hashed sidecar index for one audio file.
+
+    Lives in <cache_dir>/viz_index/<md5>_v<VERSION>/ and holds:
+        meta.json                 sample rate, sample count, hop sizes
+        envelope_<hop>.npy        (n, 4) min/max/rms/mean_abs pyramid levels
+        samples_<hop>.npy         every hop-th sample (frame windows are drawn from it)
+        frames_<fps>fps_<P>p.npy  (N, 3 + P) per-frame rows derived from the two
+        spectrum_<fps>fps_<scale>.npy  (N, SPECTRUM_BANDS + 1) per-frame spectrum rows
+
+    Arrays are loaded with np.load(mmap_mode="r"), so nothing is decoded or copied
+    into RAM on a cache hit.
+    """
+
+    VERSION = 2
+    SUBDIR = "viz_index"
+
+    def __init__(self, index_dir: Path):
+        self.index_dir = Path(index_dir)
+
+    @classmethod
+    def for_audio(cls, audio_path: Path, cache_dir: Path) -> "AudioFeatureIndex":
+        key = content_hash(audio_path)
+        return cls(Path(cache_dir) / cls.SUBDIR / f"{key}_v{cls.VERSION}")
+
+    @property
+    def meta_path(self) -> Path:
+        return self.index_dir / "meta.json"
+
+    def exists(self) -> bool:
+        return self.meta_path.exists()
+
+    def load_meta(self) -> dict:
+        with open(self.meta_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _load(self, name: str) -> Optional[np.ndarray]:
+        path = self.index_dir / name
+        if not path.exists():
+            return None
+        return _load_mapped(path)
+
+    def _save(self, name: str, array: np.ndarray) -> np.ndarray:
+        """Write atomically (temp file + rename) and return the memory-mapped result."""
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        path = self.index_dir / name
+        tmp_path = path.with_suffix(f".tmp{os.getpid()}")
+        with open(tmp_path, "wb") as f:
+            np.save(f, np.ascontiguousarray(array, dtype=np.float32))
+        os.replace(tmp_path, path)
+        return _load_mapped(path)
+
+    def envelope(self, hop: int = ENVELOPE_HOPS[0]) -> Optional[np.ndarray]:
+        return self._load(f"envelope_{hop}.npy")
+
+    def samples(self, hop: int = SAMPLE_TRACK_HOP) -> Optional[np.ndarray]:
+        return self._load(f"samples_{hop}.npy")
+
+    def frames(self, fps: float, window_points: int) -> Optional[np.ndarray]:
+        return self._load(f"frames_{_fps_tag(fps)}fps_{window_points}p.npy")
+
+    def spectra(self, fps: float, scale: str = "log") -> Optional[np.ndarray]:
+        return self._load(self._spectra_name(fps, scale))
+
+    def save_envelopes(self, sample_rate: int, num_samples: int, levels: Dict[int, np.ndarray],
+                       track: np.ndarray, track_hop: int = SAMPLE_TRACK_HOP):
+        for hop, level in levels.items():
+            self._save(f"envelope_{hop}.npy", level)
+        self._publish(f"samples_{track_hop}.npy", track)
+        # Meta last - its presence marks the index as complete
+        meta = {
+            "version": self.VERSION,
+            "sample_rate": int(sample_rate),
+            "num_samples": int(num_samples),
+            "hops": list(levels.keys()),
+            "sample_track_hop": int(track_hop),
+        }
+        with open(self.meta_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+
+    def save_frames(self, fps: float, window_points: int, rows: np.ndarray) -> np.ndarray:
+        return self._save(f"frames_{_fps_tag(fps)}fps_{window_points}p.npy", rows)
+
+    def _spectra_name(self, fps: float, scale: str) -> str:
+        return f"spectrum_{_fps_tag(fps)}fps_{scale}.npy"
+
+    def _draft(self, name: str, shape: tuple) -> np.ndarray:
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        draft = self.index_dir / f"{name}.draft{os.getpid()}"
+        return np.lib.format.open_memmap(draft, mode="w+", dtype=np.float32, shape=shape)
+
+    def spectra_draft(self, fps: float, num_frames: int, scale: str = "log") -> np.ndarray:
+        """Writable memory-mapped spectrum table, published by save_spectra()."""
+        return self._draft(self._spectra_name(fps, scale), (num_frames, SPECTRUM_BANDS + 1))
+
+    def samples_draft(self, num_samples: int, hop: int = SAMPLE_TRACK_HOP) -> np.ndarray:
+        """Writable memory-mapped sample track for num_samples samples, published by save_envelopes()."""
+        return self._draft(f"samples_{hop}.npy", (-(-num_samples // hop),))
+
+    def is_draft(self, array: np.ndarray) -> bool:
+        filename = getattr(array, "filename", None)
+        return (bool(filename) and ".draft" in Path(filename).name
+                and Path(filename).resolve().parent == self.index_dir.resolve())
+
+    def discard_draft(self, array: np.ndarray):
+        """Delete an unpublished spectra_draft() file."""
+        if isinstance(array, np.memmap) and self.is_draft(array):
+            try:
+                Path(array.filename).unlink(missing_ok=True)
+            except OSError:
+                pass  # Still mapped (Windows) - a later cache cleanup removes it
+
+    def save_spectra(self, fps: float, spectra: np.ndarray, scale: str = "log") -> np.ndarray:
+        return self._publish(self._spectra_name(fps, scale), spectra)
+
+    def _publish(self, name: str, array: np.ndarray) -> np.ndarray:
+        """Save array as name; a filled draft is flushed and renamed in place, no copy."""
+        if isinstance(array, np.memmap) and self.is_draft(array):
+            array.flush()
+            path = self.index_dir / name
+            try:
+                os.replace(array.filename, path)
+                return _load_mapped(path)
+            except OSError:
+                # Mapped files cannot be renamed on some platforms - copy instead
+                saved = self._save(name, array)
+                self.discard_draft(array)
+                return saved
+        return self._save(name, array)
+
+
+def _fit_rows(rows: np.ndarray, num_frames: int) -> np.ndarray:
+    """Trim or zero-extend per-frame rows to num_frames (extra frames are silence)."""
+    if len(rows) >= num_frames:
+        return rows[:num_frames]
+    return np.concatenate((rows, np.zeros((num_frames - len(rows), rows.shape[1]), dtype=np.float32)))
+
+
+def _open_index(audio_path: Path, cache_dir: Optional[Path]) -> Optional[AudioFeatureIndex]:
+    if cache_dir is None:
+        return None
+    try:
+        return AudioFeatureIndex.for_audio(audio_path, cache_dir)
+    except OSError:
+        return None
+
+
+def _load_from_index(
+    index: AudioFeatureIndex, fps: float, num_frames: int, window_points: int, spectrum: bool,
+    spectrum_scale: str = "log",
+) -> Optional[FrameFeatureTable]:
+    """Serve a feature table from the sidecar index, or None if it needs a decode pass."""
+    try:
+        if not index.exists():
+            return None
+        meta = index.load_meta()
+        sr = meta["sample_rate"]
+
+        spectra = None
+        if spectrum:
+            spectra = index.spectra(fps, spectrum_scale)
+            # Cached spectra are reusable if they cover the request or the whole audio
+            audio_frames = int(np.ceil(meta["num_samples"] / sr * fps)) + 1
+            if spectra is None or len(spectra) < min(num_frames, audio_frames):
+                return None
+            spectra = _fit_rows(spectra, num_frames)
+
+        frames = index.frames(fps, window_points)
+        if frames is None or len(frames) != num_frames:
+            envelope = index.envelope(ENVELOPE_HOPS[0])
+            track = index.samples(SAMPLE_TRACK_HOP)
+            if envelope is None or track is None:
+                return None
+            rows = _frame_rows_from_envelope(envelope, ENVELOPE_HOPS[0], track, sr, fps, num_frames, window_points)
+            frames = index.save_frames(fps, window_points, rows)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"  [WARN] Audio feature index unreadable ({e}) - re-analyzing")
+        return None
+
+    print(f"  [CACHE] Using audio feature index: {index.index_dir.name}")
+    return FrameFeatureTable.from_arrays(sr, fps, frames, spectra)
+
+
+def extract_frame_features(
+    audio_path: Path,
+    fps: float,
+    duration: float,
+    window_points: int = DEFAULT_WINDOW_POINTS,
+    spectrum: bool = False,
+    cache_dir: Optional[Path] = None,
+    spectrum_scale: str = "log",
+) -> FrameFeatureTable:
+    """
+    Build the per-frame feature table, decoding the audio at most once.
+
+    With cache_dir set, a content-hashed sidecar index is consulted first and
+    written after the decode pass, so later renders of the same audio skip
+    decoding entirely. A file that cannot be decoded raises; if decoding fails
+    partway, the audio read so far is kept and the remaining frames are silent
+    (and the index is not written, so the next render decodes again).
+
+    Args:
+        audio_path: Path to audio file
+        fps: Video frame rate
+        duration: Media duration in seconds (sets the number of frames)
+        window_points: Downsampled samples kept per frame
+        spectrum: Also provide per-frame spectrum bands (spectrum style)
+        cache_dir: Directory for the sidecar index (None disables caching)
+        spectrum_scale: Band layout for the spectrum ("log" or "linear")
+
+    Returns:
+        FrameFeatureTable with int(duration * fps) rows
+    """
+    num_frames = max(0, int(duration * fps))
+
+    index = _open_index(audio_path, cache_dir)
+    if index is not None:
+        table = _load_from_index(index, fps, num_frames, window_points, spectrum, spectrum_scale)
+        if table is not None:
+            return table
+
+    spectra_out = track_out = None
+    if index is not None and spectrum and num_frames > 0:
+        try:
+            spectra_out = index.spectra_draft(fps, num_frames, spectrum_scale)
+        except OSError:
+            spectra_out = None
+    expected_samples = _expected_samples(audio_path) if index is not None else None
+    if expected_samples:
+        # The sample track streams into the index file instead of piling up in RAM
+        try:
+            track_out = index.samples_draft(expected_samples)
+        except OSError:
+            track_out = None
+
+    try:
+        sr, num_samples, levels, track, spectra, complete = _analyze_audio(
+            audio_path, fps, num_frames, spectrum, spectrum_scale, spectra_out, track_out
+        )
+    except Exception:
+        for draft in (spectra_out, track_out):
+            if draft is not None:
+                index.discard_draft(draft)
+        raise
+    if track_out is not None and track is not track_out:
+        index.discard_draft(track_out)  # Decoded length differed from the header: track is in RAM
+
+    finest = ENVELOPE_HOPS[0]
+    rows = _frame_rows_from_envelope(levels[finest], finest, track, sr, fps, num_frames, window_points)
+
+    if index is not None and not complete:
+        # A truncated decode is good enough for this render, not for every later one
+        for draft in (spectra, track):
+            index.discard_draft(draft)
+    elif index is not None:
+        try:
+            index.save_envelopes(sr, num_samples, levels, track)
+            rows = index.save_frames(fps, window_points, rows)
+            if spectra is not None:
+                spectra = index.save_spectra(fps, spectra, spectrum_scale)
+        except OSError as e:
+            print(f"  [WARN] Could not write audio feature index ({e})")
+            if index.is_draft(track):
+                index.discard_draft(track)
+
+    return FrameFeatureTable.from_arrays(sr, fps, rows, spectra)
@@ -0,0 +1,65 @@
+"""
+Background Assets - Background images pre-rendered at the output resolution
+
+The compose filter graphs used to fit a looped background still into the frame with
+scale=...:force_original_aspect_ratio=decrease:eval=frame,pad=..., which rescaled the
+same image for every output frame. Each background is instead fitted once per output
+resolution (aspect ratio kept, centered on the usual dark-blue padding) and kept in
+storage.cache_dir/backgrounds, keyed by the image's content hash, so the graphs get a
+frame-sized still and their scale/pad step has nothing left to do.
+"""
+
+import os
+from pathlib import Path
+from typing import Sequence, Tuple
+
+from PIL import Image
+
+from src.utils.file_hash import content_hash
+
+# Subdirectory of storage.cache_dir holding the fitted backgrounds
+SUBDIR = "backgrounds"
+
+# Padding around backgrounds with a different aspect ratio (0x141E30, as in the filter graphs)
+PAD_COLOR = (0x14, 0x1E, 0x30)
+
+
+def fit_size(size: Tuple[int, int], resolution: Sequence[int]) -> Tuple[int, int]:
+    """Largest size with the image's aspect ratio that fits resolution (force_original_aspect_ratio=decrease)."""
+    width, height = int(resolution[0]), int(resolution[1])
+    scale = min(width / size[0], height / size[1])
+    return min(width, max(1, round(size[0] * scale))), min(height, max(1, round(size[1] * scale)))
+
+
+def fitted_background(image_path: Path, resolution: Sequence[int], cache_dir: Path) -> Path:
+    """
+    The background fitted to resolution, rendering and caching it on first use.
+
+    Args:
+        image_path: Background image (any format PIL reads)
+        resolution: Output [width, height]
+        cache_dir: storage.cache_dir (images go in its backgrounds subdirectory)
+
+    Returns:
+        Path to an image of exactly resolution (image_path itself if it already is)
+    """
+    width, height = int(resolution[0]), int(resolution[1])
+    with Image.open(image_path) as source:
+        if source.size == (width, height):
+            return Path(image_path)
+    path = Path(cache_dir) / SUBDIR / f"{content_hash(image_path)}_{width}x{height}.png"
+    if path.exists() and path.stat().st_size > 0:
+        return path
+
+    with Image.open(image_path) as source:
+        image = source.convert("RGB")
+    fitted = fit_size(image.size, (width, height))
+    canvas = Image.new("RGB", (width, height), PAD_COLOR)
+    canvas.paste(image.resize(fitted, Image.LANCZOS), ((width - fitted[0]) // 2, (height - fitted[1]) // 2))
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.stem}.tmp{os.getpid()}.png")
+    canvas.save(tmp_path, format="PNG")
+    os.replace(tmp_path, path)
+    print(f"  [INFO] Cached {width}x{height} background: {path.name}")
+    return path
@@ -0,0 +1,26 @@
+"""
+File Hash - Content hashes for the cache keys of derived media
+
+The audio feature index, the fitted backgrounds and the still loop clips are all
+keyed by the MD5 of their source file, read in 1 MB chunks so large inputs are
+never held in memory.
+"""
+
+import hashlib
+from pathlib import Path
+
+# Bytes read per update
+CHUNK_BYTES = 1024 * 1024
+
+
+def update_with_file(digest, path: Path):
+    """Feed a file's contents into a hashlib digest and return the digest."""
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest
+
+
+def content_hash(path: Path) -> str:
+    """MD5 of the file contents."""
+    return update_with_file(hashlib.md5(), path).hexdigest()
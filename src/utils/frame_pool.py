@@ -0,0 +1,82 @@
+"""
+Frame Pool - Recycled ring of preallocated frame buffers
+
+Renderers acquire() a buffer, draw into it in place, and the encoder writer
+release()s it once its bytes are in the pipe, so a long render reuses a fixed set
+of frame-sized arrays instead of allocating (and garbage collecting) one or more
+per frame. The pool never blocks: when every buffer is in flight, acquire() hands
+out a one-off array and counts it, so a consumer that keeps frames cannot stall
+the renderer.
+"""
+
+import threading
+from typing import Dict, Tuple
+
+import numpy as np
+
+
+class FramePool:
+    """
+    Fixed-capacity pool of identically shaped frame buffers.
+
+    Args:
+        shape: Frame shape, e.g. (height, width, 3)
+        capacity: Buffers kept in the ring (allocated lazily, at most this many)
+        dtype: Frame dtype
+    """
+
+    def __init__(self, shape: Tuple[int, ...], capacity: int, dtype=np.uint8):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.capacity = max(1, int(capacity))
+        self._free = []
+        self._owned = {}  # id -> buffer; holding the buffer keeps its id unique
+        self._in_use = 0
+        self._lock = threading.Lock()
+        self.allocations = 0  # Pooled buffers created
+        self.transient_allocations = 0  # One-off buffers handed out while the pool was empty
+        self.reuses = 0
+        self.peak_in_use = 0
+
+    @property
+    def frame_bytes(self) -> int:
+        return int(np.prod(self.shape)) * self.dtype.itemsize
+
+    def acquire(self) -> np.ndarray:
+        """Return a frame buffer (contents undefined - callers overwrite every pixel)."""
+        with self._lock:
+            if self._free:
+                buffer = self._free.pop()
+                self.reuses += 1
+            elif len(self._owned) < self.capacity:
+                buffer = np.empty(self.shape, dtype=self.dtype)
+                self._owned[id(buffer)] = buffer
+                self.allocations += 1
+            else:
+                self.transient_allocations += 1
+                return np.empty(self.shape, dtype=self.dtype)
+            self._in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self._in_use)
+            return buffer
+
+    def owns(self, frame: np.ndarray) -> bool:
+        """True if ``frame`` is one of this pool's buffers."""
+        return self._owned.get(id(frame)) is frame
+
+    def release(self, frame: np.ndarray) -> None:
+        """Return a buffer after its last use; frames the pool does not own are ignored."""
+        with self._lock:
+            if self._owned.get(id(frame)) is not frame or any(buffer is frame for buffer in self._free):
+                return
+            if self._in_use > 0:
+                self._in_use -= 1
+                self._free.append(frame)
+
+    def stats(self) -> Dict[str, int]:
+        """Allocation counters for metrics."""
+        return {
+            "pool_buffers": self.allocations,
+            "transient_allocations": self.transient_allocations,
+            "reuses": self.reuses,
+            "peak_in_use": self.peak_in_use,
+        }
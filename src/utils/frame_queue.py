@@ -0,0 +1,94 @@
+"""
+Frame Queue - Blocking, byte-bounded hand-off between a frame producer and an encoder writer
+
+Producers block in put() while the queued frames would exceed the byte budget and
+consumers block in get() until a frame arrives; both wake on a condition variable
+instead of polling. abort() releases every waiter at once so a failed pipeline
+stops promptly.
+"""
+
+import threading
+from collections import deque
+from typing import Optional
+
+import numpy as np
+
+
+class FrameQueueAborted(Exception):
+    """Raised by put()/get() once the queue has been aborted."""
+
+
+class FrameQueue:
+    """
+    FIFO of frames bounded by total size in bytes.
+
+    A single frame larger than the whole budget is still accepted when the queue
+    is empty, so oversized frames slow the pipeline down but never deadlock it.
+
+    Args:
+        max_bytes: Upper bound on the bytes held by queued frames
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max(1, int(max_bytes))
+        self.peak_bytes = 0
+        self._frames = deque()
+        self._bytes = 0
+        self._closed = False
+        self._error: Optional[BaseException] = None
+        self._cond = threading.Condition()
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes currently queued."""
+        return self._bytes
+
+    @property
+    def closed(self) -> bool:
+        """True once the producer has called close()."""
+        return self._closed
+
+    def put(self, frame: np.ndarray) -> None:
+        """Append a frame, blocking while it would overflow the byte budget."""
+        size = frame.nbytes
+        with self._cond:
+            self._cond.wait_for(
+                lambda: self._error is not None or not self._frames or self._bytes + size <= self.max_bytes
+            )
+            if self._error is not None:
+                raise FrameQueueAborted(str(self._error))
+            self._frames.append(frame)
+            self._bytes += size
+            self.peak_bytes = max(self.peak_bytes, self._bytes)
+            self._cond.notify_all()
+
+    def get(self) -> Optional[np.ndarray]:
+        """Pop the oldest frame, blocking until one is available; None once closed and drained."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._error is not None or self._frames or self._closed)
+            if self._error is not None:
+                raise FrameQueueAborted(str(self._error))
+            if not self._frames:
+                return None
+            frame = self._frames.popleft()
+            self._bytes -= frame.nbytes
+            self._cond.notify_all()
+            return frame
+
+    def close(self) -> None:
+        """Mark the end of the stream; get() returns None after the remaining frames."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def abort(self, error: BaseException) -> None:
+        """Fail the queue: drop queued frames and make every blocked put()/get() raise."""
+        with self._cond:
+            if self._error is None:
+                self._error = error
+            self._frames.clear()
+            self._bytes = 0
+            self._cond.notify_all()
@@ -0,0 +1,93 @@
+"""
+Glow - Gaussian glow for visualization frames, limited to the drawn region
+
+Works on NumPy frames through OpenCV (PIL fallback): only the bounding box of what
+was drawn, padded by the kernel reach, is blurred, since everything outside it is
+flat background. Large radii are blurred at reduced resolution and scaled back up,
+which keeps the cost roughly constant as the radius grows. blur == 0 is a no-op.
+"""
+
+import math
+from typing import Optional, Tuple
+
+import numpy as np
+from PIL import Image, ImageFilter
+
+try:
+    import cv2
+    OPENCV_AVAILABLE = True
+except ImportError:
+    OPENCV_AVAILABLE = False
+
+# Sigmas above this are blurred on a downsampled copy (one factor per multiple of it)
+GLOW_DOWNSAMPLE_SIGMA = 6.0
+
+
+def glow_reach(sigma: float) -> int:
+    """Pixels a glow of this sigma spreads beyond what was drawn (0 for no glow)."""
+    return int(math.ceil(4 * sigma)) + 1 if sigma > 0 else 0
+
+
+def glow_box(box: Tuple[int, int, int, int], sigma: float, width: int, height: int,
+             sigma_y: Optional[float] = None) -> Tuple[int, int, int, int]:
+    """Pad a drawn (x0, y0, x1, y1) box by the glow reach and clip it to the frame."""
+    reach_x = glow_reach(sigma)
+    reach_y = glow_reach(sigma if sigma_y is None else sigma_y)
+    x0, y0, x1, y1 = box
+    return max(0, x0 - reach_x), max(0, y0 - reach_y), min(width, x1 + reach_x), min(height, y1 + reach_y)
+
+
+def _downsample_factor(sigma: float, size: int) -> int:
+    """Resolution divisor for blurring one axis (1 = full resolution)."""
+    factor = int(sigma // GLOW_DOWNSAMPLE_SIGMA) + 1
+    return factor if size >= 4 * factor else 1
+
+
+def apply_glow(frame: np.ndarray, sigma: float, box: Optional[Tuple[int, int, int, int]] = None,
+               out: Optional[np.ndarray] = None, sigma_y: Optional[float] = None) -> np.ndarray:
+    """
+    Gaussian-blur frame inside box (plus the glow reach), leaving the rest untouched.
+
+    Args:
+        frame: (H, W, C) uint8 frame
+        sigma: Blur standard deviation in pixels; 0 skips the blur
+        box: Drawn region (x0, y0, x1, y1), exclusive end; None = whole frame
+        out: Destination with frame's shape (may be frame itself); None = new array
+        sigma_y: Vertical standard deviation if different (0 = horizontal blur only)
+
+    Returns:
+        The glowing frame (``out`` when given)
+    """
+    height, width = frame.shape[:2]
+    if out is None:
+        out = frame.copy()
+    elif out is not frame:
+        np.copyto(out, frame)
+    if sigma <= 0:
+        return out
+    if sigma_y is None:
+        sigma_y = sigma
+
+    x0, y0, x1, y1 = glow_box(box if box is not None else (0, 0, width, height), sigma, width, height, sigma_y)
+    if x1 <= x0 or y1 <= y0:
+        return out
+    src, dst = frame[y0:y1, x0:x1], out[y0:y1, x0:x1]
+
+    if not OPENCV_AVAILABLE:
+        # PIL blurs both axes alike
+        dst[...] = np.asarray(Image.fromarray(np.ascontiguousarray(src)).filter(ImageFilter.GaussianBlur(sigma)))
+        return out
+
+    # sigmaY=0 means "same as sigmaX" to OpenCV, so a horizontal-only blur needs a 1-row kernel
+    fx = _downsample_factor(sigma, x1 - x0)
+    fy = _downsample_factor(sigma_y, y1 - y0) if sigma_y > 0 else 1
+    ksize = (0, 0) if sigma_y > 0 else (0, 1)
+    if fx == 1 and fy == 1:
+        cv2.GaussianBlur(src, ksize, sigmaX=sigma, sigmaY=sigma_y, dst=dst, borderType=cv2.BORDER_REPLICATE)
+        return out
+
+    # Blur at reduced resolution: area-average down, blur with the scaled sigmas, interpolate back
+    small = cv2.resize(src, ((x1 - x0) // fx, (y1 - y0) // fy), interpolation=cv2.INTER_AREA)
+    small = cv2.GaussianBlur(small, ksize, sigmaX=sigma / fx, sigmaY=sigma_y / fy, borderType=cv2.BORDER_REPLICATE)
+    cv2.resize(small, (x1 - x0, y1 - y0), dst=dst, interpolation=cv2.INTER_LINEAR)
+    return out
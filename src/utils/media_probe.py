@@ -0,0 +1,200 @@
+"""
+Media Probe - One JSON ffprobe per media file, cached by file fingerprint
+
+Durations, dimensions, sample rates and codecs all come from a single
+``ffprobe -show_format -show_streams -of json`` run per file. Results are kept
+in-process and, when a cache directory is given, on disk in
+storage.cache_dir/media_probe, keyed by the file's (path, size, mtime), so a file is
+probed again only after it changes. ffprobe only reads the container headers here,
+which also makes it the cheap check that an encoded output is complete.
+"""
+
+import hashlib
+import json
+import os
+import subprocess
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+# Subdirectory of storage.cache_dir holding the probe results
+SUBDIR = "media_probe"
+
+# Bump when the stored result layout changes
+VERSION = 1
+
+
+class ProbeError(RuntimeError):
+    """ffprobe could not read the file (returncode and stderr say why)."""
+
+    def __init__(self, path: Path, returncode: int, stderr: str):
+        self.returncode = returncode
+        self.stderr = stderr or ""
+        super().__init__(f"FFprobe returned {returncode} for {path}: {self.stderr[:200]}")
+
+
+class MediaProbe:
+    """ffprobe results per file, shared by every MediaProbe in the process."""
+
+    _memory: Dict[Tuple[str, int, int], Dict[str, Any]] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, cache_dir: Optional[Path] = None, timeout: float = 10):
+        """
+        Args:
+            cache_dir: storage.cache_dir for the on-disk cache (None = in-process only)
+            timeout: Seconds before an ffprobe run is abandoned
+        """
+        self.cache_dir = Path(cache_dir) / SUBDIR if cache_dir else None
+        self.timeout = timeout
+
+    @staticmethod
+    def fingerprint(path: Path) -> Tuple[str, int, int]:
+        """(absolute path, size, mtime in ns) - raises OSError if the file is missing."""
+        path = Path(path)
+        stat = path.stat()
+        return str(path.resolve()), stat.st_size, stat.st_mtime_ns
+
+    def _disk_path(self, key: Tuple[str, int, int]) -> Optional[Path]:
+        if self.cache_dir is None:
+            return None
+        digest = hashlib.md5(json.dumps([VERSION, *key]).encode("utf-8")).hexdigest()
+        return self.cache_dir / f"{digest}.json"
+
+    def _load(self, disk_path: Optional[Path]) -> Optional[Dict[str, Any]]:
+        if disk_path is None or not disk_path.exists():
+            return None
+        try:
+            with open(disk_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None  # Half-written or damaged entry: probe again
+
+    def _store(self, disk_path: Optional[Path], info: Dict[str, Any]) -> None:
+        """Write atomically (temp file + rename); the cache is best-effort."""
+        if disk_path is None:
+            return
+        try:
+            disk_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = disk_path.with_suffix(f".tmp{os.getpid()}")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(info, f)
+            os.replace(tmp_path, disk_path)
+        except OSError:
+            pass
+
+    def _run(self, path: Path) -> Dict[str, Any]:
+        cmd = ["ffprobe", "-v", "error", "-show_format", "-show_streams", "-of", "json", str(path)]
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                                errors="replace", timeout=self.timeout)
+        if result.returncode != 0:
+            raise ProbeError(path, result.returncode, result.stderr)
+        try:
+            parsed = json.loads(result.stdout or "{}")
+        except ValueError:
+            parsed = None
+        if not isinstance(parsed, dict):
+            raise ProbeError(path, result.returncode, f"unreadable ffprobe output: {str(result.stdout)[:200]}")
+        return {
+            "format": parsed.get("format", {}),
+            "streams": parsed.get("streams", []),
+            "warnings": str(result.stderr or "")[:1000],  # Errors ffprobe reported but read past
+        }
+
+    def probe(self, path: Path) -> Dict[str, Any]:
+        """
+        The file's ffprobe result: {"format": {...}, "streams": [...], "warnings": str}.
+
+        Raises:
+            OSError: The file does not exist (FileNotFoundError also if ffprobe is missing)
+            ProbeError: ffprobe failed (not cached, so the next call tries again)
+            subprocess.TimeoutExpired: ffprobe took longer than the timeout
+        """
+        key = self.fingerprint(path)
+        with self._lock:
+            info = self._memory.get(key)
+        if info is not None:
+            return info
+
+        disk_path = self._disk_path(key)
+        info = self._load(disk_path)
+        if info is None:
+            info = self._run(Path(path))
+            self._store(disk_path, info)
+        with self._lock:
+            self._memory[key] = info
+        return info
+
+    def _safe_probe(self, path: Path) -> Optional[Dict[str, Any]]:
+        try:
+            return self.probe(path)
+        except (OSError, ProbeError, subprocess.TimeoutExpired):
+            return None
+
+    @staticmethod
+    def _stream(info: Dict[str, Any], codec_type: str) -> Optional[Dict[str, Any]]:
+        for stream in info.get("streams", []):
+            if stream.get("codec_type") == codec_type:
+                return stream
+        return None
+
+    def duration(self, path: Path) -> Optional[float]:
+        """Container duration in seconds (longest stream if the container has none), None if unknown."""
+        info = self._safe_probe(path)
+        if info is None:
+            return None
+        values = [info.get("format", {}).get("duration")]
+        if values[0] in (None, "N/A"):
+            values = [stream.get("duration") for stream in info.get("streams", [])]
+        durations = []
+        for value in values:
+            try:
+                durations.append(float(value))
+            except (TypeError, ValueError):
+                pass
+        return max(durations) if durations else None
+
+    def dimensions(self, path: Path) -> Optional[Tuple[int, int]]:
+        """(width, height) of the first video stream, None if there is none."""
+        info = self._safe_probe(path)
+        stream = self._stream(info, "video") if info else None
+        if not stream or not stream.get("width") or not stream.get("height"):
+            return None
+        return int(stream["width"]), int(stream["height"])
+
+    def sample_rate(self, path: Path) -> Optional[int]:
+        """Sample rate of the first audio stream, None if there is none."""
+        info = self._safe_probe(path)
+        stream = self._stream(info, "audio") if info else None
+        try:
+            return int(stream["sample_rate"]) if stream else None
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def codec(self, path: Path, codec_type: str = "video") -> Optional[str]:
+        """Codec name of the first stream of codec_type ("video" or "audio"), None if there is none."""
+        info = self._safe_probe(path)
+        stream = self._stream(info, codec_type) if info else None
+        return stream.get("codec_name") if stream else None
+
+    def verify_output(self, path: Path) -> Optional[str]:
+        """
+        Cheap completeness check of an encoded file from its container headers.
+
+        A truncated MP4 has no readable moov atom, so ffprobe fails or reports no
+        video stream or duration; no packets are read.
+
+        Returns:
+            None if the file looks complete, otherwise what is wrong
+        """
+        try:
+            info = self.probe(path)
+        except ProbeError as e:
+            return e.stderr[:200] or f"FFprobe returned {e.returncode}"
+        except (OSError, subprocess.TimeoutExpired) as e:
+            return str(e)
+        if self._stream(info, "video") is None:
+            return "no video stream"
+        if not self.duration(path):
+            return "no duration in container"
+        return None
@@ -3,6 +3,7 @@ Metrics Tracking Module
 Tracks generation times, GPU utilization, CPU usage, RAM usage, and performance metrics
 """
 
+import sys
 import time
 from dataclasses import dataclass, field
 from datetime import datetime
@@ -27,6 +28,23 @@ def _get_cpu_ram_usage() -> Dict[str, float]:
         return {"cpu_percent": 0.0, "ram_used_gb": 0.0, "ram_total_gb": 0.0, "ram_percent": 0.0}
 
 
+def get_peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process so far in MB (None if unavailable)."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS, kilobytes elsewhere
+        return peak / (1024**2) if sys.platform == "darwin" else peak / 1024
+    except Exception:
+        pass
+    try:
+        import psutil
+        memory = psutil.Process().memory_info()
+        return getattr(memory, "peak_wset", memory.rss) / (1024**2)  # peak_wset: Windows only
+    except Exception:
+        return None
+
+
 @dataclass
 class ComponentMetrics:
     """Metrics for a single component (TTS, avatar, etc.)"""
@@ -49,6 +67,9 @@ class ComponentMetrics:
     output_file_size_mb: Optional[float] = None
     file_growth_rate_mb_per_sec: Optional[float] = None  # Average growth rate during creation
     file_creation_time_sec: Optional[float] = None  # Time from start to first file creation
+    peak_rss_mb: Optional[float] = None  # Process peak RSS when the component finished
+    # Component-reported counters (e.g. frame buffer reuse), see record_component_stats
+    stats: Dict[str, Any] = field(default_factory=dict)
     error: Optional[str] = None
     
     def finish(self, gpu_manager=None):
@@ -107,6 +128,8 @@ class ComponentMetrics:
             cpu_before = self.cpu_usage_before.get("cpu_percent", 0.0)
             cpu_after = self.cpu_usage_after.get("cpu_percent", 0.0)
             self.cpu_usage_avg = (cpu_before + cpu_after) / 2.0
+        
+        self.peak_rss_mb = get_peak_rss_mb()
 
 
 @dataclass
@@ -165,6 +188,8 @@ class GenerationMetrics:
                     "output_file_size_mb": c.output_file_size_mb,
                     "file_growth_rate_mb_per_sec": c.file_growth_rate_mb_per_sec,
                     "file_creation_time_sec": c.file_creation_time_sec,
+                    "peak_rss_mb": c.peak_rss_mb,
+                    "stats": c.stats,
                     "error": c.error,
                 }
                 for c in self.components
@@ -371,6 +396,8 @@ class MetricsTracker:
                 ram_percent = comp.ram_usage_after.get("ram_percent", 0)
                 if ram_total > 0:
                     print(f"      RAM Usage: {ram_used:.1f}/{ram_total:.1f} GB ({ram_percent:.1f}%)")
+            if comp.peak_rss_mb is not None:
+                print(f"      Peak RSS: {comp.peak_rss_mb:.0f} MB")
             
             # File creation metrics
             if comp.output_file_size_mb is not None:
@@ -379,6 +406,11 @@ class MetricsTracker:
                     print(f"      Encoding Rate: {comp.file_growth_rate_mb_per_sec:.2f} MB/s")
                 if comp.file_creation_time_sec is not None:
                     print(f"      File Creation Time: {comp.file_creation_time_sec:.2f}s")
+            
+            # Component-reported stats
+            for name, values in comp.stats.items():
+                summary = ", ".join(f"{key}={value}" for key, value in values.items())
+                print(f"      {name}: {summary}")
         
         print("=" * 60 + "\n")
 
@@ -403,3 +435,22 @@ def get_metrics_tracker(config: Optional[Dict[str, Any]] = None) -> Optional[Met
     
     return _metrics_tracker
 
+
+def record_component_stats(name: str, stats: Dict[str, Any]) -> None:
+    """
+    Attach stats to the component currently being tracked (the latest unfinished one).
+    
+    Does nothing when no tracker or component is active, so callers can report
+    unconditionally.
+    
+    Args:
+        name: Stats group name (e.g., "frame_buffers")
+        stats: JSON-serializable values
+    """
+    tracker = _metrics_tracker
+    if tracker is None or tracker.current_session is None:
+        return
+    for comp in reversed(tracker.current_session.components):
+        if comp.end_time is None:
+            comp.stats[name] = dict(stats)
+            return
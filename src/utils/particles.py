@@ -0,0 +1,145 @@
+"""
+Particles - Struct-of-arrays particle field for the particles visualization style
+
+Particle state lives in flat NumPy arrays (x, y, vx, vy, size) plus a per-particle
+color lookup table, so a frame is a handful of vectorized operations no matter how
+many particles there are. Positions are a pure function of the distance travelled
+so far, which makes any frame reproducible (and seekable) from the seed and the
+cumulative audio-driven speed.
+"""
+
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import cv2
+    OPENCV_AVAILABLE = True
+except ImportError:
+    OPENCV_AVAILABLE = False
+
+DEFAULT_PARTICLE_COUNT = 200
+# Base speed (pixels per frame at travel rate 1) and radius ranges
+MAX_SPEED = 2.5
+MIN_SIZE = 2.0
+SIZE_RANGE = 5.0
+
+
+class ParticleField:
+    """
+    N particles drifting across a width x height canvas with wrap-around edges.
+
+    Args:
+        width: Canvas width in pixels
+        height: Canvas height in pixels
+        count: Number of particles
+        colors: (start_rgb, end_rgb); particle i gets the color i / count of the way along
+        seed: RNG seed; the same seed always produces the same field (None = random)
+    """
+
+    def __init__(self, width: int, height: int, count: int = DEFAULT_PARTICLE_COUNT,
+                 colors: Tuple[Sequence[int], Sequence[int]] = ((0, 150, 255), (255, 100, 200)),
+                 seed: Optional[int] = None):
+        self.width = width
+        self.height = height
+        self.count = max(0, int(count))
+        rng = np.random.default_rng(seed)
+        self.x = rng.random(self.count) * width
+        self.y = rng.random(self.count) * height
+        self.vx = (rng.random(self.count) - 0.5) * (2 * MAX_SPEED)
+        self.vy = (rng.random(self.count) - 0.5) * (2 * MAX_SPEED)
+        self.size = (rng.random(self.count) * SIZE_RANGE + MIN_SIZE).astype(np.float32)
+
+        # Same truncating interpolation as AudioVisualizer._interpolate_color
+        start = np.asarray(colors[0], dtype=np.float64)
+        end = np.asarray(colors[1], dtype=np.float64)
+        t = (np.arange(self.count) / max(1, self.count))[:, np.newaxis]
+        self.color_lut = (start + (end - start) * t).astype(np.int64).clip(0, 255).astype(np.uint8)
+
+        self._discs: Dict[Tuple[int, int], np.ndarray] = {}
+        # Owner-id canvas reused by every render(), padded by the largest radius seen so far
+        self._owner: Optional[np.ndarray] = None
+        self._owner_pad = 0
+        # (x0, y0, x1, y1) covering every particle drawn by the last render(), None if none were
+        self.drawn_box: Optional[Tuple[int, int, int, int]] = None
+
+    def positions(self, travel: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Integer pixel positions after moving ``travel`` units along each velocity."""
+        x = np.mod(self.x + self.vx * travel, self.width)
+        y = np.mod(self.y + self.vy * travel, self.height)
+        # mod can round up to exactly width/height for tiny negative inputs
+        return (np.minimum(x.astype(np.int64), self.width - 1),
+                np.minimum(y.astype(np.int64), self.height - 1))
+
+    def _disc(self, radius: int, stride: int) -> np.ndarray:
+        """Flat offsets of a filled disc in a canvas with the given row stride (cached)."""
+        key = (radius, stride)
+        if key not in self._discs:
+            span = np.arange(-radius, radius + 1)
+            dy, dx = np.meshgrid(span, span, indexing="ij")
+            inside = dx * dx + dy * dy <= (radius + 0.5) ** 2
+            self._discs[key] = dy[inside] * stride + dx[inside]
+        return self._discs[key]
+
+    def _owner_canvas(self, pad: int) -> np.ndarray:
+        """Cleared owner-id canvas padded by at least ``pad`` pixels (reused across renders)."""
+        if self._owner is None or pad > self._owner_pad:
+            self._owner = np.zeros((self.height + 2 * pad, self.width + 2 * pad), dtype=np.int32)
+            self._owner_pad = pad
+        else:
+            self._owner.fill(0)
+        return self._owner
+
+    def render(self, travel: float, size_scale: float = 1.0,
+               background: Sequence[int] = (0, 0, 0), out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Rasterize the field into a (height, width, 3) uint8 frame.
+
+        Particles are grouped by integer radius and each group is stamped with one
+        scatter of a prebuilt disc into an owner-id canvas, padded by the largest
+        radius so nothing needs clipping (the canvas is kept and cleared between
+        renders, and only grows when a larger radius comes along). Smaller discs are stamped first so larger
+        ones sit on top. Owner ids are then mapped to RGB through the color LUT.
+
+        Args:
+            travel: Cumulative travel (sum of per-frame speed factors up to this frame)
+            size_scale: Radius multiplier for this frame (audio-driven)
+            background: RGB fill where no particle is drawn
+            out: Contiguous (height, width, 3) uint8 buffer to draw into (None = new array)
+
+        Returns:
+            RGB frame (``out`` when given)
+        """
+        palette = np.zeros((self.count + 1, 4), dtype=np.uint8)
+        palette[0, :3] = np.asarray(background[:3], dtype=np.uint8)
+        palette[1:, :3] = self.color_lut
+        if out is None:
+            out = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        if self.count == 0:
+            out[:] = palette[0, :3]
+            self.drawn_box = None
+            return out
+
+        cx, cy = self.positions(travel)
+        radii = (self.size * size_scale).astype(np.int64)
+        self.drawn_box = (max(0, int((cx - radii).min())), max(0, int((cy - radii).min())),
+                          min(self.width, int((cx + radii).max()) + 1), min(self.height, int((cy + radii).max()) + 1))
+        owner = self._owner_canvas(int(radii.max()))
+        pad = self._owner_pad
+        stride = self.width + 2 * pad
+        flat = owner.reshape(-1)
+        centers = (cy + pad) * stride + (cx + pad)
+        ids = np.arange(1, self.count + 1, dtype=np.int32)
+
+        for radius in np.unique(radii):
+            members = np.flatnonzero(radii == radius)
+            offsets = self._disc(int(radius), stride)
+            flat[(centers[members, np.newaxis] + offsets).reshape(-1)] = np.repeat(ids[members], len(offsets))
+
+        visible = owner[pad:pad + self.height, pad:pad + self.width]
+        if not OPENCV_AVAILABLE:
+            return np.take(palette[:, :3], visible, axis=0, out=out)
+        # One 4-byte gather plus a native RGBA->RGB pack beats a 3-byte gather
+        rgba = np.take(palette.view(np.uint32).reshape(-1), visible).view(np.uint8)
+        cv2.cvtColor(rgba.reshape(self.height, self.width, 4), cv2.COLOR_RGBA2RGB, dst=out)
+        return out
@@ -0,0 +1,182 @@
+"""
+Segmented Encode - Parallel GOP-aligned FFmpeg encodes joined by stream copy
+
+One long libx264 process stops scaling after a handful of threads. Every encode here
+forces a fixed keyframe interval (-g 30 -keyint_min 30 -sc_threshold 0), so the timeline
+can be cut on those keyframes: the segments are encoded video-only in parallel FFmpeg
+processes and joined with the concat demuxer (-c copy). The joined stream has the same
+keyframe layout as a single encode, and the audio is encoded once, in the final mux.
+"""
+
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+# Keyframe interval (frames) of every encode in this project
+GOP_FRAMES = 30
+
+# Shorter segments cost more in process start-up and muxing than they save
+MIN_SEGMENT_SECONDS = 10.0
+
+
+def segment_bounds(first: int, last: int, segments: int, min_frames: int = 0,
+                   gop: int = GOP_FRAMES) -> List[Tuple[int, int]]:
+    """
+    Split frames [first, last) into contiguous ranges that start on keyframes.
+
+    Args:
+        first: First frame (keyframe boundaries are counted from here)
+        last: End frame (exclusive)
+        segments: Maximum number of ranges
+        min_frames: Minimum frames per range (fewer ranges are used for short inputs)
+        gop: Keyframe interval in frames
+
+    Returns:
+        [(start, stop)] covering [first, last) in order
+    """
+    total = last - first
+    if total <= 0:
+        return []
+    count = max(1, min(int(segments), total // max(1, min_frames, gop)))
+    gops = -(-total // gop)
+    count = min(count, gops)
+    bounds = []
+    for k in range(count):
+        start = first + (gops * k // count) * gop
+        stop = min(last, first + (gops * (k + 1) // count) * gop)
+        bounds.append((start, stop))
+    return bounds
+
+
+def segment_command(cmd: Sequence[str], output_path: Path, segment_path: Path,
+                    start: float, duration: float) -> List[str]:
+    """
+    Rewrite a one-output FFmpeg command to encode [start, start + duration) without audio.
+
+    Every input is seeked and limited to the segment, audio is dropped and the output
+    goes to segment_path; codec and filter options are kept as they are.
+    """
+    target = str(output_path)
+    if target not in cmd:
+        raise ValueError(f"Output {target} not found in FFmpeg command")
+    limits = ["-ss", f"{start:.6f}", "-t", f"{duration:.6f}"]
+    rewritten = []
+    for arg in cmd:
+        if arg == "-i":
+            rewritten.extend(limits)
+        if arg == target:
+            rewritten.extend(["-an", "-t", f"{duration:.6f}", str(segment_path)])
+            continue
+        rewritten.append(arg)
+    return rewritten
+
+
+def audio_output_args(cmd: Sequence[str] = ()) -> List[str]:
+    """AAC options for the final mux, keeping the bitrate, sample rate and channels cmd uses."""
+    args = ["-c:a", "aac"]
+    for option, default in (("-b:a", "192k"), ("-ar", "44100"), ("-ac", "2")):
+        index = list(cmd).index(option) if option in cmd else -1
+        value = cmd[index + 1] if 0 <= index < len(cmd) - 1 else default
+        args.extend([option, value])
+    return args
+
+
+def run_parallel(commands: Sequence[Sequence[str]], timeout: Optional[float] = None) -> None:
+    """Run FFmpeg commands concurrently; raise RuntimeError naming the first one that failed."""
+    def run(cmd):
+        return subprocess.run(list(cmd), capture_output=True, text=True, errors="replace", timeout=timeout)
+
+    with ThreadPoolExecutor(max_workers=max(1, len(commands))) as pool:
+        results = list(pool.map(run, commands))
+    for index, result in enumerate(results):
+        if result.returncode != 0:
+            error_msg = result.stderr or result.stdout or "Unknown error"
+            raise RuntimeError(f"FFmpeg segment {index + 1}/{len(results)} failed "
+                               f"(exit code {result.returncode}): {error_msg[-500:]}")
+
+
+def concat_segments(segment_paths: Sequence[Path], output_path: Path, audio_path: Optional[Path] = None,
+                    audio_offset: float = 0.0, audio_args: Optional[List[str]] = None,
+                    output_args: Optional[List[str]] = None, timeout: Optional[float] = None,
+                    list_path: Optional[Path] = None, duration: Optional[float] = None) -> Path:
+    """
+    Join segment files with the concat demuxer (video stream copy), muxing audio once.
+
+    Args:
+        segment_paths: Segments in playback order (same codec settings)
+        output_path: Joined file
+        audio_path: Audio to mux (None = video only)
+        audio_offset: Where in audio_path the first segment starts (seconds)
+        audio_args: Audio encoder options (default: AAC, see audio_output_args)
+        output_args: Container options (default: MP4 with faststart)
+        timeout: Seconds before the join is abandoned
+        list_path: Where to write the concat list (default: next to the first segment)
+        duration: Cut the output at this many seconds (-t); -shortest alone can leave
+            stream-copied video running past the end of the audio
+
+    Returns:
+        output_path
+    """
+    list_path = Path(list_path or Path(segment_paths[0]).parent / "segments.txt")
+    # The concat list quotes paths with ', so embedded quotes are closed, escaped and reopened
+    list_path.write_text("".join(
+        "file '{}'\n".format(str(Path(path).resolve()).replace("'", "'\\''")) for path in segment_paths
+    ))
+
+    cmd = ["ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", str(list_path)]
+    if audio_path is not None:
+        if audio_offset > 0:
+            cmd.extend(["-ss", f"{audio_offset:.6f}"])
+        cmd.extend(["-i", str(audio_path), "-map", "0:v:0", "-map", "1:a:0", "-c:v", "copy"])
+        cmd.extend(audio_args or audio_output_args())
+        cmd.append("-shortest")
+    else:
+        cmd.extend(["-c", "copy"])
+    if duration is not None:
+        cmd.extend(["-t", f"{duration:.6f}"])
+    cmd.extend(output_args or ["-f", "mp4", "-movflags", "+faststart"])
+    cmd.append(str(output_path))
+
+    result = subprocess.run(cmd, capture_output=True, text=True, errors="replace", timeout=timeout)
+    if result.returncode != 0:
+        error_msg = result.stderr or result.stdout or "Unknown error"
+        raise RuntimeError(f"FFmpeg segment concat failed (exit code {result.returncode}): {error_msg[-500:]}")
+    return output_path
+
+
+def encode_segmented(cmd: Sequence[str], output_path: Path, audio_path: Path, duration: float,
+                     segments: int, fps: float = 30, timeout: Optional[float] = None) -> bool:
+    """
+    Run a one-output FFmpeg encode as parallel keyframe-aligned segments.
+
+    Args:
+        cmd: The single-process command (its output file must be output_path)
+        output_path: Final file
+        audio_path: Audio muxed into the final file
+        duration: Output duration in seconds
+        segments: Maximum parallel segments
+        fps: Output frame rate (keyframes every GOP_FRAMES frames)
+        timeout: Seconds allowed for each FFmpeg step
+
+    Returns:
+        False when the encode is too short to split (nothing was run), True once done
+    """
+    bounds = segment_bounds(0, int(round(duration * fps)), segments, min_frames=int(MIN_SEGMENT_SECONDS * fps))
+    if len(bounds) < 2:
+        return False
+
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(prefix="segments_", dir=output_path.parent) as segment_dir:
+        segment_paths = [Path(segment_dir) / f"segment_{index:03d}.mp4" for index in range(len(bounds))]
+        commands = [
+            segment_command(cmd, output_path, segment_path, start / fps, (stop - start) / fps)
+            for segment_path, (start, stop) in zip(segment_paths, bounds, strict=True)
+        ]
+        print(f"  [INFO] Encoding {len(bounds)} segments of ~{(bounds[0][1] - bounds[0][0]) / fps:.0f}s in parallel...")
+        run_parallel(commands, timeout)
+        concat_segments(segment_paths, output_path, audio_path, audio_args=audio_output_args(cmd), timeout=timeout)
+    print(f"  [OK] Joined {len(bounds)} segments with stream copy: {output_path}")
+    return True
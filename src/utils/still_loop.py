@@ -0,0 +1,146 @@
+"""
+Still Loop - Cached loop clips for still-image videos joined by stream copy
+
+A static background (or the black frame of an audio-only episode) encodes to the same
+frames for the whole episode. The first run encodes a short clip of the still with the
+episode's video options and keeps it in storage.cache_dir/still_loops, keyed by the
+source's content hash, the frame rate and those options. Every run then repeats the clip
+through the concat demuxer (-c:v copy), cut at the audio's duration, and encodes only the
+audio. The clip is closed-GOP, a whole number of GOPs long and starts on a keyframe, so the
+joined video keeps the fixed keyframe interval and stays seekable.
+"""
+
+import hashlib
+import json
+import math
+import os
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+from src.utils.file_hash import update_with_file
+from src.utils.segmented_encode import GOP_FRAMES, audio_output_args, concat_segments
+
+# Subdirectory of storage.cache_dir holding the loop clips
+SUBDIR = "still_loops"
+
+# Loop clip length (10 keyframe intervals at 30 fps)
+LOOP_SECONDS = 10.0
+
+# Output options that belong to the audio stream (each takes a value)
+AUDIO_OPTIONS = ("-c:a", "-b:a", "-ar", "-ac")
+
+# Largest accepted gap in seconds between a looped video's duration and its audio's
+DURATION_TOLERANCE = 0.1
+
+
+def video_output_args(cmd: Sequence[str], output_path: Path) -> List[str]:
+    """
+    Video output options of a one-output FFmpeg command (between its last input and output_path).
+
+    Audio options and -shortest are dropped; codec, rate control, GOP, filter and
+    container options are kept as they are.
+    """
+    target = str(output_path)
+    if target not in cmd or "-i" not in cmd:
+        raise ValueError(f"Output {target} not found in FFmpeg command")
+    args = list(cmd[:list(cmd).index(target)])
+    options = args[len(args) - args[::-1].index("-i") + 1:]
+    kept = []
+    skip = False
+    for arg in options:
+        if skip:
+            skip = False
+        elif arg in AUDIO_OPTIONS:
+            skip = True
+        elif arg != "-shortest":
+            kept.append(arg)
+    return kept
+
+
+def loop_frames(fps: float, seconds: float = LOOP_SECONDS) -> int:
+    """Loop clip length in frames: seconds rounded to whole keyframe intervals."""
+    return max(1, int(round(seconds * fps / GOP_FRAMES))) * GOP_FRAMES
+
+
+def loop_key(source: str, video_args: Sequence[str], fps: float, frames: int) -> str:
+    """MD5 of the still (file contents, or the source string for lavfi sources), timing and options."""
+    digest = hashlib.md5()
+    path = Path(source)
+    if path.is_file():
+        update_with_file(digest, path)
+    else:
+        digest.update(source.encode("utf-8"))
+    digest.update(json.dumps([float(fps), int(frames), list(video_args)]).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def loop_segment(input_args: Sequence[str], video_args: Sequence[str], cache_dir: Path, fps: float = 30,
+                 seconds: float = LOOP_SECONDS, timeout: Optional[float] = None) -> Path:
+    """
+    Cached loop clip of a still source, encoding it on first use.
+
+    Args:
+        input_args: Input options ending in "-i <source>" (e.g. -loop 1 -i image.png)
+        video_args: Video output options (see video_output_args)
+        cache_dir: storage.cache_dir (clips go in its still_loops subdirectory)
+        fps: Output frame rate
+        seconds: Clip length (rounded to whole keyframe intervals)
+        timeout: Seconds before the encode is abandoned
+
+    Returns:
+        Path to the clip
+    """
+    frames = loop_frames(fps, seconds)
+    source = input_args[list(input_args).index("-i") + 1]
+    key = loop_key(source, video_args, fps, frames)
+    path = Path(cache_dir) / SUBDIR / f"{key}.mp4"
+    if path.exists() and path.stat().st_size > 0:
+        return path
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{key}.tmp{os.getpid()}.mp4")
+    rate = [] if "-r" in video_args else ["-r", f"{fps:g}"]
+    cmd = ["ffmpeg", "-y", *input_args, *video_args, *rate,
+           "-flags", "+cgop", "-frames:v", str(frames), "-an", str(tmp_path)]
+    result = subprocess.run(cmd, capture_output=True, text=True, errors="replace", timeout=timeout)
+    if result.returncode != 0 or not tmp_path.exists():
+        tmp_path.unlink(missing_ok=True)
+        error_msg = result.stderr or result.stdout or "Unknown error"
+        raise RuntimeError(f"FFmpeg loop clip encode failed (exit code {result.returncode}): {error_msg[-500:]}")
+    os.replace(tmp_path, path)
+    print(f"  [INFO] Cached {frames / fps:.0f}s still loop clip: {path.name}")
+    return path
+
+
+def loop_still(input_args: Sequence[str], video_args: Sequence[str], audio_path: Path, output_path: Path,
+               duration: float, cache_dir: Path, fps: float = 30, audio_args: Optional[List[str]] = None,
+               timeout: Optional[float] = None) -> Path:
+    """
+    Write a still-image video of the audio's length from a cached loop clip.
+
+    Args:
+        input_args: Input options ending in "-i <source>"
+        video_args: Video output options of the full-length encode
+        audio_path: Audio muxed into the output (sets where it ends)
+        output_path: Final video
+        duration: Audio duration in seconds
+        cache_dir: storage.cache_dir
+        fps: Output frame rate
+        audio_args: Audio encoder options (default: AAC, see audio_output_args)
+        timeout: Seconds allowed for each FFmpeg step
+
+    Returns:
+        output_path
+    """
+    segment = loop_segment(input_args, video_args, cache_dir, fps, timeout=timeout)
+    repeats = max(1, math.ceil(duration * fps / loop_frames(fps)))
+
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(prefix="still_loop_", dir=output_path.parent) as list_dir:
+        concat_segments([segment] * repeats, output_path, audio_path, audio_args=audio_args or audio_output_args(),
+                        timeout=timeout, list_path=Path(list_dir) / "segments.txt", duration=duration)
+    print(f"  [OK] Looped cached still clip {repeats}x with stream copy: {output_path}")
+    return output_path
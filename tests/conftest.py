@@ -383,6 +383,30 @@ def test_config_visualization(temp_dir: Path) -> dict:
     }
 
 
+@pytest.fixture
+def feature_table():
+    """Factory for random per-frame feature tables: feature_table(num_frames, seed=0, bins=64, quiet=()).
+
+    Waveform windows are in [-0.3, 0.3] (peak/RMS/mean_abs in [0, 0.6]) and spectra in [0, 5);
+    rows listed in quiet are scaled down to near silence.
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        pytest.skip("numpy not installed")
+    from src.utils.audio_features import FrameFeatureTable
+
+    def build(num_frames: int, seed: int = 0, bins: int = 64, quiet=()):
+        rng = np.random.default_rng(seed)
+        frames = rng.uniform(0, 0.6, (num_frames, 3 + bins)).astype(np.float32)
+        frames[:, 3:] -= 0.3
+        frames[list(quiet), :] *= 1e-4
+        spectra = rng.uniform(0, 5, (num_frames, 65)).astype(np.float32)
+        return FrameFeatureTable.from_arrays(22050, 30, frames, spectra)
+
+    return build
+
+
 @pytest.fixture
 def sample_script_text() -> str:
     """Sample script text for testing."""
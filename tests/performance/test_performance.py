@@ -75,3 +75,46 @@ def test_audio_mixer_mix_speed(benchmark, test_config, tmp_path):
         mixer.mix(voice, music)
 
     benchmark(run_mix)
+
+
+@pytest.mark.performance
+@pytest.mark.benchmark
+@pytest.mark.parametrize("style", ["spectrum", "circular", "particles"])
+@pytest.mark.parametrize("blur", [0, 3, 12])
+def test_visualizer_frame_glow_speed(benchmark, test_config_visualization, feature_table, style, blur):
+    """Benchmark one 1080p frame per style; the blur=0 case is the baseline the glow adds to."""
+    from src.core.audio_visualizer import AudioVisualizer
+
+    table = feature_table(8)
+    test_config_visualization["visualization"].update({"style": style, "blur": blur, "particles": {"seed": 0}})
+    render = AudioVisualizer(test_config_visualization)._frame_renderer(table)
+    index = iter(range(10**9))
+
+    def run_frame():
+        render(next(index) % len(table))
+
+    benchmark.extra_info["glow_sigma"] = blur
+    benchmark(run_frame)
+
+
+@pytest.mark.performance
+@pytest.mark.benchmark
+@pytest.mark.parametrize("style", ["spectrum", "waveform", "particles"])
+@pytest.mark.parametrize("render_fps", [None, 15])
+def test_visualizer_render_fps_speed(benchmark, test_config_visualization, feature_table, style, render_fps):
+    """A/B: one second of 30 fps 720p video, rendered at every frame (None) vs at 15 fps and retimed."""
+    from src.core.audio_visualizer import AudioVisualizer
+
+    table = feature_table(30, bins=256)
+    test_config_visualization["video"].update({"resolution": [1280, 720], "fps": 30})
+    test_config_visualization["visualization"].update(
+        {"style": style, "render_fps": render_fps, "render_fps_method": "blend", "particles": {"seed": 0}}
+    )
+    viz = AudioVisualizer(test_config_visualization)
+
+    def run_second():
+        for _ in viz._generate_output_range(table, 0, len(table), viz.render_batch_frames):
+            pass
+
+    benchmark.extra_info["render_fps"] = render_fps or 30
+    benchmark(run_second)
@@ -0,0 +1,360 @@
+"""
+Tests for single-pass per-frame audio feature extraction
+"""
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from src.utils.audio_features import (
+    ENVELOPE_HOPS,
+    FRAME_OVERLAP_SECONDS,
+    SPECTRUM_BANDS,
+    AudioFeatureIndex,
+    FrameFeatureTable,
+    StreamingSTFT,
+    _SampleReader,
+    _SampleTrackBuilder,
+    extract_frame_features,
+    spectrum_band_edges,
+    spectrum_normalizers,
+)
+
+
+@pytest.fixture
+def tone_wav(tmp_path):
+    """Two seconds of a 440 Hz tone followed by one second of silence."""
+    sr = 22050
+    t = np.arange(sr * 2) / sr
+    tone = (0.5 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+    audio = np.concatenate([tone, np.zeros(sr, dtype=np.float32)])
+    path = tmp_path / "tone.wav"
+    sf.write(path, audio, sr)
+    return path, sr
+
+
+@pytest.mark.unit
+def test_sample_reader_spans_block_boundaries():
+    data = np.arange(100, dtype=np.float32)
+    reader = _SampleReader(data[i:i + 7] for i in range(0, 100, 7))
+
+    assert np.array_equal(reader.read(5, 10), data[5:15])
+    reader.discard_before(5)
+    assert np.array_equal(reader.read(12, 20), data[12:32])
+    reader.discard_before(12)
+    # Reads past the end are clipped to what exists
+    assert np.array_equal(reader.read(95, 10), data[95:])
+
+
+@pytest.mark.unit
+def test_extract_frame_features_shapes(tone_wav):
+    path, sr = tone_wav
+    table = extract_frame_features(path, fps=10, duration=3.0, window_points=64)
+
+    assert table.sample_rate == sr
+    assert len(table) == 30
+    assert table.window.shape == (30, 64)
+    assert table.spectrum is None
+
+
+@pytest.mark.unit
+def test_extract_frame_features_tracks_loudness(tone_wav):
+    path, _ = tone_wav
+    table = extract_frame_features(path, fps=10, duration=3.0)
+
+    # Tone frames: peak ~0.5, RMS ~0.5/sqrt(2)
+    assert table.peak[5] == pytest.approx(0.5, abs=0.01)
+    assert table.rms[5] == pytest.approx(0.5 / np.sqrt(2), abs=0.01)
+    # Trailing silence
+    assert table.peak[-1] == 0.0
+    assert not table.window[-1].any()
+
+
+@pytest.mark.unit
+def test_extract_frame_features_window_is_decimated_samples(tmp_path):
+    sr, fps, points = 22050, 30, 256
+    t = np.arange(sr * 2) / sr
+    audio = (0.4 * np.sin(2 * np.pi * 220 * t) + 0.2 * np.sin(2 * np.pi * 1330 * t)).astype(np.float32)
+    path = tmp_path / "chord.wav"
+    sf.write(path, audio, sr, subtype="FLOAT")
+
+    table = extract_frame_features(path, fps=fps, duration=2.0, window_points=points)
+
+    length = int((1 / fps + FRAME_OVERLAP_SECONDS) * sr)
+    for i in (0, 17, 45):
+        start = int(max(0, i / fps - FRAME_OVERLAP_SECONDS / 2) * sr)
+        expected = audio[start + (np.arange(points) * length) // points]
+        assert np.allclose(table.window[i], expected, atol=0.02)
+        # One value per point, not peaks of coarse buckets repeated across points
+        assert len(np.unique(table.window[i])) > points * 0.9
+
+
+@pytest.mark.unit
+def test_extract_frame_features_spectrum_peaks_at_tone(tone_wav):
+    path, sr = tone_wav
+    table = extract_frame_features(path, fps=10, duration=3.0, spectrum=True)
+
+    assert table.spectrum.shape == (30, SPECTRUM_BANDS)
+    # 440 Hz lands in FFT bin ~41 at n_fft=2048 / 22050 Hz
+    edges = spectrum_band_edges(sr)
+    assert int(np.argmax(table.spectrum[5])) == np.searchsorted(edges, 41, side="right") - 1
+    assert table.spectrum_peak[5] > 0
+    assert table.spectrum_peak[-1] == 0
+
+
+@pytest.mark.unit
+def test_extract_frame_features_linear_spectrum(tone_wav):
+    path, _ = tone_wav
+    table = extract_frame_features(path, fps=10, duration=3.0, spectrum=True, spectrum_scale="linear")
+
+    # 10 FFT bins per band -> bin ~41 is band 4
+    assert int(np.argmax(table.spectrum[5])) == 4
+
+
+@pytest.mark.unit
+def test_spectrum_band_edges():
+    log_edges = spectrum_band_edges(22050)
+    assert len(log_edges) == SPECTRUM_BANDS + 1
+    # Every band holds at least one FFT bin and the table stays inside the spectrum
+    assert np.all(np.diff(log_edges) >= 1)
+    assert log_edges[-1] <= 1025
+    assert np.array_equal(spectrum_band_edges(22050, "linear")[:3], [0, 10, 20])
+    with pytest.raises(ValueError):
+        spectrum_band_edges(22050, "mel-ish")
+
+
+@pytest.mark.unit
+def test_streaming_stft_matches_per_frame_fft():
+    sr, fps, n_fft = 8000, 30, 256
+    audio = np.random.default_rng(0).standard_normal(sr).astype(np.float32)
+    stft = StreamingSTFT(sr, fps, "linear", n_fft=n_fft, batch_frames=7)
+    reader = _SampleReader(audio[i:i + 1000] for i in range(0, len(audio), 1000))
+
+    batches = list(stft.magnitudes(reader, 32))
+    columns = np.concatenate([mags for _, mags in batches])
+
+    # One column per frame, even for frames whose window runs past the audio
+    assert [start for start, _ in batches] == list(range(0, 32, 7))
+    assert columns.shape == (32, n_fft // 2 + 1)
+    padded = np.pad(audio, (n_fft, sr))
+    for i, center in enumerate(stft.centers(0, 32)):
+        frame = padded[center + n_fft // 2:center + n_fft // 2 + n_fft] * stft.window
+        np.testing.assert_allclose(columns[i], np.abs(np.fft.rfft(frame)), atol=1e-3)
+
+
+@pytest.mark.unit
+def test_spectrum_normalizers():
+    peaks = np.array([1.0, 4.0, 2.0, 8.0, 0.0], dtype=np.float32)
+
+    assert np.array_equal(spectrum_normalizers(peaks), np.full(5, 8.0))
+    assert np.array_equal(spectrum_normalizers(peaks, "running"), [1, 4, 4, 8, 8])
+    assert np.array_equal(spectrum_normalizers(peaks, "lookahead", 1), [4, 4, 8, 8, 8])
+    # Silence never divides by zero
+    assert np.array_equal(spectrum_normalizers(np.zeros(3), "running"), np.ones(3))
+    with pytest.raises(ValueError):
+        spectrum_normalizers(peaks, "loudest")
+
+
+@pytest.mark.unit
+def test_extract_frame_features_pads_past_end_of_audio(tone_wav):
+    path, _ = tone_wav
+    table = extract_frame_features(path, fps=10, duration=5.0)
+
+    assert len(table) == 50
+    assert not table.peak[35:].any()
+
+
+@pytest.mark.unit
+def test_extract_frame_features_undecodable_file_raises(tmp_path):
+    # soundfile rejects the file, and librosa's audioread fallback raises a DecodeError subclass
+    from audioread.exceptions import DecodeError
+
+    path = tmp_path / "broken.wav"
+    path.write_bytes(b"not audio")
+
+    with pytest.raises(DecodeError):
+        extract_frame_features(path, fps=5, duration=1.0, spectrum=True)
+
+
+@pytest.mark.unit
+def test_extract_frame_features_keeps_audio_decoded_before_an_error(tmp_path, monkeypatch):
+    def failing_blocks(path):
+        def blocks():
+            yield np.full(22050, 0.5, dtype=np.float32)
+            raise RuntimeError("decode error")
+
+        return 22050, blocks()
+
+    monkeypatch.setattr("src.utils.audio_features.open_audio_blocks", failing_blocks)
+    path = tmp_path / "truncated.wav"
+    path.write_bytes(b"truncated")
+
+    table = extract_frame_features(path, fps=10, duration=2.0, spectrum=True, cache_dir=tmp_path / "cache")
+
+    assert len(table) == 20
+    assert table.peak[:9].min() > 0.4
+    assert not table.peak[11:].any()
+    assert not table.spectrum[11:].any()
+    # The truncated decode is not cached: no index and no leftover drafts
+    index = AudioFeatureIndex.for_audio(path, tmp_path / "cache")
+    assert not index.exists()
+    assert not list(index.index_dir.glob("*"))
+
+
+@pytest.mark.unit
+def test_empty_table():
+    table = FrameFeatureTable.empty(4, fps=30, window_points=8)
+
+    assert table.num_frames == 4
+    assert table.window_points == 8
+    assert table.sample_rate == 22050
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("fps,rows", [(15, [0, 2, 4, 6, 8]), (12, [0, 2, 5, 8]), (30, list(range(10)))])
+def test_table_resample_picks_nearest_rows(fps, rows):
+    frames = np.arange(10 * 11, dtype=np.float32).reshape(10, 11)
+    spectra = np.arange(10 * (SPECTRUM_BANDS + 1), dtype=np.float32).reshape(10, SPECTRUM_BANDS + 1)
+    table = FrameFeatureTable.from_arrays(22050, 30, frames, spectra)
+
+    resampled = table.resample(fps)
+
+    assert resampled.fps == min(fps, 30)
+    assert np.array_equal(resampled.window, frames[rows, 3:])
+    assert np.array_equal(resampled.spectrum_peak, spectra[rows, -1])
+    if fps == 15:
+        assert np.shares_memory(resampled.window, frames)
+
+
+@pytest.mark.unit
+def test_table_save_load_round_trip(tone_wav, tmp_path):
+    path, _ = tone_wav
+    table = extract_frame_features(path, fps=10, duration=3.0, spectrum=True)
+
+    table.save(tmp_path / "shared")
+    loaded = FrameFeatureTable.load(tmp_path / "shared")
+
+    assert isinstance(loaded.window.base, np.memmap) or isinstance(loaded.window, np.memmap)
+    assert (loaded.sample_rate, loaded.fps) == (table.sample_rate, table.fps)
+    assert np.array_equal(loaded.window, table.window)
+    assert np.array_equal(loaded.mean_abs, table.mean_abs)
+    assert np.array_equal(loaded.spectrum_peak, table.spectrum_peak)
+
+
+@pytest.mark.unit
+def test_feature_index_written_on_first_pass(tone_wav, tmp_path):
+    path, sr = tone_wav
+    cache_dir = tmp_path / "cache"
+
+    extract_frame_features(path, fps=10, duration=3.0, cache_dir=cache_dir)
+
+    index = AudioFeatureIndex.for_audio(path, cache_dir)
+    assert index.exists()
+    assert index.load_meta()["sample_rate"] == sr
+    # Pyramid levels shrink by the hop ratio
+    levels = [index.envelope(hop) for hop in ENVELOPE_HOPS]
+    assert len(levels[0]) == int(np.ceil(sr * 3 / ENVELOPE_HOPS[0]))
+    assert len(levels[1]) == int(np.ceil(len(levels[0]) / 8))
+    assert levels[2].shape[1] == 4
+
+
+@pytest.mark.unit
+def test_feature_index_rerender_skips_decoding(tone_wav, tmp_path, monkeypatch):
+    path, _ = tone_wav
+    cache_dir = tmp_path / "cache"
+    first = extract_frame_features(path, fps=10, duration=3.0, spectrum=True, cache_dir=cache_dir)
+
+    def no_decode(*args, **kwargs):
+        raise AssertionError("audio should not be decoded on a cache hit")
+
+    monkeypatch.setattr("src.utils.audio_features.open_audio_blocks", no_decode)
+    second = extract_frame_features(path, fps=10, duration=3.0, spectrum=True, cache_dir=cache_dir)
+
+    assert isinstance(second.window.base, np.memmap) or isinstance(second.window, np.memmap)
+    assert np.array_equal(first.window, second.window)
+    assert np.array_equal(first.rms, second.rms)
+    assert np.array_equal(first.spectrum, second.spectrum)
+
+    # A new frame rate is derived from the cached envelope, still without decoding
+    other_fps = extract_frame_features(path, fps=25, duration=3.0, cache_dir=cache_dir)
+    assert len(other_fps) == 75
+
+
+@pytest.mark.unit
+def test_feature_index_cached_matches_uncached(tone_wav, tmp_path):
+    path, _ = tone_wav
+    uncached = extract_frame_features(path, fps=30, duration=3.0)
+    extract_frame_features(path, fps=30, duration=3.0, cache_dir=tmp_path)
+    cached = extract_frame_features(path, fps=30, duration=3.0, cache_dir=tmp_path)
+
+    assert np.array_equal(uncached.peak, cached.peak)
+    assert np.array_equal(uncached.window, cached.window)
+
+
+@pytest.mark.unit
+def test_feature_index_adds_missing_spectrum(tone_wav, tmp_path):
+    path, _ = tone_wav
+    extract_frame_features(path, fps=10, duration=3.0, cache_dir=tmp_path)
+    index = AudioFeatureIndex.for_audio(path, tmp_path)
+    assert index.spectra(10) is None
+
+    table = extract_frame_features(path, fps=10, duration=3.0, spectrum=True, cache_dir=tmp_path)
+
+    assert table.spectrum is not None
+    assert index.spectra(10).shape == (30, SPECTRUM_BANDS + 1)
+
+
+@pytest.mark.unit
+def test_feature_index_spectrum_written_in_place(tone_wav, tmp_path):
+    path, _ = tone_wav
+    uncached = extract_frame_features(path, fps=10, duration=3.0, spectrum=True)
+    cached = extract_frame_features(path, fps=10, duration=3.0, spectrum=True, cache_dir=tmp_path)
+
+    index = AudioFeatureIndex.for_audio(path, tmp_path)
+    assert np.array_equal(uncached.spectrum, cached.spectrum)
+    assert np.array_equal(index.spectra(10)[:, :-1], uncached.spectrum)
+    # The memory-mapped draft was published, not left behind
+    assert not list(index.index_dir.glob("*.draft*"))
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("header_offset", [0, -1000, 1000])
+def test_feature_index_sample_track_streams_to_disk(tone_wav, tmp_path, monkeypatch, header_offset):
+    """The track goes straight into the index file; a wrong header length falls back to RAM."""
+    from src.utils import audio_features
+
+    path, sr = tone_wav
+    drafts = []
+    samples_draft = AudioFeatureIndex.samples_draft
+
+    def recording_draft(self, num_samples, *args):
+        drafts.append(samples_draft(self, num_samples, *args))
+        return drafts[-1]
+
+    monkeypatch.setattr(audio_features, "_expected_samples", lambda audio_path: sr * 3 + header_offset)
+    monkeypatch.setattr(AudioFeatureIndex, "samples_draft", recording_draft)
+    uncached = extract_frame_features(path, fps=10, duration=3.0)
+    cached = extract_frame_features(path, fps=10, duration=3.0, cache_dir=tmp_path)
+
+    index = AudioFeatureIndex.for_audio(path, tmp_path)
+    track = index.samples()
+    assert len(drafts) == 1
+    assert len(track) == sr * 3 // 2
+    assert np.array_equal(cached.window, uncached.window)
+    assert not list(index.index_dir.glob("*.draft*"))
+
+
+@pytest.mark.unit
+def test_sample_track_builder_fills_out_buffer():
+    data = np.arange(100, dtype=np.float32)
+    out = np.zeros(50, dtype=np.float32)
+    builder = _SampleTrackBuilder(out=out)
+    for start in range(0, 100, 7):
+        builder.add(data[start:start + 7])
+
+    assert builder.finish() is out
+    assert np.array_equal(out, data[::2])
+
+    short = _SampleTrackBuilder(out=np.zeros(40, dtype=np.float32))
+    short.add(data)
+    assert np.array_equal(short.finish(), data[::2])
@@ -3,6 +3,7 @@ Tests for AudioVisualizer module
 """
 
 import sys
+import threading
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
@@ -225,6 +226,158 @@ class TestWaveformHelpers:
         assert rotated[1][0] == -1
         assert rotated[1][1] == 0
 
+    def test_rotate_points_array_matches_list(self, test_config_visualization):
+        """Array input should rotate like the list form and stay an array."""
+        from src.core.audio_visualizer import AudioVisualizer
+
+        viz = AudioVisualizer(test_config_visualization)
+        points = [(10, 3), (-4, 7), (0, 0)]
+        as_list = viz._rotate_points(points, center=(2, 1), angle_degrees=33)
+        as_array = viz._rotate_points(np.array(points), center=(2, 1), angle_degrees=33)
+
+        assert isinstance(as_array, np.ndarray)
+        assert [tuple(p) for p in as_array.tolist()] == as_list
+
+    def test_windowed_rms_matches_direct_windows(self, test_config_visualization):
+        """Prefix-sum RMS should equal RMS computed window by window."""
+        from src.core.audio_visualizer import AudioVisualizer
+
+        chunk = np.random.default_rng(0).standard_normal(1470).astype(np.float32)
+        result = AudioVisualizer._windowed_rms(chunk, 500)
+
+        half_window = max(10, len(chunk) // 1000)
+        for idx in (0, 1, 250, 499):
+            center = int((idx / 500) * len(chunk))
+            window = chunk[max(0, center - half_window):center + half_window]
+            assert result[idx] == pytest.approx(np.sqrt(np.mean(window.astype(np.float64) ** 2)))
+        assert not AudioVisualizer._windowed_rms(np.array([], dtype=np.float32), 8).any()
+
+    def test_block_profiles_match_baseline_per_frame_loop(self, test_config_visualization):
+        """Block profiles should equal the old per-frame, per-sample loop for every frame of the block."""
+        from src.core.audio_visualizer import AudioVisualizer
+
+        test_config_visualization["visualization"]["waveform"] = {"amplitude_multiplier": 2.5}
+        viz = AudioVisualizer(test_config_visualization)
+        rng = np.random.default_rng(4)
+        chunks = (rng.standard_normal((6, 1837)) * np.linspace(0.05, 0.6, 6)[:, np.newaxis]).astype(np.float32)
+        amplitudes = np.linspace(0.5, 3.0, 6)
+
+        def baseline_horizontal(chunk, wave_samples):
+            raw_samples = []
+            for idx in range(wave_samples):
+                audio_idx = int((idx / wave_samples) * len(chunk))
+                window_size = max(10, len(chunk) // (wave_samples * 2))
+                window = chunk[max(0, audio_idx - window_size):min(len(chunk), audio_idx + window_size)]
+                raw_samples.append(np.sqrt(np.mean(window ** 2)))
+            middle = (max(raw_samples) + min(raw_samples)) / 2.0
+            for window_size in (min(25, len(raw_samples) // 5), min(15, len(raw_samples) // 10)):
+                kernel = np.ones(window_size) / window_size
+                padded = np.pad(raw_samples, (window_size // 2, window_size // 2), mode='edge')
+                raw_samples = np.convolve(padded, kernel, mode='valid').tolist()
+            scaled = []
+            for value in raw_samples[:wave_samples]:
+                normalized = min(2.0, max(0.0, value / 0.5)) * viz.amplitude_multiplier
+                if normalized <= 0:
+                    scaled.append(0.0)
+                elif normalized <= 1.0:
+                    scaled.append(normalized)
+                else:
+                    scaled.append(min(1.0, 1.0 + (np.log(normalized) / np.log(7.0)) * 0.65))
+            return np.array(scaled), middle
+
+        def baseline_vertical(chunk, wave_samples, amplitude):
+            widths = []
+            for y_idx in range(wave_samples):
+                center = int((y_idx / wave_samples) * len(chunk))
+                window = chunk[max(0, center - 2):min(len(chunk), center + 2)]
+                widths.append(max(0.1, min(1.0, np.abs(window).mean() * amplitude)))
+            return np.array(widths)
+
+        horizontal = viz._waveform_block_profiles(chunks, "horizontal", 500, amplitudes)
+        vertical = viz._waveform_block_profiles(chunks, "vertical", 360, amplitudes)
+
+        for chunk, amplitude, (samples, middle), widths in zip(chunks, amplitudes, horizontal, vertical, strict=True):
+            expected_samples, expected_middle = baseline_horizontal(chunk, 500)
+            assert np.allclose(samples, expected_samples, atol=1e-6)
+            assert middle == pytest.approx(expected_middle, abs=1e-6)
+            assert np.allclose(widths, baseline_vertical(chunk, 360, amplitude), atol=1e-6)
+
+    def test_waveform_profile_computed_once_per_frame(self, monkeypatch, test_config_visualization):
+        """Lines, instances and positions should reuse a single waveform profile."""
+        from src.core import audio_visualizer
+        from src.core.audio_visualizer import AudioVisualizer
+
+        if not audio_visualizer.OPENCV_AVAILABLE:
+            pytest.skip("OpenCV not available")
+
+        test_config_visualization["video"]["resolution"] = [160, 90]
+        test_config_visualization["visualization"]["waveform"] = {
+            "position": "top,bottom",
+            "num_lines": 3,
+            "num_instances": 2,
+            "instances_offset": 10,
+        }
+        viz = AudioVisualizer(test_config_visualization)
+
+        calls = []
+        original = AudioVisualizer._windowed_rms
+        monkeypatch.setattr(
+            AudioVisualizer, "_windowed_rms",
+            staticmethod(lambda chunk, num_points: calls.append(num_points) or original(chunk, num_points)),
+        )
+
+        chunk = np.sin(np.linspace(0, 20, 735)).astype(np.float32) * 0.5
+        frame = viz._render_waveform_frame(chunk, 1.0, 6)
+
+        assert frame.shape == (90, 160, 3)
+        assert frame.any()
+        assert len(calls) == 1
+
+    def test_roi_rendering_matches_full_frame(self, test_config_visualization):
+        """Band-only drawing should produce the same frame as drawing the full canvas."""
+        from src.core import audio_visualizer
+        from src.core.audio_visualizer import AudioVisualizer
+
+        if not audio_visualizer.OPENCV_AVAILABLE:
+            pytest.skip("OpenCV not available")
+
+        test_config_visualization["video"]["resolution"] = [320, 180]
+        test_config_visualization["visualization"]["waveform"] = {"position": "bottom,left", "num_lines": 2}
+        viz = AudioVisualizer(test_config_visualization)
+        chunk = np.sin(np.linspace(0, 40, 1470)).astype(np.float32) * 0.4
+
+        roi_frame = viz._render_waveform_frame(chunk, 1.0, 12)
+        viz._waveform_bands = lambda *args: None
+        full_frame = viz._render_waveform_frame(chunk, 1.0, 12)
+
+        assert roi_frame.any()
+        assert np.array_equal(roi_frame, full_frame)
+
+    def test_waveform_band(self, test_config_visualization):
+        """Single-position waveforms expose their band; rotated ones need the full frame."""
+        from src.core import audio_visualizer
+        from src.core.audio_visualizer import AudioVisualizer
+
+        if not audio_visualizer.OPENCV_AVAILABLE:
+            pytest.skip("OpenCV not available")
+
+        test_config_visualization["video"]["resolution"] = [640, 360]
+        test_config_visualization["visualization"]["style"] = "waveform"
+        test_config_visualization["visualization"]["waveform"] = {"position": "bottom", "height_percent": 25}
+        viz = AudioVisualizer(test_config_visualization)
+
+        x, y, w, h = viz.waveform_band()
+        assert (x, w) == (0, 640)
+        assert y + h == 360
+        assert 90 <= h < 360 and h % 2 == 0
+
+        viz._output_band = viz.waveform_band()
+        frame = viz._render_waveform_frame(np.full(735, 0.3, dtype=np.float32), 1.0, 24)
+        assert frame.shape == (h, w, 3)
+
+        viz.rotation = 10
+        assert viz.waveform_band() is None
+
 
 class TestAdvancedWaveformRendering:
     """Test advanced waveform rendering options."""
@@ -362,6 +515,34 @@ class TestSpectrumGeneration:
         """Test spectrum frame generation - skipped due to librosa lazy loading."""
         pass
 
+    def test_spectrum_frame_matches_row_by_row_drawing(self, test_config_visualization):
+        """Sprite-based bars should match drawing each bar row by row with PIL."""
+        from PIL import Image, ImageDraw
+
+        from src.core.audio_visualizer import AudioVisualizer
+
+        width, height, num_bars = 320, 120, 16
+        viz = AudioVisualizer(test_config_visualization)
+        bar_heights = np.linspace(0.0, 1.0, num_bars)
+
+        img = Image.new("RGB", (width, height), tuple(viz.background_color))
+        draw = ImageDraw.Draw(img)
+        bar_width = width // num_bars
+        for bar_idx, bar_height in enumerate(bar_heights):
+            x = bar_idx * bar_width
+            bar_h = int(bar_height * height * 0.8 * viz.sensitivity)
+            color = viz._interpolate_color(viz.primary_color, viz.secondary_color, bar_idx / num_bars)
+            for h in range(bar_h):
+                alpha = h / bar_h
+                bar_color = tuple([int(c * alpha) for c in color])
+                draw.rectangle([x + 2, height - h, x + bar_width - 2, height - h + 1], fill=bar_color)
+
+        layout = viz._spectrum_layout(width, height, num_bars)
+        frame = viz._render_spectrum_frame(bar_heights, layout)
+
+        assert frame.shape == (height, width, 3)
+        assert np.array_equal(frame, np.array(img))
+
 
 class TestCircularGeneration:
     """Test circular/radial frame generation."""
@@ -387,6 +568,38 @@ class TestCircularGeneration:
             assert isinstance(frame, np.ndarray)
             assert frame.shape[:2] == tuple(viz.resolution[::-1])
 
+    def test_circular_canvas_reuse_leaves_no_trails(self, test_config_visualization):
+        """Test a loud frame drawn into the reused canvas does not bleed into the next one."""
+        from src.core.audio_visualizer import AudioVisualizer
+
+        viz = AudioVisualizer(test_config_visualization)
+        width, height = viz.resolution
+        chunk = np.linspace(-0.5, 0.5, 64, dtype=np.float32)
+        layout = viz._circular_layout(width, height)
+
+        loud = viz._render_circular_frame(1.0, chunk, layout, blur=2)
+        quiet = viz._render_circular_frame(0.05, chunk * 0.1, layout, blur=2)
+        fresh = viz._render_circular_frame(0.05, chunk * 0.1, viz._circular_layout(width, height), blur=2)
+
+        assert np.array_equal(quiet, fresh)
+        assert not np.array_equal(loud, quiet)
+
+    def test_circular_blur_zero_skips_blur(self, test_config_visualization, monkeypatch):
+        """Test blur == 0 never runs a Gaussian blur."""
+        import src.core.audio_visualizer as audio_visualizer
+        from src.core.audio_visualizer import AudioVisualizer
+
+        if not audio_visualizer.OPENCV_AVAILABLE:
+            pytest.skip("OpenCV not available")
+        viz = AudioVisualizer(test_config_visualization)
+        layout = viz._circular_layout(*viz.resolution)
+        calls = []
+        monkeypatch.setattr(audio_visualizer.cv2, "GaussianBlur", lambda *a, **k: calls.append(a))
+
+        viz._render_circular_frame(0.2, np.zeros(16, dtype=np.float32), layout, blur=0)
+
+        assert calls == []
+
 
 class TestParticleGeneration:
     """Test particle frame generation."""
@@ -412,6 +625,21 @@ class TestParticleGeneration:
             assert isinstance(frame, np.ndarray)
             assert frame.shape[:2] == tuple(viz.resolution[::-1])
 
+    def test_particle_seed_makes_renders_reproducible(self, test_config_visualization):
+        """Test a configured seed yields identical particle frames on every render."""
+        from src.core.audio_visualizer import AudioVisualizer
+
+        test_config_visualization["visualization"]["particles"] = {"count": 500, "seed": 42}
+        test_config_visualization["visualization"]["resolution"] = [160, 90]
+        amplitudes = np.linspace(0, 0.5, 6)
+
+        first = list(AudioVisualizer(test_config_visualization)._render_particle_frames(amplitudes))
+        second = list(AudioVisualizer(test_config_visualization)._render_particle_frames(amplitudes))
+
+        assert len(first) == 6
+        assert all(np.array_equal(a, b) for a, b in zip(first, second, strict=True))
+        assert not np.array_equal(first[0], first[-1])
+
 
 class TestStyleSelection:
     """Test style selection logic."""
@@ -508,13 +736,13 @@ class TestEdgeCases:
 
         result = viz.generate_visualization(audio_path, output_path)
 
-        # Verify librosa was called for sample rate detection
+        # Fake audio is not readable by soundfile, so librosa is used as the fallback decoder
         assert mock_load.called
         # _get_audio_duration_ffmpeg called to get audio duration
         assert mock_get_duration.called
         assert result == mock_stream_video.return_value
 
-    @patch("src.core.audio_visualizer.librosa.load")
+    @patch("librosa.load")
     @patch("src.core.audio_visualizer.librosa")
     @patch("src.core.audio_visualizer.AudioVisualizer._generate_spectrum_frames_streaming_chunked")
     @patch("src.core.audio_visualizer.AudioVisualizer._stream_frames_to_video")
@@ -542,7 +770,7 @@ class TestEdgeCases:
         assert mock_spectrum.called
         assert result == mock_stream_video.return_value
 
-    @patch("src.core.audio_visualizer.librosa.load")
+    @patch("librosa.load")
     @patch("src.core.audio_visualizer.librosa")
     @patch("src.core.audio_visualizer.AudioVisualizer._generate_particle_frames_streaming_chunked")
     @patch("src.core.audio_visualizer.AudioVisualizer._stream_frames_to_video")
@@ -570,7 +798,7 @@ class TestEdgeCases:
         assert mock_particles.called
         assert result == mock_stream_video.return_value
 
-    @patch("src.core.audio_visualizer.librosa.load")
+    @patch("librosa.load")
     @patch("src.core.audio_visualizer.librosa")
     @patch("src.core.audio_visualizer.AudioVisualizer._generate_waveform_frames_streaming_chunked")
     @patch("src.core.audio_visualizer.AudioVisualizer._stream_frames_to_video")
@@ -599,7 +827,7 @@ class TestEdgeCases:
         assert mock_waveform.called
         assert result == mock_stream_video.return_value
 
-    @patch("src.core.audio_visualizer.librosa.load")
+    @patch("librosa.load")
     @patch("src.core.audio_visualizer.librosa")
     @patch("src.core.audio_visualizer.AudioVisualizer._generate_circular_frames_streaming_chunked")
     @patch("src.core.audio_visualizer.AudioVisualizer._stream_frames_to_video")
@@ -627,7 +855,7 @@ class TestEdgeCases:
         assert mock_circular.called
         assert result == mock_stream_video.return_value
 
-    @patch("src.core.audio_visualizer.librosa.load")
+    @patch("librosa.load")
     @patch("src.core.audio_visualizer.librosa")
     @patch("src.core.audio_visualizer.AudioVisualizer._generate_waveform_frames_streaming_chunked_from_array")
     @patch("src.core.audio_visualizer.AudioVisualizer._stream_frames_to_video")
@@ -893,7 +1121,7 @@ class TestAudioVisualizerUncoveredMethods:
 
         with patch("src.core.audio_visualizer.subprocess.run") as mock_run:
             mock_run.return_value.returncode = 0
-            mock_run.return_value.stdout = "10.5\n"
+            mock_run.return_value.stdout = '{"format": {"duration": "10.5"}}'
             duration = viz._get_audio_duration_ffmpeg(audio_path)
 
         assert duration == 10.5
@@ -1655,4 +1883,900 @@ def test_waveform_draw_line_condition(tmp_path, test_config_visualization):
     # Should generate frames with lines drawn
     assert len(frames) > 0
     # Verify frames are not empty
-    assert frames[0].shape[0] > 0 and frames[0].shape[1] > 0
\ No newline at end of file
+    assert frames[0].shape[0] > 0 and frames[0].shape[1] > 0
+
+
+class _PipeProcess:
+    """Stand-in FFmpeg process that records what is written to stdin."""
+
+    def __init__(self):
+        self.returncode = 0
+        self.written = []
+        self.stdin = MagicMock()
+        self.stdin.write.side_effect = lambda data: self.written.append(bytes(data))
+        self.stderr = MagicMock()
+        self.stderr.readline.return_value = b""
+        self.stdout = MagicMock()
+
+    def launch(self, cmd):
+        self.cmd = cmd
+        return self
+
+    def poll(self):
+        return None
+
+    def communicate(self, timeout=None):
+        return (b"", b"")
+
+
+def _stream_with_pipe(viz, frames, tmp_path, duration=1.0, **kwargs):
+    process = _PipeProcess()
+    with (
+        patch("src.core.audio_visualizer.subprocess.run") as mock_run,
+        patch("src.core.audio_visualizer.subprocess.Popen", side_effect=lambda cmd, **kwargs: process.launch(cmd)),
+        patch("src.utils.file_monitor.FileMonitor") as mock_monitor_class,
+        patch("src.utils.ram_monitor.RAMMonitor") as mock_ram_monitor_class,
+    ):
+        mock_run.return_value.stdout = ""
+        mock_monitor_class.return_value.get_current_size_mb.return_value = 0.0
+        mock_ram_monitor_class.return_value.check_ram_limit.return_value = (False, None)
+        viz._stream_frames_to_video(frames, tmp_path / "audio.mp3", tmp_path / "out.mp4", duration, **kwargs)
+    return process
+
+
+def _variant_processes(viz, table, variants, tmp_path):
+    """Run generate_variants against stand-in encoders; returns (outputs, output name -> process)."""
+    from src.core.audio_visualizer import AudioVisualizer
+
+    processes = {}
+
+    def launch(cmd, **kwargs):
+        processes[Path(cmd[-1]).name] = _PipeProcess().launch(cmd)
+        return processes[Path(cmd[-1]).name]
+
+    with (
+        patch.object(AudioVisualizer, "_get_audio_duration_ffmpeg", return_value=len(table) / 30),
+        patch.object(AudioVisualizer, "_extract_frame_features", return_value=table),
+        patch("src.core.audio_visualizer.subprocess.run") as mock_run,
+        patch("src.core.audio_visualizer.subprocess.Popen", side_effect=launch),
+        patch("src.utils.file_monitor.FileMonitor") as mock_monitor_class,
+        patch("src.utils.ram_monitor.RAMMonitor") as mock_ram_monitor_class,
+    ):
+        mock_run.return_value.stdout = ""
+        mock_monitor_class.return_value.get_current_size_mb.return_value = 0.0
+        mock_ram_monitor_class.return_value.check_ram_limit.return_value = (False, None)
+        outputs = viz.generate_variants(tmp_path / "audio.mp3", variants, tmp_path)
+    return outputs, processes
+
+
+class TestParallelRender:
+    """Test process-pool frame rendering."""
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("style", ["waveform", "spectrum", "circular", "particles"])
+    def test_parallel_render_matches_sequential(self, style, feature_table):
+        """Test worker-pool rendering yields the sequential frames, in order."""
+        from src.core.audio_visualizer import AudioVisualizer
+
+        table = feature_table(40)
+        viz = AudioVisualizer({
+            "video": {"resolution": [160, 90], "fps": 30},
+            "visualization": {"style": style, "blur": 1, "workers": 2, "particles": {"seed": 3}},
+        })
+
+        sequential = [viz._frame_renderer(table)(i) for i in range(len(table))]
+        parallel = list(viz._generate_frames_parallel(table, 2))
+
+        assert len(parallel) == len(sequential)
+        assert all(np.array_equal(a, b) for a, b in zip(sequential, parallel, strict=True))
+
+    @pytest.mark.unit
+    def test_parallel_render_keeps_frames_in_flight_within_queue_budget(self, feature_table):
+        """Test shards shrink and the window narrows so in-flight frames fit frame_queue_mb."""
+        from concurrent.futures import Future
+
+        from src.core.audio_visualizer import AudioVisualizer
+
+        table = feature_table(100)
+        viz = AudioVisualizer({
+            "video": {"resolution": [160, 90], "fps": 30},
+            "visualization": {"style": "waveform", "frame_queue_mb": 1},  # 24 frames of 160x90 RGB
+        })
+        in_flight = {"frames": 0, "peak": 0}
+        shard_sizes = []
+
+        class RecordingPool:
+            def submit(self, fn, start, stop):
+                shard_sizes.append(stop - start)
+                in_flight["frames"] += stop - start
+                in_flight["peak"] = max(in_flight["peak"], in_flight["frames"])
+                future = Future()
+                future.set_result(np.zeros((stop - start, 90, 160, 3), dtype=np.uint8))
+                return future
+
+        for _frame in viz._generate_frames_parallel(table, 32, pool=RecordingPool()):
+            in_flight["frames"] -= 1
+
+        assert sum(shard_sizes) == 100
+        assert max(shard_sizes) == 1
+        assert in_flight["peak"] <= 24
+
+    @pytest.mark.unit
+    def test_worker_visualizer_pickles_without_feature_arrays(self, feature_table):
+        """Test the copy sent to workers leaves the render_fps tables behind (workers memmap the table)."""
+        import pickle
+
+        from src.core.audio_visualizer import AudioVisualizer
+        from src.utils.audio_features import FrameFeatureTable
+
+        table = feature_table(600)
+        viz = AudioVisualizer({
+            "video": {"resolution": [160, 90], "fps": 30},
+            "visualization": {"style": "spectrum", "workers": 2, "render_fps": 15},
+        })
+        viz._render_features(table)
+        assert viz._render_tables is not None
+
+        payload = pickle.dumps(viz._worker_visualizer())
+        worker_viz = pickle.loads(payload)
+
+        assert viz._render_tables is not None  # The parent keeps its cache
+        carried = [
+            name for name, value in vars(worker_viz).items()
+            for item in (value if isinstance(value, tuple) else (value,))
+            if isinstance(item, (np.ndarray, FrameFeatureTable))
+        ]
+        assert worker_viz._render_tables is None
+        assert carried == []
+        assert len(payload) < table.window.nbytes // 10
+
+
+class TestSilenceElision:
+    """Test quiet runs are drawn once and repeated."""
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("style", ["waveform", "spectrum", "circular"])
+    def test_silence_elision_draws_each_quiet_run_once(self, style, feature_table):
+        """Test quiet runs repeat their first frame, whichever frame is asked for first."""
+        from src.core.audio_visualizer import AudioVisualizer
+
+        table = feature_table(12, seed=1, quiet=[2, 3, 4, 8, 9])  # Two quiet runs: 2-4 and 8-9
+        viz = AudioVisualizer({
+            "video": {"resolution": [160, 90], "fps": 30},
+            "visualization": {"style": style, "elide_silence": True, "silence_threshold_db": -40},
+        })
+
+        run_starts = viz._quiet_run_starts(table)
+        assert run_starts.tolist() == [-1, -1, 2, 2, 2, -1, -1, -1, 8, 8, -1, -1]
+
+        render = viz._frame_renderer(table)
+        assert np.array_equal(render(4), AudioVisualizer(viz.config)._frame_renderer(table)(2))
+        assert render(3) is render(2) is render(4)
+        assert render(9) is render(8)
+        assert render(5) is not render(5)
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("style", ["waveform", "spectrum"])
+    def test_silence_elision_renders_quiet_runs_once_in_blocks(self, style, feature_table):
+        """Test block rendering only draws loud frames and the first frame of each quiet run."""
+        from src.core import audio_visualizer
+        from src.core.audio_visualizer import AudioVisualizer
+
+        if not audio_visualizer.OPENCV_AVAILABLE:
+            pytest.skip("OpenCV not available")
+
+        table = feature_table(40, seed=2, quiet=range(3, 35))  # One quiet run spanning several blocks
+        config = {
+            "video": {"resolution": [160, 90], "fps": 30},
+            "visualization": {"style": style, "elide_silence": True, "silence_threshold_db": -40},
+        }
+        viz = AudioVisualizer(config)
+        inner = viz._spectrum_block_renderer if style == "spectrum" else viz._waveform_block_renderer
+        calls = []
+
+        def counting_renderer(features):
+            render_block = inner(features)
+
+            def render(start, stop):
+                calls.append((start, stop))
+                return render_block(start, stop)
+
+            return render
+
+        setattr(viz, inner.__name__, counting_renderer)
+        render_block = viz._block_renderer(table)
+        blocks = [render_block(start, min(len(table), start + 8)) for start in range(0, len(table), 8)]
+
+        assert calls == [(0, 4), (35, 40)]
+        assert sum(stop - start for start, stop in calls) == 3 + 1 + 5
+        expected = AudioVisualizer(config).render_batch(table)
+        assert np.array_equal(np.concatenate(blocks), expected)
+        assert viz._count_elided_frames(table) == 31
+
+    @pytest.mark.unit
+    def test_silence_elision_blocks_return_pooled_buffers(self, feature_table):
+        """Test elided blocks hand every pooled buffer back once the writer releases the block."""
+        from src.core import audio_visualizer
+        from src.core.audio_visualizer import AudioVisualizer
+        from src.utils.frame_pool import FramePool
+
+        if not audio_visualizer.OPENCV_AVAILABLE:
+            pytest.skip("OpenCV not available")
+
+        # Block 0 mixes loud and quiet rows; block 1 starts a quiet run and is otherwise loud
+        table = feature_table(16, seed=5, quiet=[3, 4, 8])
+        viz = AudioVisualizer({
+            "video": {"resolution": [160, 90], "fps": 30},
+            "visualization": {"style": "waveform", "elide_silence": True, "silence_threshold_db": -40},
+        })
+        viz._frame_pool = FramePool((8, 90, 160, 3), capacity=2)
+        render_block = viz._block_renderer(table)
+
+        for _ in range(3):
+            for start in (0, 8):
+                viz._frame_pool.release(render_block(start, start + 8))
+
+        assert viz._frame_pool.stats()["peak_in_use"] <= 2
+        assert viz._frame_pool.stats()["transient_allocations"] == 0
+
+    @pytest.mark.unit
+    def test_silence_elision_skips_particles(self):
+        """Test particles keep moving through silence, so their frames are never elided."""
+        from src.core.audio_visualizer import AudioVisualizer
+        from src.utils.audio_features import FrameFeatureTable
+
+        table = FrameFeatureTable.from_arrays(22050, 30, np.zeros((5, 3 + 64), dtype=np.float32))
+        viz = AudioVisualizer({"visualization": {"style": "particles", "elide_silence": True}})
+
+        assert viz._quiet_run_starts(table) is None
+
+
+class TestRenderBatch:
+    """Test vectorized block rendering."""
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize(
+        "viz_settings",
+        [
+            {"style": "spectrum"},
+            {"style": "spectrum", "blur": 14},
+            {"style": "spectrum", "elide_silence": True, "silence_threshold_db": -40},
+            {"style": "waveform"},
+            {"style": "waveform", "waveform": {"position": "left,right", "num_lines": 2}},
+            {"style": "waveform", "waveform": {"rotation": 20}, "elide_silence": True, "silence_threshold_db": -40},
+        ],
+    )
+    def test_render_batch_matches_frame_by_frame(self, viz_settings, feature_table):
+        """Test block rendering produces exactly the frames render(i) draws one at a time."""
+        from src.core import audio_visualizer
+        from src.core.audio_visualizer import AudioVisualizer
+
+        if not audio_visualizer.OPENCV_AVAILABLE:
+            pytest.skip("OpenCV not available")
+
+        table = feature_table(21, seed=3, quiet=[2, 3, 4, 8, 9])
+        config = {"video": {"resolution": [160, 90], "fps": 30}, "visualization": viz_settings}
+
+        render = AudioVisualizer(config)._frame_renderer(table)
+        expected = np.stack([render(i) for i in range(len(table))])
+        render_block = AudioVisualizer(config)._block_renderer(table)
+        blocks = [render_block(start, min(len(table), start + 8)) for start in range(0, len(table), 8)]
+
+        assert [block.shape for block in blocks] == [(8, 90, 160, 3), (8, 90, 160, 3), (5, 90, 160, 3)]
+        assert np.array_equal(np.concatenate(blocks), expected)
+        assert np.array_equal(AudioVisualizer(config).render_batch(table, 5, 12), expected[5:12])
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("style", ["waveform", "spectrum"])
+    def test_block_streaming_skips_quiet_rows(self, style, feature_table):
+        """Test streaming in render_batch_frames blocks draws loud rows and one row per quiet run."""
+        from src.core import audio_visualizer
+        from src.core.audio_visualizer import AudioVisualizer
+
+        if not audio_visualizer.OPENCV_AVAILABLE:
+            pytest.skip("OpenCV not available")
+
+        table = feature_table(48, seed=4, quiet=[*range(5, 30), *range(36, 44)])
+        viz = AudioVisualizer({
+            "video": {"resolution": [160, 90], "fps": 30},
+            "visualization": {"style": style, "elide_silence": True, "silence_threshold_db": -40},
+        })
+        inner = viz._spectrum_block_renderer if style == "spectrum" else viz._waveform_block_renderer
+        rendered_rows = []
+
+        def counting_renderer(features):
+            render_block = inner(features)
+
+            def render(start, stop):
+                rendered_rows.append(stop - start)
+                return render_block(start, stop)
+
+            return render
+
+        setattr(viz, inner.__name__, counting_renderer)
+        frames = [frame for block in viz._generate_frame_range(table, 0, 48, viz.render_batch_frames) for frame in block]
+
+        assert len(frames) == 48
+        assert sum(rendered_rows) == 48 - 24 - 7  # Every quiet frame after its run's first is skipped
+
+    @pytest.mark.unit
+    def test_render_batch_stacks_frames_for_per_frame_styles(self):
+        """Test styles without a block renderer still return one (N, H, W, 3) array."""
+        from src.core.audio_visualizer import AudioVisualizer
+        from src.utils.audio_features import FrameFeatureTable
+
+        table = FrameFeatureTable.from_arrays(22050, 30, np.full((6, 3 + 64), 0.2, dtype=np.float32))
+        viz = AudioVisualizer({"video": {"resolution": [64, 48], "fps": 30}, "visualization": {"style": "circular"}})
+
+        assert viz._block_renderer(table) is None
+        assert viz.render_batch(table, 1, 4).shape == (3, 48, 64, 3)
+
+
+class TestVisualizationSegments:
+    """Test start/end segments and parallel segment encodes."""
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize(
+        "viz_settings",
+        [
+            {"style": "waveform"},
+            {"style": "spectrum", "spectrum_normalization": "lookahead", "elide_silence": True,
+             "silence_threshold_db": -40},
+            {"style": "circular", "elide_silence": True, "silence_threshold_db": -40},
+            {"style": "particles", "particles": {"count": 40, "seed": 5}},
+        ],
+    )
+    def test_generate_visualization_segment_matches_full_render(self, tmp_path, viz_settings, feature_table):
+        """Test a start/end segment renders exactly the matching frames of a full render."""
+        from src.core.audio_visualizer import AudioVisualizer
+
+        table = feature_table(30, seed=8, quiet=range(8, 14))  # Quiet run straddling the segment start
+        config = {"video": {"resolution": [96, 54], "fps": 30},
+                  "visualization": {**viz_settings, "render_batch_frames": 4}}
+
+        def render(start=None, end=None):
+            viz = AudioVisualizer(config)
+            streamed = {}
+
+            def collect(frame_generator, audio_path, output_path, duration, audio_offset=0.0, input_fps=None,
+                        compose=None):
+                items = [np.array(item) for item in frame_generator]
+                streamed["frames"] = np.concatenate([item if item.ndim == 4 else item[np.newaxis] for item in items])
+                streamed["duration"], streamed["offset"] = duration, audio_offset
+                return output_path
+
+            with (
+                patch.object(viz, "_get_audio_duration_ffmpeg", return_value=1.0),
+                patch.object(viz, "_extract_frame_features", return_value=table),
+                patch.object(viz, "_stream_frames_to_video", side_effect=collect),
+            ):
+                viz.generate_visualization(tmp_path / "audio.wav", tmp_path / "out.mp4", start=start, end=end)
+            return streamed
+
+        full = render()
+        segment = render(start=0.35, end=0.7)
+
+        assert len(full["frames"]) == 30
+        assert np.array_equal(segment["frames"], full["frames"][10:21])
+        assert segment["offset"] == pytest.approx(10 / 30)
+        assert segment["duration"] == pytest.approx(11 / 30)
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_generate_visualization_encodes_segments_in_parallel(self, tmp_path, workers, feature_table):
+        """Test encode_segments > 1 streams keyframe-aligned video-only parts that join into the full render."""
+        from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+        from src.core.audio_visualizer import AudioVisualizer
+        from src.utils.audio_features import FrameFeatureTable
+
+        table = feature_table(900, seed=9)
+
+        pools, process_pools, saves = [], [], []
+
+        def thread_pool(max_workers):
+            pools.append(max_workers)
+            return ThreadPoolExecutor(max_workers=max_workers)
+
+        def process_pool(max_workers, **kwargs):
+            process_pools.append(max_workers)
+            return ProcessPoolExecutor(max_workers=max_workers, **kwargs)
+
+        save = FrameFeatureTable.save
+
+        def counting_save(self, directory):
+            saves.append(directory)
+            save(self, directory)
+
+        def render(encode_segments):
+            config = {"video": {"resolution": [32, 18], "fps": 30, "encode_segments": encode_segments},
+                      "visualization": {"style": "spectrum", "render_batch_frames": 4, "workers": workers}}
+            viz = AudioVisualizer(config)
+            streamed = {}
+
+            def collect(self, frame_generator, audio_path, output_path, duration, audio_offset=0.0, mux_audio=True,
+                        input_fps=None, compose=None):
+                items = [np.array(item) for item in frame_generator]
+                streamed[output_path.name] = (np.concatenate([item if item.ndim == 4 else item[np.newaxis]
+                                                              for item in items]), duration, mux_audio,
+                                           self.frame_queue_mb)
+                return output_path
+
+            with (
+                patch.object(AudioVisualizer, "_get_audio_duration_ffmpeg", return_value=30.0),
+                patch.object(AudioVisualizer, "_extract_frame_features", return_value=table),
+                patch.object(AudioVisualizer, "_stream_frames_to_video", collect),
+                patch("src.core.audio_visualizer.concat_segments") as mock_concat,
+                patch("concurrent.futures.ThreadPoolExecutor", side_effect=thread_pool),
+                patch("concurrent.futures.ProcessPoolExecutor", side_effect=process_pool),
+                patch.object(FrameFeatureTable, "save", counting_save),
+            ):
+                viz.generate_visualization(tmp_path / "audio.wav", tmp_path / "out.mp4")
+            return streamed, mock_concat
+
+        full, _ = render(1)
+        process_pools.clear()
+        saves.clear()
+        parts, mock_concat = render(3)
+
+        # Every segment encodes at once, whatever the render worker count
+        assert pools == [3]
+        # With workers > 1 the segments share one render pool over one saved table
+        assert process_pools == ([workers] if workers > 1 else [])
+        assert len(saves) == (1 if workers > 1 else 0)
+
+        assert sorted(parts) == ["segment_000.mp4", "segment_001.mp4", "segment_002.mp4"]
+        assert all(not mux_audio and duration == pytest.approx(10.0) for _, duration, mux_audio, _ in parts.values())
+        # The three concurrent encoders share one frame queue budget
+        assert full["out.mp4"][3] == 256
+        assert all(queue_mb == pytest.approx(256 / 3) for *_, queue_mb in parts.values())
+        joined = np.concatenate([parts[name][0] for name in sorted(parts)])
+        assert np.array_equal(joined, full["out.mp4"][0])
+        segment_paths, output_path, audio_path = mock_concat.call_args[0]
+        assert [path.name for path in segment_paths] == sorted(parts)
+        assert output_path == tmp_path / "out.mp4" and audio_path == tmp_path / "audio.wav"
+
+    @pytest.mark.unit
+    def test_segment_encodes_skip_nvenc(self, tmp_path, test_config_visualization):
+        """Test a video-only segment stream encodes with libx264 even when NVENC is available."""
+        from src.core.audio_visualizer import AudioVisualizer
+
+        viz = AudioVisualizer(test_config_visualization)
+        frames = (np.zeros((18, 32, 3), dtype=np.uint8) for _ in range(3))
+        process = _PipeProcess()
+
+        with (
+            patch("src.utils.gpu_utils.get_gpu_manager") as mock_gpu_manager,
+            patch("src.core.audio_visualizer.subprocess.run") as mock_run,
+            patch("src.core.audio_visualizer.subprocess.Popen", side_effect=lambda cmd, **kwargs: process.launch(cmd)),
+            patch("src.utils.file_monitor.FileMonitor") as mock_monitor_class,
+            patch("src.utils.ram_monitor.RAMMonitor") as mock_ram_monitor_class,
+        ):
+            mock_gpu_manager.return_value.gpu_available = True
+            mock_run.return_value.stdout = "h264_nvenc"
+            mock_monitor_class.return_value.get_current_size_mb.return_value = 0.0
+            mock_ram_monitor_class.return_value.check_ram_limit.return_value = (False, None)
+            viz._stream_frames_to_video(frames, tmp_path / "audio.mp3", tmp_path / "segment_000.mp4", 0.1,
+                                        mux_audio=False)
+
+        assert process.cmd[process.cmd.index("-c:v") + 1] == "libx264"
+        assert "-an" in process.cmd
+
+    @pytest.mark.unit
+    def test_generate_visualization_rejects_empty_segment(self, tmp_path):
+        """Test a segment outside the audio raises instead of encoding nothing."""
+        from src.core.audio_visualizer import AudioVisualizer
+        from src.utils.audio_features import FrameFeatureTable
+
+        viz = AudioVisualizer({"video": {"resolution": [64, 48], "fps": 30}, "visualization": {"style": "waveform"}})
+        table = FrameFeatureTable.from_arrays(22050, 30, np.zeros((30, 3 + 64), dtype=np.float32))
+
+        with (
+            patch.object(viz, "_get_audio_duration_ffmpeg", return_value=1.0),
+            patch.object(viz, "_extract_frame_features", return_value=table),
+            patch.object(viz, "_stream_frames_to_video") as mock_stream,
+            pytest.raises(ValueError, match="segment"),
+        ):
+            viz.generate_visualization(tmp_path / "audio.wav", tmp_path / "out.mp4", start=2.0, end=3.0)
+        mock_stream.assert_not_called()
+
+
+class TestFrameStreaming:
+    """Test the frame pipeline into the FFmpeg pipe."""
+
+    @pytest.mark.unit
+    def test_stream_frames_to_video_writes_frames_in_order(self, tmp_path, test_config_visualization):
+        """Test the writer thread delivers every frame, in order, through a small byte-bounded queue."""
+        from src.core.audio_visualizer import AudioVisualizer
+
+        test_config_visualization["visualization"]["frame_queue_mb"] = 0.001
+        test_config_visualization["visualization"]["pipe_format"] = "rgb24"
+        viz = AudioVisualizer(test_config_visualization)
+        frames = [np.full((4, 4, 3), i, dtype=np.uint8) for i in range(50)]
+
+        process = _stream_with_pipe(viz, iter(frames), tmp_path)
+
+        assert process.written == [frame.tobytes() for frame in frames]
+        process.stdin.close.assert_called()
+        assert "-ss" not in process.cmd
+
+    @pytest.mark.unit
+    def test_stream_frames_to_video_seeks_audio_for_segments(self, tmp_path, test_config_visualization):
+        """Test a segment's audio input starts at the segment's first frame."""
+        from src.core.audio_visualizer import AudioVisualizer
+
+        test_config_visualization["visualization"]["pipe_format"] = "rgb24"
+        viz = AudioVisualizer(test_config_visualization)
+        frames = [np.zeros((4, 4, 3), dtype=np.uint8) for _ in range(3)]
+
+        process = _stream_with_pipe(viz, iter(frames), tmp_path, duration=0.1, audio_offset=12.5)
+
+        audio = process.cmd.index(str(tmp_path / "audio.mp3"))
+        assert process.cmd[audio - 3:audio] == ["-ss", "12.500000", "-i"]
+
+    @pytest.mark.unit
+    def test_stream_frames_to_video_duplicates_frames_piped_below_video_fps(self, tmp_path, test_config_visualization):
+        """Test frames piped at render_fps are read at that rate and written at the video rate."""
+        from src.core.audio_visualizer import AudioVisualizer
+
+        test_config_visualization["visualization"]["pipe_format"] = "rgb24"
+        viz = AudioVisualizer(test_config_visualization)
+        frames = [np.zeros((4, 4, 3), dtype=np.uint8) for _ in range(3)]
+
+        process = _stream_with_pipe(viz, iter(frames), tmp_path, duration=0.2, input_fps=15)
+
+        stdin = process.cmd.index("-")
+        assert process.cmd[stdin - 3:stdin] == ["-r", "15", "-i"]
+        assert process.cmd[process.cmd.index("-r", stdin) + 1] == str(viz.fps)
+
+    @pytest.mark.unit
+    def test_stream_frames_to_video_pipes_into_compose_command(self, tmp_path, test_config_visualization):
+        """Test single-pass composition streams the frames into the caller's command, colorizing gray in its graph."""
+        from src.core.audio_visualizer import AudioVisualizer
+
+        test_config_visualization["video"]["resolution"] = [4, 4]
+        test_config_visualization["visualization"].update({"style": "waveform", "primary_color": [0, 255, 0]})
+        viz = AudioVisualizer(test_config_visualization)
+        frames = [np.full((4, 4, 3), (0, 255, 0), dtype=np.uint8) for _ in range(3)]
+        composed = {}
+
+        def compose(pipe_input, pipe_chain):
+            composed["input"], composed["chain"] = pipe_input, pipe_chain
+            return ["ffmpeg", *pipe_input, "-filter_complex", f"[0:v]{pipe_chain}[out]", str(tmp_path / "out.mp4")]
+
+        process = _stream_with_pipe(viz, iter(frames), tmp_path, duration=0.1, compose=compose)
+
+        assert process.cmd[-1] == str(tmp_path / "out.mp4")
+        assert composed["input"][-2:] == ["-i", "-"] and "gray" in composed["input"]
+        assert composed["chain"].startswith("format=rgb24,lutrgb=")
+        assert str(tmp_path / "audio.mp3") not in process.cmd
+        assert len(b"".join(process.written)) == 3 * 16
+
+    @pytest.mark.unit
+    def test_stream_frames_to_video_recycles_frame_buffers(self, tmp_path, test_config_visualization):
+        """Test streamed renders draw into a small ring of pooled buffers without changing the output."""
+        from src.core.audio_visualizer import AudioVisualizer
+
+        test_config_visualization["video"]["resolution"] = [64, 48]
+        test_config_visualization["visualization"]["style"] = "particles"
+        test_config_visualization["visualization"]["particles"] = {"count": 50, "seed": 11}
+        test_config_visualization["visualization"]["frame_queue_mb"] = 0.02  # Two frames
+        test_config_visualization["visualization"]["pipe_format"] = "rgb24"
+        viz = AudioVisualizer(test_config_visualization)
+        amplitudes = np.linspace(0.0, 0.5, 40)
+        expected = [frame.tobytes() for frame in viz._render_particle_frames(amplitudes)]
+
+        process = _stream_with_pipe(viz, viz._render_particle_frames(amplitudes), tmp_path)
+
+        assert process.written == expected
+        stats = viz.stream_stats
+        assert stats["frames"] == 40
+        assert stats["pool_buffers"] + stats["transient_allocations"] + stats["reuses"] == 40
+        assert stats["pool_buffers"] <= 4  # Queue capacity plus the render/write spares
+        assert stats["reuses"] > 0
+        assert viz._frame_pool is None
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("pipe_format", ["rgb24", "gray", "yuv420p"])
+    def test_stream_frames_to_video_writes_each_block_in_one_call(self, tmp_path, pipe_format):
+        """Test render_batch blocks reach the pipe as one write each, with throughput reported."""
+        from src.core import audio_visualizer
+        from src.core.audio_visualizer import AudioVisualizer
+        from src.utils.audio_features import FrameFeatureTable
+
+        if not audio_visualizer.OPENCV_AVAILABLE:
+            pytest.skip("OpenCV not available")
+
+        frames = np.random.default_rng(4).uniform(-0.4, 0.4, (10, 3 + 64)).astype(np.float32)
+        table = FrameFeatureTable.from_arrays(22050, 30, np.abs(frames))
+        config = {
+            "video": {"resolution": [64, 48], "fps": 30},
+            "visualization": {"style": "waveform", "primary_color": [0, 255, 0], "pipe_format": pipe_format,
+                              "render_batch_frames": 4},
+        }
+        viz = AudioVisualizer(config)
+        convert = viz._pipe_converter(pipe_format, 64, 48)
+        render = AudioVisualizer(config)._frame_renderer(table)
+        expected = b"".join(convert(render(i)).tobytes() for i in range(len(table)))
+
+        viz._stream_block_frames = 4
+        blocks = viz._generate_frame_blocks(viz._block_renderer(table), len(table), 4)
+        process = _stream_with_pipe(viz, blocks, tmp_path)
+
+        assert len(process.written) == 3
+        assert b"".join(process.written) == expected
+        assert viz.stream_stats["frames"] == 10
+        assert viz.stream_stats["block_frames"] == 4
+        assert viz.stream_stats["fps"] > 0
+
+    @pytest.mark.unit
+    def test_stream_frames_to_video_stall_watchdog(self, tmp_path, test_config_visualization, monkeypatch):
+        """Test a generator that stops producing is aborted by the progress watchdog."""
+        import src.core.audio_visualizer as audio_visualizer
+        from src.core.audio_visualizer import AudioVisualizer
+
+        monkeypatch.setattr(audio_visualizer, "FRAME_STALL_TIMEOUT", 0.3)
+        monkeypatch.setattr(audio_visualizer, "WATCHDOG_INTERVAL", 0.05)
+        release = threading.Event()
+
+        def stalling_frames():
+            yield np.zeros((4, 4, 3), dtype=np.uint8)
+            release.wait(timeout=10)
+            yield np.zeros((4, 4, 3), dtype=np.uint8)
+
+        viz = AudioVisualizer(test_config_visualization)
+        try:
+            with pytest.raises(Exception, match="stalled"):
+                _stream_with_pipe(viz, stalling_frames(), tmp_path)
+        finally:
+            release.set()
+
+
+class TestRenderFps:
+    """Test rendering below the video frame rate."""
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("style", ["spectrum", "waveform", "circular", "particles"])
+    @pytest.mark.parametrize("method", ["blend", "duplicate"])
+    def test_render_fps_retimes_rendered_frames(self, style, method, feature_table):
+        """Test render_fps draws every other frame and blends or repeats them up to the video rate."""
+        from src.core.audio_visualizer import AudioVisualizer
+
+        table = feature_table(31, seed=12)
+        viz = AudioVisualizer({"video": {"resolution": [96, 54], "fps": 30},
+                               "visualization": {"style": style, "render_fps": 15, "render_fps_method": method,
+                                                 "particles": {"count": 40, "seed": 3}}})
+
+        full = [np.array(frame) for frame in viz._generate_output_range(table, 0, 31, 4)]
+        segment = [np.array(frame) for frame in viz._generate_output_range(table, 7, 20, 4)]
+        rendered = viz.render_batch(table.resample(15))
+
+        assert len(full) == 31 and len(rendered) == 16
+        assert all(np.array_equal(a, b) for a, b in zip(segment, full[7:20], strict=True))
+        assert np.array_equal(full[4], rendered[2])
+        if method == "duplicate":
+            assert np.array_equal(full[5], rendered[2])
+        else:
+            midpoint = (rendered[2].astype(np.float32) + rendered[3]) / 2
+            assert np.abs(full[5] - midpoint).max() <= 1
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("style,input_fps,streamed", [("particles", 15, 16), ("spectrum", None, 31)])
+    def test_generate_visualization_render_fps_streams_per_method(self, tmp_path, style, input_fps, streamed,
+                                                                  feature_table):
+        """Test full renders at render_fps leave duplication to FFmpeg and blend in Python otherwise."""
+        from src.core.audio_visualizer import AudioVisualizer
+
+        table = feature_table(31, seed=13)
+        viz = AudioVisualizer({"video": {"resolution": [32, 18], "fps": 30},
+                               "visualization": {"style": style, "render_fps": 15, "particles": {"seed": 1}}})
+
+        with (
+            patch.object(viz, "_get_audio_duration_ffmpeg", return_value=31 / 30),
+            patch.object(viz, "_extract_frame_features", return_value=table),
+            patch.object(viz, "_stream_frames_to_video") as mock_stream,
+        ):
+            viz.generate_visualization(tmp_path / "audio.wav", tmp_path / "out.mp4")
+
+        items = list(mock_stream.call_args[0][0])
+        assert sum(len(item) if item.ndim == 4 else 1 for item in items) == streamed
+        assert mock_stream.call_args.kwargs["input_fps"] == input_fps
+
+
+class TestPipeFormat:
+    """Test the pixel formats piped to FFmpeg."""
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize(
+        "viz_settings, expected",
+        [
+            ({"style": "waveform", "primary_color": [0, 255, 0]}, "gray"),
+            ({"style": "waveform", "waveform": {"line_colors": [[0, 255, 0], [255, 0, 0]], "num_lines": 2}}, "yuv420p"),
+            ({"style": "circular", "background_color": [0, 0, 0]}, "yuv420p"),
+            ({"style": "circular", "primary_color": [9, 9, 9], "secondary_color": [9, 9, 9],
+              "background_color": [0, 0, 0]}, "gray"),
+            ({"style": "particles", "primary_color": [9, 9, 9], "secondary_color": [9, 9, 9]}, "yuv420p"),
+            ({"style": "spectrum", "pipe_format": "gray"}, "yuv420p"),
+            ({"style": "spectrum", "pipe_format": "rgba"}, "rgba"),
+        ],
+    )
+    def test_pipe_format_matches_style_colors(self, test_config_visualization, viz_settings, expected):
+        """Test auto picks a gray mask for single-color styles on black and yuv420p otherwise."""
+        from src.core.audio_visualizer import AudioVisualizer
+
+        test_config_visualization["visualization"].update(viz_settings)
+        viz = AudioVisualizer(test_config_visualization)
+
+        assert viz._resolve_pipe_format(64, 48) == expected
+        assert viz._resolve_pipe_format(63, 48) == ("rgb24" if expected == "yuv420p" else expected)
+
+    @pytest.mark.unit
+    def test_use_alpha_layer_streams_rgba(self, test_config_visualization):
+        """Test an alpha layer pipes straight-alpha rgba whatever pipe_format auto would pick."""
+        from src.core import audio_visualizer
+        from src.core.audio_visualizer import AudioVisualizer
+
+        test_config_visualization["visualization"].update({"style": "waveform", "primary_color": [0, 255, 0]})
+        viz = AudioVisualizer(test_config_visualization)
+
+        assert viz.use_alpha_layer() is audio_visualizer.OPENCV_AVAILABLE
+        assert viz._resolve_pipe_format(63, 48) == ("rgba" if audio_visualizer.OPENCV_AVAILABLE else "rgb24")
+
+    @pytest.mark.unit
+    def test_pipe_converters_preserve_frame_content(self, test_config_visualization):
+        """Test the gray mask recolors to the rendered frame and yuv420p/rgba keep their layouts."""
+        from src.core.audio_visualizer import AudioVisualizer
+
+        test_config_visualization["visualization"]["primary_color"] = [40, 200, 120]
+        viz = AudioVisualizer(test_config_visualization)
+        coverage = np.linspace(0.0, 1.0, 48 * 64).reshape(48, 64, 1)
+        frame = np.round(coverage * np.array([40, 200, 120])).astype(np.uint8)
+
+        mask = viz._pipe_converter("gray", 64, 48)(frame)
+        recolored = np.round(mask[:, :, np.newaxis].astype(np.float64) * np.array([40, 200, 120]) / 255)
+        assert mask.shape == (48, 64)
+        assert np.abs(recolored - frame).max() <= 1
+
+        assert viz._pipe_converter("yuv420p", 64, 48)(frame).shape == (72, 64)
+
+        rgba = viz._pipe_converter("rgba", 64, 48)(frame)
+        assert rgba.shape == (48, 64, 4)
+        assert rgba[0, 0, 3] == 0 and rgba[-1, -1, 3] == 255
+        assert tuple(rgba[-1, -1, :3]) == (40, 200, 120)
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("pipe_format", ["gray", "rgba"])
+    def test_pipe_converters_build_the_mask_once(self, pipe_format, test_config_visualization):
+        """Test the mask color and LUT are built once per converter and outputs reuse one buffer."""
+        from src.core import audio_visualizer
+        from src.core.audio_visualizer import AudioVisualizer
+
+        if not audio_visualizer.OPENCV_AVAILABLE:
+            pytest.skip("OpenCV not available")
+
+        test_config_visualization["visualization"]["primary_color"] = [40, 200, 120]
+        viz = AudioVisualizer(test_config_visualization)
+        frames = np.random.default_rng(5).integers(0, 2, (4, 48, 64, 1)) * np.array([40, 200, 120], dtype=np.uint8)
+
+        with patch.object(viz, "_mask_color", wraps=viz._mask_color) as mask_color:
+            convert = viz._pipe_converter(pipe_format, 64, 48)
+            outputs = [convert(frame.astype(np.uint8)) for frame in frames]
+            expected = AudioVisualizer(test_config_visualization)._pipe_converter(pipe_format, 64, 48)(
+                frames[-1].astype(np.uint8)
+            )
+
+        assert mask_color.call_count == 1
+        assert all(out is outputs[0] for out in outputs)
+        assert np.array_equal(outputs[-1], expected)
+
+    @pytest.mark.unit
+    def test_stream_frames_to_video_pipes_gray_mask(self, tmp_path, test_config_visualization):
+        """Test single-color frames go down the pipe as one byte per pixel plus a colorizing filter."""
+        from src.core.audio_visualizer import AudioVisualizer
+
+        test_config_visualization["video"]["resolution"] = [8, 6]
+        test_config_visualization["visualization"]["primary_color"] = [0, 255, 0]
+        viz = AudioVisualizer(test_config_visualization)
+        frames = [np.zeros((6, 8, 3), dtype=np.uint8) for _ in range(3)]
+        frames[1][:, :, 1] = 200
+
+        process = _stream_with_pipe(viz, iter(frames), tmp_path)
+
+        assert process.written == [frame[:, :, 1].tobytes() for frame in frames]
+        assert process.cmd[process.cmd.index("-pix_fmt") + 1] == "gray"
+        assert "format=rgb24,lutrgb=r=0:g=val:b=0" in process.cmd
+
+
+class TestVariants:
+    """Test rendering many variants from one analysis."""
+
+    @pytest.mark.unit
+    def test_generate_variants_renders_every_variant_from_one_analysis(self, tmp_path, feature_table):
+        """Test variants share one feature extraction and each encoder gets that variant's frames."""
+        from src.core.audio_visualizer import AudioVisualizer
+
+        table = feature_table(6, seed=2)
+        viz = AudioVisualizer({
+            "video": {"resolution": [64, 48], "fps": 30},
+            "visualization": {"style": "waveform", "pipe_format": "rgb24", "waveform": {"position": "bottom"}},
+        })
+        variants = {
+            "top": {"waveform": {"position": "top"}},
+            "rings": {"style": "circular", "blur": 1},
+            "bars": {"style": "spectrum"},
+        }
+        processes = {}
+
+        def launch(cmd, **kwargs):
+            processes[Path(cmd[-1]).stem] = _PipeProcess().launch(cmd)
+            return processes[Path(cmd[-1]).stem]
+
+        with (
+            patch.object(AudioVisualizer, "_get_audio_duration_ffmpeg", return_value=0.2),
+            patch.object(AudioVisualizer, "_extract_frame_features", return_value=table) as mock_extract,
+            patch("src.core.audio_visualizer.subprocess.run") as mock_run,
+            patch("src.core.audio_visualizer.subprocess.Popen", side_effect=launch),
+            patch("src.utils.file_monitor.FileMonitor") as mock_monitor_class,
+            patch("src.utils.ram_monitor.RAMMonitor") as mock_ram_monitor_class,
+        ):
+            mock_run.return_value.stdout = ""
+            mock_monitor_class.return_value.get_current_size_mb.return_value = 0.0
+            mock_ram_monitor_class.return_value.check_ram_limit.return_value = (False, None)
+            outputs = viz.generate_variants(tmp_path / "audio.mp3", variants, tmp_path)
+
+        mock_extract.assert_called_once()
+        assert outputs == {name: tmp_path / f"{name}.mp4" for name in variants}
+        for name, overrides in variants.items():
+            variant = AudioVisualizer(viz._variant_config(overrides))
+            render = variant._frame_renderer(table)
+            assert b"".join(processes[name].written) == b"".join(render(i).tobytes() for i in range(len(table)))
+        assert viz._variant_config(variants["top"])["visualization"]["waveform"] == {"position": "top"}
+
+    @pytest.mark.unit
+    def test_generate_variants_writes_rgba_variants_to_mov(self, tmp_path):
+        """Test a variant piped as rgba gets a .mov output like generate_visualization's segments."""
+        from src.core import audio_visualizer
+        from src.core.audio_visualizer import AudioVisualizer
+        from src.utils.audio_features import FrameFeatureTable
+
+        if not audio_visualizer.OPENCV_AVAILABLE:
+            pytest.skip("OpenCV not available")
+
+        table = FrameFeatureTable.from_arrays(22050, 30, np.full((4, 3 + 64), 0.2, dtype=np.float32))
+        viz = AudioVisualizer({"video": {"resolution": [32, 18], "fps": 30},
+                               "visualization": {"style": "waveform", "pipe_format": "rgb24"}})
+
+        outputs, processes = _variant_processes(viz, table, {"alpha": {"pipe_format": "rgba"}, "plain": {}}, tmp_path)
+
+        assert outputs == {"alpha": tmp_path / "alpha.mov", "plain": tmp_path / "plain.mp4"}
+        alpha = processes["alpha.mov"]
+        assert alpha.cmd[alpha.cmd.index("-pix_fmt") + 1] == "rgba"
+        assert len(b"".join(alpha.written)) == 4 * 18 * 32 * 4
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("style,input_fps", [("spectrum", None), ("particles", 15)])
+    def test_generate_variants_render_fps_matches_generate_visualization(self, tmp_path, style, input_fps,
+                                                                         feature_table):
+        """Test a render_fps variant streams the frames generate_visualization streams, retimed the same way."""
+        from src.core.audio_visualizer import AudioVisualizer
+
+        table = feature_table(31, seed=14)
+        viz = AudioVisualizer({"video": {"resolution": [32, 18], "fps": 30},
+                               "visualization": {"style": "waveform", "pipe_format": "rgb24"}})
+        overrides = {"style": style, "render_fps": 15, "particles": {"seed": 6}}
+
+        _, processes = _variant_processes(viz, table, {"slow": overrides}, tmp_path)
+
+        single = AudioVisualizer(viz._variant_config(overrides))
+        with (
+            patch.object(single, "_get_audio_duration_ffmpeg", return_value=31 / 30),
+            patch.object(single, "_extract_frame_features", return_value=table),
+            patch.object(single, "_stream_frames_to_video") as mock_stream,
+        ):
+            single.generate_visualization(tmp_path / "audio.mp3", tmp_path / "single.mp4")
+        expected = b"".join(np.ascontiguousarray(item).tobytes() for item in mock_stream.call_args[0][0])
+
+        process = processes["slow.mp4"]
+        assert b"".join(process.written) == expected
+        stdin = process.cmd.index("-")
+        assert (process.cmd[stdin - 3:stdin] == ["-r", "15", "-i"]) == (input_fps is not None)
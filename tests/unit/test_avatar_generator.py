@@ -1272,9 +1272,9 @@ class TestAvatarGeneratorUncoveredMethods:
         audio_path = temp_dir / "audio.mp3"
         audio_path.write_bytes(b"mp3")
 
-        with patch("src.core.avatar_generator.subprocess.run") as mock_run:
+        with patch("src.utils.media_probe.subprocess.run") as mock_run:
             mock_run.return_value.returncode = 0
-            mock_run.return_value.stdout = "10.5\n"
+            mock_run.return_value.stdout = '{"format": {"duration": "10.5"}}'
             duration = generator._get_audio_duration_ffmpeg(audio_path)
 
         assert duration == 10.5
@@ -1290,7 +1290,7 @@ class TestAvatarGeneratorUncoveredMethods:
         audio_path = temp_dir / "audio.mp3"
         audio_path.write_bytes(b"mp3")
 
-        with patch("src.core.avatar_generator.subprocess.run", side_effect=FileNotFoundError("ffprobe not found")):
+        with patch("src.utils.media_probe.subprocess.run", side_effect=FileNotFoundError("ffprobe not found")):
             duration = generator._get_audio_duration_ffmpeg(audio_path)
 
         assert duration is None
@@ -1307,7 +1307,7 @@ class TestAvatarGeneratorUncoveredMethods:
         audio_path = temp_dir / "audio.mp3"
         audio_path.write_bytes(b"mp3")
 
-        with patch("src.core.avatar_generator.subprocess.run", side_effect=subprocess.TimeoutExpired("ffprobe", 10)):
+        with patch("src.utils.media_probe.subprocess.run", side_effect=subprocess.TimeoutExpired("ffprobe", 10)):
             duration = generator._get_audio_duration_ffmpeg(audio_path)
 
         assert duration is None
@@ -1481,7 +1481,7 @@ def test_generate_sadtalker_subprocess_failure(tmp_path, test_config, stub_torch
 
     with (
         patch("src.core.avatar_generator.Path.exists", return_value=True),
-        patch("src.core.avatar_generator.subprocess.run") as mock_run,
+        patch("subprocess.run") as mock_run,
         patch.object(AvatarGenerator, "_create_fallback_video", return_value=output_path) as mock_fallback,
     ):
         mock_result = MagicMock()
@@ -1538,7 +1538,7 @@ def test_generate_wav2lip_subprocess_failure(tmp_path, test_config, stub_torch_i
     audio_path.write_bytes(b"mp3" * 100)
 
     with (
-        patch("src.core.avatar_generator.subprocess.run") as mock_run,
+        patch("subprocess.run") as mock_run,
         patch.object(AvatarGenerator, "_create_fallback_video", return_value=output_path) as mock_fallback,
     ):
         mock_result = MagicMock()
@@ -1618,11 +1618,11 @@ def test_generate_wav2lip_audio_file_not_found(tmp_path, test_config, stub_torch
     with (
         patch.object(AvatarGenerator, "_detect_face_with_landmarks", return_value=(10, 100, 10, 100)),
         patch.object(AvatarGenerator, "_create_wav2lip_inference_script", return_value=tmp_path / "script.py"),
-        patch("src.core.avatar_generator.subprocess.run") as mock_run,
+        patch("subprocess.run") as mock_run,
         patch("builtins.print"),
     ):
         # Mock the subprocess.run for audio duration check
-        mock_run.return_value.stdout = "1.0"
+        mock_run.return_value.stdout = '{"format": {"duration": "1.0"}}'
         mock_run.return_value.returncode = 0
         
         # Mock os.chdir to avoid actual directory changes
@@ -1669,13 +1669,13 @@ def test_generate_wav2lip_timeout_expired(tmp_path, test_config, stub_torch_if_n
         patch.object(AvatarGenerator, "_detect_face_with_landmarks", return_value=(10, 100, 10, 100)),
         patch.object(AvatarGenerator, "_create_wav2lip_inference_script", return_value=tmp_path / "script.py"),
         patch.object(AvatarGenerator, "_create_fallback_video", return_value=output_path) as mock_fallback,
-        patch("src.core.avatar_generator.subprocess.run") as mock_run,
-        patch("src.core.avatar_generator.subprocess.Popen", return_value=TimeoutProcess()),
+        patch("subprocess.run") as mock_run,
+        patch("subprocess.Popen", return_value=TimeoutProcess()),
         patch("src.utils.file_monitor.FileMonitor") as mock_monitor_class,
         patch("builtins.print"),
     ):
         # Mock audio duration check
-        mock_run.return_value.stdout = "1.0"
+        mock_run.return_value.stdout = '{"format": {"duration": "1.0"}}'
         mock_run.return_value.returncode = 0
         
         mock_monitor = MagicMock()
@@ -1728,13 +1728,13 @@ def test_generate_wav2lip_non_zero_returncode(tmp_path, test_config, stub_torch_
         patch.object(AvatarGenerator, "_detect_face_with_landmarks", return_value=(10, 100, 10, 100)),
         patch.object(AvatarGenerator, "_create_wav2lip_inference_script", return_value=tmp_path / "script.py"),
         patch.object(AvatarGenerator, "_create_fallback_video", return_value=output_path) as mock_fallback,
-        patch("src.core.avatar_generator.subprocess.run") as mock_run,
-        patch("src.core.avatar_generator.subprocess.Popen", return_value=FailedProcess()),
+        patch("subprocess.run") as mock_run,
+        patch("subprocess.Popen", return_value=FailedProcess()),
         patch("src.utils.file_monitor.FileMonitor") as mock_monitor_class,
         patch("builtins.print"),
     ):
         # Mock audio duration check
-        mock_run.return_value.stdout = "1.0"
+        mock_run.return_value.stdout = '{"format": {"duration": "1.0"}}'
         mock_run.return_value.returncode = 0
         
         mock_monitor = MagicMock()
@@ -1787,13 +1787,13 @@ def test_generate_wav2lip_zero_returncode_no_output(tmp_path, test_config, stub_
         patch.object(AvatarGenerator, "_detect_face_with_landmarks", return_value=(10, 100, 10, 100)),
         patch.object(AvatarGenerator, "_create_wav2lip_inference_script", return_value=tmp_path / "script.py"),
         patch.object(AvatarGenerator, "_create_fallback_video", return_value=output_path) as mock_fallback,
-        patch("src.core.avatar_generator.subprocess.run") as mock_run,
-        patch("src.core.avatar_generator.subprocess.Popen", return_value=SuccessProcess()),
+        patch("subprocess.run") as mock_run,
+        patch("subprocess.Popen", return_value=SuccessProcess()),
         patch("src.utils.file_monitor.FileMonitor") as mock_monitor_class,
         patch("builtins.print"),
     ):
         # Mock audio duration check
-        mock_run.return_value.stdout = "1.0"
+        mock_run.return_value.stdout = '{"format": {"duration": "1.0"}}'
         mock_run.return_value.returncode = 0
         
         mock_monitor = MagicMock()
@@ -1828,11 +1828,11 @@ def test_generate_wav2lip_exception_during_execution(tmp_path, test_config, stub
     with (
         patch.object(AvatarGenerator, "_detect_face_with_landmarks", return_value=(10, 100, 10, 100)),
         patch.object(AvatarGenerator, "_create_wav2lip_inference_script", side_effect=Exception("Script creation failed")),
-        patch("src.core.avatar_generator.subprocess.run") as mock_run,
+        patch("subprocess.run") as mock_run,
         patch("builtins.print"),
     ):
         # Mock audio duration check
-        mock_run.return_value.stdout = "1.0"
+        mock_run.return_value.stdout = '{"format": {"duration": "1.0"}}'
         mock_run.return_value.returncode = 0
         
         # Mock Path.exists to return False for script (so _create_wav2lip_inference_script is called)
@@ -1958,7 +1958,7 @@ class TestAvatarGeneratorAdditionalCoverage:
         audio_path = temp_dir / "audio.mp3"
         audio_path.write_bytes(b"mp3")
 
-        with patch("src.core.avatar_generator.subprocess.run") as mock_run:
+        with patch("subprocess.run") as mock_run:
             mock_run.return_value.returncode = 1
             mock_run.return_value.stdout = ""
             duration = generator._get_audio_duration_ffmpeg(audio_path)
@@ -1976,7 +1976,7 @@ class TestAvatarGeneratorAdditionalCoverage:
         audio_path = temp_dir / "audio.mp3"
         audio_path.write_bytes(b"mp3")
 
-        with patch("src.core.avatar_generator.subprocess.run") as mock_run:
+        with patch("subprocess.run") as mock_run:
             mock_run.return_value.returncode = 0
             mock_run.return_value.stdout = ""  # Empty stdout
             duration = generator._get_audio_duration_ffmpeg(audio_path)
@@ -1994,7 +1994,7 @@ class TestAvatarGeneratorAdditionalCoverage:
         audio_path = temp_dir / "audio.mp3"
         audio_path.write_bytes(b"mp3")
 
-        with patch("src.core.avatar_generator.subprocess.run") as mock_run:
+        with patch("subprocess.run") as mock_run:
             mock_run.return_value.returncode = 0
             mock_run.return_value.stdout = "invalid_number\n"
             duration = generator._get_audio_duration_ffmpeg(audio_path)
@@ -232,7 +232,7 @@ class TestAvatarGeneratorMissingPaths:
                 output_path = temp_dir / "output.mp4"
 
                 with patch("src.core.avatar_generator.Path.exists", return_value=True):
-                    with patch("src.core.avatar_generator.subprocess.run") as mock_run:
+                    with patch("subprocess.run") as mock_run:
                         # Mock subprocess failure
                         mock_result = MagicMock()
                         mock_result.returncode = 1
@@ -270,7 +270,7 @@ class TestAvatarGeneratorMissingPaths:
                 temp_result_dir.mkdir(exist_ok=True)
 
                 with patch("src.core.avatar_generator.Path.exists", return_value=True):
-                    with patch("src.core.avatar_generator.subprocess.run") as mock_run:
+                    with patch("subprocess.run") as mock_run:
                         # Mock subprocess success
                         mock_result = MagicMock()
                         mock_result.returncode = 0
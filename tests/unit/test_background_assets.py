@@ -0,0 +1,57 @@
+"""
+Tests for background images pre-rendered at the output resolution
+"""
+
+from unittest.mock import patch
+
+import pytest
+from PIL import Image
+
+from src.utils.background_assets import PAD_COLOR, fit_size, fitted_background
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("size,expected", [((1920, 1080), (853, 480)), ((1000, 1000), (480, 480)),
+                                           ((3000, 500), (854, 142)), ((854, 480), (854, 480))])
+def test_fit_size_keeps_aspect_ratio_inside_frame(size, expected):
+    assert fit_size(size, [854, 480]) == expected
+
+
+@pytest.mark.unit
+def test_fitted_background_pads_and_centers(tmp_path):
+    image = tmp_path / "square.png"
+    Image.new("RGB", (100, 100), (255, 0, 0)).save(image)
+
+    fitted = fitted_background(image, [160, 90], tmp_path / "cache")
+
+    with Image.open(fitted) as result:
+        assert result.size == (160, 90)
+        assert result.getpixel((0, 45)) == PAD_COLOR and result.getpixel((159, 45)) == PAD_COLOR
+        assert result.getpixel((80, 45)) == (255, 0, 0)
+    assert fitted.parent == tmp_path / "cache" / "backgrounds"
+
+
+@pytest.mark.unit
+def test_fitted_background_renders_once_per_content_and_resolution(tmp_path):
+    image = tmp_path / "bg.png"
+    Image.new("RGB", (320, 240), (10, 20, 30)).save(image)
+    cache = tmp_path / "cache"
+
+    first = fitted_background(image, [160, 90], cache)
+    with patch("src.utils.background_assets.Image.new") as mock_new:
+        assert fitted_background(image, [160, 90], cache) == first
+    mock_new.assert_not_called()
+
+    assert fitted_background(image, [128, 72], cache) != first
+    Image.new("RGB", (320, 240), (90, 20, 30)).save(image)
+    assert fitted_background(image, [160, 90], cache) != first
+    assert len(list((cache / "backgrounds").iterdir())) == 3
+
+
+@pytest.mark.unit
+def test_fitted_background_passes_through_frame_sized_images(tmp_path):
+    image = tmp_path / "bg.jpg"
+    Image.new("RGB", (160, 90)).save(image)
+
+    assert fitted_background(image, [160, 90], tmp_path / "cache") == image
+    assert not (tmp_path / "cache").exists()
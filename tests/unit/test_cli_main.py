@@ -903,6 +903,46 @@ def test_cli_create_with_avatar_visualize_background(tmp_path):
         avatar_instance.generate.assert_called_once()
 
 
+def test_cli_visualize_batch_renders_variants_file(tmp_path):
+    """Test visualize-batch hands every variant in the YAML file to one generate_variants call."""
+    audio = tmp_path / "episode.mp3"
+    audio.write_bytes(b"audio")
+    variants_file = tmp_path / "variants.yaml"
+    variants_file.write_text("bottom:\n  waveform: {position: bottom}\nrings:\n  style: circular\n")
+    out_dir = tmp_path / "sweep"
+
+    with (
+        patch("src.cli.main.load_config", return_value=make_cli_config(tmp_path)),
+        patch("src.core.audio_visualizer.AudioVisualizer") as mock_viz,
+    ):
+        mock_viz.return_value.generate_variants.return_value = {
+            "bottom": out_dir / "bottom.mp4", "rings": out_dir / "rings.mp4"
+        }
+        result = runner.invoke(app, ["visualize-batch", str(audio), str(variants_file), "-o", str(out_dir)])
+
+    assert result.exit_code == 0
+    mock_viz.return_value.generate_variants.assert_called_once_with(
+        audio, {"bottom": {"waveform": {"position": "bottom"}}, "rings": {"style": "circular"}}, out_dir
+    )
+
+
+def test_cli_visualize_batch_reports_failed_variant(tmp_path):
+    """Test a variant missing from the results makes visualize-batch exit non-zero."""
+    audio = tmp_path / "episode.mp3"
+    audio.write_bytes(b"audio")
+    variants_file = tmp_path / "variants.yaml"
+    variants_file.write_text("a: {style: spectrum}\nb: {style: circular}\n")
+
+    with (
+        patch("src.cli.main.load_config", return_value=make_cli_config(tmp_path)),
+        patch("src.core.audio_visualizer.AudioVisualizer") as mock_viz,
+    ):
+        mock_viz.return_value.generate_variants.return_value = {"a": tmp_path / "a.mp4"}
+        result = runner.invoke(app, ["visualize-batch", str(audio), str(variants_file), "-o", str(tmp_path)])
+
+    assert result.exit_code == 1
+
+
 def test_cli_list_without_database(tmp_path):
     """Test list command when database is not available."""
     with patch("src.cli.main.DATABASE_AVAILABLE", False):
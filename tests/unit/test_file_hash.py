@@ -0,0 +1,28 @@
+"""
+Tests for the shared file content hash
+"""
+
+import hashlib
+
+import pytest
+
+from src.utils.file_hash import CHUNK_BYTES, content_hash, update_with_file
+
+
+@pytest.mark.unit
+def test_content_hash_matches_md5_across_chunks(tmp_path):
+    data = bytes(range(256)) * (CHUNK_BYTES // 256 + 3)
+    path = tmp_path / "media.bin"
+    path.write_bytes(data)
+
+    assert content_hash(path) == hashlib.md5(data).hexdigest()
+
+
+@pytest.mark.unit
+def test_update_with_file_extends_an_existing_digest(tmp_path):
+    path = tmp_path / "still.png"
+    path.write_bytes(b"image bytes")
+
+    digest = update_with_file(hashlib.md5(b"prefix"), path)
+
+    assert digest.hexdigest() == hashlib.md5(b"prefiximage bytes").hexdigest()
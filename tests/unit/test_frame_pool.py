@@ -0,0 +1,46 @@
+"""
+Tests for the recycled frame buffer pool
+"""
+
+import numpy as np
+import pytest
+
+from src.utils.frame_pool import FramePool
+
+
+@pytest.mark.unit
+def test_released_buffers_are_reused():
+    pool = FramePool((4, 6, 3), capacity=2)
+    first = pool.acquire()
+    pool.release(first)
+    second = pool.acquire()
+
+    assert second is first
+    assert second.shape == (4, 6, 3) and second.dtype == np.uint8
+    assert pool.stats() == {"pool_buffers": 1, "transient_allocations": 0, "reuses": 1, "peak_in_use": 1}
+
+
+@pytest.mark.unit
+def test_exhausted_pool_hands_out_transient_buffers():
+    pool = FramePool((2, 2, 3), capacity=2)
+    held = [pool.acquire(), pool.acquire()]
+    extra = pool.acquire()
+
+    assert not pool.owns(extra)
+    assert all(pool.owns(frame) for frame in held)
+    pool.release(extra)  # Ignored: not a pooled buffer
+    assert pool.stats()["transient_allocations"] == 1
+    assert pool.stats()["peak_in_use"] == 2
+
+
+@pytest.mark.unit
+def test_foreign_and_repeated_releases_are_ignored():
+    pool = FramePool((2, 2, 3), capacity=2)
+    frame = pool.acquire()
+    pool.release(np.empty((2, 2, 3), dtype=np.uint8))
+    pool.release(frame)
+    pool.release(frame)
+
+    # A double release must not let two renders share one buffer
+    assert pool.acquire() is frame
+    assert pool.acquire() is not frame
@@ -0,0 +1,89 @@
+"""
+Tests for the byte-bounded blocking frame queue
+"""
+
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from src.utils.frame_queue import FrameQueue, FrameQueueAborted
+
+
+@pytest.mark.unit
+def test_frames_come_out_in_order_within_budget():
+    queue = FrameQueue(max_bytes=3000)
+    received = []
+
+    def consume():
+        while (frame := queue.get()) is not None:
+            received.append(int(frame[0]))
+
+    consumer = threading.Thread(target=consume)
+    consumer.start()
+    for i in range(100):
+        queue.put(np.full(1000, i, dtype=np.uint8))
+    queue.close()
+    consumer.join(timeout=5)
+
+    assert received == list(range(100))
+    assert queue.peak_bytes <= 3000
+
+
+@pytest.mark.unit
+def test_put_blocks_until_space_frees():
+    queue = FrameQueue(max_bytes=10)
+    queue.put(np.zeros(8, dtype=np.uint8))
+    done = threading.Event()
+
+    def produce():
+        queue.put(np.zeros(8, dtype=np.uint8))
+        done.set()
+
+    threading.Thread(target=produce, daemon=True).start()
+    time.sleep(0.1)
+    assert not done.is_set()
+
+    queue.get()
+    assert done.wait(timeout=2)
+
+
+@pytest.mark.unit
+def test_oversized_frame_passes_when_empty():
+    queue = FrameQueue(max_bytes=4)
+    queue.put(np.zeros(16, dtype=np.uint8))
+
+    assert len(queue) == 1
+    assert queue.nbytes == 16
+
+
+@pytest.mark.unit
+def test_abort_releases_blocked_callers():
+    queue = FrameQueue(max_bytes=10)
+    errors = []
+
+    def consume():
+        try:
+            queue.get()
+        except FrameQueueAborted as e:
+            errors.append(e)
+
+    consumer = threading.Thread(target=consume)
+    consumer.start()
+    queue.abort(RuntimeError("encoder died"))
+    consumer.join(timeout=2)
+
+    assert len(errors) == 1
+    with pytest.raises(FrameQueueAborted):
+        queue.put(np.zeros(1, dtype=np.uint8))
+
+
+@pytest.mark.unit
+def test_get_returns_none_after_close_and_drain():
+    queue = FrameQueue(max_bytes=10)
+    queue.put(np.ones(2, dtype=np.uint8))
+    queue.close()
+
+    assert queue.get() is not None
+    assert queue.get() is None
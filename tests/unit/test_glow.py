@@ -0,0 +1,55 @@
+"""
+Tests for the region-limited glow
+"""
+
+import numpy as np
+import pytest
+
+from src.utils import glow
+from src.utils.glow import apply_glow, glow_box
+
+cv2 = pytest.importorskip("cv2")
+
+
+def _figure(height=120, width=200):
+    frame = np.zeros((height, width, 3), dtype=np.uint8)
+    frame[50:70, 80:120] = (40, 220, 90)
+    return frame, (80, 50, 120, 70)
+
+
+@pytest.mark.unit
+def test_zero_blur_copies_without_filtering(monkeypatch):
+    frame, box = _figure()
+    monkeypatch.setattr(glow.cv2, "GaussianBlur", lambda *a, **k: pytest.fail("blur ran"))
+
+    result = apply_glow(frame, 0, box)
+
+    assert result is not frame and np.array_equal(result, frame)
+    assert apply_glow(frame, 0, box, out=frame) is frame
+
+
+@pytest.mark.unit
+def test_box_glow_matches_full_frame_blur():
+    frame, box = _figure()
+    expected = cv2.GaussianBlur(frame, (0, 0), sigmaX=2.5)
+
+    out = np.empty_like(frame)
+    result = apply_glow(frame, 2.5, box, out=out)
+
+    assert result is out
+    assert np.array_equal(result, expected)
+    assert glow_box(box, 2.5, 200, 120) == (69, 39, 131, 81)
+
+
+@pytest.mark.unit
+def test_large_radius_glow_is_downsampled_approximation(monkeypatch):
+    frame, box = _figure()
+    exact = cv2.GaussianBlur(frame, (0, 0), sigmaX=14, borderType=cv2.BORDER_REPLICATE)
+    sizes = []
+    resize = cv2.resize
+    monkeypatch.setattr(glow.cv2, "resize", lambda src, size, **k: sizes.append(size) or resize(src, size, **k))
+
+    result = apply_glow(frame, 14, box)
+
+    assert sizes and sizes[0][0] < frame.shape[1] // 2  # Blurred at reduced resolution
+    assert np.abs(result.astype(int) - exact.astype(int)).max() <= 3
@@ -0,0 +1,116 @@
+"""
+Tests for the cached JSON ffprobe service
+"""
+
+import json
+import subprocess
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.utils.media_probe import MediaProbe, ProbeError
+
+PROBE_JSON = json.dumps({
+    "format": {"format_name": "mov,mp4,m4a,3gp,3g2,mj2", "duration": "12.500000"},
+    "streams": [
+        {"codec_type": "video", "codec_name": "h264", "width": 1024, "height": 640, "duration": "12.5"},
+        {"codec_type": "audio", "codec_name": "aac", "sample_rate": "44100", "duration": "12.4"},
+    ],
+})
+
+
+def probe_result(stdout=PROBE_JSON, returncode=0, stderr=""):
+    return MagicMock(returncode=returncode, stdout=stdout, stderr=stderr)
+
+
+@pytest.fixture
+def media_file(tmp_path):
+    path = tmp_path / "episode.mp4"
+    path.write_bytes(b"media" * 100)
+    return path
+
+
+@pytest.mark.unit
+def test_queries_share_one_json_probe(media_file):
+    probe = MediaProbe()
+    with patch("src.utils.media_probe.subprocess.run", return_value=probe_result()) as mock_run:
+        assert probe.duration(media_file) == 12.5
+        assert probe.dimensions(media_file) == (1024, 640)
+        assert probe.sample_rate(media_file) == 44100
+        assert probe.codec(media_file) == "h264" and probe.codec(media_file, "audio") == "aac"
+        assert MediaProbe().duration(media_file) == 12.5
+
+    assert mock_run.call_count == 1
+    cmd = mock_run.call_args[0][0]
+    assert cmd[:1] == ["ffprobe"] and "-show_format" in cmd and "-show_streams" in cmd
+    assert cmd[cmd.index("-of") + 1] == "json" and "-count_packets" not in cmd
+
+
+@pytest.mark.unit
+def test_changed_file_is_probed_again(media_file):
+    probe = MediaProbe()
+    with patch("src.utils.media_probe.subprocess.run", return_value=probe_result()) as mock_run:
+        probe.duration(media_file)
+        media_file.write_bytes(b"media" * 200)
+        probe.duration(media_file)
+
+    assert mock_run.call_count == 2
+
+
+@pytest.mark.unit
+def test_disk_cache_survives_a_new_process(media_file, tmp_path):
+    with patch("src.utils.media_probe.subprocess.run", return_value=probe_result()):
+        MediaProbe(tmp_path / "cache").probe(media_file)
+    MediaProbe._memory.clear()
+
+    with patch("src.utils.media_probe.subprocess.run") as mock_run:
+        assert MediaProbe(tmp_path / "cache").dimensions(media_file) == (1024, 640)
+    mock_run.assert_not_called()
+    assert len(list((tmp_path / "cache" / "media_probe").glob("*.json"))) == 1
+
+
+@pytest.mark.unit
+def test_failures_are_not_cached(media_file):
+    probe = MediaProbe()
+    with patch("src.utils.media_probe.subprocess.run",
+               return_value=probe_result(stdout="", returncode=1, stderr="Invalid data found")):
+        with pytest.raises(ProbeError, match="Invalid data") as error:
+            probe.probe(media_file)
+        assert error.value.returncode == 1
+        assert probe.duration(media_file) is None
+
+    with patch("src.utils.media_probe.subprocess.run", return_value=probe_result()):
+        assert probe.duration(media_file) == 12.5
+
+
+@pytest.mark.unit
+def test_missing_values_and_files_answer_none(media_file, tmp_path):
+    audio_only = json.dumps({"format": {"duration": "N/A"}, "streams": [{"codec_type": "audio", "duration": "3.0"}]})
+    probe = MediaProbe()
+    with patch("src.utils.media_probe.subprocess.run", return_value=probe_result(stdout=audio_only)):
+        assert probe.duration(media_file) == 3.0
+        assert probe.dimensions(media_file) is None
+        assert probe.sample_rate(media_file) is None
+    assert probe.duration(tmp_path / "missing.mp3") is None
+
+    slow = tmp_path / "slow.mp4"
+    slow.write_bytes(b"media")
+    with patch("src.utils.media_probe.subprocess.run", side_effect=subprocess.TimeoutExpired("ffprobe", 10)):
+        assert probe.duration(slow) is None
+
+
+@pytest.mark.unit
+def test_verify_output_reads_container_headers_only(media_file):
+    probe = MediaProbe()
+    with patch("src.utils.media_probe.subprocess.run", return_value=probe_result()):
+        assert probe.verify_output(media_file) is None
+
+    media_file.write_bytes(b"truncated")
+    with patch("src.utils.media_probe.subprocess.run",
+               return_value=probe_result(stdout="", returncode=1, stderr="moov atom not found")):
+        assert "moov atom not found" in probe.verify_output(media_file)
+
+    media_file.write_bytes(b"audio only")
+    with patch("src.utils.media_probe.subprocess.run",
+               return_value=probe_result(stdout=json.dumps({"format": {"duration": "1.0"}, "streams": []}))):
+        assert probe.verify_output(media_file) == "no video stream"
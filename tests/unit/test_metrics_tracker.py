@@ -282,6 +282,27 @@ def test_get_cpu_ram_usage_fallback(monkeypatch):
     assert result == {"cpu_percent": 0.0, "ram_used_gb": 0.0, "ram_total_gb": 0.0, "ram_percent": 0.0}
 
 
+def test_record_component_stats_attaches_to_running_component(tmp_path, monkeypatch):
+    config = make_config(tmp_path)
+    tracker = MetricsTracker(config)
+    monkeypatch.setattr(metrics, "_metrics_tracker", tracker)
+
+    finished = tracker.start_component("tts")
+    tracker.finish_component(finished)
+    running = tracker.start_component("video_composition")
+    metrics.record_component_stats("frame_buffers", {"pool_buffers": 4, "reuses": 96})
+
+    assert running.stats == {"frame_buffers": {"pool_buffers": 4, "reuses": 96}}
+    assert finished.stats == {}
+    assert finished.peak_rss_mb is None or finished.peak_rss_mb > 0
+    assert tracker.current_session.to_dict()["components"][1]["stats"] == running.stats
+
+
+def test_record_component_stats_without_tracker(monkeypatch):
+    monkeypatch.setattr(metrics, "_metrics_tracker", None)
+    metrics.record_component_stats("frame_buffers", {"reuses": 1})  # No tracker: nothing to do
+
+
 def test_metrics_tracker_save_metrics_failure(tmp_path, monkeypatch, capsys):
     config = make_config(tmp_path)
     tracker = MetricsTracker(config)
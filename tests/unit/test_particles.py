@@ -0,0 +1,80 @@
+"""
+Tests for the struct-of-arrays particle field
+"""
+
+import numpy as np
+import pytest
+
+from src.utils.particles import ParticleField
+
+
+@pytest.mark.unit
+def test_same_seed_same_field():
+    a = ParticleField(64, 48, count=50, seed=7)
+    b = ParticleField(64, 48, count=50, seed=7)
+    c = ParticleField(64, 48, count=50, seed=8)
+
+    assert np.array_equal(a.render(12.5, 1.5), b.render(12.5, 1.5))
+    assert not np.array_equal(a.x, c.x)
+
+
+@pytest.mark.unit
+def test_positions_wrap_around_edges():
+    field = ParticleField(100, 50, count=1, seed=0)
+    field.x[:], field.y[:] = 95.0, 2.0
+    field.vx[:], field.vy[:] = 2.0, -1.0
+
+    x, y = field.positions(4.0)
+
+    assert (x[0], y[0]) == (3, 48)
+
+
+@pytest.mark.unit
+def test_render_stamps_discs_in_lut_colors():
+    field = ParticleField(40, 30, count=2, colors=((0, 0, 255), (255, 0, 0)), seed=0)
+    field.x[:] = [10.0, 30.0]
+    field.y[:] = [15.0, 15.0]
+    field.vx[:] = field.vy[:] = 0.0
+    field.size[:] = 2.0
+
+    frame = field.render(0.0, size_scale=1.0, background=(9, 9, 9))
+
+    assert frame.shape == (30, 40, 3)
+    assert tuple(frame[15, 10]) == (0, 0, 255)
+    assert tuple(frame[15, 30]) == tuple(field.color_lut[1])
+    assert tuple(frame[15, 12]) == (0, 0, 255)  # radius 2
+    assert tuple(frame[15, 13]) == (9, 9, 9)
+    assert tuple(frame[0, 0]) == (9, 9, 9)
+
+
+@pytest.mark.unit
+def test_render_clips_discs_at_frame_edges():
+    field = ParticleField(20, 20, count=1, seed=0)
+    field.x[:], field.y[:] = 0.0, 19.0
+    field.vx[:] = field.vy[:] = 0.0
+    field.size[:] = 2.0
+
+    frame = field.render(0.0, size_scale=3.0, background=(0, 0, 0))
+
+    assert frame[19, 0].any()
+    assert not frame[:10, 10:].any()
+
+
+@pytest.mark.unit
+def test_empty_field_renders_background():
+    frame = ParticleField(8, 4, count=0).render(1.0, background=(1, 2, 3))
+
+    assert (frame == [1, 2, 3]).all()
+
+
+@pytest.mark.unit
+def test_render_reuses_owner_canvas():
+    field = ParticleField(64, 48, count=30, seed=3)
+    fresh = ParticleField(64, 48, count=30, seed=3)
+
+    field.render(5.0, size_scale=2.0)
+    canvas = field._owner
+    frame = field.render(9.0, size_scale=1.0)
+
+    assert field._owner is canvas  # Smaller radii fit the existing padding
+    assert np.array_equal(frame, fresh.render(9.0, size_scale=1.0))
@@ -0,0 +1,119 @@
+"""
+Tests for parallel segmented encoding
+"""
+
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.utils.segmented_encode import (
+    audio_output_args,
+    concat_segments,
+    encode_segmented,
+    segment_bounds,
+    segment_command,
+)
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("first,last,segments", [(0, 1800, 4), (0, 1799, 3), (45, 1000, 4), (0, 95, 8)])
+def test_segment_bounds_cover_range_on_keyframes(first, last, segments):
+    bounds = segment_bounds(first, last, segments)
+
+    assert bounds[0][0] == first and bounds[-1][1] == last
+    assert len(bounds) <= segments
+    for (_, stop), (start, _) in zip(bounds[:-1], bounds[1:], strict=True):
+        assert stop == start
+        assert (start - first) % 30 == 0
+
+
+@pytest.mark.unit
+def test_segment_bounds_respects_minimum_length():
+    assert segment_bounds(0, 900, 8, min_frames=300) == [(0, 300), (300, 600), (600, 900)]
+    assert segment_bounds(0, 299, 4, min_frames=300) == [(0, 299)]
+    assert segment_bounds(10, 10, 4) == []
+
+
+@pytest.mark.unit
+def test_segment_command_limits_inputs_and_drops_audio(tmp_path):
+    output = tmp_path / "out.mp4"
+    cmd = ["ffmpeg", "-y", "-loop", "1", "-i", "bg.png", "-i", "audio.mp3",
+           "-c:v", "libx264", "-c:a", "aac", "-shortest", str(output)]
+
+    rewritten = segment_command(cmd, output, tmp_path / "seg.mp4", 20.0, 10.0)
+
+    assert rewritten == ["ffmpeg", "-y", "-loop", "1",
+                         "-ss", "20.000000", "-t", "10.000000", "-i", "bg.png",
+                         "-ss", "20.000000", "-t", "10.000000", "-i", "audio.mp3",
+                         "-c:v", "libx264", "-c:a", "aac", "-shortest",
+                         "-an", "-t", "10.000000", str(tmp_path / "seg.mp4")]
+    with pytest.raises(ValueError):
+        segment_command(cmd, tmp_path / "other.mp4", tmp_path / "seg.mp4", 0.0, 1.0)
+
+
+@pytest.mark.unit
+def test_audio_output_args_follow_command():
+    assert audio_output_args(["-b:a", "128k", "-ac", "1"]) == ["-c:a", "aac", "-b:a", "128k", "-ar", "44100", "-ac", "1"]
+    assert audio_output_args() == ["-c:a", "aac", "-b:a", "192k", "-ar", "44100", "-ac", "2"]
+
+
+@pytest.mark.unit
+def test_concat_segments_stream_copies_video_and_muxes_audio(tmp_path):
+    segments = [tmp_path / "a.mp4", tmp_path / "it's.mp4"]
+    with patch("src.utils.segmented_encode.subprocess.run") as mock_run:
+        mock_run.return_value = MagicMock(returncode=0)
+        concat_segments(segments, tmp_path / "out.mp4", tmp_path / "audio.mp3", audio_offset=5.0)
+
+    cmd = mock_run.call_args[0][0]
+    assert cmd[cmd.index("-f") + 1] == "concat"
+    assert cmd[cmd.index("-c:v") + 1] == "copy"
+    assert cmd[cmd.index("-ss") + 1] == "5.000000"
+    assert cmd.index("-ss") < cmd.index(str(tmp_path / "audio.mp3"))
+    listing = (tmp_path / "segments.txt").read_text()
+    assert listing.splitlines()[1] == "file '{}'".format(str(segments[1].resolve()).replace("'", "'\\''"))
+    assert "-t" not in cmd
+
+
+@pytest.mark.unit
+def test_concat_segments_cuts_at_duration(tmp_path):
+    output = tmp_path / "out.mp4"
+    with patch("src.utils.segmented_encode.subprocess.run") as mock_run:
+        mock_run.return_value = MagicMock(returncode=0)
+        concat_segments([tmp_path / "a.mp4"], output, tmp_path / "audio.mp3", duration=95.25)
+
+    cmd = mock_run.call_args[0][0]
+    assert cmd[cmd.index("-t") + 1] == "95.250000"
+    assert "-shortest" in cmd and cmd.index("-t") < cmd.index(str(output))
+
+
+@pytest.mark.unit
+def test_concat_segments_raises_on_failure(tmp_path):
+    with patch("src.utils.segmented_encode.subprocess.run") as mock_run:
+        mock_run.return_value = MagicMock(returncode=1, stderr="bad segment", stdout="")
+        with pytest.raises(RuntimeError, match="bad segment"):
+            concat_segments([tmp_path / "a.mp4"], tmp_path / "out.mp4")
+
+
+@pytest.mark.unit
+def test_encode_segmented_runs_segments_then_joins(tmp_path):
+    output = tmp_path / "out.mp4"
+    cmd = ["ffmpeg", "-i", "bg.png", "-i", "audio.mp3", "-b:a", "128k", str(output)]
+    with patch("src.utils.segmented_encode.subprocess.run") as mock_run:
+        mock_run.return_value = MagicMock(returncode=0)
+        assert encode_segmented(cmd, output, Path("audio.mp3"), 60.0, 4, fps=30)
+
+    commands = [call[0][0] for call in mock_run.call_args_list]
+    assert len(commands) == 5
+    assert all("-an" in segment for segment in commands[:4])
+    starts = sorted(float(segment[segment.index("-ss") + 1]) for segment in commands[:4])
+    assert starts == [0.0, 15.0, 30.0, 45.0]
+    assert "concat" in commands[4] and commands[4][-1] == str(output)
+    assert commands[4][commands[4].index("-b:a") + 1] == "128k"
+
+
+@pytest.mark.unit
+def test_encode_segmented_skips_short_encodes(tmp_path):
+    with patch("src.utils.segmented_encode.subprocess.run") as mock_run:
+        assert not encode_segmented(["ffmpeg", str(tmp_path / "o.mp4")], tmp_path / "o.mp4", Path("a.mp3"), 12.0, 4)
+    mock_run.assert_not_called()
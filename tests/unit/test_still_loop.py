@@ -0,0 +1,92 @@
+"""
+Tests for cached still-image loop clips
+"""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.utils.still_loop import loop_frames, loop_key, loop_segment, loop_still, video_output_args
+
+
+def fake_ffmpeg(cmd, **kwargs):
+    """Write the output file like FFmpeg would."""
+    with open(cmd[-1], "wb") as f:
+        f.write(b"mp4")
+    return MagicMock(returncode=0, stderr="", stdout="")
+
+
+@pytest.mark.unit
+def test_video_output_args_drop_inputs_audio_and_output(tmp_path):
+    output = tmp_path / "out.mp4"
+    cmd = ["ffmpeg", "-y", "-loop", "1", "-i", "bg.png", "-i", "audio.mp3",
+           "-c:v", "libx264", "-crf", "28", "-c:a", "aac", "-b:a", "128k", "-ar", "44100",
+           "-pix_fmt", "yuv420p", "-shortest", "-f", "mp4", str(output)]
+
+    assert video_output_args(cmd, output) == ["-c:v", "libx264", "-crf", "28", "-pix_fmt", "yuv420p", "-f", "mp4"]
+    with pytest.raises(ValueError):
+        video_output_args(cmd, tmp_path / "other.mp4")
+
+
+@pytest.mark.unit
+def test_loop_frames_are_whole_keyframe_intervals():
+    assert loop_frames(30) == 300
+    assert loop_frames(24) == 240
+    assert loop_frames(30, seconds=0.2) == 30
+
+
+@pytest.mark.unit
+def test_loop_key_follows_image_content_and_options(tmp_path):
+    image = tmp_path / "bg.png"
+    image.write_bytes(b"one")
+    key = loop_key(str(image), ["-crf", "28"], 30, 300)
+
+    assert loop_key(str(image), ["-crf", "28"], 30, 300) == key
+    assert loop_key(str(image), ["-crf", "23"], 30, 300) != key
+    assert loop_key(str(image), ["-crf", "28"], 24, 240) != key
+    image.write_bytes(b"two")
+    assert loop_key(str(image), ["-crf", "28"], 30, 300) != key
+
+
+@pytest.mark.unit
+def test_loop_segment_encodes_closed_gop_clip_once(tmp_path):
+    video_args = ["-c:v", "libx264", "-g", "30"]
+    with patch("src.utils.still_loop.subprocess.run", side_effect=fake_ffmpeg) as mock_run:
+        first = loop_segment(["-loop", "1", "-i", "bg.png"], video_args, tmp_path, fps=30)
+        second = loop_segment(["-loop", "1", "-i", "bg.png"], video_args, tmp_path, fps=30)
+
+    assert first == second and first.parent == tmp_path / "still_loops"
+    assert mock_run.call_count == 1
+    cmd = mock_run.call_args[0][0]
+    assert cmd[cmd.index("-frames:v") + 1] == "300"
+    assert cmd[cmd.index("-flags") + 1] == "+cgop"
+    assert cmd[cmd.index("-r") + 1] == "30" and "-an" in cmd
+    assert [path.name for path in first.parent.iterdir()] == [first.name]
+
+
+@pytest.mark.unit
+def test_loop_segment_raises_and_leaves_no_clip_on_failure(tmp_path):
+    with patch("src.utils.still_loop.subprocess.run") as mock_run:
+        mock_run.return_value = MagicMock(returncode=1, stderr="bad image", stdout="")
+        with pytest.raises(RuntimeError, match="bad image"):
+            loop_segment(["-loop", "1", "-i", "bg.png"], ["-c:v", "libx264"], tmp_path)
+
+    assert not any((tmp_path / "still_loops").iterdir())
+
+
+@pytest.mark.unit
+def test_loop_still_repeats_clip_to_cover_audio(tmp_path):
+    output = tmp_path / "out" / "episode.mp4"
+    with patch("src.utils.still_loop.subprocess.run", side_effect=fake_ffmpeg), patch(
+        "src.utils.still_loop.concat_segments"
+    ) as mock_concat:
+        loop_still(["-loop", "1", "-i", "bg.png"], ["-c:v", "libx264"], tmp_path / "audio.mp3", output,
+                   95.0, tmp_path / "cache", audio_args=["-c:a", "aac", "-b:a", "128k"])
+
+    segments, target, audio = mock_concat.call_args[0]
+    assert len(segments) == 10 and len(set(segments)) == 1
+    assert target == output and audio == tmp_path / "audio.mp3"
+    assert mock_concat.call_args[1]["audio_args"] == ["-c:a", "aac", "-b:a", "128k"]
+    # Stream-copied video is cut at the audio's end instead of running on to the last whole clip
+    assert mock_concat.call_args[1]["duration"] == 95.0
+    assert mock_concat.call_args[1]["list_path"].parent.parent == output.parent
@@ -21,7 +21,7 @@ def mock_ffmpeg_success(monkeypatch):
 
         if isinstance(cmd, list) and cmd:
             if cmd[0] == "ffprobe":
-                return CompletedProcess(cmd, 0, stdout="1.0\n", stderr="")
+                return CompletedProcess(cmd, 0, stdout='{"format": {"duration": "1.0"}}', stderr="")
             if cmd[0] == "ffmpeg":
                 output_path = Path(cmd[-1])
                 output_path.parent.mkdir(parents=True, exist_ok=True)
@@ -498,6 +498,35 @@ class TestVideoComposerHelperMethods:
 
             assert isinstance(result, Path)
 
+    def test_sized_background_prerenders_preset_resolution(self, test_config, temp_dir):
+        """Test backgrounds are fitted to the preset once and unreadable images fall back to FFmpeg scaling."""
+        from PIL import Image
+
+        composer = VideoComposer(test_config)
+        image = temp_dir / "bg.png"
+        Image.new("RGB", (640, 480)).save(image)
+
+        sized, fitted = composer._sized_background(image, VideoComposer.QUALITY_PRESETS["fastest"])
+        with Image.open(sized) as result:
+            assert result.size == (854, 480)
+        assert fitted
+        assert sized.parent == Path(test_config["storage"]["cache_dir"]) / "backgrounds"
+
+        broken = temp_dir / "broken.png"
+        broken.write_bytes(b"not an image")
+        assert composer._sized_background(broken, VideoComposer.QUALITY_PRESETS["fastest"]) == (broken, False)
+
+    def test_background_filter_passes_fitted_backgrounds_through(self):
+        """Test only backgrounds that are not already frame-sized get a scale/pad stage."""
+        preset = VideoComposer.QUALITY_PRESETS["fastest"]
+
+        assert VideoComposer._background_filter(preset, True) == "null"
+        assert VideoComposer._background_filter(preset, True, "scale=854:480") == "null"
+        assert VideoComposer._background_filter(preset, False).startswith(
+            "scale=854:480:force_original_aspect_ratio=decrease"
+        )
+        assert VideoComposer._background_filter(preset, False, "scale=854:480") == "scale=854:480"
+
     def test_create_text_image(self, test_config):
         """Test text image creation."""
         composer = VideoComposer(test_config)
@@ -578,7 +607,7 @@ class TestVideoComposerHelperMethods:
         mock_result = MagicMock()
         mock_result.returncode = 0
         mock_result.stderr = ""
-        mock_result.stdout = "10.5\n"  # Valid duration
+        mock_result.stdout = '{"format": {"duration": "10.5"}}'  # Valid duration
         
         with patch("subprocess.run", return_value=mock_result):
             is_valid, error_msg = composer._validate_audio_file(audio_path)
@@ -587,6 +616,145 @@ class TestVideoComposerHelperMethods:
             assert error_msg == ""
 
 
+    def test_encode_segmented_applies_to_long_cpu_encodes(self, test_config, temp_dir):
+        """Test encode_segments hands long libx264 encodes to the segmented encoder."""
+        test_config.setdefault("video", {})["encode_segments"] = 4
+        composer = VideoComposer(test_config)
+        output = temp_dir / "out.mp4"
+        cmd = ["ffmpeg", "-i", "bg.png", "-c:v", "libx264", str(output)]
+
+        with patch.object(composer, "_get_audio_duration_ffmpeg", return_value=120.0), patch(
+            "src.utils.segmented_encode.encode_segmented", return_value=True
+        ) as mock_encode:
+            assert composer._encode_segmented(cmd, temp_dir / "audio.mp3", output, audio_source=temp_dir / "avatar.mp4")
+            assert mock_encode.call_args[0][2] == temp_dir / "avatar.mp4"
+            assert mock_encode.call_args[0][4] == 4
+
+            nvenc_cmd = ["ffmpeg", "-i", "bg.png", "-c:v", "h264_nvenc", str(output)]
+            assert not composer._encode_segmented(nvenc_cmd, temp_dir / "audio.mp3", output)
+            test_config["video"]["encode_segments"] = 1
+            assert not composer._encode_segmented(cmd, temp_dir / "audio.mp3", output)
+        assert mock_encode.call_count == 1
+
+
+    def test_pipe_visualization_command_reads_frames_and_episode_audio(self, test_config, temp_dir):
+        """Test the visualization input becomes the frame pipe and its audio the episode audio."""
+        viz_path, audio_path = temp_dir / "viz.mp4", temp_dir / "audio.mp3"
+        cmd = [
+            "ffmpeg", "-y", "-loop", "1", "-i", "bg.png", "-i", str(viz_path),
+            "-filter_complex", "[0:v]scale=64:36[bg];[1:v]scale=64:36[viz];[bg][viz]blend=all_mode=screen[out]",
+            "-map", "[out]", "-map", "1:a", "-c:v", "libx264", "out.mp4",
+        ]
+        pipe_input = ["-f", "rawvideo", "-pix_fmt", "gray", "-i", "-"]
+
+        piped = VideoComposer._pipe_visualization_command(cmd, viz_path, pipe_input, "lutrgb=r=0", audio_path)
+
+        assert str(viz_path) not in piped
+        assert piped[4:14] == ["-i", "bg.png", *pipe_input, "-i", str(audio_path)]
+        assert piped[piped.index("-filter_complex") + 1] == (
+            "[1:v]lutrgb=r=0[viz_piped];[0:v]scale=64:36[bg];[viz_piped]scale=64:36[viz];[bg][viz]blend=all_mode=screen[out]"
+        )
+        assert piped[piped.index("[out]") + 2] == "2:a"
+
+    def test_compose_single_pass_streams_into_compose_command(self, test_config, temp_dir):
+        """Test video.single_pass hands the compose command to the visualizer instead of a temp video."""
+        viz_path, audio_path, output = temp_dir / "viz.mp4", temp_dir / "audio.mp3", temp_dir / "out.mp4"
+        cmd = ["ffmpeg", "-i", str(viz_path), "-i", "avatar.mp4", "-c:a", "copy", str(output)]
+        visualizer = MagicMock()
+        composer = VideoComposer(test_config)
+
+        assert not composer._compose_single_pass(visualizer, cmd, viz_path, audio_path, output)
+        visualizer.generate_visualization.assert_not_called()
+
+        test_config.setdefault("video", {})["single_pass"] = True
+        assert composer._compose_single_pass(visualizer, cmd, viz_path, audio_path, output, band_only=True)
+        args, kwargs = visualizer.generate_visualization.call_args
+        assert args == (audio_path, output) and kwargs["band_only"]
+        assert kwargs["compose"](["-f", "rawvideo", "-i", "-"], "") == [
+            "ffmpeg", "-f", "rawvideo", "-i", "-", "-i", "avatar.mp4", "-c:a", "copy", str(output)
+        ]
+
+        visualizer.generate_visualization.side_effect = RuntimeError("pipe closed")
+        assert not composer._compose_single_pass(visualizer, cmd, viz_path, audio_path, output)
+
+    def test_overlay_visualization_on_avatar_single_pass_maps_episode_audio(self, test_config, temp_dir):
+        """Test the single-pass avatar overlay takes its audio from the episode, not the avatar video."""
+        audio_path, avatar, output = temp_dir / "audio.mp3", temp_dir / "avatar.mp4", temp_dir / "out.mp4"
+        test_config.setdefault("video", {})["single_pass"] = True
+        composer = VideoComposer(test_config)
+        commands = []
+
+        def generate(self, audio, output_path, compose=None):
+            commands.append(compose(["-f", "rawvideo", "-i", "-"], ""))
+            return output_path
+
+        with patch("src.utils.gpu_utils.get_gpu_manager") as mock_gpu_manager, patch(
+            "src.core.audio_visualizer.AudioVisualizer.generate_visualization", generate
+        ):
+            mock_gpu_manager.return_value.gpu_available = False
+            assert composer._overlay_visualization_on_avatar(avatar, audio_path, output) == output
+
+        cmd = commands[0]
+        assert cmd[:9] == ["ffmpeg", "-f", "rawvideo", "-i", "-", "-i", str(avatar), "-i", str(audio_path)]
+        assert cmd[cmd.index("[vout]") - 1:cmd.index("[vout]") + 3] == ["-map", "[vout]", "-map", "2:a"]
+        assert "-shortest" in cmd
+
+    def test_compose_still_loop_reuses_command_video_options(self, test_config, temp_dir):
+        """Test the cached still loop is encoded with the command's video options and falls back on failure."""
+        audio_path, output = temp_dir / "audio.mp3", temp_dir / "out.mp4"
+        cmd = [
+            "ffmpeg", "-y", "-loop", "1", "-i", "bg.png", "-i", str(audio_path),
+            "-c:v", "libx264", "-crf", "28", "-vf", "scale=854:480",
+            "-c:a", "aac", "-b:a", "128k", "-ar", "44100", "-ac", "2", "-shortest", str(output),
+        ]
+        test_config["video"]["still_loop_cache"] = True
+        composer = VideoComposer(test_config)
+
+        with patch.object(composer, "_get_audio_duration_ffmpeg", return_value=95.0), patch(
+            "src.utils.still_loop.loop_still", return_value=output
+        ) as mock_loop, patch("src.utils.media_probe.MediaProbe.duration", return_value=95.02):
+            assert composer._compose_still_loop(cmd, ["-loop", "1", "-i", "bg.png"], audio_path, output)
+            assert mock_loop.call_args[0][1] == ["-c:v", "libx264", "-crf", "28", "-vf", "scale=854:480"]
+            assert mock_loop.call_args[0][4] == 95.0
+            assert mock_loop.call_args[1]["audio_args"] == ["-c:a", "aac", "-b:a", "128k", "-ar", "44100", "-ac", "2"]
+
+            mock_loop.side_effect = RuntimeError("encode failed")
+            assert not composer._compose_still_loop(cmd, ["-loop", "1", "-i", "bg.png"], audio_path, output)
+
+            test_config["video"]["still_loop_cache"] = False
+            assert not composer._compose_still_loop(cmd, ["-loop", "1", "-i", "bg.png"], audio_path, output)
+        assert mock_loop.call_count == 2
+
+    def test_compose_still_loop_rejects_output_longer_than_audio(self, test_config, temp_dir):
+        """Test a looped video that does not end with the audio is discarded for a full encode."""
+        audio_path, output = temp_dir / "audio.mp3", temp_dir / "out.mp4"
+        cmd = ["ffmpeg", "-y", "-loop", "1", "-i", "bg.png", "-i", str(audio_path), "-c:v", "libx264", str(output)]
+        test_config["video"]["still_loop_cache"] = True
+        composer = VideoComposer(test_config)
+
+        def loop_still(*args, **kwargs):
+            output.write_bytes(b"looped")
+            return output
+
+        with patch.object(composer, "_get_audio_duration_ffmpeg", return_value=95.0), patch(
+            "src.utils.still_loop.loop_still", side_effect=loop_still
+        ), patch("src.utils.media_probe.MediaProbe.duration", return_value=100.0) as mock_duration:
+            assert not composer._compose_still_loop(cmd, ["-loop", "1", "-i", "bg.png"], audio_path, output)
+
+        mock_duration.assert_called_once_with(output)
+        assert not output.exists()
+
+    def test_still_loop_cache_is_off_by_default(self, test_config, temp_dir):
+        """Test the still loop only runs when video.still_loop_cache is set."""
+        test_config["video"].pop("still_loop_cache", None)
+        composer = VideoComposer(test_config)
+
+        with patch("src.utils.still_loop.loop_still") as mock_loop:
+            assert not composer._compose_still_loop(["ffmpeg", "-i", "bg.png", "out.mp4"], ["-i", "bg.png"],
+                                                    temp_dir / "audio.mp3", temp_dir / "out.mp4")
+        mock_loop.assert_not_called()
+
+
 class TestVideoComposerErrorHandling:
     """Test error handling."""
 
@@ -12,7 +12,7 @@ def make_cfg(tmp_path):
     (tmp_path / "cache").mkdir()
     return {
         "storage": {"outputs_dir": str(tmp_path / "out"), "cache_dir": str(tmp_path / "cache")},
-        "video": {"fps": 24, "codec": "libx264"},
+        "video": {"fps": 24, "codec": "libx264", "still_loop_cache": False},
         "character": {"name": "QA Bot"},
     }
 
@@ -837,13 +837,94 @@ def test_compose_avatar_with_background_success(tmp_path):
         patch.object(VideoComposer, "_check_nvenc", return_value=False),
     ):
         mock_run.return_value.returncode = 0
-        mock_run.return_value.stdout = "1024x640"
+        mock_run.return_value.stdout = '{"streams": [{"codec_type": "video", "width": 1024, "height": 640}]}'
         result = comp._compose_avatar_with_background(avatar, audio, bg, output)
 
     assert result == output
     assert output.exists()
 
 
+@pytest.mark.unit
+@pytest.mark.parametrize("size,frame_sized", [((854, 480), True), ((640, 480), True), (None, False)])
+def test_compose_avatar_with_background_skips_scale_pad_for_fitted_background(tmp_path, size, frame_sized):
+    """Test a background pre-rendered at the preset resolution passes through the graph unscaled."""
+    from PIL import Image
+
+    from src.core.video_composer import VideoComposer
+
+    audio = tmp_path / "audio.mp3"
+    avatar = tmp_path / "avatar.mp4"
+    bg = tmp_path / "bg.png"
+    output = tmp_path / "out" / "final.mp4"
+    audio.write_bytes(b"mp3")
+    avatar.write_bytes(b"mp4")
+    if size:
+        Image.new("RGB", size).save(bg)
+    else:
+        bg.write_bytes(b"not an image")  # Cannot be pre-rendered: FFmpeg fits it
+    comp = VideoComposer(make_cfg(tmp_path))
+
+    def popen(cmd, **kwargs):
+        popen.cmd = cmd
+        process = MagicMock(returncode=0)
+        process.communicate.side_effect = lambda timeout=None: (output.write_bytes(b"video"), ("", ""))[1]
+        process.stderr = iter(())
+        return process
+
+    with (
+        patch("src.core.video_composer.subprocess.Popen", side_effect=popen),
+        patch("src.core.video_composer.subprocess.run") as mock_run,
+        patch("src.utils.file_monitor.FileMonitor"),
+        patch.object(VideoComposer, "_get_audio_duration_ffmpeg", return_value=1.0),
+        patch.object(VideoComposer, "_check_nvenc", return_value=False),
+    ):
+        mock_run.return_value.returncode = 0
+        mock_run.return_value.stdout = '{"streams": [{"codec_type": "video", "width": 1024, "height": 640}]}'
+        assert comp._compose_avatar_with_background(avatar, audio, bg, output) == output
+
+    graph = popen.cmd[popen.cmd.index("-filter_complex") + 1]
+    assert graph.startswith("[0:v]null[bg];") is frame_sized
+    assert ("force_original_aspect_ratio=decrease,pad=854:480" in graph) is not frame_sized
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("size,vf", [((640, 480), "scale=854:480"), ((854, 480), "null")])
+def test_compose_with_ffmpeg_cpu_fallback_stretches_source_background(tmp_path, size, vf):
+    """Test the NVENC-failure fallback stretches the original image, not the letterboxed pre-render."""
+    from PIL import Image
+
+    from src.core.video_composer import VideoComposer
+
+    audio = tmp_path / "audio.mp3"
+    image = tmp_path / "bg.png"
+    output = tmp_path / "out.mp4"
+    audio.write_bytes(b"mp3" * 100)
+    Image.new("RGB", size).save(image)
+    comp = VideoComposer(make_cfg(tmp_path))
+
+    mock_gpu_manager = MagicMock()
+    mock_gpu_manager.gpu_available = True
+    process = MagicMock(returncode=0)
+    process.communicate.return_value = ("", "")
+    process.poll.return_value = 0
+
+    with (
+        patch.object(VideoComposer, "_validate_audio_file", return_value=(True, "")),
+        patch.object(VideoComposer, "_get_audio_duration_ffmpeg", return_value=1.0),
+        patch("src.utils.gpu_utils.get_gpu_manager", return_value=mock_gpu_manager),
+        patch("src.core.video_composer.subprocess.run") as mock_run,
+        patch("src.core.video_composer.subprocess.Popen", return_value=process) as mock_popen,
+    ):
+        mock_run.return_value.stdout = "encoders available"  # No h264_nvenc
+        mock_run.return_value.stderr = ""
+        output.write_bytes(b"video content")
+        comp._compose_with_ffmpeg(audio, image, output, quality="fastest")
+
+    cmd = mock_popen.call_args[0][0]
+    assert cmd[cmd.index("-loop") + 3] == str(image)
+    assert cmd[cmd.index("-vf") + 1] == vf
+
+
 @pytest.mark.unit
 def test_compose_avatar_background_visualization_success(tmp_path):
     """Test _compose_avatar_background_visualization success path."""
@@ -862,6 +943,9 @@ def test_compose_avatar_background_visualization_success(tmp_path):
     comp = VideoComposer(cfg)
 
     class FakeViz:
+        def waveform_band(self):
+            return None
+
         def generate_visualization(self, a, o):
             o.write_bytes(b"viz")
             return o
@@ -888,13 +972,76 @@ def test_compose_avatar_background_visualization_success(tmp_path):
         patch.object(VideoComposer, "_check_nvenc", return_value=False),
     ):
         mock_run.return_value.returncode = 0
-        mock_run.return_value.stdout = "1024x640"
+        mock_run.return_value.stdout = '{"streams": [{"codec_type": "video", "width": 1024, "height": 640}]}'
         result = comp._compose_avatar_background_visualization(avatar, audio, bg, output)
 
     assert result == output
     assert output.exists()
 
 
+@pytest.mark.unit
+@pytest.mark.parametrize("enabled,accepted", [(True, True), (True, False), (False, True)])
+def test_compose_avatar_background_visualization_alpha_layer_skips_chromakey(tmp_path, enabled, accepted):
+    """Test an enabled alpha visualization layer is overlaid directly, without chromakey or eq."""
+    from src.core.video_composer import VideoComposer
+
+    audio = tmp_path / "audio.mp3"
+    avatar = tmp_path / "avatar.mp4"
+    bg = tmp_path / "bg.jpg"
+    output = tmp_path / "out" / "final.mp4"
+    audio.write_bytes(b"mp3")
+    avatar.write_bytes(b"mp4")
+    bg.write_bytes(b"jpg")
+    cfg = make_cfg(tmp_path)
+    cfg["visualization"] = {"alpha_layer": enabled}
+    comp = VideoComposer(cfg)
+    written = []
+    requested = []
+    alpha = enabled and accepted
+
+    class FakeViz:
+        def __init__(self, config):
+            pass
+
+        def use_alpha_layer(self):
+            requested.append(True)
+            return accepted
+
+        def waveform_band(self):
+            return None
+
+        def generate_visualization(self, a, o):
+            written.append(o)
+            o.write_bytes(b"viz")
+            return o
+
+    def popen(cmd, **kwargs):
+        popen.cmd = cmd
+        process = MagicMock(returncode=0)
+        process.communicate.side_effect = lambda timeout=None: (output.write_bytes(b"video"), ("", ""))[1]
+        process.stderr = iter(())
+        return process
+
+    with (
+        patch.dict(sys.modules, {"src.core.audio_visualizer": MagicMock(AudioVisualizer=FakeViz)}),
+        patch("src.core.video_composer.subprocess.Popen", side_effect=popen),
+        patch("src.core.video_composer.subprocess.run") as mock_run,
+        patch("src.utils.file_monitor.FileMonitor"),
+        patch.object(VideoComposer, "_get_audio_duration_ffmpeg", return_value=1.0),
+        patch.object(VideoComposer, "_check_nvenc", return_value=False),
+    ):
+        mock_run.return_value.returncode = 0
+        mock_run.return_value.stdout = '{"streams": [{"codec_type": "video", "width": 1024, "height": 640}]}'
+        assert comp._compose_avatar_background_visualization(avatar, audio, bg, output) == output
+
+    graph = popen.cmd[popen.cmd.index("-filter_complex") + 1]
+    assert requested == ([True] if enabled else [])
+    assert written[0].suffix == (".mov" if alpha else ".mp4")
+    assert ("chromakey" in graph) is not alpha
+    assert ("eq=saturation" in graph) is not alpha
+    assert "[bg_avatar][viz_cropped]overlay" in graph if alpha else "[viz_transparent]" in graph
+
+
 @pytest.mark.unit
 def test_compose_avatar_background_visualization_fallback(tmp_path):
     """Test _compose_avatar_background_visualization fallback to avatar+background."""
@@ -912,6 +1059,9 @@ def test_compose_avatar_background_visualization_fallback(tmp_path):
     comp = VideoComposer(cfg)
 
     class FakeViz:
+        def waveform_band(self):
+            return None
+
         def generate_visualization(self, a, o):
             raise RuntimeError("Visualization failed")
 
@@ -983,7 +1133,7 @@ def test_get_audio_duration_ffmpeg_success(tmp_path):
 
     with patch("src.core.video_composer.subprocess.run") as mock_run:
         mock_run.return_value.returncode = 0
-        mock_run.return_value.stdout = "10.5\n"
+        mock_run.return_value.stdout = '{"format": {"duration": "10.5"}}'
         duration = comp._get_audio_duration_ffmpeg(audio)
 
     assert duration == 10.5
@@ -1157,7 +1307,7 @@ def test_validate_audio_file_invalid_duration_zero(tmp_path):
 
     with patch("src.core.video_composer.subprocess.run") as mock_run:
         mock_run.return_value.returncode = 0
-        mock_run.return_value.stdout = "0.0\n"
+        mock_run.return_value.stdout = '{"format": {"duration": "0.0"}}'
         mock_run.return_value.stderr = ""
         is_valid, error_msg = comp._validate_audio_file(audio)
 
@@ -1177,7 +1327,7 @@ def test_validate_audio_file_invalid_duration_negative(tmp_path):
 
     with patch("src.core.video_composer.subprocess.run") as mock_run:
         mock_run.return_value.returncode = 0
-        mock_run.return_value.stdout = "-1.0\n"
+        mock_run.return_value.stdout = '{"format": {"duration": "-1.0"}}'
         mock_run.return_value.stderr = ""
         is_valid, error_msg = comp._validate_audio_file(audio)
 
@@ -1197,7 +1347,7 @@ def test_validate_audio_file_duration_parse_error(tmp_path):
 
     with patch("src.core.video_composer.subprocess.run") as mock_run:
         mock_run.return_value.returncode = 0
-        mock_run.return_value.stdout = "not a number\n"
+        mock_run.return_value.stdout = '{"format": {"duration": "not a number"}}'
         mock_run.return_value.stderr = ""
         is_valid, error_msg = comp._validate_audio_file(audio)
 
@@ -1270,7 +1420,7 @@ def test_validate_audio_file_corruption_indicators(tmp_path):
     # Test "illegal" indicator
     with patch("src.core.video_composer.subprocess.run") as mock_run:
         mock_run.return_value.returncode = 0
-        mock_run.return_value.stdout = "10.0\n"
+        mock_run.return_value.stdout = '{"format": {"duration": "10.0"}}'
         mock_run.return_value.stderr = "illegal stream format"
         is_valid, error_msg = comp._validate_audio_file(audio)
 
@@ -1280,7 +1430,7 @@ def test_validate_audio_file_corruption_indicators(tmp_path):
     # Test "invalid" indicator
     with patch("src.core.video_composer.subprocess.run") as mock_run:
         mock_run.return_value.returncode = 0
-        mock_run.return_value.stdout = "10.0\n"
+        mock_run.return_value.stdout = '{"format": {"duration": "10.0"}}'
         mock_run.return_value.stderr = "invalid file format"
         is_valid, error_msg = comp._validate_audio_file(audio)
 
@@ -1290,7 +1440,7 @@ def test_validate_audio_file_corruption_indicators(tmp_path):
     # Test "corrupt" indicator
     with patch("src.core.video_composer.subprocess.run") as mock_run:
         mock_run.return_value.returncode = 0
-        mock_run.return_value.stdout = "10.0\n"
+        mock_run.return_value.stdout = '{"format": {"duration": "10.0"}}'
         mock_run.return_value.stderr = "file is corrupt"
         is_valid, error_msg = comp._validate_audio_file(audio)
 
@@ -2432,6 +2582,7 @@ def test_compose_avatar_background_visualization_missing_avatar(tmp_path):
     ):
         mock_viz = MagicMock()
         mock_viz.generate_visualization.return_value = tmp_path / "viz.mp4"
+        mock_viz.waveform_band.return_value = None
         mock_viz_class.return_value = mock_viz
         mock_gpu.return_value.gpu_available = False
 
@@ -2468,6 +2619,7 @@ def test_compose_avatar_background_visualization_empty_avatar(tmp_path):
     ):
         mock_viz = MagicMock()
         mock_viz.generate_visualization.return_value = tmp_path / "viz.mp4"
+        mock_viz.waveform_band.return_value = None
         mock_viz_class.return_value = mock_viz
         mock_gpu.return_value.gpu_available = False
 
@@ -2515,7 +2667,7 @@ def test_compose_avatar_background_visualization_ffprobe_success(tmp_path):
 
     probe_result = MagicMock()
     probe_result.returncode = 0
-    probe_result.stdout = "1024x640"
+    probe_result.stdout = '{"streams": [{"codec_type": "video", "width": 1024, "height": 640}]}'
 
     with (
         patch("src.core.audio_visualizer.AudioVisualizer") as mock_viz_class,
@@ -2526,6 +2678,7 @@ def test_compose_avatar_background_visualization_ffprobe_success(tmp_path):
     ):
         mock_viz = MagicMock()
         mock_viz.generate_visualization.return_value = tmp_path / "viz.mp4"
+        mock_viz.waveform_band.return_value = None
         mock_viz_class.return_value = mock_viz
         
         mock_gpu.return_value.gpu_available = False
@@ -2589,6 +2742,7 @@ def test_compose_avatar_background_visualization_ffprobe_failure(tmp_path):
     ):
         mock_viz = MagicMock()
         mock_viz.generate_visualization.return_value = tmp_path / "viz.mp4"
+        mock_viz.waveform_band.return_value = None
         mock_viz_class.return_value = mock_viz
         
         mock_gpu.return_value.gpu_available = False
@@ -2644,6 +2798,7 @@ def test_compose_avatar_background_visualization_ffprobe_exception(tmp_path):
     ):
         mock_viz = MagicMock()
         mock_viz.generate_visualization.return_value = tmp_path / "viz.mp4"
+        mock_viz.waveform_band.return_value = None
         mock_viz_class.return_value = mock_viz
         
         mock_gpu.return_value.gpu_available = False
@@ -2704,6 +2859,7 @@ def test_compose_avatar_background_visualization_invalid_dimensions(tmp_path):
     ):
         mock_viz = MagicMock()
         mock_viz.generate_visualization.return_value = tmp_path / "viz.mp4"
+        mock_viz.waveform_band.return_value = None
         mock_viz_class.return_value = mock_viz
         
         mock_gpu.return_value.gpu_available = False
@@ -2754,7 +2910,7 @@ def test_compose_avatar_background_visualization_wider_avatar(tmp_path):
     # Avatar wider than 16:9 (e.g., 1920x800 = 2.4:1 aspect ratio)
     probe_result = MagicMock()
     probe_result.returncode = 0
-    probe_result.stdout = "1920x800"
+    probe_result.stdout = '{"streams": [{"codec_type": "video", "width": 1920, "height": 800}]}'
 
     with (
         patch("src.core.audio_visualizer.AudioVisualizer") as mock_viz_class,
@@ -2765,6 +2921,7 @@ def test_compose_avatar_background_visualization_wider_avatar(tmp_path):
     ):
         mock_viz = MagicMock()
         mock_viz.generate_visualization.return_value = tmp_path / "viz.mp4"
+        mock_viz.waveform_band.return_value = None
         mock_viz_class.return_value = mock_viz
         
         mock_gpu.return_value.gpu_available = False
@@ -2818,7 +2975,7 @@ def test_compose_avatar_background_visualization_taller_avatar(tmp_path):
     # Avatar taller than 16:9 (e.g., 800x1920 = 0.42:1 aspect ratio)
     probe_result = MagicMock()
     probe_result.returncode = 0
-    probe_result.stdout = "800x1920"
+    probe_result.stdout = '{"streams": [{"codec_type": "video", "width": 800, "height": 1920}]}'
 
     with (
         patch("src.core.audio_visualizer.AudioVisualizer") as mock_viz_class,
@@ -2828,6 +2985,7 @@ def test_compose_avatar_background_visualization_taller_avatar(tmp_path):
     ):
         mock_viz = MagicMock()
         mock_viz.generate_visualization.return_value = tmp_path / "viz.mp4"
+        mock_viz.waveform_band.return_value = None
         mock_viz_class.return_value = mock_viz
         
         mock_gpu.return_value.gpu_available = False
@@ -2878,7 +3036,7 @@ def test_compose_avatar_background_visualization_vertical_waveform_left(tmp_path
 
     probe_result = MagicMock()
     probe_result.returncode = 0
-    probe_result.stdout = "1024x640"
+    probe_result.stdout = '{"streams": [{"codec_type": "video", "width": 1024, "height": 640}]}'
 
     with (
         patch("src.core.audio_visualizer.AudioVisualizer") as mock_viz_class,
@@ -2889,6 +3047,7 @@ def test_compose_avatar_background_visualization_vertical_waveform_left(tmp_path
     ):
         mock_viz = MagicMock()
         mock_viz.generate_visualization.return_value = tmp_path / "viz.mp4"
+        mock_viz.waveform_band.return_value = None
         mock_viz_class.return_value = mock_viz
         
         mock_gpu.return_value.gpu_available = False
@@ -2942,7 +3101,7 @@ def test_compose_avatar_background_visualization_vertical_waveform_right(tmp_pat
 
     probe_result = MagicMock()
     probe_result.returncode = 0
-    probe_result.stdout = "1024x640"
+    probe_result.stdout = '{"streams": [{"codec_type": "video", "width": 1024, "height": 640}]}'
 
     with (
         patch("src.core.audio_visualizer.AudioVisualizer") as mock_viz_class,
@@ -2952,6 +3111,7 @@ def test_compose_avatar_background_visualization_vertical_waveform_right(tmp_pat
     ):
         mock_viz = MagicMock()
         mock_viz.generate_visualization.return_value = tmp_path / "viz.mp4"
+        mock_viz.waveform_band.return_value = None
         mock_viz_class.return_value = mock_viz
         
         mock_gpu.return_value.gpu_available = False
@@ -3002,7 +3162,7 @@ def test_compose_avatar_background_visualization_horizontal_waveform_top(tmp_pat
 
     probe_result = MagicMock()
     probe_result.returncode = 0
-    probe_result.stdout = "1024x640"
+    probe_result.stdout = '{"streams": [{"codec_type": "video", "width": 1024, "height": 640}]}'
 
     with (
         patch("src.core.audio_visualizer.AudioVisualizer") as mock_viz_class,
@@ -3012,6 +3172,7 @@ def test_compose_avatar_background_visualization_horizontal_waveform_top(tmp_pat
     ):
         mock_viz = MagicMock()
         mock_viz.generate_visualization.return_value = tmp_path / "viz.mp4"
+        mock_viz.waveform_band.return_value = None
         mock_viz_class.return_value = mock_viz
         
         mock_gpu.return_value.gpu_available = False
@@ -3062,7 +3223,7 @@ def test_compose_avatar_background_visualization_horizontal_waveform_middle(tmp_
 
     probe_result = MagicMock()
     probe_result.returncode = 0
-    probe_result.stdout = "1024x640"
+    probe_result.stdout = '{"streams": [{"codec_type": "video", "width": 1024, "height": 640}]}'
 
     with (
         patch("src.core.audio_visualizer.AudioVisualizer") as mock_viz_class,
@@ -3072,6 +3233,7 @@ def test_compose_avatar_background_visualization_horizontal_waveform_middle(tmp_
     ):
         mock_viz = MagicMock()
         mock_viz.generate_visualization.return_value = tmp_path / "viz.mp4"
+        mock_viz.waveform_band.return_value = None
         mock_viz_class.return_value = mock_viz
         
         mock_gpu.return_value.gpu_available = False
@@ -3106,7 +3268,7 @@ def test_compose_avatar_background_visualization_timeout(tmp_path):
 
     probe_result = MagicMock()
     probe_result.returncode = 0
-    probe_result.stdout = "1024x640"
+    probe_result.stdout = '{"streams": [{"codec_type": "video", "width": 1024, "height": 640}]}'
 
     class DummyProcess:
         def communicate(self, timeout=None):
@@ -3124,6 +3286,7 @@ def test_compose_avatar_background_visualization_timeout(tmp_path):
     ):
         mock_viz = MagicMock()
         mock_viz.generate_visualization.return_value = tmp_path / "viz.mp4"
+        mock_viz.waveform_band.return_value = None
         mock_viz_class.return_value = mock_viz
         
         mock_gpu.return_value.gpu_available = False
@@ -3153,7 +3316,7 @@ def test_compose_avatar_background_visualization_ffmpeg_error(tmp_path):
 
     probe_result = MagicMock()
     probe_result.returncode = 0
-    probe_result.stdout = "1024x640"
+    probe_result.stdout = '{"streams": [{"codec_type": "video", "width": 1024, "height": 640}]}'
 
     class DummyProcess:
         def __init__(self):
@@ -3179,6 +3342,7 @@ def test_compose_avatar_background_visualization_ffmpeg_error(tmp_path):
     ):
         mock_viz = MagicMock()
         mock_viz.generate_visualization.return_value = tmp_path / "viz.mp4"
+        mock_viz.waveform_band.return_value = None
         mock_viz_class.return_value = mock_viz
         
         mock_gpu.return_value.gpu_available = False
@@ -3228,7 +3392,7 @@ def test_compose_avatar_background_visualization_gpu_fallback(tmp_path):
 
     probe_result = MagicMock()
     probe_result.returncode = 0
-    probe_result.stdout = "1024x640"
+    probe_result.stdout = '{"streams": [{"codec_type": "video", "width": 1024, "height": 640}]}'
 
     mock_gpu_manager = MagicMock()
     mock_gpu_manager.gpu_available = True
@@ -3243,6 +3407,7 @@ def test_compose_avatar_background_visualization_gpu_fallback(tmp_path):
     ):
         mock_viz = MagicMock()
         mock_viz.generate_visualization.return_value = tmp_path / "viz.mp4"
+        mock_viz.waveform_band.return_value = None
         mock_viz_class.return_value = mock_viz
         
         mock_run.side_effect = [probe_result, MagicMock()]
@@ -3549,7 +3714,7 @@ def test_compose_avatar_with_background_success(tmp_path):
 
     probe_result = MagicMock()
     probe_result.returncode = 0
-    probe_result.stdout = "1024x640"
+    probe_result.stdout = '{"streams": [{"codec_type": "video", "width": 1024, "height": 640}]}'
 
     with (
         patch("src.utils.gpu_utils.get_gpu_manager") as mock_gpu,
@@ -3642,7 +3807,7 @@ def test_compose_avatar_with_background_timeout(tmp_path):
 
     probe_result = MagicMock()
     probe_result.returncode = 0
-    probe_result.stdout = "1024x640"
+    probe_result.stdout = '{"streams": [{"codec_type": "video", "width": 1024, "height": 640}]}'
 
     class DummyProcess:
         def communicate(self, timeout=None):
@@ -3684,7 +3849,7 @@ def test_compose_avatar_with_background_ffmpeg_error(tmp_path):
 
     probe_result = MagicMock()
     probe_result.returncode = 0
-    probe_result.stdout = "1024x640"
+    probe_result.stdout = '{"streams": [{"codec_type": "video", "width": 1024, "height": 640}]}'
 
     class DummyProcess:
         def __init__(self):
@@ -3747,7 +3912,7 @@ def test_compose_avatar_with_background_exception_fallback(tmp_path):
 
     probe_result = MagicMock()
     probe_result.returncode = 0
-    probe_result.stdout = "1024x640"
+    probe_result.stdout = '{"streams": [{"codec_type": "video", "width": 1024, "height": 640}]}'
 
     with (
         patch("src.utils.gpu_utils.get_gpu_manager") as mock_gpu,
@@ -3814,6 +3979,7 @@ def test_compose_avatar_background_visualization_gpu_encoding_success(tmp_path):
 
         mock_viz_instance = MagicMock()
         mock_viz_instance.generate_visualization.return_value = tmp_path / "viz.mp4"
+        mock_viz_instance.waveform_band.return_value = None
         mock_viz.return_value = mock_viz_instance
 
         mock_monitor_instance = MagicMock()
@@ -3890,6 +4056,7 @@ def test_compose_avatar_background_visualization_gpu_encoding_timeout(tmp_path):
 
         mock_viz_instance = MagicMock()
         mock_viz_instance.generate_visualization.return_value = tmp_path / "viz.mp4"
+        mock_viz_instance.waveform_band.return_value = None
         mock_viz.return_value = mock_viz_instance
 
         mock_monitor_instance = MagicMock()
@@ -3958,6 +4125,7 @@ def test_compose_avatar_background_visualization_gpu_encoding_error(tmp_path):
 
         mock_viz_instance = MagicMock()
         mock_viz_instance.generate_visualization.return_value = tmp_path / "viz.mp4"
+        mock_viz_instance.waveform_band.return_value = None
         mock_viz.return_value = mock_viz_instance
 
         mock_monitor_instance = MagicMock()
@@ -4026,6 +4194,7 @@ def test_compose_avatar_background_visualization_gpu_encoding_empty_output(tmp_p
 
         mock_viz_instance = MagicMock()
         mock_viz_instance.generate_visualization.return_value = tmp_path / "viz.mp4"
+        mock_viz_instance.waveform_band.return_value = None
         mock_viz.return_value = mock_viz_instance
 
         mock_monitor_instance = MagicMock()
@@ -4346,6 +4515,7 @@ def test_compose_avatar_background_visualization_audio_duration_none(tmp_path):
 
         mock_viz_instance = MagicMock()
         mock_viz_instance.generate_visualization.return_value = tmp_path / "viz.mp4"
+        mock_viz_instance.waveform_band.return_value = None
         mock_viz.return_value = mock_viz_instance
 
         mock_monitor_instance = MagicMock()
@@ -4417,6 +4587,7 @@ def test_compose_avatar_background_visualization_stderr_read_exception(tmp_path)
 
         mock_viz_instance = MagicMock()
         mock_viz_instance.generate_visualization.return_value = tmp_path / "viz.mp4"
+        mock_viz_instance.waveform_band.return_value = None
         mock_viz.return_value = mock_viz_instance
 
         mock_monitor_instance = MagicMock()
@@ -4483,6 +4654,7 @@ def test_compose_avatar_background_visualization_cpu_fallback(tmp_path):
 
         mock_viz_instance = MagicMock()
         mock_viz_instance.generate_visualization.return_value = tmp_path / "viz.mp4"
+        mock_viz_instance.waveform_band.return_value = None
         mock_viz.return_value = mock_viz_instance
 
         mock_monitor_instance = MagicMock()
@@ -4505,6 +4677,46 @@ def test_compose_avatar_background_visualization_cpu_fallback(tmp_path):
             assert result == output
 
 
+@pytest.mark.unit
+def test_compose_avatar_background_visualization_segmented_uses_avatar_audio(tmp_path):
+    """Test the segmented CPU encode muxes the avatar's lip-synced audio, as the command maps it."""
+    from src.core.video_composer import VideoComposer
+
+    avatar = tmp_path / "avatar.mp4"
+    audio = tmp_path / "audio.mp3"
+    bg = tmp_path / "bg.jpg"
+    output = tmp_path / "out.mp4"
+    avatar.write_bytes(b"video" * 100)
+    audio.write_bytes(b"mp3" * 100)
+    bg.write_bytes(b"jpg")
+
+    comp = VideoComposer(make_cfg(tmp_path))
+
+    probe_result = MagicMock()
+    probe_result.returncode = 0
+    probe_result.stdout = "width=1920\nheight=1080\n"
+
+    with (
+        patch("src.core.video_composer.subprocess.run", return_value=probe_result),
+        patch("src.core.video_composer.subprocess.Popen") as mock_popen,
+        patch("src.utils.gpu_utils.get_gpu_manager") as mock_gpu,
+        patch("src.core.audio_visualizer.AudioVisualizer") as mock_viz,
+        patch.object(comp, "_compose_single_pass", return_value=False),
+        patch.object(comp, "_encode_segmented", return_value=True) as mock_segmented,
+    ):
+        mock_gpu.return_value.gpu_available = False
+        mock_viz.return_value.waveform_band.return_value = None
+
+        result = comp._compose_avatar_background_visualization(avatar, audio, bg, output)
+
+    assert result == output
+    mock_popen.assert_not_called()
+    cmd, audio_path, output_path = mock_segmented.call_args[0]
+    assert cmd[cmd.index("[vout]") + 2] == "2:a"
+    assert (audio_path, output_path) == (audio, output)
+    assert mock_segmented.call_args[1]["audio_source"] == avatar
+
+
 @pytest.mark.unit
 def test_compose_avatar_with_background_gpu_setup_exception(tmp_path):
     """Test _compose_avatar_with_background handles GPU setup exception."""
@@ -5046,12 +5258,12 @@ def test_compose_avatar_with_background_avatar_aspect_ratio_scaling(tmp_path):
     # Test case 1: Avatar wider than output (line 1496-1498)
     probe_result_wide = MagicMock()
     probe_result_wide.returncode = 0
-    probe_result_wide.stdout = "1920x640"  # Wide aspect ratio
+    probe_result_wide.stdout = '{"streams": [{"codec_type": "video", "width": 1920, "height": 640}]}'  # Wide aspect ratio
 
     # Test case 2: Avatar taller than output (line 1499-1501)
     probe_result_tall = MagicMock()
     probe_result_tall.returncode = 0
-    probe_result_tall.stdout = "640x1920"  # Tall aspect ratio
+    probe_result_tall.stdout = '{"streams": [{"codec_type": "video", "width": 640, "height": 1920}]}'  # Tall aspect ratio
 
     for probe_result in [probe_result_wide, probe_result_tall]:
         with (
@@ -5122,6 +5334,7 @@ def test_compose_avatar_background_visualization_gpu_setup_exception(tmp_path):
 
         mock_viz_instance = MagicMock()
         mock_viz_instance.generate_visualization.return_value = tmp_path / "viz.mp4"
+        mock_viz_instance.waveform_band.return_value = None
         mock_viz.return_value = mock_viz_instance
 
         mock_monitor_instance = MagicMock()